@@ -17,6 +17,18 @@ from PySide6.QtCore import QObject, Signal
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from core.hash_cache import get_hash_cache
+from core.multipart_stream import MultipartStream
+from core.chunked_upload import ChunkedUploader
+from core.transport import get_transport, NO_PROXIES
+from core.op_batcher import OpBatcher
+from core.task_tracker import TaskTracker
+from core.token_refresh import TokenRefresher
+from core.response_cache import ResponseCache
+from core.metadata_store import get_metadata_store
+from core.local_store import data_dir
+from core.name_index import get_name_index
+from core.remote_sync import RemoteSync
 
 
 class APIClient(QObject):
@@ -35,8 +47,21 @@ class APIClient(QObject):
         self.user_jwt: Optional[str] = None
         self.refresh_token_value: Optional[str] = None
         self.baidu_token: Optional[Dict[str, Any]] = None
-        self.session = requests.Session()
+        # 与其他请求共享连接池；请求头/cookie 属于本客户端
+        self.session = get_transport().new_session()
+        # 单飞刷新 JWT，并在过期前主动刷新
+        self.token_refresher = TokenRefresher(self)
+        # 只读接口的响应缓存（切换账号/登出时清空）
+        self.response_cache = ResponseCache()
+        # 远端目录树的本地镜像（列表结果写入，打开目录时先用本地数据显示）
+        self.metadata_store = get_metadata_store()
+        # 基于镜像的本地文件名索引（随镜像增量更新，搜索无需访问服务端）
+        self.name_index = get_name_index()
+        # 基于镜像的增量同步（只重新列出变化的目录）
+        self.remote_sync = RemoteSync(self)
         self.device_fingerprint = self.generate_device_fingerprint()
+        # 直链下载的并行连接数（1 表示单连接）
+        self.download_connections = 4
         
         # 设置请求头
         self.session.headers.update({
@@ -59,7 +84,7 @@ class APIClient(QObject):
     # ---------- 单账号旧存储（兼容） ----------
     def get_tokens_store_path(self) -> Path:
         """获取本地token存储路径"""
-        base = Path(os.environ.get('APPDATA') or Path.home() / '.pan_client')
+        base = data_dir()
         base.mkdir(parents=True, exist_ok=True)
         return base / 'auth_tokens.json'
     
@@ -119,7 +144,7 @@ class APIClient(QObject):
     # ---------- 多账号存储 ----------
     def _accounts_dir(self) -> Path:
         """获取账号存储目录"""
-        base = Path(os.environ.get('APPDATA') or Path.home() / '.pan_client')
+        base = data_dir()
         base.mkdir(parents=True, exist_ok=True)
         return base
 
@@ -198,6 +223,7 @@ class APIClient(QObject):
     def _apply_account(self, uk: str):
         """应用指定账号的token和用户信息"""
         acct = self.accounts.get(str(uk)) or {}
+        self.response_cache.clear()
         self.user_jwt = acct.get('jwt_token')
         self.refresh_token_value = acct.get('refresh_token')
         self.baidu_token = acct.get('baidu_token')
@@ -446,19 +472,22 @@ class APIClient(QObject):
             return None
         
         try:
+            self.token_refresher.ensure_fresh()
             # 确保请求头包含Authorization
-            headers = {"Authorization": f"Bearer {self.user_jwt}"}
+            used_jwt = self.user_jwt
+            headers = {"Authorization": f"Bearer {used_jwt}"}
             response = self.session.post(
                 f"{self.base_url}/mcp/user/exec",
                 json={"op": operation, "args": args or {}},
                 headers=headers
             )
             if response.status_code == 200:
+                self._invalidate_for_op(operation, args)
                 return response.json()
             elif response.status_code in [401, 403]:
                 # Token过期，尝试刷新
                 print(f"[DEBUG] API调用失败 (HTTP {response.status_code})，尝试刷新token...")
-                if self.refresh_token():
+                if self.refresh_token(used_jwt):
                     # 刷新成功，重试请求
                     headers = {"Authorization": f"Bearer {self.user_jwt}"}
                     response = self.session.post(
@@ -467,6 +496,7 @@ class APIClient(QObject):
                         headers=headers
                     )
                     if response.status_code == 200:
+                        self._invalidate_for_op(operation, args)
                         return response.json()
                     else:
                         print(f"[DEBUG] 重试后仍然失败: HTTP {response.status_code}")
@@ -491,6 +521,140 @@ class APIClient(QObject):
             print(f"API调用失败: {e}")
             raise e
     
+    @property
+    def op_batcher(self) -> OpBatcher:
+        """/mcp/user/exec 操作合并器（首次使用时创建）"""
+        batcher = getattr(self, '_op_batcher', None)
+        if batcher is None:
+            batcher = self._op_batcher = OpBatcher(self)
+        return batcher
+
+    @property
+    def task_tracker(self) -> TaskTracker:
+        """异步文件任务（删除/移动/复制/重命名）完成状态跟踪器（首次使用时创建）"""
+        tracker = getattr(self, '_task_tracker', None)
+        if tracker is None:
+            tracker = self._task_tracker = TaskTracker(self)
+        return tracker
+
+    def call_api_batched(self, operation: str, args: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """与 call_api 相同，但与短时间内其他线程提交的操作合并为一次请求"""
+        if not self.user_jwt:
+            return None
+        return self.op_batcher.call(operation, args)
+
+    def call_api_many(self, ops: List[tuple]) -> List[Optional[Dict[str, Any]]]:
+        """一次提交多个操作 [(op, args), ...]，按顺序返回结果；失败项为 {"status":"error",...}"""
+        if not self.user_jwt:
+            return [None] * len(ops or [])
+        return self.op_batcher.call_many(list(ops or []))
+
+    def batch(self):
+        """显式合并：with api_client.batch() as b: fut = b.submit(op, args)"""
+        return self.op_batcher.batch()
+
+    # ---------- 响应缓存 ----------
+    @staticmethod
+    def _op_paths(operation: str, args: Optional[Dict[str, Any]]) -> List[str]:
+        """写操作触及的远端路径（只读操作返回空列表）"""
+        import posixpath
+        args = args or {}
+        if operation == 'mkdir':
+            return [args.get('path')]
+        if operation in ('delete', 'move', 'copy', 'rename'):
+            try:
+                filelist = args.get('filelist')
+                items = json.loads(filelist) if isinstance(filelist, str) else (filelist or [])
+            except Exception:
+                return ['/']
+            paths = []
+            for item in items:
+                if isinstance(item, str):
+                    paths.append(item)
+                elif isinstance(item, dict):
+                    src = item.get('path')
+                    paths.append(src)
+                    dest = item.get('dest')
+                    name = item.get('newname') or posixpath.basename(src or '')
+                    if dest:
+                        paths.append(posixpath.join(dest, name) if name else dest)
+            return paths
+        if operation in ('upload_text', 'upload_url', 'upload_local'):
+            if args.get('remote_path'):
+                return [args['remote_path']]
+            if args.get('dir'):
+                return [posixpath.join(args['dir'], args.get('filename') or '')]
+        return []
+
+    def _invalidate_for_op(self, operation: str, args: Optional[Dict[str, Any]]):
+        paths = [p for p in self._op_paths(operation, args) if p]
+        if paths:
+            self.response_cache.invalidate_paths(paths)
+            import posixpath
+            self.remote_sync.mark_dirty(posixpath.dirname(p.rstrip('/')) or '/' for p in paths)
+        if operation in ('delete', 'move'):
+            # 源路径已不存在（旧条目留到所在目录下次同步时产生 removed 事件）；目标位置等下次列表时写入
+            try:
+                filelist = (args or {}).get('filelist')
+                items = json.loads(filelist) if isinstance(filelist, str) else (filelist or [])
+                sources = [i if isinstance(i, str) else (i or {}).get('path') for i in items]
+                self.remote_sync.forget_paths(sources)
+            except Exception:
+                pass
+
+    def account_key(self) -> str:
+        """本地数据按账号隔离使用的键"""
+        uk = getattr(self, 'current_account_uk', None)
+        if not uk:
+            info = getattr(self, 'user_info', None) or {}
+            uk = info.get('uk') or info.get('username') or 'default'
+        return str(uk)
+
+    def _remember_listing(self, dir_path: str, limit: int, page: int, result: Any):
+        """把 list_files 的成功结果写入元数据镜像"""
+        if not isinstance(result, dict) or result.get('status') != 'ok':
+            return
+        data = result.get('data') if isinstance(result.get('data'), dict) else result
+        files = (data or {}).get('list') or (data or {}).get('files') or (data or {}).get('items') or []
+        self.metadata_store.apply_listing(self.account_key(), dir_path, files, page=page,
+                                          complete=len(files) < int(limit or 0))
+
+    def cached_listing(self, dir_path: str) -> Optional[List[Dict[str, Any]]]:
+        """本地镜像中的目录列表；从未拉取过返回 None"""
+        return self.metadata_store.listing(self.account_key(), dir_path)
+
+    def local_search(self, keyword: str, limit: int = 200, under: Optional[str] = None) -> List[Dict[str, Any]]:
+        """在本地文件名索引中搜索（只覆盖列出过的目录；首次调用会阻塞构建索引）"""
+        return self.name_index.search(self.account_key(), keyword, limit=limit, under=under)
+
+    def _cached_get(self, endpoint: str, url: str, params: Optional[Dict[str, Any]] = None,
+                    headers: Optional[Dict[str, str]] = None, refresh_on_auth: bool = False,
+                    timeout: Optional[float] = None, use_cache: bool = True):
+        """GET JSON 并缓存：未过期直接返回，过期后带条件请求头重新校验（304 复用缓存）"""
+        cache = self.response_cache
+        key = cache.key(endpoint, params)
+        entry = cache.lookup(key) if use_cache else None
+        if entry is not None and entry.fresh:
+            return entry.value()
+        req_headers = dict(headers or {})
+        if entry is not None:
+            req_headers.update(entry.validators())
+        used_jwt = self.user_jwt
+        resp = self.session.get(url, params=params, headers=req_headers or None, timeout=timeout)
+        if refresh_on_auth and resp.status_code in [401, 403] and self.user_jwt:
+            print(f"[DEBUG] {endpoint}失败 (HTTP {resp.status_code})，尝试刷新token...")
+            if self.refresh_token(used_jwt):
+                if 'Authorization' in req_headers:
+                    req_headers['Authorization'] = f'Bearer {self.user_jwt}'
+                resp = self.session.get(url, params=params, headers=req_headers or None, timeout=timeout)
+        if resp.status_code == 304 and entry is not None:
+            cache.revalidated(key)
+            return entry.value()
+        data = resp.json() if resp.content else None
+        if resp.status_code == 200 and data is not None:
+            cache.put(key, data, etag=resp.headers.get('ETag'), last_modified=resp.headers.get('Last-Modified'))
+        return data
+
     def call_public_api(self, operation: str, args: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
         """调用公共API（默认也携带JWT，以满足后端统一鉴权）"""
         try:
@@ -516,9 +680,15 @@ class APIClient(QObject):
     def get_quota_info(self) -> Optional[Dict[str, Any]]:
         """获取网盘配额，返回 data 或 None"""
         try:
+            key = self.response_cache.key('quota')
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
             result = self.get_quota()
             if result and result.get('status') == 'ok':
-                return result.get('data') or {}
+                quota = result.get('data') or {}
+                self.response_cache.put(key, quota)
+                return quota
             return None
         except Exception as e:
             print(f"获取配额失败: {e}")
@@ -529,9 +699,20 @@ class APIClient(QObject):
         if not self.user_jwt:
             return None
         try:
-            resp = self.session.get(f"{self.base_url}/quota/today")
+            key = self.response_cache.key('quota_today')
+            entry = self.response_cache.lookup(key)
+            if entry is not None and entry.fresh:
+                return entry.value()
+            resp = self.session.get(f"{self.base_url}/quota/today",
+                                    headers=entry.validators() if entry is not None else None)
+            if resp.status_code == 304 and entry is not None:
+                self.response_cache.revalidated(key)
+                return entry.value()
             if resp.status_code == 200:
-                return resp.json()
+                data = resp.json()
+                self.response_cache.put(key, data, etag=resp.headers.get('ETag'),
+                                        last_modified=resp.headers.get('Last-Modified'))
+                return data
             # 返回统一错误结构
             try:
                 data = resp.json()
@@ -555,6 +736,18 @@ class APIClient(QObject):
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
+    def files_dedup_md5_batch(self, md5_list: List[str], sample_limit: int = 5, max_concurrent: int = 4) -> Dict[str, Dict[str, Any]]:
+        """批量查重：后端仅提供单个MD5查询，这里并发发出请求并汇总为 {md5: 响应}"""
+        from concurrent.futures import ThreadPoolExecutor
+        unique = list(dict.fromkeys(m for m in (md5_list or []) if m))
+        if not unique:
+            return {}
+        if len(unique) == 1:
+            return {unique[0]: self.files_dedup_md5(unique[0], sample_limit)}
+        with ThreadPoolExecutor(max_workers=max(1, min(int(max_concurrent or 1), len(unique)))) as pool:
+            results = pool.map(lambda m: self.files_dedup_md5(m, sample_limit), unique)
+            return dict(zip(unique, results))
+
     def refresh_and_cache_user_quota(self):
         """拉取配额并写入本地缓存的 user_info.quota"""
         quota = self.get_quota_info()
@@ -572,9 +765,20 @@ class APIClient(QObject):
                 self.save_accounts()
             self.save_tokens(None, None, self.user_info)
     
-    def list_files(self, dir_path: str = "/", limit: int = 100, page: int = 1) -> Optional[Dict[str, Any]]:
-        """获取文件列表"""
-        return self.call_api("list_files", {"dir": dir_path, "limit": limit, "page": page})
+    def list_files(self, dir_path: str = "/", limit: int = 100, page: int = 1,
+                   use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """获取文件列表（use_cache=False 时强制从服务端拉取，如手动刷新、操作结果校验）"""
+        args = {"dir": dir_path, "limit": limit, "page": page}
+        key = self.response_cache.key("list_files", args)
+        if use_cache:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+        result = self.call_api("list_files", args)
+        if isinstance(result, dict) and result.get('status') == 'ok':
+            self.response_cache.put(key, result, tag=dir_path)
+            self._remember_listing(dir_path, limit, page, result)
+        return result
     
     def list_images(self, dir_path: str = "/", limit: int = 100) -> Optional[Dict[str, Any]]:
         """获取图片列表"""
@@ -623,6 +827,101 @@ class APIClient(QObject):
         # 使用路径格式的filelist参数
         filelist = [{"path": source_path, "dest": target_dir}]
         return self.call_api("copy", {"filelist": json.dumps(filelist), "async": 1, "ondup": "overwrite"})
+
+    # ---------- 批量文件操作 ----------
+    FILELIST_LIMIT = 100  # 单个 delete/move/copy 请求 filelist 的条目上限
+
+    @staticmethod
+    def _filelist_entry(operation: str, item: Any) -> Optional[Any]:
+        """把调用方条目转换为 filelist 中的一项；无效条目返回 None"""
+        import posixpath
+        if operation == 'delete':
+            path = item if isinstance(item, str) else (item or {}).get('path')
+            return path or None
+        if not isinstance(item, dict) or not item.get('path'):
+            return None
+        if operation == 'rename':
+            # 与 rename_file 一致：移动到同一目录并使用新名称
+            if not item.get('newname'):
+                return None
+            return {"path": item['path'], "dest": posixpath.dirname(item['path'].rstrip('/')) or '/',
+                    "newname": item['newname']}
+        if not item.get('dest'):
+            return None
+        entry = {"path": item['path'], "dest": item['dest']}
+        if item.get('newname'):
+            entry["newname"] = item['newname']
+        return entry
+
+    def _filelist_results(self, chunk: List[Any], ret: Any) -> List[Optional[str]]:
+        """逐项结果：成功为 None，失败为错误信息"""
+        if not isinstance(ret, dict):
+            return ["未触达后端"] * len(chunk)
+        if ret.get('status') not in ('ok', 'success') and ret.get('errno') not in (0, '0'):
+            error = ret.get('error') or self._handle_api_error(ret)
+            return [str(error)] * len(chunk)
+        data = ret.get('data') if isinstance(ret.get('data'), dict) else ret
+        info = data.get('info')
+        if isinstance(info, list) and info:
+            # 服务端给出了逐项结果：按路径对应（没有路径时按顺序）
+            by_path = {}
+            for i, it in enumerate(info):
+                if isinstance(it, dict):
+                    by_path[it.get('path') or i] = it.get('errno', 0)
+            results = []
+            for i, entry in enumerate(chunk):
+                path = entry if isinstance(entry, str) else entry.get('path')
+                errno = by_path.get(path, by_path.get(i, 0))
+                results.append(None if errno in (0, '0', None) else self._handle_api_error({'data': {'errno': errno}}))
+            return results
+        if data.get('errno') not in (0, '0', None):
+            return [self._handle_api_error({'data': data})] * len(chunk)
+        return [None] * len(chunk)
+
+    def file_op_many(self, operation: str, items: List[Any], ondup: str = "overwrite") -> Dict[str, Any]:
+        """批量删除/移动/复制/重命名：多个条目打包进一个 filelist 请求
+
+        - delete：items 为路径列表
+        - move/copy：items 为 {"path", "dest", "newname"(可选)}
+        - rename：items 为 {"path", "newname"}
+        超过 FILELIST_LIMIT 时自动拆分，拆分后的请求合并为一次多操作请求提交；返回
+        {"status": "ok"|"partial"|"error", "succeeded": [源路径], "failed": [{"path", "error"}],
+         "taskids": [...], "tasks": [{"taskid", "paths"}]}（tasks 为每个请求的任务编号及其成功条目）
+        """
+        if operation not in ('delete', 'move', 'copy', 'rename'):
+            return {"status": "error", "error": f"unsupported_op:{operation}"}
+        filelist = [e for e in (self._filelist_entry(operation, item) for item in items or []) if e]
+        if not filelist:
+            return {"status": "error", "error": "empty_filelist"}
+        op = 'move' if operation == 'rename' else operation
+        chunks = [filelist[i:i + self.FILELIST_LIMIT] for i in range(0, len(filelist), self.FILELIST_LIMIT)]
+        try:
+            responses = self.call_api_many([(op, {"filelist": json.dumps(chunk, ensure_ascii=False),
+                                                  "async": 1, "ondup": ondup}) for chunk in chunks])
+        except Exception as e:
+            responses = [{"status": "error", "error": str(e)}] * len(chunks)
+
+        succeeded, failed, taskids, tasks = [], [], [], []
+        for chunk, ret in zip(chunks, responses):
+            data = (ret.get('data') if isinstance(ret, dict) and isinstance(ret.get('data'), dict) else ret) or {}
+            taskid = (data.get('taskid') if isinstance(data, dict) else None) or \
+                (ret.get('taskid') if isinstance(ret, dict) else None)
+            chunk_ok = []
+            for entry, error in zip(chunk, self._filelist_results(chunk, ret)):
+                path = entry if isinstance(entry, str) else entry['path']
+                if error is None:
+                    chunk_ok.append(path)
+                else:
+                    failed.append({"path": path, "error": error})
+            succeeded.extend(chunk_ok)
+            if taskid:
+                taskids.append(taskid)
+            tasks.append({"taskid": taskid, "paths": chunk_ok})
+        status = "ok" if not failed else ("partial" if succeeded else "error")
+        result = {"status": status, "succeeded": succeeded, "failed": failed, "taskids": taskids, "tasks": tasks}
+        if status == "error":
+            result["error"] = failed[0]["error"]
+        return result
     
     def upload_local_file(self, local_path: str, remote_path: str, 
                          concurrent: int = 3) -> Optional[Dict[str, Any]]:
@@ -643,20 +942,16 @@ class APIClient(QObject):
         return self.call_public_api("upload_url", {"url": url, "dir": dir_path, "filename": filename})
 
     def _calculate_file_md5(self, file_path: str) -> str:
-        """计算文件的MD5值"""
-        import hashlib
-        try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except Exception as e:
-            print(f"[DEBUG] MD5计算失败: {e}")
-            return None
+        """计算文件的MD5值（文件未变化时直接命中本地哈希缓存）"""
+        return get_hash_cache().file_md5(file_path)
+
+    def user_upload_local_file(self, local_path: str, remote_path: str, md5: str = None,
+                               progress_callback=None, auto_md5: bool = True) -> Optional[Dict[str, Any]]:
+        """用户态本地文件上传 - 使用POST /upload/user接口
 
-    def user_upload_local_file(self, local_path: str, remote_path: str, md5: str = None) -> Optional[Dict[str, Any]]:
-        """用户态本地文件上传 - 使用POST /upload/user接口"""
+        请求体按块流式发送，progress_callback(sent, total) 报告已发送字节数；
+        auto_md5=False 时不为去重预先计算MD5（秒传预检未命中，直接上传）
+        """
         try:
             if not self.user_jwt:
                 return {"status": "error", "error": "not_logged_in"}
@@ -672,46 +967,66 @@ class APIClient(QObject):
             print(f"[DEBUG] 调用 user_upload_local_file，local_path: {local_path}, remote_path: {remote_path}")
             
             # 如果没有提供MD5，自动计算
-            if not md5:
+            if not md5 and auto_md5:
                 md5 = self._calculate_file_md5(local_path)
                 if md5:
                     print(f"[DEBUG] 自动计算MD5: {md5}")
             
             # 使用新的用户态上传接口
             url = f"{self.base_url}/upload/user"
-            with open(local_path, 'rb') as f:
-                files = {
-                    'file': (filename, f, 'application/octet-stream')
-                }
-                data = {
-                    'dir': dir_path,
-                    'filename': filename
-                }
-                # 可选：提供MD5用于去重
-                if md5:
-                    data['md5'] = md5
-                    print(f"[DEBUG] 提供MD5用于去重: {md5}")
-                
-                headers = {
-                    'Authorization': f'Bearer {self.user_jwt}'
-                }
-                # 使用requests.post避免session headers Content-Type冲突
-                import requests
-                resp = requests.post(url, data=data, files=files, headers=headers)
-                print(f"[DEBUG] user_upload_local_file 响应状态码: {resp.status_code}")
-                if resp.status_code == 200:
-                    result = resp.json()
-                    print(f"[DEBUG] user_upload_local_file 响应: {result}")
-                    return result
-                else:
-                    error_result = {"status": "error", "error": f"HTTP {resp.status_code}", "response": resp.text}
-                    print(f"[DEBUG] user_upload_local_file 错误响应: {error_result}")
-                    return error_result
+            data = {
+                'dir': dir_path,
+                'filename': filename
+            }
+            # 可选：提供MD5用于去重
+            if md5:
+                data['md5'] = md5
+                print(f"[DEBUG] 提供MD5用于去重: {md5}")
+            body = MultipartStream(data, 'file', local_path, filename, progress_callback=progress_callback)
+
+            headers = {
+                'Authorization': f'Bearer {self.user_jwt}',
+                'Content-Type': body.content_type,
+            }
+            # 不走self.session，避免session headers Content-Type冲突
+            resp = get_transport().post(url, data=body, headers=headers, timeout=None)
+            print(f"[DEBUG] user_upload_local_file 响应状态码: {resp.status_code}")
+            if resp.status_code == 200:
+                result = resp.json()
+                print(f"[DEBUG] user_upload_local_file 响应: {result}")
+                self.response_cache.invalidate_path(remote_path)
+                return result
+            else:
+                error_result = {"status": "error", "error": f"HTTP {resp.status_code}", "response": resp.text}
+                print(f"[DEBUG] user_upload_local_file 错误响应: {error_result}")
+                return error_result
         except Exception as e:
             error_result = {"status": "error", "error": str(e)}
             print(f"[DEBUG] user_upload_local_file 异常: {error_result}")
             return error_result
     
+    def user_upload_chunked(self, local_path: str, remote_path: str, progress_callback=None,
+                            should_stop=None, max_concurrent: int = 3) -> Optional[Dict[str, Any]]:
+        """用户态大文件分片上传：直接调用百度网盘 precreate/superfile2/create，支持断点续传
+
+        与直链下载相同，使用用户自己的百度 access_token 直连百度（不经后端 /upload/user）：
+        后端上传接口只接受一次性整文件请求，无法按分块重试与续传；token 只发往百度官方域名。
+        """
+        try:
+            baidu_token = self.get_user_baidu_token()
+            if not baidu_token or not baidu_token.get('access_token'):
+                return {"status": "error", "error": "无法获取用户百度token，请重新授权"}
+            print(f"[DEBUG] 调用 user_upload_chunked，local_path: {local_path}, remote_path: {remote_path}")
+            uploader = ChunkedUploader(baidu_token.get('access_token'), local_path, remote_path,
+                                       max_concurrent=max_concurrent, progress_callback=progress_callback,
+                                       should_stop=should_stop)
+            result = uploader.upload()
+            print(f"[DEBUG] user_upload_chunked 结果: {result}")
+            self.response_cache.invalidate_path(remote_path)
+            return result
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
     def user_upload_text(self, dir_path: str, filename: str, content: str) -> Optional[Dict[str, Any]]:
         """用户态文本上传"""
         print(f"[DEBUG] 调用 user_upload_text，dir: {dir_path}, filename: {filename}")
@@ -763,8 +1078,12 @@ class APIClient(QObject):
     def public_upload_batch_local(self, file_list: list) -> Optional[Dict[str, Any]]:
         return self.call_public_api("upload_batch_local", {"file_list": file_list})
 
-    def public_upload_multipart(self, dir_path: str, local_path: str, filename: str = None, md5: str = None) -> Optional[Dict[str, Any]]:
-        """公共态：multipart 文件直传到后端 /upload，强制写入 /用户上传 下（需登录）"""
+    def public_upload_multipart(self, dir_path: str, local_path: str, filename: str = None, md5: str = None,
+                                progress_callback=None) -> Optional[Dict[str, Any]]:
+        """公共态：multipart 文件直传到后端 /upload，强制写入 /用户上传 下（需登录）
+
+        请求体按块流式发送，progress_callback(sent, total) 报告已发送字节数
+        """
         try:
             if not self.user_jwt:
                 return {"status": "error", "error": "not_logged_in"}
@@ -772,23 +1091,21 @@ class APIClient(QObject):
             fn = filename or (os.path.basename(local_path) if local_path else None)
             if not fn:
                 return {"status": "error", "error": "invalid_filename"}
-            with open(local_path, 'rb') as f:
-                files = {
-                    'file': (fn, f, 'application/octet-stream')
-                }
-                data = {
-                    'dir': dir_path,
-                    'filename': fn
-                }
-                # 如果提供了MD5，添加到表单数据中
-                if md5:
-                    data['md5'] = md5
-                headers = {
-                    'Authorization': f'Bearer {self.user_jwt}'
-                }
-                # use a plain requests.post to avoid session headers Content-Type conflict
-                resp = requests.post(url, data=data, files=files, headers=headers)
-                return resp.json() if resp.content else {"status": "error", "error": "empty_response"}
+            data = {
+                'dir': dir_path,
+                'filename': fn
+            }
+            # 如果提供了MD5，添加到表单数据中
+            if md5:
+                data['md5'] = md5
+            body = MultipartStream(data, 'file', local_path, fn, progress_callback=progress_callback)
+            headers = {
+                'Authorization': f'Bearer {self.user_jwt}',
+                'Content-Type': body.content_type,
+            }
+            # bypass self.session to avoid session headers Content-Type conflict
+            resp = get_transport().post(url, data=body, headers=headers, timeout=None)
+            return resp.json() if resp.content else {"status": "error", "error": "empty_response"}
         except FileNotFoundError:
             return {"status": "error", "error": "local_file_not_found"}
         except Exception as e:
@@ -899,9 +1216,9 @@ class APIClient(QObject):
         })
     
     def _fsid_to_path(self, fsid: str) -> Optional[str]:
-        """将fsid转换为路径（内部辅助方法）"""
+        """将fsid转换为路径（内部辅助方法；并发的查询会合并为一次请求）"""
         try:
-            result = self.get_file_metas([fsid])
+            result = self.call_api_batched("file_metas", {"fsids": [fsid], "thumb": False, "extra": False})
             if result and result.get('errno') == 0:
                 data = result.get('data', {})
                 if data and 'list' in data and data['list']:
@@ -963,8 +1280,15 @@ class APIClient(QObject):
         """检查是否已登录"""
         return self.user_jwt is not None
     
-    def refresh_token(self) -> bool:
-        """刷新JWT token"""
+    def refresh_token(self, used_jwt: Optional[str] = None) -> bool:
+        """刷新JWT token（单飞：并发调用只发一次刷新请求，其余等待结果）
+
+        used_jwt 为失败请求携带的 token，已被其他线程换新时直接返回 True
+        """
+        return self.token_refresher.refresh(used_jwt)
+
+    def _refresh_token_now(self) -> bool:
+        """实际发起刷新请求并保存新 token（由 TokenRefresher 串行调用）"""
         if not self.refresh_token_value:
             print("[DEBUG] 无refresh_token，无法刷新")
             return False
@@ -1028,6 +1352,7 @@ class APIClient(QObject):
     
     def logout(self):
         """登出：清除内存与本地token"""
+        self.response_cache.clear()
         self.user_jwt = None
         self.baidu_token = None
         if hasattr(self, 'user_info'):
@@ -1065,6 +1390,8 @@ class APIClient(QObject):
             params['order_desc'] = int(bool(order_desc))
         try:
             url = f"{self.base_url}/files/list"
+            self.token_refresher.ensure_fresh()
+            used_jwt = self.user_jwt
             # 使用session的全局headers，确保JWT token正确传递
             resp = self.session.get(url, params=params, timeout=10)
             
@@ -1076,7 +1403,7 @@ class APIClient(QObject):
             # 检查是否需要刷新token（仅401/403错误）
             if resp.status_code in [401, 403] and self.user_jwt:
                 print(f"[DEBUG] files_list失败 (HTTP {resp.status_code})，尝试刷新token...")
-                if self.refresh_token():
+                if self.refresh_token(used_jwt):
                     # 刷新成功，重试请求（使用更新后的全局headers）
                     resp = self.session.get(url, params=params, timeout=10)
             
@@ -1087,18 +1414,10 @@ class APIClient(QObject):
 
     def files_stats(self):
         try:
-            url = f"{self.base_url}/files/stats"
+            self.token_refresher.ensure_fresh()
             # 使用session的全局headers，确保JWT token正确传递
-            resp = self.session.get(url, timeout=10)
-            
-            # 检查是否需要刷新token（仅401/403错误）
-            if resp.status_code in [401, 403] and self.user_jwt:
-                print(f"[DEBUG] files_stats失败 (HTTP {resp.status_code})，尝试刷新token...")
-                if self.refresh_token():
-                    # 刷新成功，重试请求（使用更新后的全局headers）
-                    resp = self.session.get(url, timeout=10)
-            
-            return resp.json() if resp.content else None
+            return self._cached_get('files_stats', f"{self.base_url}/files/stats",
+                                    refresh_on_auth=True, timeout=10)
         except Exception as e:
             print(f"files_stats失败: {e}")
             return None
@@ -1129,24 +1448,20 @@ class APIClient(QObject):
 
     def files_categories(self):
         try:
-            url = f"{self.base_url}/files/categories"
             headers = {}
             if self.user_jwt:
                 headers['Authorization'] = f'Bearer {self.user_jwt}'
-            resp = self.session.get(url, headers=headers)
-            return resp.json() if resp.content else None
+            return self._cached_get('files_categories', f"{self.base_url}/files/categories", headers=headers)
         except Exception as e:
             print(f"files_categories失败: {e}")
             return None
 
     def files_statuses(self):
         try:
-            url = f"{self.base_url}/files/statuses"
             headers = {}
             if self.user_jwt:
                 headers['Authorization'] = f'Bearer {self.user_jwt}'
-            resp = self.session.get(url, headers=headers)
-            return resp.json() if resp.content else None
+            return self._cached_get('files_statuses', f"{self.base_url}/files/statuses", headers=headers)
         except Exception as e:
             print(f"files_statuses失败: {e}")
             return None
@@ -1208,7 +1523,7 @@ class APIClient(QObject):
         if expires_hint is not None:
             args['expires_hint'] = int(expires_hint)
         try:
-            result = self.call_api('download_link', args)
+            result = self.call_api_batched('download_link', args)
             if result is None:
                 return {"status": "error", "error": "API调用失败"}
             return result
@@ -1237,6 +1552,7 @@ class APIClient(QObject):
             if ttl is not None:
                 args['ttl'] = int(ttl)
             payload = {"op": "download_ticket", "args": args}
+            self.token_refresher.ensure_fresh()
             headers = {"Authorization": f"Bearer {self.user_jwt}"}
             try:
                 print(f"[DEBUG][TICKET][USER] payload={payload}")
@@ -1357,7 +1673,6 @@ class APIClient(QObject):
         直接调用百度网盘API，使用POST方法。
         """
         import json as _json
-        import requests as _requests
         import time
 
         # 重试逻辑
@@ -1394,7 +1709,7 @@ class APIClient(QObject):
                 print(f"[DEBUG] access_token: {access_token[:20]}...")
                 
                 # 使用GET请求
-                response = _requests.get(url, params=params, timeout=30)
+                response = get_transport().get(url, params=params, timeout=30)
                 
                 # 打印完整的curl命令
                 curl_cmd = f"curl -X GET '{url}'"
@@ -1471,16 +1786,27 @@ class APIClient(QObject):
                     time.sleep(retry_delay)
                     retry_delay *= 2
 
-    def download_via_dlink(self, dlink: str, access_token: str, save_path: str, range_start: Optional[int] = None, progress_callback=None) -> None:
+    def download_via_dlink(self, dlink: str, access_token: str, save_path: str, range_start: Optional[int] = None, progress_callback=None,
+                           connections: Optional[int] = None, should_stop=None, manifest=None) -> None:
         """通过 dlink 进行直链下载，遵循官方要求：
         - 必须在dlink URL中添加access_token参数
         - 请求头设置完整的浏览器User-Agent
         - 允许 302 跳转
         - 支持 Range 断点续传（range_start 字节位置）
+        - connections > 1 时使用多连接分段下载；服务端不支持 Range（31023）时回退单连接
+        - 传入 manifest（DownloadManifest）时写入 .part 并持续记录已完成区间，
+          续传位置以清单为准（忽略 range_start），完成后重命名为 save_path
         失败抛出异常。
         """
         import os as _os
-        import requests as _requests
+
+        write_path = save_path
+        if manifest is not None:
+            write_path = manifest.part_path
+            range_start = manifest.contiguous_prefix()
+            if range_start and not _os.path.exists(write_path):
+                manifest.reset_ranges()
+                range_start = 0
 
         # 确保保存目录存在
         save_dir = _os.path.dirname(save_path)
@@ -1506,18 +1832,40 @@ class APIClient(QObject):
             headers["Range"] = f"bytes={int(range_start)}-"
 
         print(f"[DEBUG] 开始下载文件: {url[:50]}...")
-        print(f"[DEBUG] 保存路径: {save_path}")
+        print(f"[DEBUG] 保存路径: {write_path}")
         print(f"[DEBUG] 请求头: {headers}")
 
         # 禁用代理，避免被系统代理影响
         proxies = {"http": None, "https": None}
         
-        # 创建新的session来避免cookie冲突
-        download_session = _requests.Session()
+        # 多连接分段下载（有清单时可补齐任意缺失区间；无清单的续传沿用单连接Range逻辑）
+        connections = int(connections or getattr(self, 'download_connections', 1) or 1)
+        if connections > 1 and (manifest is not None or not (range_start and int(range_start) > 0)):
+            from core.segmented_download import SegmentedDownloader, RangeNotSupported
+            downloader = SegmentedDownloader(
+                url,
+                write_path,
+                headers=headers,
+                connections=connections,
+                proxies=proxies,
+                cookies=self.session.cookies if hasattr(self, 'session') else None,
+                progress_callback=progress_callback,
+                should_stop=should_stop,
+                manifest=manifest,
+            )
+            try:
+                downloader.download()
+                if manifest is not None:
+                    if should_stop and should_stop():
+                        return
+                    manifest.finalize()
+                return
+            except RangeNotSupported as e:
+                print(f"[DEBUG] 服务端不支持分段下载（{e}），回退单连接整文件下载")
         
-        # 添加必要的cookies（如果有的话）
-        if hasattr(self, 'session') and hasattr(self.session, 'cookies'):
-            download_session.cookies.update(self.session.cookies)
+        # 独立的session避免cookie冲突，连接池与其他请求共享
+        download_session = get_transport().new_session(
+            cookies=self.session.cookies if hasattr(self, 'session') else None)
 
         def _perform_request(hdrs):
             return download_session.get(
@@ -1532,14 +1880,8 @@ class APIClient(QObject):
         r = _perform_request(headers)
         # If server complains about http_range or returns 416/400, retry once without Range
         if r.status_code in (400, 416) and ("Range" in headers):
-            try:
-                err_body = r.json() if r.content else {}
-            except Exception:
-                err_body = {}
-            if (
-                (isinstance(err_body, dict) and str(err_body.get("error_code")) == "31023")
-                or "http_range" in str(err_body)
-            ):
+            from core.segmented_download import is_http_range_error
+            if is_http_range_error(r):
                 print("[DEBUG] 发现 http_range 错误，移除 Range 重试整文件下载")
                 headers.pop("Range", None)
                 r.close()
@@ -1561,14 +1903,34 @@ class APIClient(QObject):
                 raise RuntimeError(f"下载失败: HTTP {r.status_code} {err}")
 
             total_size = int(r.headers.get('Content-Length') or 0)
-            mode = 'ab' if ("Range" in headers) else 'wb'
-            downloaded = int(range_start or 0)
+            # 服务端忽略 Range 返回 200 时必须从头写入，不能追加
+            resumed = ("Range" in headers) and r.status_code == 206
+            downloaded = int(range_start or 0) if resumed else 0
+
+            if manifest is not None:
+                if not resumed:
+                    manifest.reset_ranges()
+                    if not manifest.size and total_size:
+                        manifest.size = total_size
+                mode = 'r+b' if (resumed and _os.path.exists(write_path)) else 'wb'
+            else:
+                mode = 'ab' if resumed else 'wb'
 
-            with open(save_path, mode) as f:
+            with open(write_path, mode) as f:
+                if mode == 'r+b':
+                    f.seek(downloaded)
                 for chunk in r.iter_content(chunk_size=512 * 1024):
+                    if should_stop and should_stop():
+                        if manifest is not None:
+                            manifest.save()
+                        return
                     if not chunk:
                         continue
                     f.write(chunk)
+                    if manifest is not None:
+                        f.flush()
+                        manifest.add_range(downloaded, downloaded + len(chunk) - 1)
+                        manifest.save(force=False)
                     downloaded += len(chunk)
                     if progress_callback and total_size > 0:
                         try:
@@ -1577,39 +1939,41 @@ class APIClient(QObject):
                             pct = None
                         if pct is not None:
                             progress_callback(pct, downloaded, total_size)
+                if manifest is not None:
+                    # 分段下载残留的预分配空间超出实际数据时截断
+                    f.truncate(downloaded)
+
+        if manifest is not None:
+            if manifest.size and downloaded < manifest.size:
+                manifest.save()
+                raise RuntimeError(f"下载未完成: {downloaded}/{manifest.size}")
+            if not manifest.size:
+                manifest.size = downloaded
+            manifest.finalize()
     
     def download_file_direct(self, url: str, save_path: str, progress_callback=None) -> bool:
         """直接下载文件（禁用代理）"""
         try:
             import os
-            import urllib.request
-            import urllib.parse
-            from urllib.error import URLError, HTTPError
             
             # 确保保存目录存在
             save_dir = os.path.dirname(save_path)
             if save_dir:  # 只有当路径包含目录时才创建目录
                 os.makedirs(save_dir, exist_ok=True)
             
-            # 创建请求对象，禁用代理
-            request = urllib.request.Request(url)
-            request.add_header('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-            
-            # 创建opener，禁用代理
-            opener = urllib.request.build_opener()
-            opener.addheaders = [('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')]
+            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
             
-            # 开始下载
-            with opener.open(request) as response:
+            # 开始下载（禁用代理，复用共享连接池）
+            with get_transport().get(url, headers=headers, stream=True, timeout=60, proxies=NO_PROXIES) as response:
+                response.raise_for_status()
                 # 获取文件大小
                 total_size = int(response.headers.get('Content-Length', 0))
                 downloaded_size = 0
                 
                 with open(save_path, 'wb') as f:
-                    while True:
-                        chunk = response.read(8192)
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
                         if not chunk:
-                            break
+                            continue
                         f.write(chunk)
                         downloaded_size += len(chunk)
                         
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+asyncio 版 API 客户端
+与阻塞的 APIClient 并存并共享登录状态（base_url / JWT / refresh_token），
+所有协程运行在同一个后台事件循环线程上：成百上千个并发的列表/元信息/传输操作
+只占用协程而不是各自的 QThread。
+
+默认使用 aiohttp（requirements.txt 已包含）的原生异步 HTTP，代理按共享传输层的策略逐个请求解析；
+未安装 aiohttp 时回退为在有界线程池中执行共享连接池的阻塞请求（并发上限即线程池大小），接口不变。
+"""
+
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Dict, Any, List, Union, Callable, Coroutine
+
+from requests.structures import CaseInsensitiveDict
+
+from core.multipart_stream import MultipartStream
+from core.transport import get_transport, NO_PROXIES
+
+try:
+    import aiohttp
+except ImportError:  # 可选依赖
+    aiohttp = None
+
+
+class EventLoopThread:
+    """后台事件循环线程；submit() 可从任意线程提交协程"""
+
+    def __init__(self, name: str = 'pan-asyncio'):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            try:
+                pending = asyncio.all_tasks(self.loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            finally:
+                self.loop.close()
+
+    def submit(self, coro: Coroutine) -> Future:
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        thread.join(timeout)
+
+
+_default_loop: Optional[EventLoopThread] = None
+_default_lock = threading.Lock()
+
+
+def get_event_loop_thread() -> EventLoopThread:
+    """进程内共享的事件循环线程"""
+    global _default_loop
+    with _default_lock:
+        if _default_loop is None:
+            _default_loop = EventLoopThread()
+        return _default_loop
+
+
+class _Response:
+    """统一 aiohttp 与回退路径的响应"""
+
+    def __init__(self, status_code: int, content: bytes, headers: Optional[Dict[str, str]] = None):
+        self.status_code = status_code
+        self.content = content or b''
+        self.headers = CaseInsensitiveDict(dict(headers or {}))
+
+    def json(self) -> Any:
+        return json.loads(self.content.decode('utf-8'))
+
+
+class AsyncAPIClient:
+    """异步 API 客户端（接口与 APIClient 对应的方法同名同参，返回值一致）
+
+    用法：
+        client = AsyncAPIClient(api_client)
+        future = client.run(client.list_files('/'))   # 任意线程提交，返回 concurrent Future
+    Qt 界面中通过 ui.threads.async_bridge.AsyncBridge 把结果送回主线程。
+    """
+
+    MAX_CONNECTIONS = 32  # 同时进行的 HTTP 请求上限（aiohttp 连接数 / 回退线程池大小）
+    DEFAULT_TIMEOUT = 30
+    CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, api_client, max_connections: Optional[int] = None,
+                 loop_thread: Optional[EventLoopThread] = None):
+        self.api_client = api_client
+        self.max_connections = max(1, int(max_connections or self.MAX_CONNECTIONS))
+        self.loop_thread = loop_thread or get_event_loop_thread()
+        self._session = None  # aiohttp.ClientSession，在事件循环线程内创建
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def native(self) -> bool:
+        """是否使用 aiohttp 原生异步 I/O"""
+        return aiohttp is not None
+
+    # ---------- 调度 ----------
+    def run(self, coro: Coroutine) -> Future:
+        """从任意线程提交协程到事件循环线程"""
+        return self.loop_thread.submit(coro)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="async-io")
+            get_transport().ensure_pool_size(self.max_connections)
+        return self._executor
+
+    async def _in_thread(self, func: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), func, *args)
+
+    async def _aiohttp(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_connections)
+            # 代理不读取环境变量，由 _request 按共享传输层的策略逐个请求指定
+            self._session = aiohttp.ClientSession(connector=connector, trust_env=False)
+        return self._session
+
+    @property
+    def base_url(self) -> str:
+        return self.api_client.base_url
+
+    def _auth_headers(self) -> Dict[str, str]:
+        jwt = self.api_client.user_jwt
+        return {'Authorization': f'Bearer {jwt}'} if jwt else {}
+
+    async def _request(self, method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                       json_body: Any = None, data: Any = None, headers: Optional[Dict[str, str]] = None,
+                       timeout: Optional[float] = DEFAULT_TIMEOUT) -> _Response:
+        headers = dict(headers or {})
+        if aiohttp is not None:
+            session = await self._aiohttp()
+            client_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else aiohttp.ClientTimeout(total=None)
+            async with session.request(method, url, params=params, json=json_body, data=data, headers=headers,
+                                       timeout=client_timeout, proxy=get_transport().proxy_for(url)) as resp:
+                content = await resp.read()
+                return _Response(resp.status, content, resp.headers)
+
+        def _blocking():
+            r = get_transport().request(method, url, params=params, json=json_body, data=data,
+                                        headers=headers, timeout=timeout)
+            return _Response(r.status_code, r.content, r.headers)
+        return await self._in_thread(_blocking)
+
+    async def _refresh_token(self, used_jwt: Optional[str]) -> bool:
+        """刷新 JWT：并发的 401 只触发一次刷新，刷新本身复用阻塞客户端的逻辑（会持久化新 token）
+
+        used_jwt 为失败请求携带的 token；若已被其他协程或线程刷新过则直接重试
+        """
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            if self.api_client.user_jwt and self.api_client.user_jwt != used_jwt:
+                return True
+            return bool(await self._in_thread(self.api_client.refresh_token, used_jwt))
+
+    async def _authed(self, method: str, url: str, **kwargs) -> _Response:
+        """携带 JWT 请求；临近过期时先主动刷新，401/403 时刷新 token 后重试一次"""
+        extra = kwargs.pop('headers', None) or {}
+        refresher = self.api_client.token_refresher
+        if refresher.needs_refresh():
+            used_jwt = self.api_client.user_jwt
+            if self._refresh_lock is None:
+                self._refresh_lock = asyncio.Lock()
+            async with self._refresh_lock:
+                if self.api_client.user_jwt == used_jwt:
+                    await self._in_thread(refresher.ensure_fresh)
+        used_jwt = self.api_client.user_jwt
+        resp = await self._request(method, url, headers={**extra, **self._auth_headers()}, **kwargs)
+        if resp.status_code in (401, 403) and self.api_client.user_jwt:
+            print(f"[DEBUG] 异步请求失败 (HTTP {resp.status_code})，尝试刷新token...")
+            if await self._refresh_token(used_jwt):
+                resp = await self._request(method, url, headers={**extra, **self._auth_headers()}, **kwargs)
+        return resp
+
+    @staticmethod
+    def _error_message(resp: _Response) -> str:
+        try:
+            error_data = resp.json()
+            return error_data.get('error') or error_data.get('message') or f"HTTP {resp.status_code}"
+        except Exception:
+            return f"HTTP {resp.status_code}"
+
+    # ---------- MCP 调用 ----------
+    async def call_api(self, operation: str, args: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """调用百度网盘API（与 APIClient.call_api 相同：未登录返回 None，失败抛出异常）"""
+        if not self.api_client.user_jwt:
+            return None
+        resp = await self._authed('POST', f"{self.base_url}/mcp/user/exec",
+                                  json_body={"op": operation, "args": args or {}})
+        if resp.status_code == 200:
+            self.api_client._invalidate_for_op(operation, args)
+            return resp.json()
+        raise Exception(self._error_message(resp))
+
+    async def call_public_api(self, operation: str, args: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        try:
+            resp = await self._request('POST', f"{self.base_url}/mcp/public/exec",
+                                       json_body={"op": operation, "args": args or {}},
+                                       headers=self._auth_headers())
+            return resp.json() if resp.status_code == 200 else None
+        except Exception as e:
+            print(f"公共API调用失败: {e}")
+            return None
+
+    async def list_files(self, dir_path: str = "/", limit: int = 100, page: int = 1,
+                         use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        args = {"dir": dir_path, "limit": limit, "page": page}
+        cache = self.api_client.response_cache
+        key = cache.key("list_files", args)
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        result = await self.call_api("list_files", args)
+        if isinstance(result, dict) and result.get('status') == 'ok':
+            cache.put(key, result, tag=dir_path)
+            await self._in_thread(self.api_client._remember_listing, dir_path, limit, page, result)
+        return result
+
+    async def search_filename(self, key: str, dir_path: str = "/", page: int = 1, num: int = 50,
+                              recursion: bool = True) -> Optional[Dict[str, Any]]:
+        """按文件名搜索（参数与 APIClient.search_filename 相同）"""
+        return await self.call_api("search_filename", {
+            "key": key,
+            "dir": dir_path,
+            "page": str(page),
+            "num": str(num),
+            "recursion": "1" if recursion else "0",
+            "keyword": key,  # 兼容性：同时携带keyword以兼容老后端
+        })
+
+    # ---------- files_* ----------
+    async def _files_get(self, name: str, path: str, params: Optional[Dict[str, Any]] = None,
+                         timeout: Optional[float] = DEFAULT_TIMEOUT, cached: bool = False):
+        """cached=True 时与阻塞客户端共用响应缓存（含条件请求重新校验）"""
+        try:
+            cache = self.api_client.response_cache
+            key = cache.key(name, params)
+            entry = cache.lookup(key) if cached else None
+            if entry is not None and entry.fresh:
+                return entry.value()
+            headers = entry.validators() if entry is not None else None
+            resp = await self._authed('GET', f"{self.base_url}{path}", params=params, timeout=timeout, headers=headers)
+            if resp.status_code == 304 and entry is not None:
+                cache.revalidated(key)
+                return entry.value()
+            data = resp.json() if resp.content else None
+            if cached and resp.status_code == 200 and data is not None:
+                cache.put(key, data, etag=resp.headers.get('ETag'), last_modified=resp.headers.get('Last-Modified'))
+            return data
+        except Exception as e:
+            print(f"{name}失败: {e}")
+            return None
+
+    async def files_list(self, page=1, page_size=50, file_path: str = None, category: int = None,
+                         file_size_min: int = None, file_size_max: int = None,
+                         status: str = None, order_by: str = None, order_desc: bool = None,
+                         cached: bool = False):
+        params = {'page': page, 'page_size': page_size}
+        optional = {'file_path': file_path, 'category': category, 'file_size_min': file_size_min,
+                    'file_size_max': file_size_max, 'status': status, 'order_by': order_by}
+        params.update({k: v for k, v in optional.items() if v is not None and v != ''})
+        if order_desc is not None:
+            params['order_desc'] = int(bool(order_desc))
+        return await self._files_get('files_list', '/files/list', params, timeout=10, cached=cached)
+
+    async def files_stats(self):
+        return await self._files_get('files_stats', '/files/stats', timeout=10, cached=True)
+
+    async def files_search(self, keyword: str, limit: int = 20):
+        return await self._files_get('files_search', '/files/search', {'keyword': keyword, 'limit': limit})
+
+    async def files_detail(self, file_id: int):
+        return await self._files_get('files_detail', f'/files/{file_id}')
+
+    async def files_categories(self):
+        return await self._files_get('files_categories', '/files/categories', cached=True)
+
+    async def files_statuses(self):
+        return await self._files_get('files_statuses', '/files/statuses', cached=True)
+
+    async def files_dedup_md5(self, md5_hex: str, sample_limit: int = 5) -> Optional[Dict[str, Any]]:
+        if not self.api_client.user_jwt:
+            return {"status": "error", "error": "not_logged_in"}
+        try:
+            resp = await self._authed('GET', f"{self.base_url}/files/dedup/md5",
+                                      params={"md5": md5_hex, "sample_limit": int(sample_limit)})
+            return resp.json() if resp.content else {"status": "error", "error": "empty_response"}
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
+    async def files_dedup_md5_batch(self, md5_list: List[str], sample_limit: int = 5) -> Dict[str, Dict[str, Any]]:
+        unique = list(dict.fromkeys(m for m in (md5_list or []) if m))
+        results = await asyncio.gather(*(self.files_dedup_md5(m, sample_limit) for m in unique))
+        return {m: r for m, r in zip(unique, results) if isinstance(r, dict)}
+
+    # ---------- 元信息 ----------
+    async def get_file_metas_with_dlink(self, fsids: List[Union[int, str]], access_token: str) -> Dict[str, Any]:
+        fsids_list = [int(x) if str(x).isdigit() else x for x in fsids]
+        params = {'method': 'filemetas', 'fsids': json.dumps(fsids_list), 'dlink': 1, 'access_token': access_token}
+        last_error = None
+        for attempt in range(3):
+            try:
+                resp = await self._request('GET', "https://pan.baidu.com/rest/2.0/xpan/multimedia", params=params)
+                data = resp.json()
+                if resp.status_code == 200 and int(data.get('errno') or 0) == 0:
+                    return data
+                last_error = RuntimeError(f"filemetas 失败: HTTP {resp.status_code} {data}")
+            except Exception as e:
+                last_error = e
+            await asyncio.sleep(1 * (attempt + 1))
+        raise last_error
+
+    # ---------- 传输 ----------
+    async def download(self, url: str, save_path: str, headers: Optional[Dict[str, str]] = None,
+                       progress_callback=None, should_stop: Optional[Callable[[], bool]] = None) -> int:
+        """流式下载到文件，返回写入字节数；progress_callback(percent, downloaded, total)"""
+        save_dir = os.path.dirname(save_path)
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+        if aiohttp is None:
+            return await self._in_thread(self._download_blocking, url, save_path, headers, progress_callback, should_stop)
+        session = await self._aiohttp()
+        downloaded = 0
+        # 与回退路径（NO_PROXIES）一致：直链下载不走代理
+        async with session.get(url, headers=headers or {}, timeout=aiohttp.ClientTimeout(total=None, sock_read=60)) as resp:
+            if resp.status not in (200, 206):
+                raise RuntimeError(f"下载失败: HTTP {resp.status}")
+            total = int(resp.headers.get('Content-Length') or 0)
+            with open(save_path, 'wb') as f:
+                async for chunk in resp.content.iter_chunked(self.CHUNK_SIZE):
+                    if should_stop and should_stop():
+                        raise RuntimeError('已取消')
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    if progress_callback and total > 0:
+                        progress_callback(downloaded / total * 100, downloaded, total)
+        return downloaded
+
+    def _download_blocking(self, url, save_path, headers, progress_callback, should_stop) -> int:
+        downloaded = 0
+        with get_transport().get(url, headers=headers or {}, stream=True, timeout=60, proxies=NO_PROXIES) as r:
+            if r.status_code not in (200, 206):
+                raise RuntimeError(f"下载失败: HTTP {r.status_code}")
+            total = int(r.headers.get('Content-Length') or 0)
+            with open(save_path, 'wb') as f:
+                for chunk in r.iter_content(chunk_size=self.CHUNK_SIZE):
+                    if should_stop and should_stop():
+                        raise RuntimeError('已取消')
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    if progress_callback and total > 0:
+                        progress_callback(downloaded / total * 100, downloaded, total)
+        return downloaded
+
+    async def download_via_dlink(self, dlink: str, access_token: str, save_path: str,
+                                 progress_callback=None, should_stop: Optional[Callable[[], bool]] = None) -> int:
+        """用户态直链下载（单连接；多连接分段与断点续传仍由下载管理器负责）"""
+        sep = '&' if '?' in dlink else '?'
+        url = f"{dlink}{sep}access_token={access_token}"
+        return await self.download(url, save_path, {'User-Agent': 'pan.baidu.com'}, progress_callback, should_stop)
+
+    async def user_upload_local_file(self, local_path: str, remote_path: str, md5: str = None,
+                                     progress_callback=None) -> Optional[Dict[str, Any]]:
+        """用户态本地文件上传（流式 multipart，内存占用与文件大小无关）"""
+        if not self.api_client.user_jwt:
+            return {"status": "error", "error": "not_logged_in"}
+        if aiohttp is None:
+            return await self._in_thread(
+                lambda: self.api_client.user_upload_local_file(local_path, remote_path, md5=md5,
+                                                               progress_callback=progress_callback))
+        try:
+            import posixpath
+            fields = {'dir': posixpath.dirname(remote_path), 'filename': posixpath.basename(remote_path)}
+            if md5:
+                fields['md5'] = md5
+            body = MultipartStream(fields, 'file', local_path, fields['filename'], progress_callback=progress_callback)
+
+            async def _chunks():
+                for chunk in body:
+                    yield chunk
+
+            headers = {**self._auth_headers(), 'Content-Type': body.content_type, 'Content-Length': str(len(body))}
+            session = await self._aiohttp()
+            url = f"{self.base_url}/upload/user"
+            async with session.post(url, data=_chunks(), headers=headers, timeout=aiohttp.ClientTimeout(total=None),
+                                    proxy=get_transport().proxy_for(url)) as resp:
+                content = await resp.read()
+                if resp.status == 200:
+                    self.api_client.response_cache.invalidate_path(remote_path)
+                    return json.loads(content.decode('utf-8'))
+                return {"status": "error", "error": f"HTTP {resp.status}", "response": content.decode('utf-8', 'replace')}
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
+    # ---------- 关闭 ----------
+    async def _close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def close(self):
+        """关闭 aiohttp 会话与回退线程池（事件循环线程保持运行，可被其他客户端复用）"""
+        try:
+            if self._session is not None:
+                self.run(self._close()).result(timeout=5)
+        except Exception:
+            pass
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+分片断点续传上传
+按百度网盘开放平台的 precreate → superfile2 分片上传 → create 三步上传大文件：
+固定大小分块、一次读取得到全部分块 MD5、多个分块并行上传且单块失败重试；
+本地断点日志记录 uploadid 与已完成分块，中断后只补传缺失的分块。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, List, Callable
+
+from core.hash_cache import get_hash_cache
+from core.local_store import data_path, write_json_atomic
+from core.rapid_upload import slice_md5
+from core.transport import get_transport
+
+
+class UploadJournal:
+    """分片上传断点日志
+
+    以 (本地路径, 远端路径) 为键保存在 ~/.pan_client/upload_journal/ 下；
+    本地文件签名或分块方式变化、uploadid 过期时视为无效。
+    """
+
+    DIR_NAME = 'upload_journal'
+    VERSION = 1
+    TTL = 24 * 3600  # uploadid 有效期有限，保守按 1 天处理
+
+    def __init__(self, local_path: str, remote_path: str, base_dir: Optional[str] = None):
+        if base_dir is None:
+            base_dir = data_path(self.DIR_NAME)
+        key = hashlib.sha1(f"{os.path.abspath(local_path)}\n{remote_path}".encode('utf-8')).hexdigest()
+        self.path = os.path.join(base_dir, key + '.json')
+        self.local_path = local_path
+        self.remote_path = remote_path
+        self.signature: List[int] = []
+        self.block_size = 0
+        self.block_md5s: List[str] = []
+        self.uploadid: Optional[str] = None
+        self.done: set = set()
+        self.created_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_signature(local_path: str) -> List[int]:
+        st = os.stat(local_path)
+        return [int(st.st_size), int(st.st_mtime_ns), int(st.st_ino or 0)]
+
+    def load(self, block_size: int, block_md5s: List[str]) -> bool:
+        """读取日志；与当前文件/分块一致且未过期时返回 True"""
+        try:
+            if not os.path.exists(self.path):
+                return False
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if int(data.get('version') or 0) != self.VERSION:
+                return False
+            if data.get('signature') != self.file_signature(self.local_path):
+                return False
+            if int(data.get('block_size') or 0) != int(block_size) or data.get('block_md5s') != block_md5s:
+                return False
+            if time.time() - float(data.get('created_at') or 0) > self.TTL or not data.get('uploadid'):
+                return False
+            self.signature = data['signature']
+            self.block_size = int(block_size)
+            self.block_md5s = list(block_md5s)
+            self.uploadid = data['uploadid']
+            self.done = set(int(i) for i in (data.get('done') or []))
+            self.created_at = float(data['created_at'])
+            return True
+        except Exception as e:
+            print(f"[DEBUG] 读取上传日志失败: {e}")
+            return False
+
+    def start(self, block_size: int, block_md5s: List[str], uploadid: str):
+        self.signature = self.file_signature(self.local_path)
+        self.block_size = int(block_size)
+        self.block_md5s = list(block_md5s)
+        self.uploadid = uploadid
+        self.done = set()
+        self.created_at = time.time()
+        self.save()
+
+    def mark_done(self, index: int):
+        with self._lock:
+            self.done.add(int(index))
+        self.save()
+
+    def save(self):
+        with self._lock:
+            try:
+                payload = {
+                    'version': self.VERSION,
+                    'local_path': self.local_path,
+                    'remote_path': self.remote_path,
+                    'signature': self.signature,
+                    'block_size': self.block_size,
+                    'block_md5s': self.block_md5s,
+                    'uploadid': self.uploadid,
+                    'done': sorted(self.done),
+                    'created_at': self.created_at,
+                }
+                write_json_atomic(self.path, payload)
+            except Exception as e:
+                print(f"[DEBUG] 保存上传日志失败: {e}")
+
+    def discard(self):
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except Exception:
+            pass
+
+
+class ChunkedUploadError(Exception):
+    pass
+
+
+class _UploadIdExpired(Exception):
+    pass
+
+
+class ChunkedUploader:
+    """大文件分片上传
+
+    file_url / upload_url 可替换为本地模拟服务，用于调试
+    progress_callback(sent_bytes, total_bytes) 在每个分块完成后调用（续传时包含已完成分块）
+    """
+
+    BLOCK_SIZE = 4 * 1024 * 1024  # 普通用户分片大小上限为 4MB
+    MAX_CONCURRENT = 3
+    MAX_RETRIES = 3
+    RETRY_DELAY = 1.0
+    FILE_URL = "https://pan.baidu.com/rest/2.0/xpan/file"
+    UPLOAD_URL = "https://d.pcs.baidu.com/rest/2.0/pcs/superfile2"
+    RTYPE = 1  # 路径冲突时自动重命名，不覆盖已有文件
+    UPLOADID_INVALID = (31363, 31364)  # 分片上传会话不存在/已过期
+
+    def __init__(self, access_token: str, local_path: str, remote_path: str,
+                 block_size: Optional[int] = None, max_concurrent: Optional[int] = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 should_stop: Optional[Callable[[], bool]] = None,
+                 journal_dir: Optional[str] = None,
+                 file_url: Optional[str] = None, upload_url: Optional[str] = None):
+        self.access_token = access_token
+        self.local_path = local_path
+        self.remote_path = remote_path
+        self.block_size = int(block_size or self.BLOCK_SIZE)
+        self.max_concurrent = max(1, int(max_concurrent or self.MAX_CONCURRENT))
+        self.progress_callback = progress_callback
+        self.should_stop = should_stop
+        self.file_url = file_url or self.FILE_URL
+        self.upload_url = upload_url or self.UPLOAD_URL
+        self.journal = UploadJournal(local_path, remote_path, journal_dir)
+        self.size = 0
+        self._sent = 0
+        self._sent_lock = threading.Lock()
+
+    def _stopped(self) -> bool:
+        return bool(self.should_stop and self.should_stop())
+
+    def _report(self, n: int):
+        with self._sent_lock:
+            self._sent += n
+            sent = self._sent
+        if self.progress_callback:
+            try:
+                self.progress_callback(min(sent, self.size), self.size)
+            except Exception:
+                pass
+
+    def _block_len(self, index: int) -> int:
+        return max(0, min(self.block_size, self.size - index * self.block_size))
+
+    # ---------- 三步接口 ----------
+    def _precreate(self, block_md5s: List[str], content_md5: Optional[str] = None) -> Dict[str, Any]:
+        """预创建；带上 content-md5 与 slice-md5 时服务端已有相同内容会直接秒传（return_type=2）"""
+        data = {
+            'path': self.remote_path,
+            'size': str(self.size),
+            'isdir': '0',
+            'autoinit': '1',
+            'rtype': str(self.RTYPE),
+            'block_list': json.dumps(block_md5s),
+        }
+        if content_md5:
+            data['content-md5'] = content_md5
+            sm = slice_md5(self.local_path)
+            if sm:
+                data['slice-md5'] = sm
+        resp = get_transport().post(self.file_url, params={'method': 'precreate', 'access_token': self.access_token},
+                             data=data, timeout=30)
+        result = resp.json()
+        if int(result.get('errno') or 0) != 0:
+            raise ChunkedUploadError(f"precreate 失败: errno={result.get('errno')}")
+        return result
+
+    def _upload_block(self, index: int, expected_md5: str):
+        last_error = None
+        for attempt in range(self.MAX_RETRIES):
+            if self._stopped():
+                raise ChunkedUploadError('已取消')
+            try:
+                with open(self.local_path, 'rb') as f:
+                    f.seek(index * self.block_size)
+                    data = f.read(self._block_len(index))
+                params = {
+                    'method': 'upload',
+                    'access_token': self.access_token,
+                    'type': 'tmpfile',
+                    'path': self.remote_path,
+                    'uploadid': self.journal.uploadid,
+                    'partseq': str(index),
+                }
+                resp = get_transport().post(self.upload_url, params=params,
+                                     files={'file': ('blob', data, 'application/octet-stream')}, timeout=120)
+                result = resp.json() if resp.content else {}
+                code = int(result.get('error_code') or result.get('errno') or 0)
+                if code in self.UPLOADID_INVALID:
+                    raise _UploadIdExpired(code)
+                if resp.status_code != 200 or code != 0:
+                    raise ChunkedUploadError(f"分片 {index} 上传失败: HTTP {resp.status_code} {result}")
+                if result.get('md5') and result.get('md5') != expected_md5:
+                    raise ChunkedUploadError(f"分片 {index} 校验失败")
+                self.journal.mark_done(index)
+                self._report(len(data))
+                return
+            except _UploadIdExpired:
+                raise
+            except Exception as e:
+                last_error = e
+                print(f"[DEBUG] 分片 {index} 第 {attempt + 1}/{self.MAX_RETRIES} 次上传失败: {e}")
+                if attempt + 1 < self.MAX_RETRIES:
+                    time.sleep(self.RETRY_DELAY * (2 ** attempt))
+        raise ChunkedUploadError(str(last_error))
+
+    def _create(self, block_md5s: List[str]) -> Dict[str, Any]:
+        data = {
+            'path': self.remote_path,
+            'size': str(self.size),
+            'isdir': '0',
+            'rtype': str(self.RTYPE),
+            'uploadid': self.journal.uploadid,
+            'block_list': json.dumps(block_md5s),
+        }
+        resp = get_transport().post(self.file_url, params={'method': 'create', 'access_token': self.access_token},
+                             data=data, timeout=30)
+        result = resp.json()
+        errno = int(result.get('errno') or 0)
+        if errno in self.UPLOADID_INVALID:
+            raise _UploadIdExpired(errno)
+        if errno != 0:
+            raise ChunkedUploadError(f"create 失败: errno={errno}")
+        return result
+
+    # ---------- 入口 ----------
+    def upload(self) -> Dict[str, Any]:
+        """执行上传，返回 {"status": "ok", "data": create响应} 或 {"status": "error", "error": ...}"""
+        try:
+            self.size = os.path.getsize(self.local_path)
+            hashed = get_hash_cache().file_block_md5s(self.local_path, self.block_size, self.should_stop)
+            if hashed is None:
+                return {"status": "error", "error": "已取消" if self._stopped() else "计算分块MD5失败"}
+            content_md5, block_md5s = hashed
+            for attempt in range(2):
+                try:
+                    return {"status": "ok", "data": self._run(block_md5s, content_md5)}
+                except _UploadIdExpired as e:
+                    # 上传会话失效：丢弃断点日志，重新 precreate 一次
+                    print(f"[DEBUG] uploadid 已失效({e})，重新开始分片上传")
+                    self.journal.discard()
+                    with self._sent_lock:
+                        self._sent = 0
+            return {"status": "error", "error": "uploadid 多次失效"}
+        except Exception as e:
+            print(f"[DEBUG] 分片上传失败 {self.local_path}: {e}")
+            return {"status": "error", "error": str(e)}
+
+    def _run(self, block_md5s: List[str], content_md5: str) -> Dict[str, Any]:
+        all_blocks = set(range(len(block_md5s)))
+        if self.journal.load(self.block_size, block_md5s):
+            todo = sorted(all_blocks - self.journal.done)
+            print(f"[DEBUG] 续传 {self.remote_path}: 已完成 {len(self.journal.done)}/{len(block_md5s)} 个分块")
+        else:
+            pre = self._precreate(block_md5s, content_md5)
+            if int(pre.get('return_type') or 1) == 2:
+                # 服务端已有相同内容，秒传完成
+                self.journal.discard()
+                self._report(self.size)
+                return pre.get('info') or pre
+            self.journal.start(self.block_size, block_md5s, pre.get('uploadid'))
+            needed = pre.get('block_list')
+            todo = sorted(int(i) for i in needed) if needed else sorted(all_blocks)
+            # precreate 声明无需上传的分块视为已完成
+            for i in all_blocks - set(todo):
+                self.journal.done.add(i)
+        done_bytes = sum(self._block_len(i) for i in self.journal.done)
+        if done_bytes:
+            self._report(done_bytes)
+
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrent, len(todo)),
+                                    thread_name_prefix="chunk-upload") as pool:
+                futs = [pool.submit(self._upload_block, i, block_md5s[i]) for i in todo]
+                try:
+                    for fut in as_completed(futs):
+                        fut.result()
+                finally:
+                    for fut in futs:
+                        fut.cancel()
+
+        result = self._create(block_md5s)
+        self.journal.discard()
+        return result
+
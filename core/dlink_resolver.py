@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+批量 dlink 解析
+按批次调用 filemetas（每次最多 100 个 fsid）获取 dlink 与元信息，
+缓存到临近过期前；多个下载线程同时请求时合并为一次请求。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Union
+
+
+class DlinkResolver:
+    """dlink 批量解析器（线程安全）
+
+    - prefetch(fsids)：登记即将下载的 fsid，首次解析时与当前 fsid 合并为一批
+    - resolve(fsid)：返回包含 dlink 的元信息；缓存命中且未临近过期时不发请求
+    - invalidate(fsid)：下载失败（如 dlink 过期 31360）后丢弃缓存，下次重新解析
+    """
+
+    BATCH_SIZE = 100  # filemetas 单次最多 100 个 fsid
+    DLINK_TTL = 8 * 3600  # 百度 dlink 有效期约 8 小时
+    REFRESH_MARGIN = 10 * 60  # 距过期不足该时长视为失效，提前刷新
+
+    def __init__(self, api_client, batch_size: Optional[int] = None):
+        self.api_client = api_client
+        self.batch_size = max(1, min(self.BATCH_SIZE, int(batch_size or self.BATCH_SIZE)))
+        self._cache: Dict[str, tuple] = {}  # fsid -> (meta, expires_at)
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()  # 同一时间只发一批请求，其余线程等待结果
+
+    @staticmethod
+    def _key(fsid: Union[int, str]) -> str:
+        return str(fsid)
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if not entry:
+            return None
+        meta, expires_at = entry
+        if time.time() >= expires_at - self.REFRESH_MARGIN:
+            return None
+        return meta
+
+    def prefetch(self, fsids: List[Union[int, str]]):
+        """登记待解析的 fsid（不发请求）"""
+        with self._lock:
+            for fsid in fsids or []:
+                if fsid is None:
+                    continue
+                key = self._key(fsid)
+                if self._cached(key) is None:
+                    self._pending[key] = None
+
+    def invalidate(self, fsid: Union[int, str]):
+        with self._lock:
+            self._cache.pop(self._key(fsid), None)
+
+    def resolve(self, fsid: Union[int, str]) -> Dict[str, Any]:
+        """返回 fsid 的元信息（含 dlink），失败抛出异常"""
+        key = self._key(fsid)
+        with self._lock:
+            meta = self._cached(key)
+        if meta is not None:
+            return meta
+        with self._fetch_lock:
+            # 等锁期间可能已被其他线程的批次解析
+            with self._lock:
+                meta = self._cached(key)
+                if meta is not None:
+                    return meta
+                batch = [key]
+                self._pending.pop(key, None)
+                while self._pending and len(batch) < self.batch_size:
+                    other, _ = self._pending.popitem(last=False)
+                    if self._cached(other) is None:
+                        batch.append(other)
+            try:
+                self._fetch(batch)
+            except Exception:
+                # 整批失败：其余 fsid 放回待解析队列，由各自的任务稍后重试
+                with self._lock:
+                    for other in batch[1:]:
+                        self._pending[other] = None
+                raise
+        with self._lock:
+            meta = self._cached(key)
+        if meta is None:
+            raise RuntimeError('无法获取dlink')
+        return meta
+
+    def resolve_many(self, fsids: List[Union[int, str]]) -> Dict[str, Dict[str, Any]]:
+        """批量解析，返回 {fsid: meta}；解析失败的 fsid 不在结果中"""
+        self.prefetch(fsids)
+        result = {}
+        for fsid in fsids or []:
+            try:
+                result[self._key(fsid)] = self.resolve(fsid)
+            except Exception as e:
+                print(f"[DEBUG] 解析dlink失败 fsid={fsid}: {e}")
+        return result
+
+    def access_token(self) -> str:
+        baidu_token = self.api_client.get_user_baidu_token()
+        if not baidu_token or not baidu_token.get('access_token'):
+            raise RuntimeError('无法获取用户百度token，请重新授权')
+        return baidu_token.get('access_token')
+
+    def _fetch(self, keys: List[str]):
+        """一次 filemetas 请求解析一批 fsid"""
+        fsids = [int(k) if k.isdigit() else k for k in keys]
+        print(f"[DEBUG] 批量解析dlink: {len(fsids)} 个fsid")
+        meta = self.api_client.get_file_metas_with_dlink(fsids, self.access_token())
+        meta_list = (meta.get('list') if isinstance(meta, dict) else None) or \
+                    ((meta.get('data') or {}).get('list') if isinstance(meta, dict) else None) or []
+        now = time.time()
+        expires_at = now + self.DLINK_TTL
+        with self._lock:
+            for k in [k for k, (_, exp) in self._cache.items() if exp <= now]:
+                self._cache.pop(k, None)
+            for item in meta_list:
+                fsid = item.get('fs_id') or item.get('fsid')
+                if fsid is not None and item.get('dlink'):
+                    self._cache[self._key(fsid)] = (item, expires_at)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+下载断点清单（sidecar manifest）
+与 .part 临时文件并排存放，记录远端文件标识与已完成的字节区间，
+进程退出后重启仍可精确续传；远端文件变化时拒绝拼接旧数据。
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple, Union
+
+from core.local_store import write_json_atomic
+
+
+class DownloadManifest:
+    """下载断点清单
+
+    数据文件写入 `<target>.part`，清单写入 `<target>.part.json`；
+    ranges 为已落盘的闭区间列表 [[start, end], ...]（有序、已合并）。
+    """
+
+    PART_SUFFIX = '.part'
+    MANIFEST_SUFFIX = '.part.json'
+    VERSION = 1
+    SAVE_INTERVAL = 1.0  # 节流：两次落盘的最小间隔（秒）
+
+    def __init__(self, target_path: str, fsid: Union[int, str, None] = None, size: int = 0,
+                 mtime: Optional[int] = None, md5: Optional[str] = None,
+                 ranges: Optional[List[List[int]]] = None):
+        self.target_path = target_path
+        self.fsid = str(fsid) if fsid is not None else None
+        self.size = int(size or 0)
+        self.mtime = int(mtime) if mtime else None
+        self.md5 = (md5 or None)
+        self.ranges: List[List[int]] = [list(r) for r in (ranges or [])]
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._last_save = 0.0
+
+    # ---------- 路径 ----------
+    @property
+    def part_path(self) -> str:
+        return self.target_path + self.PART_SUFFIX
+
+    @property
+    def manifest_path(self) -> str:
+        return self.target_path + self.MANIFEST_SUFFIX
+
+    # ---------- 构造 ----------
+    @classmethod
+    def load(cls, target_path: str) -> Optional['DownloadManifest']:
+        """读取已有清单；清单缺失或损坏时返回 None"""
+        path = target_path + cls.MANIFEST_SUFFIX
+        try:
+            if not os.path.exists(path):
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if int(data.get('version') or 0) != cls.VERSION:
+                return None
+            return cls(
+                target_path,
+                fsid=data.get('fsid'),
+                size=data.get('size') or 0,
+                mtime=data.get('mtime'),
+                md5=data.get('md5'),
+                ranges=data.get('ranges') or [],
+            )
+        except Exception as e:
+            print(f"[DEBUG] 读取下载清单失败: {e}")
+            return None
+
+    @classmethod
+    def from_meta(cls, target_path: str, meta: Dict[str, Any]) -> 'DownloadManifest':
+        """由 filemetas / download_links 返回的元信息构造"""
+        meta = meta or {}
+        return cls(
+            target_path,
+            fsid=meta.get('fs_id') or meta.get('fsid'),
+            size=meta.get('size') or meta.get('file_size') or 0,
+            mtime=meta.get('server_mtime') or meta.get('mtime'),
+            md5=meta.get('md5'),
+        )
+
+    @classmethod
+    def open_for(cls, target_path: str, meta: Dict[str, Any]) -> 'DownloadManifest':
+        """打开用于续传的清单：
+        - 已有清单且远端未变化：沿用已完成区间
+        - 远端已变化或无清单：丢弃旧的 .part 数据，从零开始（不拼接不可信字节）
+        """
+        fresh = cls.from_meta(target_path, meta)
+        old = cls.load(target_path)
+        if old is not None and old.matches(fresh) and os.path.exists(old.part_path):
+            print(f"[DEBUG] 续传清单有效: 已完成 {old.completed_bytes()}/{old.size} 字节")
+            return old
+        if old is not None:
+            print("[DEBUG] 远端文件已变化，丢弃旧的续传数据")
+        fresh.discard_data()
+        return fresh
+
+    # ---------- 校验 ----------
+    def matches(self, other: 'DownloadManifest') -> bool:
+        """远端标识一致才允许续传；未知字段（None/0）不参与比较"""
+        if self.fsid and other.fsid and self.fsid != other.fsid:
+            return False
+        if self.size and other.size and self.size != other.size:
+            return False
+        if self.mtime and other.mtime and self.mtime != other.mtime:
+            return False
+        if self.md5 and other.md5 and self.md5.lower() != other.md5.lower():
+            return False
+        return True
+
+    # ---------- 区间 ----------
+    def add_range(self, start: int, end: int):
+        """记录已落盘的闭区间 [start, end]，并与相邻区间合并"""
+        if end < start:
+            return
+        with self._lock:
+            merged = []
+            s, e = int(start), int(end)
+            for a, b in self.ranges:
+                if b + 1 < s or e + 1 < a:
+                    merged.append([a, b])
+                else:
+                    s, e = min(s, a), max(e, b)
+            merged.append([s, e])
+            merged.sort()
+            self.ranges = merged
+
+    def reset_ranges(self):
+        with self._lock:
+            self.ranges = []
+
+    def completed_bytes(self) -> int:
+        with self._lock:
+            return sum(b - a + 1 for a, b in self.ranges)
+
+    def contiguous_prefix(self) -> int:
+        """从0开始连续完成的字节数（单连接续传位置）"""
+        with self._lock:
+            if self.ranges and self.ranges[0][0] == 0:
+                return self.ranges[0][1] + 1
+            return 0
+
+    def missing_ranges(self) -> List[Tuple[int, int]]:
+        """尚未完成的闭区间列表"""
+        with self._lock:
+            missing = []
+            pos = 0
+            for a, b in self.ranges:
+                if a > pos:
+                    missing.append((pos, a - 1))
+                pos = max(pos, b + 1)
+            if pos < self.size:
+                missing.append((pos, self.size - 1))
+            return missing
+
+    def is_complete(self) -> bool:
+        return self.size > 0 and not self.missing_ranges()
+
+    # ---------- 持久化 ----------
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'version': self.VERSION,
+                'fsid': self.fsid,
+                'size': self.size,
+                'mtime': self.mtime,
+                'md5': self.md5,
+                'ranges': [list(r) for r in self.ranges],
+                'updated_at': int(time.time()),
+            }
+
+    def save(self, force: bool = True):
+        """原子写入清单；force=False 时按 SAVE_INTERVAL 节流"""
+        with self._save_lock:
+            now = time.time()
+            if not force and now - self._last_save < self.SAVE_INTERVAL:
+                return
+            self._last_save = now
+            try:
+                write_json_atomic(self.manifest_path, self.to_dict())
+            except Exception as e:
+                print(f"[DEBUG] 保存下载清单失败: {e}")
+
+    def discard_data(self):
+        """删除旧的 .part 数据与清单，并清空区间"""
+        for p in (self.part_path, self.manifest_path):
+            try:
+                if os.path.exists(p):
+                    os.remove(p)
+            except Exception as e:
+                print(f"[DEBUG] 清理续传文件失败 {p}: {e}")
+        self.reset_ranges()
+
+    def finalize(self):
+        """下载完成：.part 重命名为目标文件并删除清单"""
+        os.replace(self.part_path, self.target_path)
+        try:
+            if os.path.exists(self.manifest_path):
+                os.remove(self.manifest_path)
+        except Exception:
+            pass
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+下载队列持久化
+记录每个下载任务的来源、目标路径、优先级与状态，程序重启后可恢复未完成的任务
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Optional, Dict, Any, List
+
+from core.local_store import data_path, write_json_atomic
+
+
+class DownloadTask:
+    """下载任务
+
+    kind: 'dlink'（用户态，filemetas 直链下载）或 'proxy'（公共态，票据 + 后端代理下载）
+    state: queued / running / paused / done / failed / canceled
+    priority 越大越先调度；同优先级按入队顺序
+    """
+
+    KIND_DLINK = 'dlink'
+    KIND_PROXY = 'proxy'
+
+    STATE_QUEUED = 'queued'
+    STATE_RUNNING = 'running'
+    STATE_PAUSED = 'paused'
+    STATE_DONE = 'done'
+    STATE_FAILED = 'failed'
+    STATE_CANCELED = 'canceled'
+
+    # 仍需调度（未结束）的状态
+    PENDING_STATES = (STATE_QUEUED, STATE_RUNNING, STATE_PAUSED)
+
+    FIELDS = ('task_id', 'kind', 'fsid', 'path', 'save_path', 'name', 'size', 'meta',
+              'priority', 'state', 'attempts', 'error', 'downloaded', 'total', 'created_at')
+
+    def __init__(self, kind: str, save_path: str, fsid=None, path: Optional[str] = None,
+                 name: Optional[str] = None, size: int = 0, meta: Optional[Dict[str, Any]] = None,
+                 priority: int = 0, task_id: Optional[str] = None, state: str = STATE_QUEUED,
+                 attempts: int = 0, error: Optional[str] = None, downloaded: int = 0,
+                 total: int = 0, created_at: Optional[float] = None):
+        self.task_id = task_id or uuid.uuid4().hex
+        self.kind = kind
+        self.fsid = fsid
+        self.path = path
+        self.save_path = save_path
+        self.name = name or os.path.basename(save_path or '') or 'download.bin'
+        self.size = int(size or 0)
+        self.meta = dict(meta or {})
+        self.priority = int(priority or 0)
+        self.state = state
+        self.attempts = int(attempts or 0)
+        self.error = error
+        self.downloaded = int(downloaded or 0)
+        self.total = int(total or size or 0)
+        self.created_at = created_at or time.time()
+
+    @property
+    def is_pending(self) -> bool:
+        return self.state in self.PENDING_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional['DownloadTask']:
+        try:
+            kwargs = {k: data.get(k) for k in cls.FIELDS if k in data}
+            kind = kwargs.pop('kind')
+            save_path = kwargs.pop('save_path')
+            if not kind or not save_path:
+                return None
+            return cls(kind, save_path, **kwargs)
+        except Exception as e:
+            print(f"[DEBUG] 解析下载任务失败: {e}")
+            return None
+
+
+class DownloadQueueStore:
+    """下载队列的 JSON 存储（原子写入）"""
+
+    FILE_NAME = 'download_queue.json'
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path(self.FILE_NAME)
+        self._lock = threading.Lock()
+
+    def load(self) -> List[DownloadTask]:
+        try:
+            if not os.path.exists(self.path):
+                return []
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            tasks = []
+            for item in (data.get('tasks') or []):
+                task = DownloadTask.from_dict(item)
+                if task is not None:
+                    tasks.append(task)
+            return tasks
+        except Exception as e:
+            print(f"[DEBUG] 读取下载队列失败: {e}")
+            return []
+
+    def save(self, tasks: List[DownloadTask]):
+        """只持久化未结束的任务；已完成/失败/取消的任务不再保留"""
+        with self._lock:
+            try:
+                payload = {
+                    'version': 1,
+                    'tasks': [t.to_dict() for t in tasks if t.is_pending],
+                }
+                write_json_atomic(self.path, payload, indent=2)
+            except Exception as e:
+                print(f"[DEBUG] 保存下载队列失败: {e}")
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+本地文件哈希缓存
+以 (路径, 大小, mtime_ns, inode) 作为文件签名，签名未变化时直接返回已计算的哈希，
+避免重试/断网后重新上传时再次完整读取文件。数据保存在 ~/.pan_client 下的 SQLite 中，
+超过条目上限时按最近使用时间淘汰。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Callable, Tuple, List
+
+from core.local_store import data_path, open_sqlite, evict_lru, Shared
+
+
+class HashCache:
+    """文件哈希缓存（线程安全）
+
+    kind 区分同一文件的不同哈希（如 'md5'），便于以后缓存分片/校验值
+    """
+
+    FILE_NAME = 'hash_cache.db'
+    MAX_ENTRIES = 200000  # 超过后淘汰最久未使用的条目
+    EVICT_RATIO = 0.9  # 淘汰到上限的 90%，避免每次写入都触发淘汰
+    CHUNK_SIZE = 1024 * 1024
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS hashes ("
+        " path TEXT NOT NULL, kind TEXT NOT NULL,"
+        " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL,"
+        " value TEXT NOT NULL, last_used REAL NOT NULL,"
+        " PRIMARY KEY (path, kind))",
+        "CREATE INDEX IF NOT EXISTS idx_hashes_last_used ON hashes(last_used)",
+    )
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.path = path or data_path(self.FILE_NAME)
+        self.max_entries = max(1, int(max_entries or self.MAX_ENTRIES))
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = open_sqlite(self.path, self.SCHEMA, synchronous="NORMAL")
+        return self._conn
+
+    @staticmethod
+    def signature(path: str) -> Tuple[str, int, int, int]:
+        """返回 (规范化路径, 大小, mtime_ns, inode)；文件不存在时抛出 OSError"""
+        key = os.path.normcase(os.path.abspath(path))
+        st = os.stat(path)
+        return key, int(st.st_size), int(st.st_mtime_ns), int(st.st_ino or 0)
+
+    def get(self, path: str, kind: str = 'md5') -> Optional[str]:
+        """签名一致时返回缓存的哈希，否则返回 None"""
+        try:
+            key, size, mtime_ns, inode = self.signature(path)
+            with self._lock:
+                conn = self._db()
+                row = conn.execute(
+                    "SELECT size, mtime_ns, inode, value FROM hashes WHERE path=? AND kind=?",
+                    (key, kind),
+                ).fetchone()
+                if not row:
+                    return None
+                if (row[0], row[1], row[2]) != (size, mtime_ns, inode):
+                    conn.execute("DELETE FROM hashes WHERE path=? AND kind=?", (key, kind))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE hashes SET last_used=? WHERE path=? AND kind=?", (time.time(), key, kind))
+                conn.commit()
+                return row[3]
+        except OSError:
+            return None
+        except Exception as e:
+            print(f"[DEBUG] 读取哈希缓存失败: {e}")
+            return None
+
+    def put(self, path: str, value: str, kind: str = 'md5', signature: Optional[Tuple[str, int, int, int]] = None):
+        """写入缓存；signature 应为计算哈希前取得的签名，以免记录到计算期间被修改的文件"""
+        if not value:
+            return
+        try:
+            key, size, mtime_ns, inode = signature or self.signature(path)
+            with self._lock:
+                conn = self._db()
+                conn.execute(
+                    "INSERT OR REPLACE INTO hashes (path, kind, size, mtime_ns, inode, value, last_used)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, kind, size, mtime_ns, inode, value, time.time()),
+                )
+                self._writes += 1
+                if self._writes % 100 == 1:
+                    self._evict(conn)
+                conn.commit()
+        except Exception as e:
+            print(f"[DEBUG] 写入哈希缓存失败: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        remove = evict_lru(conn, 'hashes', self.max_entries, self.EVICT_RATIO)
+        if remove:
+            print(f"[DEBUG] 哈希缓存淘汰 {remove} 条")
+
+    def file_md5(self, path: str, should_stop: Optional[Callable[[], bool]] = None) -> Optional[str]:
+        """返回文件 MD5：优先命中缓存，否则完整计算并写入缓存；被中止或出错时返回 None"""
+        cached = self.get(path, 'md5')
+        if cached:
+            return cached
+        try:
+            sig = self.signature(path)
+            md5 = hashlib.md5()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                    if should_stop and should_stop():
+                        return None
+                    md5.update(chunk)
+            value = md5.hexdigest()
+            # 计算期间文件被改动则不缓存
+            if self.signature(path) == sig:
+                self.put(path, value, 'md5', sig)
+            return value
+        except Exception as e:
+            print(f"[DEBUG] MD5计算失败: {e}")
+            return None
+
+    def file_block_md5s(self, path: str, block_size: int,
+                        should_stop: Optional[Callable[[], bool]] = None) -> Optional[Tuple[str, List[str]]]:
+        """一次读取同时得到 (整文件 MD5, 各分块 MD5 列表)，两者都写入缓存"""
+        kind = f'block_md5:{int(block_size)}'
+        full = self.get(path, 'md5')
+        cached = self.get(path, kind)
+        if full and cached:
+            try:
+                return full, json.loads(cached)
+            except Exception:
+                pass
+        try:
+            sig = self.signature(path)
+            whole = hashlib.md5()
+            blocks: List[str] = []
+            with open(path, 'rb') as f:
+                while True:
+                    block = hashlib.md5()
+                    remaining = int(block_size)
+                    got = 0
+                    while remaining > 0:
+                        if should_stop and should_stop():
+                            return None
+                        chunk = f.read(min(self.CHUNK_SIZE, remaining))
+                        if not chunk:
+                            break
+                        whole.update(chunk)
+                        block.update(chunk)
+                        got += len(chunk)
+                        remaining -= len(chunk)
+                    if got:
+                        blocks.append(block.hexdigest())
+                    if remaining > 0:
+                        break
+            if not blocks:
+                # 空文件也按一个分块处理
+                blocks.append(hashlib.md5().hexdigest())
+            full = whole.hexdigest()
+            if self.signature(path) == sig:
+                self.put(path, full, 'md5', sig)
+                self.put(path, json.dumps(blocks), kind, sig)
+            return full, blocks
+        except Exception as e:
+            print(f"[DEBUG] 分块MD5计算失败: {e}")
+            return None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+
+
+_default_cache = Shared(HashCache)
+
+
+def get_hash_cache() -> HashCache:
+    """进程内共享的默认哈希缓存"""
+    return _default_cache.get()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+列表预取
+在后台提前拉取用户接下来很可能要看的列表，结果只写入共享的响应缓存 / 元数据镜像，
+真正加载时直接命中缓存：
+- 滚动接近底部时预取下一页（用户目录 / 公共资源）；
+- 目录显示后预先列出最可能打开的几个子目录（访问过的优先，其次最近修改的）。
+预取同一时刻最多只有一个请求在途，两次请求之间有最小间隔；有前台传输或列表加载时暂停；
+导航离开时 cancel() 丢弃排队的任务并取消在途请求。
+"""
+
+import posixpath
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, List, Callable, Coroutine
+
+
+class _Task:
+    __slots__ = ('key', 'factory')
+
+    def __init__(self, key: tuple, factory: Callable[[], Coroutine]):
+        self.key = key
+        self.factory = factory
+
+
+class ListingPrefetcher:
+    """列表预取器（线程安全）
+
+    - prefetch_page(dir, limit, page)：预取用户目录的某一页
+    - prefetch_public_page(page, page_size, keyword)：预取公共资源的某一页
+    - prefetch_subdirs(entries, limit)：预先列出最可能打开的子目录
+    - record_visit(path)：记录目录访问，用于子目录排序
+    - cancel()：丢弃排队任务并取消在途请求（导航时调用）
+    is_busy() 会在计时器线程 / 事件循环线程中调用，只应读取线程安全的状态（例如主线程维护的标志）。
+    """
+
+    MIN_INTERVAL = 0.5  # 两次预取请求之间的最小间隔（秒）
+    BUSY_RETRY = 2.0  # 前台繁忙时的重试间隔（秒）
+    MAX_QUEUE = 8
+    MAX_SUBDIRS = 3
+    FRESH_SECONDS = 60.0  # 镜像中最近列出过的目录不再预取
+
+    def __init__(self, client, is_busy: Optional[Callable[[], bool]] = None):
+        self.client = client
+        self.is_busy = is_busy
+        self._lock = threading.Lock()
+        self._queue: deque = deque()
+        self._inflight: Optional[Future] = None
+        self._last_at = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._visits: Dict[str, int] = {}
+        self._closed = False
+
+    @property
+    def api_client(self):
+        return self.client.api_client
+
+    # ---------- 提交 ----------
+    def _enqueue(self, key: tuple, factory: Callable[[], Coroutine]) -> bool:
+        with self._lock:
+            if self._closed or any(t.key == key for t in self._queue):
+                return False
+            if len(self._queue) >= self.MAX_QUEUE:
+                # 保留最新的请求：最早排队的多半已经不需要了
+                self._queue.popleft()
+            self._queue.append(_Task(key, factory))
+        self._pump()
+        return True
+
+    def prefetch_page(self, dir_path: str, limit: int, page: int) -> bool:
+        args = {"dir": dir_path, "limit": limit, "page": page}
+        cache = self.api_client.response_cache
+        if cache.get(cache.key("list_files", args)) is not None:
+            return False
+        return self._enqueue(("list_files", dir_path, limit, page),
+                             lambda: self.client.list_files(dir_path, limit, page))
+
+    def prefetch_public_page(self, page: int, page_size: int, keyword: Optional[str] = None) -> bool:
+        params = {'page': page, 'page_size': page_size}
+        if keyword:
+            params['file_path'] = keyword
+        cache = self.api_client.response_cache
+        if cache.get(cache.key("files_list", params)) is not None:
+            return False
+        return self._enqueue(("files_list", page, page_size, keyword or ''),
+                             lambda: self.client.files_list(page=page, page_size=page_size,
+                                                            file_path=keyword or None, cached=True))
+
+    def record_visit(self, path: str):
+        path = posixpath.normpath('/' + (path or '/').strip('/'))
+        with self._lock:
+            self._visits[path] = self._visits.get(path, 0) + 1
+
+    def likely_subdirs(self, entries: List[Dict[str, Any]], limit: Optional[int] = None) -> List[str]:
+        """按“访问次数、最近修改时间”排序的子目录路径"""
+        scored = []
+        with self._lock:
+            visits = dict(self._visits)
+        for e in entries or []:
+            if not isinstance(e, dict) or int(e.get('isdir') or 0) != 1:
+                continue
+            path = e.get('path') or e.get('server_path')
+            if not path:
+                continue
+            path = posixpath.normpath('/' + path.strip('/'))
+            try:
+                mtime = float(e.get('server_mtime') or e.get('mtime') or 0)
+            except (TypeError, ValueError):
+                mtime = 0.0
+            scored.append((visits.get(path, 0), mtime, path))
+        scored.sort(reverse=True)
+        return [p for _, _, p in scored[:limit or self.MAX_SUBDIRS]]
+
+    def prefetch_subdirs(self, entries: List[Dict[str, Any]], limit: int) -> int:
+        account = self.api_client.account_key()
+        store = self.api_client.metadata_store
+        count = 0
+        for path in self.likely_subdirs(entries):
+            listed_at = store.listed_at(account, path)
+            if listed_at is not None and time.time() - listed_at < self.FRESH_SECONDS:
+                continue
+            if self.prefetch_page(path, limit, 1):
+                count += 1
+        return count
+
+    # ---------- 调度 ----------
+    def _schedule(self, delay: float):
+        with self._lock:
+            if self._timer is not None or self._closed:
+                return
+            self._timer = threading.Timer(delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        self._pump()
+
+    def _pump(self):
+        with self._lock:
+            if self._closed or self._inflight is not None or not self._queue:
+                return
+            wait = self.MIN_INTERVAL - (time.time() - self._last_at)
+        if wait > 0:
+            self._schedule(wait)
+            return
+        try:
+            busy = bool(self.is_busy and self.is_busy())
+        except Exception:
+            busy = False
+        if busy:
+            self._schedule(self.BUSY_RETRY)
+            return
+        with self._lock:
+            if self._closed or self._inflight is not None or not self._queue:
+                return
+            task = self._queue.popleft()
+            future = self.client.run(task.factory())
+            self._inflight = future
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future: Future):
+        with self._lock:
+            if self._inflight is future:
+                self._inflight = None
+            self._last_at = time.time()
+        if not future.cancelled() and future.exception() is not None:
+            print(f"[DEBUG] 预取失败: {future.exception()}")
+        self._pump()
+
+    def cancel(self):
+        with self._lock:
+            self._queue.clear()
+            future, self._inflight = self._inflight, None
+        if future is not None:
+            future.cancel()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._queue) + (1 if self._inflight is not None else 0)
+
+    def close(self):
+        self.cancel()
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+本地持久化公共工具
+哈希缓存、秒传索引、元数据镜像、下载队列、上传断点日志等都保存在同一个数据目录下，
+这里统一处理：数据目录位置、SQLite 连接（WAL）与按最近使用时间淘汰、JSON 原子写入，
+以及进程内共享实例的加锁延迟创建。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Any, Callable, Iterable
+
+
+def data_dir() -> Path:
+    """本地数据目录：优先 %APPDATA%，否则 ~/.pan_client"""
+    return Path(os.environ.get('APPDATA') or Path.home() / '.pan_client')
+
+
+def data_path(name: str) -> str:
+    """数据目录下的文件/子目录路径"""
+    return str(data_dir() / name)
+
+
+def open_sqlite(path: str, schema: Iterable[str] = (), synchronous: Optional[str] = None) -> sqlite3.Connection:
+    """打开（必要时创建）SQLite 数据库并执行建表语句
+
+    WAL 模式，连接可跨线程使用，调用方需自行加锁。
+    """
+    save_dir = os.path.dirname(path)
+    if save_dir:
+        os.makedirs(save_dir, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if synchronous:
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+    for statement in schema:
+        conn.execute(statement)
+    conn.commit()
+    return conn
+
+
+def evict_lru(conn: sqlite3.Connection, table: str, max_entries: int, ratio: float = 0.9) -> int:
+    """表中条目超过 max_entries 时按 last_used 淘汰到 max_entries * ratio，返回删除的条数
+
+    淘汰到上限以下一段距离，避免每次写入都触发淘汰；表需有 last_used 列。
+    """
+    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    if count <= max_entries:
+        return 0
+    remove = count - int(max_entries * ratio)
+    conn.execute(
+        f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY last_used ASC LIMIT ?)",
+        (remove,),
+    )
+    return remove
+
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = None):
+    """先写临时文件再替换，中途退出不会留下半个文件；异常由调用方处理"""
+    save_dir = os.path.dirname(path)
+    if save_dir:
+        os.makedirs(save_dir, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp, path)
+
+
+class Shared:
+    """进程内共享实例：首次 get() 时加锁创建
+
+    _default = Shared(HashCache)
+    def get_hash_cache() -> HashCache: return _default.get()
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._instance = None
+
+    def get(self) -> Any:
+        with self._lock:
+            if self._instance is None:
+                self._instance = self._factory()
+            return self._instance
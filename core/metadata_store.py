@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+远端目录树的本地元数据镜像
+list_files 的结果写入本地 SQLite（按账号区分，以 fs_id / 路径索引），
+下次打开目录时先用本地数据立即显示，再在后台拉取最新列表校正；
+其他功能（搜索、目录选择、操作结果校验）也可以直接查询本地数据。
+"""
+
+import json
+import posixpath
+import sqlite3
+import threading
+import time
+from typing import Optional, List, Dict, Any, Iterable, Callable, Iterator
+
+from core.local_store import data_path, open_sqlite, Shared
+
+
+def _norm(path: Optional[str]) -> str:
+    p = posixpath.normpath('/' + (path or '/').strip('/'))
+    return '/' if p in ('', '.', '//') else p
+
+
+class MetadataStore:
+    """远端文件元数据镜像（线程安全）
+
+    - apply_listing(account, dir, files, page, complete)：写入一页列表；从第一页起连续拉到最后一页时，
+      以各页的并集为准删除已不存在的子项
+    - listing(account, dir)：返回目录的本地列表（与 list_files 中的条目格式一致），从未拉取过返回 None
+    - get / get_by_fsid：按路径或 fs_id 查单个条目
+    - folders(account, under)：已知的全部子目录（目录选择对话框使用）
+    - search(account, keyword)：按文件名在本地搜索
+    - upsert(account, entries)：更新单个条目；listed_dirs(account)：拉取过列表的目录
+    - remove_paths(account, paths)：删除条目及其子树
+    - add_listener(fn)：变化通知 fn(event, account, data)，event 为 "upsert"（data 为行元组列表）/
+      "remove"（data 为路径列表，含子树）/ "clear"（account 为 None 表示全部账号）
+    - iter_rows(account)：逐行遍历（path, name, fs_id, size, mtime, isdir），用于构建索引
+    """
+
+    FILE_NAME = 'metadata.db'
+    MAX_PASSES = 64  # 同时记录分页覆盖情况的目录数上限
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " account TEXT NOT NULL, path TEXT NOT NULL, parent TEXT NOT NULL, name TEXT NOT NULL,"
+        " fs_id TEXT, size INTEGER, md5 TEXT, mtime INTEGER, isdir INTEGER NOT NULL DEFAULT 0,"
+        " raw TEXT, PRIMARY KEY (account, path))",
+        "CREATE INDEX IF NOT EXISTS idx_entries_parent ON entries(account, parent)",
+        "CREATE INDEX IF NOT EXISTS idx_entries_fsid ON entries(account, fs_id)",
+        "CREATE TABLE IF NOT EXISTS dirs ("
+        " account TEXT NOT NULL, path TEXT NOT NULL, listed_at REAL NOT NULL,"
+        " complete INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (account, path))",
+    )
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path(self.FILE_NAME)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._listeners: List[Callable[[str, Optional[str], Any], None]] = []
+        # (account, dir) -> (下一页页码, 已见子项路径)：分页拉取目录时记录覆盖情况
+        self._passes: Dict[tuple, tuple] = {}
+
+    def add_listener(self, fn: Callable[[str, Optional[str], Any], None]):
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    def remove_listener(self, fn: Callable[[str, Optional[str], Any], None]):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _notify(self, event: str, account: Optional[str], data: Any = None):
+        for fn in list(self._listeners):
+            try:
+                fn(event, account, data)
+            except Exception as e:
+                print(f"[DEBUG] 元数据变化通知失败: {e}")
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = open_sqlite(self.path, self.SCHEMA)
+        return self._conn
+
+    @staticmethod
+    def _row(account: str, dir_path: str, f: Dict[str, Any]) -> Optional[tuple]:
+        name = f.get('server_filename') or f.get('file_name') or f.get('name') or ''
+        path = f.get('path') or f.get('server_path') or ''
+        if not path:
+            if not name:
+                return None
+            path = posixpath.join(dir_path, name)
+        path = _norm(path)
+        if not name:
+            name = posixpath.basename(path)
+        fs_id = f.get('fs_id') or f.get('fsid') or f.get('id')
+        mtime = f.get('server_mtime') or f.get('mtime') or f.get('update_time') or f.get('ctime') or 0
+        try:
+            mtime = int(mtime)
+        except (TypeError, ValueError):
+            mtime = 0
+        try:
+            size = int(f.get('size') or f.get('file_size') or 0)
+        except (TypeError, ValueError):
+            size = 0
+        return (account, path, _norm(posixpath.dirname(path)), name,
+                str(fs_id) if fs_id is not None else None, size, f.get('md5'), mtime,
+                1 if int(f.get('isdir') or 0) == 1 else 0, json.dumps(f, ensure_ascii=False))
+
+    @staticmethod
+    def _entry(row) -> Dict[str, Any]:
+        path, name, fs_id, size, md5, mtime, isdir, raw = row
+        try:
+            entry = json.loads(raw) if raw else {}
+        except Exception:
+            entry = {}
+        entry.setdefault('path', path)
+        entry.setdefault('server_filename', name)
+        entry.setdefault('size', size)
+        entry.setdefault('isdir', isdir)
+        entry.setdefault('server_mtime', mtime)
+        if fs_id is not None:
+            entry.setdefault('fs_id', int(fs_id) if fs_id.isdigit() else fs_id)
+        if md5:
+            entry.setdefault('md5', md5)
+        return entry
+
+    _COLUMNS = "path, name, fs_id, size, md5, mtime, isdir, raw"
+
+    def apply_listing(self, account: str, dir_path: str, files: List[Dict[str, Any]],
+                      page: int = 1, complete: bool = True):
+        dir_path = _norm(dir_path)
+        rows = [r for r in (self._row(account, dir_path, f) for f in files or [] if isinstance(f, dict)) if r]
+        page = int(page or 1)
+        gone = []
+        try:
+            with self._lock:
+                seen = self._track_pass(account, dir_path, page, complete, rows)
+                conn = self._db()
+                with conn:
+                    if complete and seen is not None:
+                        # 完整列表（各页并集）：已不存在的子项连同其子树一起删除
+                        gone = [p for (p,) in conn.execute(
+                            "SELECT path FROM entries WHERE account=? AND parent=?", (account, dir_path))
+                            if p not in seen]
+                        self._delete_subtrees(conn, account, gone)
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO entries (account, path, parent, name, fs_id, size, md5, mtime, isdir, raw)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO dirs (account, path, listed_at, complete) VALUES (?, ?, ?, ?)",
+                        (account, dir_path, time.time(), 1 if complete and seen is not None else 0))
+        except Exception as e:
+            print(f"[DEBUG] 写入元数据镜像失败: {e}")
+            return
+        if gone:
+            self._notify("remove", account, gone)
+        if rows:
+            self._notify("upsert", account, rows)
+
+    def _track_pass(self, account: str, dir_path: str, page: int, complete: bool, rows: List[tuple]):
+        """记录本轮分页已覆盖的子项；返回从第一页起连续覆盖到当前页的路径集合，中间缺页时返回 None"""
+        key = (account, dir_path)
+        if page <= 1:
+            seen = set()
+        else:
+            last = self._passes.get(key)
+            seen = last[1] if last is not None and last[0] == page else None
+        if seen is not None:
+            seen.update(r[1] for r in rows)
+        self._passes.pop(key, None)
+        if not complete and seen is not None:
+            self._passes[key] = (page + 1, seen)
+            while len(self._passes) > self.MAX_PASSES:
+                self._passes.pop(next(iter(self._passes)))
+        return seen
+
+    @staticmethod
+    def _delete_subtrees(conn: sqlite3.Connection, account: str, paths: Iterable[str]):
+        for p in paths:
+            p = _norm(p)
+            prefix = p.rstrip('/') + '/'
+            like = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conn.execute("DELETE FROM entries WHERE account=? AND (path=? OR path LIKE ? ESCAPE '\\')",
+                         (account, p, like))
+            conn.execute("DELETE FROM dirs WHERE account=? AND (path=? OR path LIKE ? ESCAPE '\\')",
+                         (account, p, like))
+
+    def listing(self, account: str, dir_path: str) -> Optional[List[Dict[str, Any]]]:
+        dir_path = _norm(dir_path)
+        try:
+            with self._lock:
+                conn = self._db()
+                if conn.execute("SELECT 1 FROM dirs WHERE account=? AND path=?", (account, dir_path)).fetchone() is None:
+                    return None
+                rows = conn.execute(
+                    f"SELECT {self._COLUMNS} FROM entries WHERE account=? AND parent=? AND path<>?"
+                    " ORDER BY isdir DESC, name COLLATE NOCASE", (account, dir_path, dir_path)).fetchall()
+            return [self._entry(r) for r in rows]
+        except Exception as e:
+            print(f"[DEBUG] 读取元数据镜像失败: {e}")
+            return None
+
+    def listed_at(self, account: str, dir_path: str) -> Optional[float]:
+        try:
+            with self._lock:
+                row = self._db().execute("SELECT listed_at FROM dirs WHERE account=? AND path=?",
+                                         (account, _norm(dir_path))).fetchone()
+            return row[0] if row else None
+        except Exception:
+            return None
+
+    def get(self, account: str, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self._lock:
+                row = self._db().execute(f"SELECT {self._COLUMNS} FROM entries WHERE account=? AND path=?",
+                                         (account, _norm(path))).fetchone()
+            return self._entry(row) if row else None
+        except Exception:
+            return None
+
+    def get_by_fsid(self, account: str, fs_id) -> Optional[Dict[str, Any]]:
+        try:
+            with self._lock:
+                row = self._db().execute(f"SELECT {self._COLUMNS} FROM entries WHERE account=? AND fs_id=?",
+                                         (account, str(fs_id))).fetchone()
+            return self._entry(row) if row else None
+        except Exception:
+            return None
+
+    def folders(self, account: str, under: str = '/') -> List[Dict[str, Any]]:
+        under = _norm(under)
+        prefix = under.rstrip('/') + '/'
+        like = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        try:
+            with self._lock:
+                rows = self._db().execute(
+                    f"SELECT {self._COLUMNS} FROM entries WHERE account=? AND isdir=1 AND path LIKE ? ESCAPE '\\'"
+                    " ORDER BY path", (account, like)).fetchall()
+            return [self._entry(r) for r in rows]
+        except Exception as e:
+            print(f"[DEBUG] 读取元数据镜像失败: {e}")
+            return []
+
+    def search(self, account: str, keyword: str, limit: int = 200) -> List[Dict[str, Any]]:
+        if not keyword:
+            return []
+        like = '%' + keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        try:
+            with self._lock:
+                rows = self._db().execute(
+                    f"SELECT {self._COLUMNS} FROM entries WHERE account=? AND name LIKE ? ESCAPE '\\'"
+                    " ORDER BY isdir DESC, name COLLATE NOCASE LIMIT ?", (account, like, int(limit))).fetchall()
+            return [self._entry(r) for r in rows]
+        except Exception as e:
+            print(f"[DEBUG] 本地搜索失败: {e}")
+            return []
+
+    def upsert(self, account: str, entries: Iterable[Dict[str, Any]]):
+        """写入/更新单个条目（不改变其所在目录的列表状态）"""
+        rows = [r for r in (self._row(account, '/', e) for e in entries or [] if isinstance(e, dict)) if r]
+        if not rows:
+            return
+        try:
+            with self._lock:
+                conn = self._db()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO entries (account, path, parent, name, fs_id, size, md5, mtime, isdir, raw)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        except Exception as e:
+            print(f"[DEBUG] 更新元数据镜像失败: {e}")
+            return
+        self._notify("upsert", account, rows)
+
+    def listed_dirs(self, account: str) -> List[str]:
+        """拉取过列表的全部目录"""
+        try:
+            with self._lock:
+                rows = self._db().execute("SELECT path FROM dirs WHERE account=? ORDER BY path", (account,)).fetchall()
+            return [r[0] for r in rows]
+        except Exception:
+            return []
+
+    def remove_paths(self, account: str, paths: Iterable[str]):
+        paths = [_norm(p) for p in paths if p]
+        try:
+            with self._lock:
+                conn = self._db()
+                with conn:
+                    self._delete_subtrees(conn, account, paths)
+        except Exception as e:
+            print(f"[DEBUG] 更新元数据镜像失败: {e}")
+            return
+        if paths:
+            self._notify("remove", account, paths)
+
+    def iter_rows(self, account: str, batch: int = 5000) -> Iterator[tuple]:
+        """逐批读取账号下全部条目 (path, name, fs_id, size, mtime, isdir)，不解析 raw"""
+        last = ''
+        while True:
+            try:
+                with self._lock:
+                    rows = self._db().execute(
+                        "SELECT path, name, fs_id, size, mtime, isdir FROM entries"
+                        " WHERE account=? AND path>? ORDER BY path LIMIT ?", (account, last, int(batch))).fetchall()
+            except Exception as e:
+                print(f"[DEBUG] 读取元数据镜像失败: {e}")
+                return
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1][0]
+
+    def clear(self, account: Optional[str] = None):
+        try:
+            with self._lock:
+                conn = self._db()
+                with conn:
+                    if account is None:
+                        conn.execute("DELETE FROM entries")
+                        conn.execute("DELETE FROM dirs")
+                    else:
+                        conn.execute("DELETE FROM entries WHERE account=?", (account,))
+                        conn.execute("DELETE FROM dirs WHERE account=?", (account,))
+                self._passes.clear()
+        except Exception as e:
+            print(f"[DEBUG] 清空元数据镜像失败: {e}")
+            return
+        self._notify("clear", account)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+
+
+_default_store = Shared(MetadataStore)
+
+
+def get_metadata_store() -> MetadataStore:
+    """进程内共享的默认元数据镜像"""
+    return _default_store.get()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+流式 multipart/form-data 编码
+requests 的 files= 会先把整个请求体拼到内存里，大文件上传时内存随文件大小增长。
+这里按块读取文件生成请求体，预先算出 Content-Length，并在每块发送后回调进度。
+"""
+
+import hashlib
+import os
+import uuid
+from typing import Optional, Dict, Callable, Iterator
+
+from core.hash_cache import get_hash_cache
+
+
+class MultipartStream:
+    """流式 multipart 请求体
+
+    用法：requests.post(url, data=stream, headers={'Content-Type': stream.content_type, ...})
+    requests 通过 len() 取得 Content-Length，再逐块迭代发送，内存占用与文件大小无关。
+    progress_callback(sent_bytes, total_bytes) 在每块产出后调用（含表单字段部分）。
+    发送过程中顺带计算文件 MD5（file_md5），cache_md5=True 时写入本地哈希缓存。
+    """
+
+    CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, fields: Optional[Dict[str, str]], file_field: str, file_path: str,
+                 filename: Optional[str] = None, file_content_type: str = 'application/octet-stream',
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 chunk_size: Optional[int] = None, cache_md5: bool = True):
+        self.boundary = uuid.uuid4().hex
+        self.file_path = file_path
+        self.file_size = os.path.getsize(file_path)
+        self.file_md5: Optional[str] = None
+        self.cache_md5 = cache_md5
+        self.progress_callback = progress_callback
+        self.chunk_size = int(chunk_size or self.CHUNK_SIZE)
+
+        name = filename or os.path.basename(file_path)
+        head = b''
+        for key, value in (fields or {}).items():
+            if value is None:
+                continue
+            head += self._part_header(key) + b'\r\n' + str(value).encode('utf-8') + b'\r\n'
+        head += self._part_header(file_field, name, file_content_type) + b'\r\n'
+        self._head = head
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode('ascii')
+        self._length = len(self._head) + self.file_size + len(self._tail)
+
+    def _part_header(self, field: str, filename: Optional[str] = None, content_type: Optional[str] = None) -> bytes:
+        disposition = f'form-data; name="{self._quote(field)}"'
+        if filename is not None:
+            disposition += f'; filename="{self._quote(filename)}"'
+        lines = [f'--{self.boundary}', f'Content-Disposition: {disposition}']
+        if content_type:
+            lines.append(f'Content-Type: {content_type}')
+        return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+    @staticmethod
+    def _quote(value: str) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\r', ' ').replace('\n', ' ')
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        sent = 0
+        sent = self._emit(sent, len(self._head))
+        yield self._head
+        cache = get_hash_cache()
+        sig = cache.signature(self.file_path)
+        md5 = hashlib.md5()
+        with open(self.file_path, 'rb') as f:
+            remaining = self.file_size
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    # 文件在上传期间被截断：Content-Length 已发出，只能中止
+                    raise IOError(f"文件在上传过程中被修改: {self.file_path}")
+                remaining -= len(chunk)
+                md5.update(chunk)
+                sent = self._emit(sent, len(chunk))
+                yield chunk
+        self.file_md5 = md5.hexdigest()
+        if self.cache_md5 and cache.signature(self.file_path) == sig:
+            cache.put(self.file_path, self.file_md5, 'md5', sig)
+        sent = self._emit(sent, len(self._tail))
+        yield self._tail
+
+    def _emit(self, sent: int, n: int) -> int:
+        # 先记账再产出：进度表示已交给连接的字节数
+        sent += n
+        if self.progress_callback:
+            try:
+                self.progress_callback(sent, self._length)
+            except Exception:
+                pass
+        return sent
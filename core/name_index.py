@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+本地文件名索引
+基于元数据镜像为当前账号建立文件名倒排索引，搜索时不需要访问服务端：
+- 文件名经 NFKC 归一化并忽略大小写，按字符二元组（bigram）建倒排表；
+  中日韩文字额外索引单字，另为每个名称的首字符建锚点，用于单字符前缀查询；
+- 查询时每个词取倒排表最短的 gram 作为候选集，再逐个校验子串，凑够结果即停止；
+  候选过多（gram 很常见）时改为在按块拼接的名称文本上用 str.find 扫描，避免逐个校验；
+- 结果不足时用编辑距离为 1 的变体（相邻互换、删除一个字符）做容错匹配；
+- 镜像每次写入（列表、更新、删除）通过监听增量更新索引，删除只打标记，累计较多时整体压缩。
+倒排表用 array('I') 存放条目编号，百万级条目时内存约数十 MB。
+"""
+
+import posixpath
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_right
+from itertools import islice
+from typing import Optional, List, Dict, Any, Iterable, Set
+
+from core.local_store import Shared
+
+_ANCHOR = '\x00'
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize('NFKC', text or '').casefold().replace('\n', ' ')
+
+
+def _is_cjk(ch: str) -> bool:
+    o = ord(ch)
+    return (0x4E00 <= o <= 0x9FFF or 0x3400 <= o <= 0x4DBF or 0x3040 <= o <= 0x30FF
+            or 0xAC00 <= o <= 0xD7AF or 0xF900 <= o <= 0xFAFF or 0x20000 <= o <= 0x2FA1F)
+
+
+def grams(key: str) -> Set[str]:
+    """名称（已归一化）的索引 gram：首字符锚点 + bigram + 中日韩单字"""
+    if not key:
+        return set()
+    result = {_ANCHOR + key[0]}
+    result.update(key[i:i + 2] for i in range(len(key) - 1))
+    result.update(ch for ch in key if _is_cjk(ch))
+    return result
+
+
+def _norm_path(path: Optional[str]) -> str:
+    p = posixpath.normpath('/' + (path or '/').strip('/'))
+    return '/' if p in ('', '.', '//') else p
+
+
+class NameIndex:
+    """文件名倒排索引（线程安全，同一时刻只为一个账号建立索引）
+
+    - ensure_loaded(account)：从元数据镜像构建（首次调用阻塞）；preload(account) 在后台线程构建
+    - search(account, query, limit, under)：前缀 > 子串 > 模糊，返回与列表条目格式一致的字典
+    - 镜像变化由 attach(store) 注册的监听自动同步
+    """
+
+    POSTING_SCAN = 20000  # 候选数超过该值时改为扫描分块文本
+    BLOCK = 65536  # 分块文本每块的条目数
+    COMPACT_RATIO = 0.3  # 已删除条目超过该比例时压缩
+
+    def __init__(self, store=None):
+        self.store = None
+        self.account: Optional[str] = None
+        self._lock = threading.RLock()
+        self._loading: Optional[threading.Thread] = None
+        self._reset()
+        if store is not None:
+            self.attach(store)
+
+    def _reset(self):
+        self._names: List[str] = []
+        self._keys: List[str] = []
+        self._paths: List[str] = []
+        self._fsids: List[Any] = []
+        self._sizes = array('q')
+        self._mtimes = array('q')
+        self._isdir = bytearray()
+        self._alive = bytearray()
+        self._dead = 0
+        self._by_path: Dict[str, int] = {}
+        self._children: Dict[str, Set[int]] = {}
+        self._postings: Dict[str, array] = {}
+        self._blocks: List[str] = []
+        self._block_offsets: List[array] = []
+        self._blocks_upto = 0
+
+    def attach(self, store):
+        self.store = store
+        store.add_listener(self._on_store_event)
+
+    # ---------- 构建 ----------
+    def is_loaded(self, account: str) -> bool:
+        return self.account == account
+
+    def ensure_loaded(self, account: str):
+        with self._lock:
+            if self.account == account:
+                return
+            self._reset()
+            if self.store is not None:
+                for path, name, fs_id, size, mtime, isdir in self.store.iter_rows(account):
+                    self._add(path, name, fs_id, size, mtime, isdir)
+            self._refresh_blocks()
+            self.account = account
+            print(f"[DEBUG] 文件名索引已建立: {len(self._by_path)} 项")
+
+    def preload(self, account: str):
+        """在后台线程构建索引（已在构建或已完成时忽略）"""
+        if self.is_loaded(account) or (self._loading is not None and self._loading.is_alive()):
+            return
+        self._loading = threading.Thread(target=self.ensure_loaded, args=(account,),
+                                         name="name-index", daemon=True)
+        self._loading.start()
+
+    def _add(self, path: str, name: str, fs_id, size, mtime, isdir) -> int:
+        key = normalize(name)
+        doc = len(self._names)
+        self._names.append(name)
+        self._keys.append(key)
+        self._paths.append(path)
+        self._fsids.append(fs_id)
+        self._sizes.append(int(size or 0))
+        self._mtimes.append(int(mtime or 0))
+        self._isdir.append(1 if isdir else 0)
+        self._alive.append(1)
+        self._by_path[path] = doc
+        self._children.setdefault(_norm_path(posixpath.dirname(path)), set()).add(doc)
+        postings = self._postings
+        for g in grams(key):
+            arr = postings.get(g)
+            if arr is None:
+                postings[g] = array('I', (doc,))
+            else:
+                arr.append(doc)
+        return doc
+
+    def _kill(self, doc: int):
+        if not self._alive[doc]:
+            return
+        self._alive[doc] = 0
+        self._dead += 1
+        path = self._paths[doc]
+        if self._by_path.get(path) == doc:
+            del self._by_path[path]
+        siblings = self._children.get(_norm_path(posixpath.dirname(path)))
+        if siblings is not None:
+            siblings.discard(doc)
+
+    def _remove_subtree(self, path: str):
+        doc = self._by_path.get(path)
+        stack = [path]
+        if doc is not None:
+            self._kill(doc)
+        while stack:
+            parent = stack.pop()
+            for child in list(self._children.pop(parent, ())):
+                if self._alive[child]:
+                    if self._isdir[child]:
+                        stack.append(self._paths[child])
+                    self._kill(child)
+
+    def _compact(self):
+        live = [i for i in range(len(self._names)) if self._alive[i]]
+        cols = [(self._paths[i], self._names[i], self._fsids[i], self._sizes[i], self._mtimes[i], self._isdir[i])
+                for i in live]
+        self._reset()
+        for row in cols:
+            self._add(*row)
+
+    # ---------- 增量更新 ----------
+    def upsert(self, rows: Iterable[tuple]):
+        """rows 为镜像的行元组 (account, path, parent, name, fs_id, size, md5, mtime, isdir, raw)"""
+        with self._lock:
+            for row in rows:
+                _, path, _, name, fs_id, size, _, mtime, isdir, _ = row
+                doc = self._by_path.get(path)
+                if doc is not None:
+                    if self._names[doc] == name and self._isdir[doc] == (1 if isdir else 0):
+                        # 名称未变：只更新属性，不动倒排表
+                        self._fsids[doc] = fs_id
+                        self._sizes[doc] = int(size or 0)
+                        self._mtimes[doc] = int(mtime or 0)
+                        continue
+                    self._kill(doc)
+                self._add(path, name, fs_id, size, mtime, isdir)
+
+    def remove(self, paths: Iterable[str]):
+        with self._lock:
+            for p in paths:
+                self._remove_subtree(_norm_path(p))
+            if self._dead > 1000 and self._dead > len(self._names) * self.COMPACT_RATIO:
+                self._compact()
+
+    def _on_store_event(self, event: str, account: Optional[str], data: Any):
+        with self._lock:
+            if event == "clear":
+                if account is None or account == self.account:
+                    self._reset()
+                    self.account = None
+                return
+            if account != self.account:
+                return
+            if event == "upsert":
+                self.upsert(data or [])
+            elif event == "remove":
+                self.remove(data or [])
+
+    # ---------- 查询 ----------
+    def _entry(self, doc: int) -> Dict[str, Any]:
+        fs_id = self._fsids[doc]
+        entry = {
+            "path": self._paths[doc],
+            "server_filename": self._names[doc],
+            "isdir": self._isdir[doc],
+            "size": self._sizes[doc],
+            "server_mtime": self._mtimes[doc],
+        }
+        if fs_id is not None:
+            entry["fs_id"] = int(fs_id) if str(fs_id).isdigit() else fs_id
+        return entry
+
+    def _term_posting(self, term: str, prefix: bool) -> Optional[array]:
+        """词的候选倒排表（取最短的一个）；任何 gram 不存在时返回 None 表示无结果"""
+        if prefix or (len(term) == 1 and not _is_cjk(term)):
+            needed = [_ANCHOR + term[0]] + [term[i:i + 2] for i in range(len(term) - 1)]
+        elif len(term) == 1:
+            needed = [term]
+        else:
+            needed = [term[i:i + 2] for i in range(len(term) - 1)]
+        best = None
+        for g in needed:
+            arr = self._postings.get(g)
+            if arr is None:
+                return None
+            if best is None or len(arr) < len(best):
+                best = arr
+        return best
+
+    def _refresh_blocks(self):
+        """把新增条目的名称拼接进分块文本（每块 BLOCK 个条目，以换行分隔）"""
+        total = len(self._keys)
+        if self._blocks_upto >= total:
+            return
+        first = self._blocks_upto // self.BLOCK
+        del self._blocks[first:]
+        del self._block_offsets[first:]
+        for start in range(first * self.BLOCK, total, self.BLOCK):
+            keys = self._keys[start:start + self.BLOCK]
+            offsets = array('I')
+            pos = 0
+            for k in keys:
+                offsets.append(pos)
+                pos += len(k) + 1
+            self._blocks.append(''.join('\n' + k for k in keys))
+            self._block_offsets.append(offsets)
+        self._blocks_upto = total
+
+    def _scan_blocks(self, needle: str, limit: int, seen: Set[int], ok) -> List[int]:
+        """在分块文本中用 str.find 查找（C 层扫描），每个条目最多命中一次"""
+        self._refresh_blocks()
+        out = []
+        for b, text in enumerate(self._blocks):
+            offsets = self._block_offsets[b]
+            base = b * self.BLOCK
+            pos = text.find(needle)
+            while pos != -1:
+                i = bisect_right(offsets, pos) - 1
+                doc = base + i
+                if doc not in seen and ok(doc):
+                    out.append(doc)
+                    if len(out) >= limit:
+                        return out
+                if i + 1 >= len(offsets):
+                    break
+                pos = text.find(needle, offsets[i + 1])
+        return out
+
+    def _match(self, term: str, prefix: bool, limit: int, seen: Set[int], ok) -> List[int]:
+        posting = self._term_posting(term, prefix)
+        if posting is None or limit <= 0:
+            return []
+        if len(posting) > self.POSTING_SCAN:
+            # 候选太多：直接扫描全部名称文本比逐个校验候选更快
+            return self._scan_blocks(('\n' + term) if prefix else term, limit, seen, ok)
+        keys = self._keys
+        if prefix:
+            it = (d for d in posting if keys[d].startswith(term) and d not in seen and ok(d))
+        else:
+            it = (d for d in posting if term in keys[d] and d not in seen and ok(d))
+        return list(islice(it, limit))
+
+    @staticmethod
+    def _variants(term: str) -> List[str]:
+        """编辑距离为 1 的变体（相邻字符互换、删除一个字符），用于容错"""
+        out = []
+        for i in range(len(term) - 1):
+            if term[i] != term[i + 1]:
+                out.append(term[:i] + term[i + 1] + term[i] + term[i + 2:])
+        if len(term) > 3:
+            out.extend(term[:i] + term[i + 1:] for i in range(len(term)))
+        return list(dict.fromkeys(v for v in out if v != term))
+
+    def search(self, account: str, query: str, limit: int = 200, under: Optional[str] = None,
+               fuzzy: bool = True) -> List[Dict[str, Any]]:
+        """按文件名搜索；多个词（空格分隔）需同时匹配，含 “/” 的词匹配完整路径"""
+        terms = [normalize(t) for t in (query or '').split() if t.strip()]
+        if not terms:
+            return []
+        self.ensure_loaded(account)
+        name_terms = [t for t in terms if '/' not in t]
+        path_terms = [t for t in terms if '/' in t]
+        prefix_dir = None
+        if under and _norm_path(under) != '/':
+            prefix_dir = _norm_path(under) + '/'
+        limit = max(1, int(limit))
+        with self._lock:
+            keys, paths, alive = self._keys, self._paths, self._alive
+
+            def _filter(others):
+                def _ok(doc: int) -> bool:
+                    if not alive[doc]:
+                        return False
+                    if others:
+                        key = keys[doc]
+                        if any(t not in key for t in others):
+                            return False
+                    if prefix_dir is not None and not paths[doc].startswith(prefix_dir):
+                        return False
+                    if path_terms:
+                        lower_path = normalize(paths[doc])
+                        if any(t not in lower_path for t in path_terms):
+                            return False
+                    return True
+                return _ok
+
+            found: List[int] = []
+            seen: Set[int] = set()
+
+            def _collect(docs):
+                for d in docs:
+                    if d not in seen:
+                        seen.add(d)
+                        found.append(d)
+
+            if not name_terms:
+                # 只有路径条件：扫描全部条目
+                ok = _filter([])
+                _collect(islice((d for d in range(len(keys)) if ok(d)), limit))
+                return [self._entry(d) for d in found]
+            lead = name_terms[0]
+            # 1) 第一个词的前缀匹配
+            _collect(self._match(lead, True, limit, seen, _filter(name_terms[1:])))
+            # 2) 子串匹配：以候选最少的词驱动，其余词逐个校验
+            driver = min(name_terms, key=lambda t: len(self._term_posting(t, False) or ()))
+            others = [t for t in name_terms if t is not driver]
+            _collect(self._match(driver, False, limit - len(found), seen, _filter(others)))
+            # 3) 容错：单个词且结果不足时尝试编辑距离为 1 的变体
+            if fuzzy and len(found) < limit and len(name_terms) == 1 and len(lead) >= 3:
+                ok = _filter([])
+                for variant in self._variants(lead):
+                    if len(found) >= limit:
+                        break
+                    _collect(self._match(variant, False, limit - len(found), seen, ok))
+            # 名称完全一致的排在最前
+            exact = [d for d in found if keys[d] == lead]
+            if exact:
+                found = exact + [d for d in found if keys[d] != lead]
+            return [self._entry(d) for d in found]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._by_path), "dead": self._dead, "grams": len(self._postings)}
+
+
+def _create_default_index() -> NameIndex:
+    from core.metadata_store import get_metadata_store
+    return NameIndex(get_metadata_store())
+
+
+_default_index = Shared(_create_default_index)
+
+
+def get_name_index() -> NameIndex:
+    """进程内共享的文件名索引（监听默认元数据镜像）"""
+    return _default_index.get()
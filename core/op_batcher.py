@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+/mcp/user/exec 请求合并
+短时间窗口内提交的多个操作（或 batch() 中显式收集的操作）合并为一次多操作请求
+POST /mcp/user/exec/batch {"ops": [{"op", "args"}, ...]}；
+服务端明确不支持该接口（404/405/501）时自动退回为并发的单操作请求，调用方无感知；
+其他失败（超时、5xx 等）时请求可能已在服务端执行，只有只读操作改为单操作重发，
+写操作（删除/移动等）直接报错，避免重复执行。
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple, Iterator
+
+
+class _Op:
+    __slots__ = ('op', 'args', 'future')
+
+    def __init__(self, op: str, args: Optional[Dict[str, Any]]):
+        self.op = op
+        self.args = args or {}
+        self.future: Future = Future()
+
+
+class OpCollector:
+    """batch() 上下文中收集操作；退出上下文时一次性发出"""
+
+    def __init__(self):
+        self.ops: List[_Op] = []
+
+    def submit(self, operation: str, args: Dict[str, Any] = None) -> Future:
+        item = _Op(operation, args)
+        self.ops.append(item)
+        return item.future
+
+
+class OpBatcher:
+    """操作合并器（线程安全）
+
+    - submit(op, args)：进入合并窗口，返回 Future（结果与 call_api 相同，失败时为异常）
+    - call(op, args)：submit 后等待结果
+    - batch()：显式收集一组操作，退出时合并发送
+    - call_many(ops)：一次发送多个操作，按顺序返回结果（失败项为错误字典）
+    """
+
+    WINDOW = 0.02  # 合并窗口（秒）
+    MAX_BATCH = 50  # 单个多操作请求最多包含的操作数
+    MAX_PARALLEL = 6  # 回退为单操作请求时的并发数
+    UNSUPPORTED_STATUS = (404, 405, 501)
+
+    def __init__(self, api_client, window: Optional[float] = None, max_batch: Optional[int] = None,
+                 max_parallel: Optional[int] = None):
+        self.api_client = api_client
+        self.window = self.WINDOW if window is None else max(0.0, float(window))
+        self.max_batch = max(1, int(max_batch or self.MAX_BATCH))
+        self.max_parallel = max(1, int(max_parallel or self.MAX_PARALLEL))
+        # None：尚未探测；True/False：服务端是否支持多操作接口
+        self.supported: Optional[bool] = None
+        self._lock = threading.Lock()
+        self._pending: List[_Op] = []
+        self._timer: Optional[threading.Timer] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="op-batch")
+            return self._executor
+
+    # ---------- 提交 ----------
+    def submit(self, operation: str, args: Dict[str, Any] = None) -> Future:
+        item = _Op(operation, args)
+        flush_now = False
+        with self._lock:
+            self._pending.append(item)
+            if len(self._pending) >= self.max_batch:
+                flush_now = True
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush_pending)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self._flush_pending()
+        return item.future
+
+    def call(self, operation: str, args: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        return self.submit(operation, args).result()
+
+    @contextmanager
+    def batch(self) -> Iterator[OpCollector]:
+        """with batcher.batch() as b: f = b.submit(op, args) —— 退出时合并发送并等待全部完成"""
+        collector = OpCollector()
+        yield collector
+        self.execute(collector.ops)
+
+    def call_many(self, ops: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Optional[Dict[str, Any]]]:
+        with self.batch() as b:
+            futures = [b.submit(op, args) for op, args in ops]
+        results = []
+        for fut in futures:
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                results.append({"status": "error", "error": str(e)})
+        return results
+
+    def _flush_pending(self):
+        with self._lock:
+            items, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if items:
+            # 不占用计时器/提交线程，交给线程池发送
+            self._pool().submit(self.execute, items)
+
+    # ---------- 发送 ----------
+    def execute(self, items: List[_Op]):
+        """发送一组操作并填充各自的 Future（超过 MAX_BATCH 时分批）"""
+        for i in range(0, len(items), self.max_batch):
+            chunk = items[i:i + self.max_batch]
+            try:
+                self._execute_chunk(chunk)
+            except Exception as e:
+                for item in chunk:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+
+    def _execute_chunk(self, items: List[_Op]):
+        if len(items) == 1 or self.supported is False:
+            self._execute_single(items)
+            return
+        try:
+            results = self._post_batch(items)
+        except Exception as e:
+            # 请求可能已被服务端执行：写操作不能重发，只读操作改为单操作请求
+            print(f"[DEBUG] 批量API调用失败: {e}")
+            reads = [item for item in items if self._read_only(item)]
+            for item in items:
+                if not self._read_only(item):
+                    item.future.set_exception(e)
+            if reads:
+                self._execute_single(reads)
+            return
+        if results is None:
+            self._execute_single(items)
+            return
+        for item, result in zip(items, results):
+            if self._succeeded(result):
+                self.api_client._invalidate_for_op(item.op, item.args)
+            item.future.set_result(result)
+
+    def _read_only(self, item: _Op) -> bool:
+        return not self.api_client._op_paths(item.op, item.args)
+
+    @staticmethod
+    def _succeeded(result: Any) -> bool:
+        """操作结果表示已执行（errno 12 为批量中部分条目不存在，其余条目已生效）"""
+        if not isinstance(result, dict) or result.get('status') == 'error':
+            return False
+        data = result.get('data') if isinstance(result.get('data'), dict) else result
+        return data.get('errno') in (0, '0', 12, '12', None)
+
+    def _post_batch(self, items: List[_Op]) -> Optional[List[Any]]:
+        """发送多操作请求；服务端明确不支持时返回 None（由调用方退回单操作请求），其他失败抛出异常"""
+        client = self.api_client
+        if not client.user_jwt:
+            return [None] * len(items)
+        url = f"{client.base_url}/mcp/user/exec/batch"
+        payload = {"ops": [{"op": item.op, "args": item.args} for item in items]}
+        client.token_refresher.ensure_fresh()
+        used_jwt = client.user_jwt
+        response = client.session.post(url, json=payload, headers={"Authorization": f"Bearer {used_jwt}"})
+        if response.status_code in (401, 403):
+            print(f"[DEBUG] 批量API调用失败 (HTTP {response.status_code})，尝试刷新token...")
+            if not client.refresh_token(used_jwt):
+                raise Exception(f"Token刷新失败: HTTP {response.status_code}")
+            response = client.session.post(url, json=payload, headers={"Authorization": f"Bearer {client.user_jwt}"})
+        if response.status_code in self.UNSUPPORTED_STATUS:
+            print(f"[DEBUG] 服务端不支持批量操作 (HTTP {response.status_code})，改为并发单操作请求")
+            self.supported = False
+            return None
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
+        data = response.json()
+        results = data.get('results') if isinstance(data, dict) else None
+        if not isinstance(results, list) or len(results) != len(items):
+            # 无法对应到各操作：之后改用单操作请求，本批按失败处理
+            self.supported = False
+            raise Exception("批量操作响应格式不符")
+        self.supported = True
+        return results
+
+    def _execute_single(self, items: List[_Op]):
+        def _run(item: _Op):
+            try:
+                item.future.set_result(self.api_client.call_api(item.op, item.args))
+            except Exception as e:
+                item.future.set_exception(e)
+
+        if len(items) == 1:
+            _run(items[0])
+            return
+        # 在独立的线程池中并发（execute 本身可能运行在 _pool 中，避免占满后互相等待）
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(items))) as pool:
+            list(pool.map(_run, items))
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            items, self._pending = self._pending, []
+            executor, self._executor = self._executor, None
+        if items:
+            self.execute(items)
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+秒传预检
+用廉价指纹 (文件大小, 前 256KB 的 MD5) 判断服务端是否可能已有相同内容：
+指纹命中的文件才计算整文件 MD5 去查重；未命中时直接上传，省去整文件读取。
+索引只记录本机见过的内容，别处上传的相同文件会因此错过查重——以少读一遍大文件为代价。
+上传成功或查重命中后记入指纹索引供下次使用。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, List, Tuple
+
+from core.hash_cache import get_hash_cache
+from core.local_store import data_path, open_sqlite, evict_lru, Shared
+
+SLICE_SIZE = 256 * 1024  # 百度秒传 slice-md5 的取样长度
+
+
+def slice_md5(path: str) -> Optional[str]:
+    """文件前 256KB 的 MD5（结果写入哈希缓存）"""
+    cache = get_hash_cache()
+    cached = cache.get(path, 'slice_md5')
+    if cached:
+        return cached
+    try:
+        sig = cache.signature(path)
+        with open(path, 'rb') as f:
+            value = hashlib.md5(f.read(SLICE_SIZE)).hexdigest()
+        cache.put(path, value, 'slice_md5', sig)
+        return value
+    except Exception as e:
+        print(f"[DEBUG] 计算slice-md5失败: {e}")
+        return None
+
+
+def fingerprint(path: str) -> Optional[Tuple[int, str]]:
+    """廉价指纹 (size, slice_md5)，只读取文件开头 256KB"""
+    try:
+        size = os.path.getsize(path)
+    except Exception:
+        return None
+    sm = slice_md5(path)
+    if sm is None:
+        return None
+    return size, sm
+
+
+class RapidUploadIndex:
+    """已知存在于服务端的内容指纹索引：(size, slice_md5) -> 整文件 MD5
+
+    上传成功或查重命中时写入；条目超过上限后按最近使用时间淘汰。
+    """
+
+    FILE_NAME = 'rapid_index.db'
+    MAX_ENTRIES = 100000
+    EVICT_RATIO = 0.9
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS remote_content ("
+        " size INTEGER NOT NULL, slice_md5 TEXT NOT NULL, md5 TEXT NOT NULL,"
+        " last_used REAL NOT NULL, PRIMARY KEY (size, slice_md5, md5))",
+        "CREATE INDEX IF NOT EXISTS idx_remote_last_used ON remote_content(last_used)",
+    )
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.path = path or data_path(self.FILE_NAME)
+        self.max_entries = max(1, int(max_entries or self.MAX_ENTRIES))
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = open_sqlite(self.path, self.SCHEMA)
+        return self._conn
+
+    def candidates(self, size: int, slice_md5_hex: str) -> List[str]:
+        """返回与指纹匹配的整文件 MD5 列表；为空表示服务端大概率没有该内容"""
+        try:
+            with self._lock:
+                rows = self._db().execute(
+                    "SELECT md5 FROM remote_content WHERE size=? AND slice_md5=?",
+                    (int(size), slice_md5_hex),
+                ).fetchall()
+            return [r[0] for r in rows]
+        except Exception as e:
+            print(f"[DEBUG] 读取秒传索引失败: {e}")
+            return []
+
+    def remember(self, size: int, slice_md5_hex: str, md5_hex: str):
+        if not slice_md5_hex or not md5_hex:
+            return
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute(
+                    "INSERT OR REPLACE INTO remote_content (size, slice_md5, md5, last_used) VALUES (?, ?, ?, ?)",
+                    (int(size), slice_md5_hex, md5_hex, time.time()),
+                )
+                self._writes += 1
+                if self._writes % 100 == 1:
+                    evict_lru(conn, 'remote_content', self.max_entries, self.EVICT_RATIO)
+                conn.commit()
+        except Exception as e:
+            print(f"[DEBUG] 写入秒传索引失败: {e}")
+
+    def forget(self, md5_hex: str):
+        """查重确认服务端已没有该内容时移除"""
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute("DELETE FROM remote_content WHERE md5=?", (md5_hex,))
+                conn.commit()
+        except Exception as e:
+            print(f"[DEBUG] 更新秒传索引失败: {e}")
+
+
+_default_index = Shared(RapidUploadIndex)
+
+
+def get_rapid_index() -> RapidUploadIndex:
+    """进程内共享的默认秒传索引"""
+    return _default_index.get()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+远端目录树增量同步
+以本地元数据镜像为基准，只重新拉取发生变化的目录：
+- 写操作涉及的目录由调用方 mark_dirty() 标记；删除/移走的条目由 forget_paths() 立即从镜像中去掉，
+  旧条目保留到该目录下次同步，使同步仍能产生 removed 事件；
+- 其余目录通过一次批量 file_metas 比较目录自身的修改时间（server_mtime）判断是否变化；
+- 重新列出脏目录后与镜像中的旧列表比对，产生 added / removed / modified 事件。
+后端目前没有游标 / diff 接口，根目录没有 fs_id，因此根目录被请求同步时总是重新列出。
+"""
+
+import posixpath
+import threading
+from typing import Optional, List, Dict, Any, Iterable, Callable
+
+
+def _norm(path: Optional[str]) -> str:
+    p = posixpath.normpath('/' + (path or '/').strip('/'))
+    return '/' if p in ('', '.', '//') else p
+
+
+def _entry_path(entry: Dict[str, Any]) -> str:
+    return _norm(entry.get('path') or entry.get('server_path') or '')
+
+
+def _entry_fingerprint(entry: Dict[str, Any]) -> tuple:
+    return (str(entry.get('fs_id') or entry.get('fsid') or ''),
+            str(entry.get('size') or entry.get('file_size') or 0),
+            str(entry.get('server_mtime') or entry.get('mtime') or 0),
+            str(entry.get('md5') or ''),
+            int(entry.get('isdir') or 0))
+
+
+def diff_listings(old: Optional[List[Dict[str, Any]]], new: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """比较同一目录的两次列表，返回事件 [{"type": "added"|"removed"|"modified", "path", "entry"}]"""
+    before = {_entry_path(e): e for e in old or [] if isinstance(e, dict)}
+    after = {_entry_path(e): e for e in new or [] if isinstance(e, dict)}
+    events = []
+    for path, entry in after.items():
+        prev = before.get(path)
+        if prev is None:
+            events.append({"type": "added", "path": path, "entry": entry})
+        elif _entry_fingerprint(prev) != _entry_fingerprint(entry):
+            events.append({"type": "modified", "path": path, "entry": entry})
+    for path, entry in before.items():
+        if path not in after:
+            events.append({"type": "removed", "path": path, "entry": entry})
+    return events
+
+
+class RemoteSync:
+    """远端目录树同步引擎（线程安全，方法均为阻塞调用，应在工作线程中使用）
+
+    - mark_dirty(paths)：标记目录需要重新列出（写操作后调用）
+    - forget_paths(paths)：条目已被删除/移走，从镜像中删除并标记其所在目录
+    - dirty_dirs(dirs)：从给定目录中挑出已变化的目录
+    - sync_dir(dir)：重新列出目录并返回事件；失败返回 None
+    - refresh(dirs, force, on_events)：检查并同步，返回 {dir: events}
+    """
+
+    PAGE_SIZE = 1000
+    METAS_BATCH = 100  # file_metas 单次最多 100 个 fsid
+
+    def __init__(self, api_client, page_size: Optional[int] = None):
+        self.api_client = api_client
+        self.page_size = max(1, int(page_size or self.PAGE_SIZE))
+        self._lock = threading.Lock()
+        self._dirty: set = set()
+        self._removed: Dict[str, Dict[str, Dict[str, Any]]] = {}  # 目录 -> {路径: 已从镜像删除的旧条目}
+
+    @property
+    def store(self):
+        return self.api_client.metadata_store
+
+    def mark_dirty(self, paths: Iterable[Optional[str]]):
+        with self._lock:
+            for p in paths:
+                if p:
+                    self._dirty.add(_norm(p))
+
+    def forget_paths(self, paths: Iterable[Optional[str]]):
+        account = self.api_client.account_key()
+        paths = [_norm(p) for p in paths if p]
+        if not paths:
+            return
+        entries = [(p, self.store.get(account, p)) for p in paths]
+        with self._lock:
+            for p, entry in entries:
+                if entry is not None:
+                    self._removed.setdefault(_norm(posixpath.dirname(p)), {})[p] = entry
+        self.store.remove_paths(account, paths)
+        self.mark_dirty(posixpath.dirname(p) for p in paths)
+
+    def _take_dirty(self, dirs: List[str]) -> set:
+        with self._lock:
+            hit = self._dirty.intersection(dirs)
+            self._dirty.difference_update(hit)
+            return hit
+
+    def dirty_dirs(self, dirs: Iterable[str]) -> List[str]:
+        account = self.api_client.account_key()
+        dirs = list(dict.fromkeys(_norm(d) for d in dirs))
+        dirty = self._take_dirty(dirs)
+        by_fsid: Dict[str, tuple] = {}
+        for d in dirs:
+            if d in dirty:
+                continue
+            known = self.store.get(account, d) if d != '/' else None
+            if d == '/' or known is None or self.store.listed_at(account, d) is None:
+                dirty.add(d)
+                continue
+            fs_id = known.get('fs_id')
+            if fs_id is None:
+                dirty.add(d)
+                continue
+            by_fsid[str(fs_id)] = (d, str(known.get('server_mtime') or 0))
+        if by_fsid:
+            keys = list(by_fsid)
+            ops = [("file_metas", {"fsids": keys[i:i + self.METAS_BATCH], "thumb": False, "extra": False})
+                   for i in range(0, len(keys), self.METAS_BATCH)]
+            seen = set()
+            for result in self.api_client.call_api_many(ops):
+                if not isinstance(result, dict):
+                    continue
+                data = result.get('data') if isinstance(result.get('data'), dict) else result
+                for meta in (data or {}).get('list') or []:
+                    key = str(meta.get('fs_id') or meta.get('fsid') or '')
+                    if key not in by_fsid:
+                        continue
+                    seen.add(key)
+                    d, old_mtime = by_fsid[key]
+                    if str(meta.get('server_mtime') or meta.get('mtime') or 0) != old_mtime or _entry_path(meta) != d:
+                        dirty.add(d)
+            # 查不到元信息（已删除或请求失败）的目录也重新列出
+            dirty.update(by_fsid[k][0] for k in by_fsid if k not in seen)
+        return [d for d in dirs if d in dirty]
+
+    def list_dir(self, dir_path: str) -> Optional[List[Dict[str, Any]]]:
+        """完整列出目录（分页直到取完）；列表结果会写入元数据镜像"""
+        entries: List[Dict[str, Any]] = []
+        page = 1
+        while True:
+            result = self.api_client.list_files(dir_path, self.page_size, page, use_cache=False)
+            if not isinstance(result, dict) or str(result.get('status', '')).lower() not in ('ok', 'success'):
+                return None
+            data = result.get('data') if isinstance(result.get('data'), dict) else result
+            files = (data or {}).get('list') or (data or {}).get('files') or (data or {}).get('items') or []
+            entries.extend(files)
+            if len(files) < self.page_size:
+                return entries
+            page += 1
+
+    def sync_dir(self, dir_path: str) -> Optional[List[Dict[str, Any]]]:
+        dir_path = _norm(dir_path)
+        account = self.api_client.account_key()
+        old = self.store.listing(account, dir_path)
+        with self._lock:
+            removed = self._removed.pop(dir_path, {})
+        new = self.list_dir(dir_path)
+        if new is None:
+            # 失败时保留标记，下次继续同步
+            with self._lock:
+                self._removed.setdefault(dir_path, {}).update(removed)
+            self.mark_dirty([dir_path])
+            return None
+        if removed:
+            # 写操作时已从镜像删除的条目仍算作旧列表的一部分，表格据此移除对应行
+            known = {_entry_path(e) for e in old or [] if isinstance(e, dict)}
+            old = list(old or []) + [e for p, e in removed.items() if p not in known]
+        if dir_path != '/':
+            self._refresh_dir_entry(account, dir_path)
+        return diff_listings(old, new)
+
+    def _refresh_dir_entry(self, account: str, dir_path: str):
+        """更新目录自身条目的修改时间，避免下次检查时被误判为已变化"""
+        known = self.store.get(account, dir_path)
+        fs_id = (known or {}).get('fs_id')
+        if fs_id is None:
+            return
+        try:
+            result = self.api_client.get_file_metas([fs_id])
+            data = result.get('data') if isinstance(result, dict) and isinstance(result.get('data'), dict) else result
+            metas = (data or {}).get('list') or []
+            if metas:
+                entry = dict(known)
+                entry.update(metas[0])
+                self.store.upsert(account, [entry])
+        except Exception as e:
+            print(f"[DEBUG] 更新目录元信息失败: {e}")
+
+    def refresh(self, dirs: Optional[Iterable[str]] = None, force: bool = False,
+                on_events: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None,
+                should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """同步给定目录（默认全部列出过的目录）；force=True 时不做变化检查直接重新列出"""
+        if dirs is None:
+            dirs = self.store.listed_dirs(self.api_client.account_key())
+        dirs = [_norm(d) for d in dirs]
+        targets = dirs if force else self.dirty_dirs(dirs)
+        changes: Dict[str, List[Dict[str, Any]]] = {}
+        for d in targets:
+            if should_stop and should_stop():
+                break
+            events = self.sync_dir(d)
+            if events:
+                changes[d] = events
+                if on_events:
+                    try:
+                        on_events(d, events)
+                    except Exception as e:
+                        print(f"[DEBUG] 同步事件回调失败: {e}")
+        return changes
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+只读接口的响应缓存
+按接口设置有效期（TTL），过期后带 If-None-Match / If-Modified-Since 重新校验（服务端支持时返回 304 即可复用）；
+写操作（新建/移动/复制/删除/上传）触及某路径时，失效该路径及其父目录相关的缓存。
+内存占用按条目数与字节数双重上限做 LRU 淘汰。
+"""
+
+import json
+import posixpath
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Iterable
+
+
+def _norm(path: Optional[str]) -> str:
+    p = posixpath.normpath('/' + (path or '/').strip('/'))
+    return '/' if p in ('', '.', '//') else p
+
+
+class CacheEntry:
+    __slots__ = ('body', 'expires_at', 'etag', 'last_modified', 'tag')
+
+    def __init__(self, body: bytes, expires_at: float, etag: Optional[str],
+                 last_modified: Optional[str], tag: Optional[str]):
+        self.body = body
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.tag = tag
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def value(self) -> Any:
+        # 每次返回新对象，调用方修改结果不会污染缓存
+        return json.loads(self.body)
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """响应缓存（线程安全）
+
+    - key(endpoint, params)：生成缓存键
+    - lookup(key)：返回条目（可能已过期，过期条目仍可用于条件请求）
+    - put(key, value, ...)：写入；tag 为关联的远端目录，用于按路径失效
+    - revalidated(key)：条件请求返回 304 后续期
+    - invalidate_path(path)：写操作后调用，失效该路径、其子树及父目录的列表与配额缓存
+    """
+
+    MAX_ENTRIES = 256
+    MAX_BYTES = 8 * 1024 * 1024
+    DEFAULT_TTL = 30.0
+    # 各接口的有效期（秒）
+    TTLS = {
+        'list_files': 30.0,
+        'files_list': 30.0,
+        'quota': 60.0,
+        'quota_today': 30.0,
+        'files_stats': 60.0,
+        'files_categories': 3600.0,
+        'files_statuses': 3600.0,
+    }
+    # 写操作后这些接口的结果与路径无关，但会随之变化
+    PATH_INDEPENDENT = ('quota', 'quota_today')
+    VOLATILE_SECONDS = 15.0  # 写操作是异步执行的，期间不缓存受影响目录的列表
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.max_entries = max(1, int(max_entries or self.MAX_ENTRIES))
+        self.max_bytes = max(1, int(max_bytes or self.MAX_BYTES))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._volatile: Dict[str, float] = {}
+
+    @staticmethod
+    def key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Tuple:
+        items = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return (endpoint,) + items
+
+    def ttl(self, endpoint: str) -> float:
+        return self.TTLS.get(endpoint, self.DEFAULT_TTL)
+
+    def lookup(self, key: Tuple) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """未过期时返回缓存值，否则 None"""
+        entry = self.lookup(key)
+        if entry is not None and entry.fresh:
+            return entry.value()
+        return None
+
+    def put(self, key: Tuple, value: Any, ttl: Optional[float] = None, etag: Optional[str] = None,
+            last_modified: Optional[str] = None, tag: Optional[str] = None):
+        if tag is not None:
+            tag = _norm(tag)
+            if self._is_volatile(tag):
+                return
+        try:
+            body = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        except Exception:
+            return
+        if len(body) > self.max_bytes:
+            return
+        ttl = self.ttl(key[0]) if ttl is None else float(ttl)
+        entry = CacheEntry(body, time.time() + ttl, etag, last_modified, tag)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+
+    def revalidated(self, key: Tuple, ttl: Optional[float] = None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.time() + (self.ttl(key[0]) if ttl is None else float(ttl))
+                self._entries.move_to_end(key)
+
+    def _is_volatile(self, tag: str) -> bool:
+        with self._lock:
+            until = self._volatile.get(tag)
+            if until is None:
+                return False
+            if time.time() >= until:
+                self._volatile.pop(tag, None)
+                return False
+            return True
+
+    def invalidate(self, endpoint: str):
+        """失效某接口的全部缓存"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == endpoint]:
+                self._bytes -= len(self._entries.pop(key).body)
+
+    def invalidate_path(self, path: Optional[str]):
+        self.invalidate_paths([path])
+
+    def invalidate_paths(self, paths: Iterable[Optional[str]]):
+        """写操作触及 paths：失效这些路径本身、其子树、其父目录的列表，以及配额类缓存"""
+        touched, parents = set(), set()
+        for path in paths:
+            if not path:
+                continue
+            p = _norm(path)
+            touched.add(p)
+            parents.add(_norm(posixpath.dirname(p)))
+        if not touched:
+            return
+        prefixes = tuple(p.rstrip('/') + '/' for p in touched)
+        until = time.time() + self.VOLATILE_SECONDS
+        with self._lock:
+            for p in touched | parents:
+                self._volatile[p] = until
+            stale = []
+            for key, entry in self._entries.items():
+                if key[0] in self.PATH_INDEPENDENT:
+                    stale.append(key)
+                elif entry.tag is not None and (
+                        entry.tag in touched or entry.tag in parents or entry.tag.startswith(prefixes)):
+                    stale.append(key)
+            for key in stale:
+                self._bytes -= len(self._entries.pop(key).body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._volatile.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
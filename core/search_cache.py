@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+搜索结果缓存
+边输入边搜索时按查询缓存一小段时间的结果：
+- 同一查询再次出现（退格后重新输入）直接返回；
+- 已经拿到完整结果（没有下一页）的较短查询，其结果在本地按名称过滤即可得到更长查询的结果，
+  服务端搜索按子串匹配，因此包含该查询的任意更长查询都可以这样复用。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Hashable
+
+from core.name_index import normalize
+
+
+class _Entry:
+    __slots__ = ('files', 'complete', 'at')
+
+    def __init__(self, files: List[Dict[str, Any]], complete: bool):
+        self.files = files
+        self.complete = complete
+        self.at = time.time()
+
+
+class SearchResultCache:
+    """按（范围, 查询）缓存搜索结果（线程安全）
+
+    - put(scope, query, files, complete)：缓存第一页结果，complete 表示已没有更多结果
+    - extend(scope, query, files, complete)：追加后续页
+    - lookup(scope, query)：返回 (files, complete)，未命中返回 None
+    """
+
+    TTL = 60.0  # 秒
+    MAX_ENTRIES = 64
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = self.TTL if ttl is None else ttl
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[Hashable, str], _Entry]" = OrderedDict()
+
+    @staticmethod
+    def _matches(entry: Dict[str, Any], needle: str) -> bool:
+        name = entry.get('server_filename') or entry.get('file_name') or entry.get('name') or ''
+        if needle in normalize(str(name)):
+            return True
+        # 公共资源按 file_path 搜索，路径也参与匹配
+        return needle in normalize(str(entry.get('file_path') or ''))
+
+    def _alive(self, entry: _Entry) -> bool:
+        return time.time() - entry.at < self.ttl
+
+    def put(self, scope: Hashable, query: str, files: List[Dict[str, Any]], complete: bool):
+        key = (scope, normalize(query))
+        with self._lock:
+            self._entries[key] = _Entry(list(files or []), bool(complete))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def extend(self, scope: Hashable, query: str, files: List[Dict[str, Any]], complete: bool):
+        key = (scope, normalize(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._alive(entry):
+                return
+            entry.files.extend(files or [])
+            entry.complete = bool(complete)
+
+    def lookup(self, scope: Hashable, query: str) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        needle = normalize(query)
+        if not needle:
+            return None
+        with self._lock:
+            entry = self._entries.get((scope, needle))
+            if entry is not None:
+                if self._alive(entry):
+                    self._entries.move_to_end((scope, needle))
+                    return list(entry.files), entry.complete
+                del self._entries[(scope, needle)]
+            # 找最长的、结果完整且被当前查询包含的已缓存查询
+            best = None
+            for (s, q), e in self._entries.items():
+                if s != scope or not e.complete or q not in needle or not self._alive(e):
+                    continue
+                if best is None or len(q) > len(best[0]):
+                    best = (q, e)
+            if best is None:
+                return None
+            files = list(best[1].files)
+        return [f for f in files if isinstance(f, dict) and self._matches(f, needle)], True
+
+    def invalidate(self, scope: Optional[Hashable] = None):
+        """丢弃某个范围（默认全部）的缓存，文件发生变化后调用"""
+        with self._lock:
+            if scope is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == scope]:
+                del self._entries[key]
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+多连接分段下载引擎
+将文件按字节区间切分，多个连接并行拉取，并按偏移写入预分配的本地文件。
+预分配只发生在临时文件上：有清单时写入调用方给出的 .part（先落盘清单再预分配），
+没有清单时写入 `<save_path>.part`，全部完成后才重命名为目标文件，
+避免中途停止后留下一个大小“已完整”的目标文件。
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple, Callable
+
+import requests
+
+from core.transport import get_transport
+
+
+class RangeNotSupported(Exception):
+    """服务端不支持（或拒绝）Range 请求，调用方应回退到单连接整文件下载"""
+
+
+def is_http_range_error(resp) -> bool:
+    """判断响应是否为百度 http_range 校验失败（error_code=31023）"""
+    try:
+        body = resp.json() if resp.content else {}
+    except Exception:
+        body = {}
+    return (
+        (isinstance(body, dict) and str(body.get("error_code")) == "31023")
+        or "http_range" in str(body)
+    )
+
+
+def split_ranges(total: int, segment_size: int) -> List[Tuple[int, int]]:
+    """将 [0, total) 切分为闭区间列表 [(start, end), ...]"""
+    ranges = []
+    start = 0
+    while start < total:
+        end = min(start + segment_size, total) - 1
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+class SegmentedDownloader:
+    """分段并行下载器
+
+    - 首先以 Range: bytes=0-0 探测，确认服务端支持分段并取得文件总大小
+    - 探测遇到 416（含空文件）、400 + 31023(http_range) 或返回 200 时抛出 RangeNotSupported
+    - 每个连接使用独立 Session，按区间写入预分配文件的对应偏移
+    - progress_callback(pct, downloaded, total) 与单连接下载保持一致
+    - 传入 manifest（DownloadManifest）时只拉取缺失区间，并持续记录已完成区间；
+      此时 save_path 即清单的 .part 文件，完成后由调用方 finalize()
+    - 不传 manifest 时写入 save_path + '.part'，成功后重命名为 save_path
+    """
+
+    MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+    CHUNK_SIZE = 512 * 1024
+    MAX_SEGMENT_RETRIES = 3
+
+    def __init__(self, url: str, save_path: str, headers: Optional[Dict[str, str]] = None,
+                 connections: int = 4, segment_size: Optional[int] = None,
+                 proxies: Optional[Dict[str, Optional[str]]] = None, cookies=None,
+                 timeout: int = 60, progress_callback: Optional[Callable] = None,
+                 should_stop: Optional[Callable[[], bool]] = None, manifest=None):
+        self.url = url
+        self.save_path = save_path
+        self.headers = dict(headers or {})
+        self.headers.pop("Range", None)
+        self.connections = max(1, int(connections or 1))
+        self.segment_size = segment_size
+        self.proxies = proxies if proxies is not None else {"http": None, "https": None}
+        self.cookies = cookies
+        self.timeout = timeout
+        self.progress_callback = progress_callback
+        self.should_stop = should_stop or (lambda: False)
+        self.manifest = manifest
+        # 实际写入的文件：无清单时先写临时文件
+        self.write_path = save_path if manifest is not None else save_path + '.part'
+
+        self.total_size = 0
+        self._downloaded = 0
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+
+    # ---------- 会话与探测 ----------
+    def _new_session(self) -> requests.Session:
+        # 各分段独立的 cookie，底层长连接来自共享连接池
+        return get_transport().new_session(cookies=self.cookies)
+
+    def _get(self, session: requests.Session, url: str, range_header: str):
+        hdrs = dict(self.headers)
+        hdrs["Range"] = range_header
+        return session.get(
+            url,
+            headers=hdrs,
+            stream=True,
+            allow_redirects=True,
+            timeout=self.timeout,
+            proxies=self.proxies,
+        )
+
+    def probe(self) -> int:
+        """探测分段能力与文件总大小；同时记录302跳转后的最终地址，避免每段重复跳转"""
+        session = self._new_session()
+        r = self._get(session, self.url, "bytes=0-0")
+        with r:
+            print(f"[DEBUG] 分段探测响应: HTTP {r.status_code}, Content-Range={r.headers.get('Content-Range')}")
+            if r.status_code in (400, 416) and is_http_range_error(r):
+                raise RangeNotSupported("http_range(31023)")
+            if r.status_code == 416:
+                # 空文件没有第 0 个字节（Content-Range: bytes */0），其他 416 同样交给单连接下载
+                raise RangeNotSupported(f"HTTP 416, Content-Range={r.headers.get('Content-Range')}")
+            if r.status_code != 206:
+                if r.status_code not in (200, 206):
+                    try:
+                        err = r.json()
+                    except Exception:
+                        err = {"errmsg": r.text[:500]}
+                    raise RuntimeError(f"下载失败: HTTP {r.status_code} {err}")
+                raise RangeNotSupported(f"HTTP {r.status_code}")
+            content_range = r.headers.get("Content-Range") or ""
+            try:
+                total = int(content_range.rsplit("/", 1)[1])
+            except Exception:
+                raise RangeNotSupported(f"无法解析Content-Range: {content_range}")
+            if r.url:
+                self.url = r.url
+        self.total_size = total
+        return total
+
+    # ---------- 文件与进度 ----------
+    def _preallocate(self):
+        save_dir = os.path.dirname(self.write_path)
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+        if self.manifest is not None:
+            # 先让清单落盘：即使随后中断，磁盘上的满尺寸 .part 也总有清单说明哪些字节有效
+            self.manifest.save()
+        mode = "r+b" if os.path.exists(self.write_path) else "wb"
+        with open(self.write_path, mode) as f:
+            f.truncate(self.total_size)
+
+    def _add_progress(self, n: int):
+        with self._lock:
+            self._downloaded += n
+            if self.progress_callback and self.total_size > 0:
+                pct = self._downloaded / self.total_size * 100
+                self.progress_callback(pct, self._downloaded, self.total_size)
+
+    def _plan(self) -> List[Tuple[int, int]]:
+        size = self.segment_size
+        if not size:
+            size = max(self.MIN_SEGMENT_SIZE, -(-self.total_size // (self.connections * 4)))
+        if self.manifest is None:
+            return split_ranges(self.total_size, size)
+        plan = []
+        for start, end in self.manifest.missing_ranges():
+            plan.extend((start + a, start + b) for a, b in split_ranges(end - start + 1, size))
+        return plan
+
+    # ---------- 分段拉取 ----------
+    def _fetch_segment(self, session: requests.Session, start: int, end: int) -> None:
+        pos = start
+        attempt = 0
+        while pos <= end:
+            if self.should_stop() or self._error is not None:
+                return
+            try:
+                r = self._get(session, self.url, f"bytes={pos}-{end}")
+                with r:
+                    if r.status_code != 206:
+                        raise RuntimeError(f"分段响应异常: HTTP {r.status_code} ({pos}-{end})")
+                    with open(self.write_path, "r+b") as f:
+                        f.seek(pos)
+                        for chunk in r.iter_content(chunk_size=self.CHUNK_SIZE):
+                            if self.should_stop():
+                                return
+                            if not chunk:
+                                continue
+                            chunk = chunk[:end - pos + 1]
+                            f.write(chunk)
+                            if self.manifest is not None:
+                                f.flush()
+                                self.manifest.add_range(pos, pos + len(chunk) - 1)
+                                self.manifest.save(force=False)
+                            pos += len(chunk)
+                            self._add_progress(len(chunk))
+                            if pos > end:
+                                break
+                if pos <= end:
+                    raise RuntimeError(f"分段提前结束: {pos}/{end}")
+            except Exception as e:
+                attempt += 1
+                if attempt >= self.MAX_SEGMENT_RETRIES:
+                    raise
+                print(f"[DEBUG] 分段 {start}-{end} 第 {attempt} 次失败，从 {pos} 继续: {e}")
+
+    def _worker(self, queue: List[Tuple[int, int]]):
+        session = self._new_session()
+        try:
+            while True:
+                with self._lock:
+                    if not queue or self._error is not None:
+                        return
+                    start, end = queue.pop(0)
+                if self.should_stop():
+                    return
+                try:
+                    self._fetch_segment(session, start, end)
+                except BaseException as e:
+                    with self._lock:
+                        if self._error is None:
+                            self._error = e
+                    return
+        finally:
+            session.close()
+
+    def download(self) -> None:
+        """执行分段下载；失败抛出异常，不支持分段时抛出 RangeNotSupported"""
+        if not self.total_size:
+            self.probe()
+        if self.total_size <= 0:
+            raise RangeNotSupported("文件大小未知")
+        if self.manifest is not None:
+            if self.manifest.size and self.manifest.size != self.total_size:
+                raise RuntimeError(f"远端文件大小已变化: {self.manifest.size} -> {self.total_size}")
+            self.manifest.size = self.total_size
+            self._downloaded = self.manifest.completed_bytes()
+        self._preallocate()
+        queue = self._plan()
+        workers = min(self.connections, len(queue)) or 1
+        print(f"[DEBUG] 分段下载: size={self.total_size}, segments={len(queue)}, connections={workers}")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="seg-dl") as pool:
+            for _ in range(workers):
+                pool.submit(self._worker, queue)
+        if self.manifest is not None:
+            self.manifest.save()
+        elif self._error is not None or self.should_stop():
+            # 无清单的半成品无法续传，直接清理
+            try:
+                os.remove(self.write_path)
+            except OSError:
+                pass
+        else:
+            os.replace(self.write_path, self.save_path)
+        if self._error is not None:
+            raise self._error
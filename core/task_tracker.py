@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+异步文件任务跟踪
+删除/移动/复制/重命名以 "async": 1 提交后由服务端在后台执行，这里确认任务是否完成，代替反复列目录：
+- 有 taskid 时查询任务状态（task_query）；
+- 服务端不支持任务查询或没有 taskid 时，用 file_metas 直接查受影响的 fsid
+  （删除：fsid 不再存在；移动/重命名：fsid 的路径变为目标路径）。
+所有待确认任务共用一个后台轮询线程，每轮把到期的任务合并为一次多操作请求；
+每个任务的轮询间隔按指数退避增长。
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, List
+
+
+class _Task:
+    __slots__ = ('taskid', 'fsid', 'expect_path', 'gone', 'future', 'deadline', 'delay', 'next_at')
+
+    def __init__(self, taskid, fsid, expect_path, gone, timeout, delay):
+        self.taskid = taskid
+        self.fsid = fsid
+        self.expect_path = expect_path
+        self.gone = gone
+        self.future: Future = Future()
+        now = time.time()
+        self.deadline = now + timeout
+        self.delay = delay
+        self.next_at = now + delay
+
+
+class TaskTracker:
+    """异步任务跟踪器（线程安全）
+
+    fut = tracker.track(taskid=..., fsid=..., gone=True)
+    fut.result() -> {"status": "success"|"failed"|"timeout"|"unknown", "taskid", "fsid", "error"}
+
+    - taskid：服务端返回的任务编号
+    - fsid + gone=True：确认文件已被删除
+    - fsid + expect_path：确认文件已移动/重命名到 expect_path
+    两者都没有时无法确认，立即返回 "unknown"。
+    """
+
+    INITIAL_DELAY = 0.3  # 首次查询前等待（秒）
+    MAX_DELAY = 4.0
+    BACKOFF = 2.0
+    TIMEOUT = 30.0
+    COALESCE = 0.25  # 到期时间相近的任务合并到同一轮查询
+    METAS_BATCH = 100  # 单次 file_metas 查询的 fsid 上限
+    RUNNING_STATUSES = ('running', 'pending', 'queued', 'processing')
+    FAILED_STATUSES = ('failed', 'failure')
+    GONE_ERRNOS = (-9, 12)
+    # 明确表示服务端没有 task_query 操作的报错；其余错误（网络、5xx、限流等）只跳过本轮
+    UNSUPPORTED_MARKERS = ('unknown op', 'unknown_op', 'unsupported', 'not supported', 'invalid op',
+                           'no such op', '未知操作', '不支持')
+    TRANSIENT_4XX = (401, 403, 408, 429)
+
+    def __init__(self, api_client):
+        self.api_client = api_client
+        # None：尚未探测；True/False：服务端是否支持任务状态查询
+        self.task_query_supported: Optional[bool] = None
+        self._cond = threading.Condition()
+        self._tasks: List[_Task] = []
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    # ---------- 提交 ----------
+    def track(self, taskid: Any = None, fsid: Any = None, expect_path: Optional[str] = None,
+              gone: bool = False, timeout: Optional[float] = None) -> Future:
+        fsid = str(fsid) if fsid not in (None, '') else None
+        task = _Task(taskid or None, fsid, expect_path, gone, timeout or self.TIMEOUT, self.INITIAL_DELAY)
+        if not self._can_poll(task):
+            task.future.set_result(self._outcome(task, "unknown"))
+            return task.future
+        with self._cond:
+            if self._closed:
+                task.future.set_result(self._outcome(task, "unknown", "已关闭"))
+                return task.future
+            self._tasks.append(task)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="task-tracker", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return task.future
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._tasks)
+
+    def _can_poll(self, task: _Task) -> bool:
+        if task.taskid and self.task_query_supported is not False:
+            return True
+        return bool(task.fsid and (task.gone or task.expect_path))
+
+    @staticmethod
+    def taskid_of(ret: Any) -> Any:
+        """从删除/移动/复制/重命名的响应中取出任务编号"""
+        if not isinstance(ret, dict):
+            return None
+        data = ret.get('data') if isinstance(ret.get('data'), dict) else {}
+        return data.get('taskid') or ret.get('taskid')
+
+    def wait(self, futures: List[Future], should_stop=None, on_tick=None, interval: float = 0.2) -> bool:
+        """在工作线程中等待一组任务结束；should_stop() 为真时提前返回 False"""
+        t0 = time.time()
+        last_tick = 0
+        while not all(f.done() for f in futures):
+            if should_stop and should_stop():
+                return False
+            time.sleep(interval)
+            elapsed = int(time.time() - t0)
+            if on_tick and elapsed != last_tick:
+                last_tick = elapsed
+                on_tick(elapsed)
+        return True
+
+    @staticmethod
+    def _outcome(task: _Task, status: str, error: str = "") -> Dict[str, Any]:
+        return {"status": status, "taskid": task.taskid, "fsid": task.fsid, "error": error}
+
+    # ---------- 轮询 ----------
+    def _loop(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                if not self._tasks:
+                    self._cond.wait()
+                    continue
+                now = time.time()
+                wait = min(t.next_at for t in self._tasks) - now
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                due = [t for t in self._tasks if t.next_at <= now + self.COALESCE]
+            try:
+                outcomes = self._poll(due)
+            except Exception as e:
+                print(f"[DEBUG] 任务状态查询失败: {e}")
+                outcomes = {}
+            now = time.time()
+            finished = []
+            with self._cond:
+                if self._closed:
+                    return  # 查询期间 close() 已结算全部任务
+                for task in due:
+                    if task not in self._tasks:
+                        continue
+                    outcome = outcomes.get(id(task))
+                    if outcome is None and now >= task.deadline:
+                        outcome = self._outcome(task, "timeout")
+                    elif outcome is None and not self._can_poll(task):
+                        outcome = self._outcome(task, "unknown")
+                    if outcome is not None:
+                        self._tasks.remove(task)
+                        finished.append((task, outcome))
+                        continue
+                    task.delay = min(self.MAX_DELAY, task.delay * self.BACKOFF)
+                    task.next_at = min(task.deadline, now + task.delay)
+            for task, outcome in finished:
+                task.future.set_result(outcome)
+
+    def _poll(self, due: List[_Task]) -> Dict[int, Dict[str, Any]]:
+        """查询一轮，返回已有结论的任务 {id(task): 结果}"""
+        outcomes: Dict[int, Dict[str, Any]] = {}
+        by_task = [t for t in due if t.taskid and self.task_query_supported is not False]
+        if by_task:
+            results = self.api_client.call_api_many([("task_query", {"taskid": t.taskid}) for t in by_task])
+            for task, ret in zip(by_task, results):
+                status = self._task_status(ret)
+                if status is None:
+                    continue
+                if status == 'success':
+                    outcomes[id(task)] = self._outcome(task, "success")
+                elif status in self.FAILED_STATUSES:
+                    outcomes[id(task)] = self._outcome(task, "failed", self._task_error(ret))
+
+        by_meta = [t for t in due if id(t) not in outcomes and t.fsid and (t.gone or t.expect_path)
+                   and not (t.taskid and self.task_query_supported is not False)]
+        if by_meta:
+            present = self._query_metas(sorted({t.fsid for t in by_meta}))
+            for task in by_meta:
+                if task.fsid not in present:
+                    continue  # 本轮查询失败，下轮再试
+                path = present[task.fsid]
+                if task.gone and path is None:
+                    outcomes[id(task)] = self._outcome(task, "success")
+                elif task.expect_path and path is not None and path.rstrip('/') == task.expect_path.rstrip('/'):
+                    outcomes[id(task)] = self._outcome(task, "success")
+        return outcomes
+
+    def _task_status(self, ret: Any) -> Optional[str]:
+        """任务状态；服务端不支持任务查询时记下并返回 None（之后改用 file_metas）"""
+        if not isinstance(ret, dict):
+            return None
+        if ret.get('status') == 'error':
+            # 后端包装层报错：只有明确的未知操作/4xx 才认定不支持，其余下轮重试
+            if self.task_query_supported is None and self._is_unsupported(ret.get('error')):
+                print(f"[DEBUG] 服务端不支持任务状态查询，改用 file_metas 确认: {ret.get('error')}")
+                self.task_query_supported = False
+            return None
+        data = ret.get('data') if isinstance(ret.get('data'), dict) else ret
+        status = str(data.get('status') or '').lower()
+        if status in ('success',) + self.RUNNING_STATUSES + self.FAILED_STATUSES:
+            self.task_query_supported = True
+            return status
+        return None
+
+    def _is_unsupported(self, error: Any) -> bool:
+        text = str(error or '').lower()
+        if any(m in text for m in self.UNSUPPORTED_MARKERS):
+            return True
+        match = re.search(r'http (\d{3})', text)
+        if match:
+            code = int(match.group(1))
+            return 400 <= code < 500 and code not in self.TRANSIENT_4XX
+        return False
+
+    def _task_error(self, ret: Dict[str, Any]) -> str:
+        data = ret.get('data') if isinstance(ret.get('data'), dict) else ret
+        for item in data.get('list') or []:
+            if isinstance(item, dict) and item.get('errno') not in (0, '0', None):
+                return self.api_client._handle_api_error({'data': {'errno': item.get('errno')}})
+        return str(data.get('errmsg') or ret.get('error') or "任务执行失败")
+
+    def _query_metas(self, fsids: List[str]) -> Dict[str, Optional[str]]:
+        """fsid -> 当前路径（已不存在为 None）；查询失败的 fsid 不在结果中"""
+        present: Dict[str, Optional[str]] = {}
+        chunks = [fsids[i:i + self.METAS_BATCH] for i in range(0, len(fsids), self.METAS_BATCH)]
+        results = self.api_client.call_api_many(
+            [("file_metas", {"fsids": [int(f) if f.isdigit() else f for f in chunk], "thumb": False, "extra": False})
+             for chunk in chunks])
+        retry = []
+        for chunk, ret in zip(chunks, results):
+            parsed = self._parse_metas(chunk, ret)
+            if parsed is None and len(chunk) > 1 and self._errno(ret) in self.GONE_ERRNOS:
+                # 整批报“文件不存在”：逐个查询区分是哪些
+                retry.extend(chunk)
+            elif parsed is not None:
+                present.update(parsed)
+        if retry:
+            results = self.api_client.call_api_many(
+                [("file_metas", {"fsids": [int(f) if f.isdigit() else f], "thumb": False, "extra": False})
+                 for f in retry])
+            for fsid, ret in zip(retry, results):
+                parsed = self._parse_metas([fsid], ret)
+                if parsed is not None:
+                    present.update(parsed)
+        return present
+
+    @staticmethod
+    def _errno(ret: Any) -> Any:
+        if not isinstance(ret, dict):
+            return None
+        data = ret.get('data') if isinstance(ret.get('data'), dict) else {}
+        errno = ret.get('errno') if 'errno' in ret else data.get('errno')
+        try:
+            return int(errno)
+        except (TypeError, ValueError):
+            return errno
+
+    def _parse_metas(self, chunk: List[str], ret: Any) -> Optional[Dict[str, Optional[str]]]:
+        if not isinstance(ret, dict):
+            return None
+        errno = self._errno(ret)
+        if errno in self.GONE_ERRNOS:
+            return {chunk[0]: None} if len(chunk) == 1 else None
+        if errno not in (0, None) or ret.get('status') == 'error':
+            return None
+        data = ret.get('data') if isinstance(ret.get('data'), dict) else ret
+        items = data.get('list') or ret.get('list') or []
+        found = {str(it.get('fs_id') or it.get('fsid')): it.get('path')
+                 for it in items if isinstance(it, dict)}
+        # 返回列表中没有的 fsid 已不存在
+        return {f: found.get(f) for f in chunk}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            tasks, self._tasks = self._tasks, []
+            self._cond.notify_all()
+        for task in tasks:
+            task.future.set_result(self._outcome(task, "unknown", "已关闭"))
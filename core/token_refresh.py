@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+JWT 刷新协调
+并发请求同时遇到 401/403 时只发一次 /auth/refresh，其余调用方等待同一次刷新的结果；
+并根据 JWT 的 exp 在过期前主动刷新，热路径上不必先挨一次 401 再重试。
+"""
+
+import base64
+import json
+import threading
+import time
+from typing import Optional
+
+
+def jwt_expiry(token: Optional[str]) -> Optional[float]:
+    """解析 JWT 载荷中的 exp（秒级时间戳）；不是 JWT 或没有 exp 时返回 None（不校验签名）"""
+    if not token:
+        return None
+    try:
+        parts = token.split('.')
+        if len(parts) != 3:
+            return None
+        payload = parts[1] + '=' * (-len(parts[1]) % 4)
+        data = json.loads(base64.urlsafe_b64decode(payload.encode('ascii')))
+        exp = data.get('exp') if isinstance(data, dict) else None
+        return float(exp) if exp is not None else None
+    except Exception:
+        return None
+
+
+class TokenRefresher:
+    """单飞刷新（线程安全）
+
+    - refresh(used_jwt)：同一时刻只有一个线程真正发起刷新，其余线程等待；
+      used_jwt 为失败请求携带的 token，若等待期间 token 已被换新则直接返回 True
+    - ensure_fresh()：距 exp 不足 REFRESH_MARGIN 时主动刷新；未临近过期时只做一次比较
+    """
+
+    REFRESH_MARGIN = 120  # 距过期不足该秒数即主动刷新
+    FAILURE_BACKOFF = 10.0  # 刷新失败后，该时长内不再为同一 token 重复刷新
+
+    def __init__(self, api_client):
+        self.api_client = api_client
+        self._lock = threading.Lock()
+        self._exp_token: Optional[str] = None
+        self._exp: Optional[float] = None
+        self._failed_token: Optional[str] = None
+        self._failed_at = 0.0
+
+    def expires_at(self) -> Optional[float]:
+        token = self.api_client.user_jwt
+        if token != self._exp_token:
+            # 仅在 token 变化时重新解析
+            self._exp, self._exp_token = jwt_expiry(token), token
+        return self._exp
+
+    def needs_refresh(self) -> bool:
+        if not self.api_client.user_jwt or not self.api_client.refresh_token_value:
+            return False
+        exp = self.expires_at()
+        if exp is None or exp - time.time() > self.REFRESH_MARGIN:
+            return False
+        return not self._recently_failed(self.api_client.user_jwt)
+
+    def _recently_failed(self, token: Optional[str]) -> bool:
+        return token == self._failed_token and time.time() - self._failed_at < self.FAILURE_BACKOFF
+
+    def ensure_fresh(self) -> bool:
+        """临近过期时主动刷新；返回当前 token 是否可用"""
+        if not self.needs_refresh():
+            return bool(self.api_client.user_jwt)
+        return self.refresh(self.api_client.user_jwt)
+
+    def refresh(self, used_jwt: Optional[str] = None) -> bool:
+        if used_jwt is None:
+            used_jwt = self.api_client.user_jwt
+        with self._lock:
+            current = self.api_client.user_jwt
+            if current and current != used_jwt:
+                # 等待期间已由其他线程刷新
+                return True
+            if self._recently_failed(current):
+                return False
+            ok = bool(self.api_client._refresh_token_now())
+            if ok:
+                self._failed_token = None
+            else:
+                self._failed_token, self._failed_at = current, time.time()
+            return ok
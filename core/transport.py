@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+统一网络传输层
+所有 HTTP 请求共用同一组连接池（按主机分池，保持长连接），避免各处临时
+requests.get / 新建 Session / urllib 每次都重新握手 TCP/TLS。
+各调用方仍可持有自己的 Session（独立的请求头与 cookie），但底层连接池是共享的。
+"""
+
+import threading
+import weakref
+from typing import Optional, Dict, Any
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 禁用代理（直链/下载通道使用，避免被系统代理影响）
+NO_PROXIES = {"http": None, "https": None}
+
+
+class _SharedPoolSession(requests.Session):
+    """挂载共享连接池的 Session：close() 不关闭共享连接池，由 Transport 统一管理"""
+
+    def close(self):
+        pass
+
+
+class Transport:
+    """共享连接池的传输层（线程安全）
+
+    - pool_connections：缓存的主机连接池个数
+    - pool_maxsize：每个主机最多保持的长连接数（需覆盖 并发下载数 × 每个下载的分段连接数）
+    - proxies：None 跟随系统代理设置；传入字典则作为所有请求的默认代理
+      （单个请求仍可传 proxies=NO_PROXIES 绕过代理）
+    """
+
+    POOL_CONNECTIONS = 16
+    POOL_MAXSIZE = 32
+    DEFAULT_TIMEOUT = 30
+
+    def __init__(self, pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None,
+                 proxies: Optional[Dict[str, Optional[str]]] = None, trust_env: bool = True):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._all_sessions: "weakref.WeakSet[requests.Session]" = weakref.WeakSet()
+        self.pool_connections = int(pool_connections or self.POOL_CONNECTIONS)
+        self.pool_maxsize = int(pool_maxsize or self.POOL_MAXSIZE)
+        self.proxies = dict(proxies) if proxies else None
+        self.trust_env = bool(trust_env)
+        self._adapter = self._new_adapter()
+
+    def _new_adapter(self) -> HTTPAdapter:
+        return HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+
+    def _apply(self, session: requests.Session):
+        session.mount('http://', self._adapter)
+        session.mount('https://', self._adapter)
+        session.trust_env = self.trust_env
+        if self.proxies:
+            session.proxies.update(self.proxies)
+
+    def new_session(self, headers: Optional[Dict[str, str]] = None, cookies=None) -> requests.Session:
+        """新建使用共享连接池的 Session（请求头/cookie 独立，连接复用）"""
+        s = _SharedPoolSession()
+        with self._lock:
+            self._apply(s)
+            self._all_sessions.add(s)
+        if headers:
+            s.headers.update(headers)
+        if cookies is not None:
+            s.cookies.update(cookies)
+        return s
+
+    def session(self, url: str) -> requests.Session:
+        """按主机缓存的 Session，供不需要自定义默认请求头的一次性请求使用"""
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}".lower()
+        with self._lock:
+            s = self._sessions.get(key)
+        if s is None:
+            s = self.new_session()
+            with self._lock:
+                s = self._sessions.setdefault(key, s)
+        return s
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault('timeout', self.DEFAULT_TIMEOUT)
+        return self.session(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def configure(self, pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None,
+                  proxies: Optional[Dict[str, Optional[str]]] = None, trust_env: Optional[bool] = None):
+        """调整连接池与代理策略；已创建的 Session 会切换到新的连接池"""
+        with self._lock:
+            if pool_connections:
+                self.pool_connections = int(pool_connections)
+            if pool_maxsize:
+                self.pool_maxsize = int(pool_maxsize)
+            if proxies is not None:
+                self.proxies = dict(proxies) or None
+            if trust_env is not None:
+                self.trust_env = bool(trust_env)
+            old = self._adapter
+            self._adapter = self._new_adapter()
+            for s in list(self._all_sessions):
+                self._apply(s)
+        try:
+            old.close()
+        except Exception:
+            pass
+
+    def proxy_for(self, url: str) -> Optional[str]:
+        """按当前代理策略（配置的代理优先，trust_env 时再参考系统代理与 no_proxy）解析 url 使用的代理，
+        供不经过 requests 的客户端（aiohttp）使用；不使用代理时返回 None"""
+        with self._lock:
+            configured = dict(self.proxies or {})
+            trust_env = self.trust_env
+        proxies = dict(requests.utils.get_environ_proxies(url)) if trust_env else {}
+        proxies.update(configured)
+        return requests.utils.select_proxy(url, proxies)
+
+    def ensure_pool_size(self, n: int):
+        """保证每个主机的长连接数不少于 n（并发下载/分段增多时调用）"""
+        if int(n or 0) > self.pool_maxsize:
+            self.configure(pool_maxsize=int(n))
+
+    def close(self):
+        """关闭所有空闲长连接（之后的请求会按需重新建立连接）"""
+        with self._lock:
+            self._sessions.clear()
+            try:
+                self._adapter.close()
+            except Exception:
+                pass
+
+
+_default_transport: Optional[Transport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+    """进程内共享的默认传输层"""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+        return _default_transport
@@ -7,6 +7,8 @@ import logging
 from typing import Optional, Dict, Any
 from datetime import datetime
 
+from core.transport import get_transport
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,7 +25,7 @@ class UpdateApiClient:
     def __init__(self, base_url: str = "http://localhost:8000", timeout: int = 10):
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
-        self.session = requests.Session()
+        self.session = get_transport().new_session()
         self.session.headers.update({
             'Content-Type': 'application/json',
             'User-Agent': 'PanClient/1.0.1'
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+测试公共设置
+- 项目根目录加入 sys.path（与 main.py / scripts 相同，以 core.xxx 导入）
+- 本地数据目录指向临时目录，测试不读写用户真实的 ~/.pan_client
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ['APPDATA'] = tempfile.mkdtemp(prefix='pan_client_test_')
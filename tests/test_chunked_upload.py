@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+ChunkedUploader：用本地 HTTP 服务模拟百度 precreate / superfile2 / create 三步接口
+"""
+
+import hashlib
+import json
+import os
+import threading
+from email.parser import BytesParser
+from email.policy import default
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from core.chunked_upload import ChunkedUploader
+
+BLOCK = 64 * 1024
+
+
+class FakeBaidu:
+    """记录收到的请求；precreate 的响应、需要失败的分块可按用例配置"""
+
+    def __init__(self):
+        self.calls = []  # (method, 参数/表单)
+        self.blocks = {}  # partseq -> 收到的数据
+        self.fail_once = set()  # 第一次上传返回 HTTP 500 的分块
+        self.precreate_response = None
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, obj):
+                body = json.dumps(obj).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                status, obj = fake.handle(url.path, query, self.headers.get('Content-Type') or '', body)
+                self._reply(status, obj)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{self.server.server_port}"
+        self.file_url = base + '/rest/2.0/xpan/file'
+        self.upload_url = base + '/rest/2.0/pcs/superfile2'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def methods(self):
+        return [m for m, _ in self.calls]
+
+    def handle(self, path, query, content_type, body):
+        method = query.get('method')
+        if path.endswith('/superfile2'):
+            msg = BytesParser(policy=default).parsebytes(
+                b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body)
+            data = next(p.get_payload(decode=True) for p in msg.iter_parts())
+            index = int(query['partseq'])
+            with self._lock:
+                self.calls.append(('upload', dict(query)))
+                if index in self.fail_once:
+                    self.fail_once.discard(index)
+                    return 500, {'error_code': 31299, 'error_msg': 'internal error'}
+                self.blocks[index] = data
+            return 200, {'md5': hashlib.md5(data).hexdigest(), 'partseq': str(index)}
+        form = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        with self._lock:
+            self.calls.append((method, form))
+        if method == 'precreate':
+            if self.precreate_response is not None:
+                return 200, self.precreate_response
+            count = len(json.loads(form['block_list']))
+            return 200, {'errno': 0, 'uploadid': 'U1', 'return_type': 1, 'block_list': list(range(count))}
+        if method == 'create':
+            return 200, {'errno': 0, 'fs_id': 42, 'path': form['path'], 'size': int(form['size'])}
+        return 404, {'errno': -1}
+
+
+@pytest.fixture
+def server():
+    fake = FakeBaidu()
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def local_file(tmp_path):
+    path = tmp_path / 'big.bin'
+    path.write_bytes(os.urandom(BLOCK * 2 + 1000))
+    return str(path)
+
+
+def _uploader(server, local_file, tmp_path, **kwargs):
+    uploader = ChunkedUploader('token', local_file, '/apps/test/big.bin', block_size=BLOCK,
+                               journal_dir=str(tmp_path / 'journal'),
+                               file_url=server.file_url, upload_url=server.upload_url, **kwargs)
+    uploader.RETRY_DELAY = 0
+    return uploader
+
+
+def _block_md5s(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [hashlib.md5(data[i:i + BLOCK]).hexdigest() for i in range(0, len(data), BLOCK)]
+
+
+def test_precreate_superfile2_create(server, local_file, tmp_path):
+    progress = []
+    uploader = _uploader(server, local_file, tmp_path, progress_callback=lambda sent, total: progress.append(sent))
+    result = uploader.upload()
+
+    assert result['status'] == 'ok'
+    assert result['data']['fs_id'] == 42
+    methods = server.methods()
+    assert methods[0] == 'precreate' and methods[-1] == 'create'
+    assert methods.count('upload') == 3
+
+    md5s = _block_md5s(local_file)
+    precreate = server.calls[0][1]
+    assert json.loads(precreate['block_list']) == md5s
+    assert precreate['content-md5'] == hashlib.md5(open(local_file, 'rb').read()).hexdigest()
+    create = server.calls[-1][1]
+    assert json.loads(create['block_list']) == md5s
+    assert create['uploadid'] == 'U1'
+    assert create['size'] == str(os.path.getsize(local_file))
+
+    with open(local_file, 'rb') as f:
+        assert b''.join(server.blocks[i] for i in sorted(server.blocks)) == f.read()
+    assert progress[-1] == os.path.getsize(local_file)
+    assert not os.path.exists(uploader.journal.path)
+
+
+def test_failed_block_is_retried(server, local_file, tmp_path):
+    server.fail_once = {1}
+    result = _uploader(server, local_file, tmp_path).upload()
+
+    assert result['status'] == 'ok'
+    partseqs = [q['partseq'] for m, q in server.calls if m == 'upload']
+    assert partseqs.count('1') == 2
+    assert partseqs.count('0') == 1 and partseqs.count('2') == 1
+    assert server.blocks[1] == open(local_file, 'rb').read()[BLOCK:2 * BLOCK]
+    assert server.methods()[-1] == 'create'
+
+
+def test_precreate_block_list_limits_uploads(server, local_file, tmp_path):
+    server.precreate_response = {'errno': 0, 'uploadid': 'U2', 'return_type': 1, 'block_list': [2]}
+    result = _uploader(server, local_file, tmp_path).upload()
+
+    assert result['status'] == 'ok'
+    assert [q['partseq'] for m, q in server.calls if m == 'upload'] == ['2']
+    assert server.calls[-1][1]['uploadid'] == 'U2'
+
+
+def test_rapid_upload_skips_blocks_and_create(server, local_file, tmp_path):
+    server.precreate_response = {'errno': 0, 'return_type': 2, 'info': {'fs_id': 7}}
+    result = _uploader(server, local_file, tmp_path).upload()
+
+    assert result == {'status': 'ok', 'data': {'fs_id': 7}}
+    assert server.methods() == ['precreate']
+
+
+def test_precreate_error_is_reported(server, local_file, tmp_path):
+    server.precreate_response = {'errno': -7}
+    result = _uploader(server, local_file, tmp_path).upload()
+
+    assert result['status'] == 'error'
+    assert 'errno=-7' in result['error']
+    assert 'upload' not in server.methods()
+
+
+def test_resume_uploads_only_missing_blocks(server, tmp_path):
+    path = tmp_path / 'resume.bin'
+    path.write_bytes(os.urandom(BLOCK * 3 + 1000))
+    local_file = str(path)
+
+    # 第一次：传完 2 个分块后停止
+    first = _uploader(server, local_file, tmp_path, max_concurrent=1, should_stop=lambda: len(server.blocks) >= 2)
+    result = first.upload()
+    assert result['status'] == 'error'
+    assert sorted(server.blocks) == [0, 1]
+    assert 'create' not in server.methods()
+    assert os.path.exists(first.journal.path)
+
+    # 第二次：新的上传器读取同一份断点日志，不再 precreate，只补传缺失的分块
+    server.calls.clear()
+    progress = []
+    second = _uploader(server, local_file, tmp_path, progress_callback=lambda sent, total: progress.append(sent))
+    assert second.journal.path == first.journal.path
+    result = second.upload()
+
+    assert result['status'] == 'ok'
+    assert 'precreate' not in server.methods()
+    assert sorted(q['partseq'] for m, q in server.calls if m == 'upload') == ['2', '3']
+    create = server.calls[-1]
+    assert create[0] == 'create'
+    assert json.loads(create[1]['block_list']) == _block_md5s(local_file)
+    assert create[1]['uploadid'] == 'U1'
+    assert progress[0] == BLOCK * 2
+    with open(local_file, 'rb') as f:
+        assert b''.join(server.blocks[i] for i in sorted(server.blocks)) == f.read()
+    assert not os.path.exists(second.journal.path)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+APIClient.file_op_many：按 FILELIST_LIMIT 拆分 filelist、逐项 errno 映射与 partial 状态
+（call_api_many 用假实现代替，记录提交的操作并按用例返回响应）
+"""
+
+import json
+
+import pytest
+
+from core.api_client import APIClient
+
+
+class FakeOps:
+    """代替 call_api_many：responder(op, filelist) 返回该请求的响应"""
+
+    def __init__(self, responder=None):
+        self.calls = []  # 每次 call_api_many 提交的 [(op, args), ...]
+        self.responder = responder or (lambda op, filelist: {"status": "ok", "data": {"errno": 0, "taskid": 1}})
+
+    def __call__(self, ops):
+        self.calls.append(ops)
+        return [self.responder(op, json.loads(args['filelist'])) for op, args in ops]
+
+    def filelists(self):
+        return [json.loads(args['filelist']) for ops in self.calls for _, args in ops]
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+def _use(client, fake):
+    client.call_api_many = fake
+    return fake
+
+
+def test_chunks_at_filelist_limit_in_one_submission(client):
+    fake = _use(client, FakeOps())
+    paths = [f'/d/f{i}' for i in range(client.FILELIST_LIMIT * 2 + 5)]
+    result = client.file_op_many('delete', paths)
+
+    assert len(fake.calls) == 1
+    assert [len(f) for f in fake.filelists()] == [client.FILELIST_LIMIT, client.FILELIST_LIMIT, 5]
+    assert sum(fake.filelists(), []) == paths
+    assert all(op == 'delete' and args['async'] == 1 for op, args in fake.calls[0])
+    assert result['status'] == 'ok'
+    assert result['succeeded'] == paths and result['failed'] == []
+    assert [len(t['paths']) for t in result['tasks']] == [client.FILELIST_LIMIT, client.FILELIST_LIMIT, 5]
+
+
+def test_exact_limit_is_single_request(client):
+    fake = _use(client, FakeOps())
+    client.file_op_many('delete', [f'/d/f{i}' for i in range(client.FILELIST_LIMIT)])
+    assert [len(f) for f in fake.filelists()] == [client.FILELIST_LIMIT]
+
+
+def test_per_item_errno_gives_partial(client):
+    def responder(op, filelist):
+        info = [{"path": e['path'], "errno": -9 if e['path'] == '/a/missing' else 0} for e in filelist]
+        return {"status": "ok", "data": {"errno": 12, "info": info, "taskid": "T1"}}
+
+    _use(client, FakeOps(responder))
+    items = [{"path": '/a/one', "dest": '/b'}, {"path": '/a/missing', "dest": '/b'}, {"path": '/a/two', "dest": '/b'}]
+    result = client.file_op_many('move', items)
+
+    assert result['status'] == 'partial'
+    assert result['succeeded'] == ['/a/one', '/a/two']
+    assert result['failed'] == [{"path": '/a/missing', "error": client._handle_api_error({'data': {'errno': -9}})}]
+    assert result['tasks'] == [{"taskid": "T1", "paths": ['/a/one', '/a/two']}]
+
+
+def test_per_item_errno_by_position(client):
+    def responder(op, filelist):
+        return {"status": "ok", "data": {"errno": 12, "info": [{"errno": 0}, {"errno": -8}]}}
+
+    _use(client, FakeOps(responder))
+    result = client.file_op_many('copy', [{"path": '/x/1', "dest": '/y'}, {"path": '/x/2', "dest": '/y'}])
+    assert result['status'] == 'partial'
+    assert result['failed'] == [{"path": '/x/2', "error": client._handle_api_error({'data': {'errno': -8}})}]
+
+
+def test_failed_chunk_only_fails_its_items(client):
+    limit = client.FILELIST_LIMIT
+
+    def responder(op, filelist):
+        if filelist[0] == '/d/f0':
+            return {"status": "ok", "data": {"errno": 0, "taskid": "T1"}}
+        return {"status": "error", "error": "HTTP 500"}
+
+    _use(client, FakeOps(responder))
+    result = client.file_op_many('delete', [f'/d/f{i}' for i in range(limit + 3)])
+    assert result['status'] == 'partial'
+    assert len(result['succeeded']) == limit
+    assert [f['path'] for f in result['failed']] == [f'/d/f{i}' for i in range(limit, limit + 3)]
+    assert all(f['error'] == 'HTTP 500' for f in result['failed'])
+    assert result['taskids'] == ['T1']
+
+
+def test_all_failed_is_error(client):
+    _use(client, FakeOps(lambda op, filelist: {"status": "ok", "data": {"errno": -7}}))
+    result = client.file_op_many('delete', ['/a', '/b'])
+    assert result['status'] == 'error'
+    assert result['succeeded'] == []
+    assert result['error'] == client._handle_api_error({'data': {'errno': -7}})
+
+
+def test_rename_is_sent_as_move(client):
+    fake = _use(client, FakeOps())
+    result = client.file_op_many('rename', [{"path": '/a/old.txt', "newname": 'new.txt'}, {"path": '/a/x'}])
+    assert fake.calls[0][0][0] == 'move'
+    assert fake.filelists() == [[{"path": '/a/old.txt', "dest": '/a', "newname": 'new.txt'}]]
+    assert result['succeeded'] == ['/a/old.txt']
+
+
+def test_unsupported_and_empty(client):
+    fake = _use(client, FakeOps())
+    assert client.file_op_many('chmod', ['/a']) == {"status": "error", "error": "unsupported_op:chmod"}
+    assert client.file_op_many('move', [{"path": '/a'}]) == {"status": "error", "error": "empty_filelist"}
+    assert fake.calls == []
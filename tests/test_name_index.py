@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+NameIndex：增量更新（upsert / remove / 压缩）与前缀 > 子串 > 模糊的排序
+"""
+
+import pytest
+
+from core.name_index import NameIndex
+
+ACCOUNT = 'acc'
+
+
+def _row(path, isdir=False, size=0, fs_id=None):
+    name = path.rstrip('/').rsplit('/', 1)[-1]
+    parent = path.rsplit('/', 1)[0] or '/'
+    return (ACCOUNT, path, parent, name, fs_id, size, '', 0, 1 if isdir else 0, None)
+
+
+@pytest.fixture
+def index():
+    idx = NameIndex()
+    idx.ensure_loaded(ACCOUNT)
+    return idx
+
+
+def _paths(results):
+    return [r['path'] for r in results]
+
+
+def test_upsert_adds_and_updates(index):
+    index.upsert([_row('/docs/report.pdf', size=10, fs_id='11'), _row('/docs', isdir=True)])
+    found = index.search(ACCOUNT, 'report')
+    assert _paths(found) == ['/docs/report.pdf']
+    assert found[0]['size'] == 10 and found[0]['fs_id'] == 11
+
+    # 名称不变：只更新属性
+    grams_before = index.stats()['grams']
+    index.upsert([_row('/docs/report.pdf', size=20, fs_id='12')])
+    found = index.search(ACCOUNT, 'report')
+    assert found[0]['size'] == 20 and found[0]['fs_id'] == 12
+    assert index.stats() == {'entries': 2, 'dead': 0, 'grams': grams_before}
+
+
+def test_upsert_renamed_entry_replaces_old_name(index):
+    index.upsert([_row('/a/old.txt')])
+    index.upsert([('acc', '/a/old.txt', '/a', 'new.txt', None, 0, '', 0, 0, None)])
+    assert index.search(ACCOUNT, 'old', fuzzy=False) == []
+    assert [r['server_filename'] for r in index.search(ACCOUNT, 'new')] == ['new.txt']
+    assert index.stats()['entries'] == 1 and index.stats()['dead'] == 1
+
+
+def test_remove_drops_subtree(index):
+    index.upsert([_row('/music', isdir=True), _row('/music/rock', isdir=True),
+                  _row('/music/rock/song.mp3'), _row('/music/jazz.mp3'), _row('/other.mp3')])
+    index.remove(['/music'])
+    assert _paths(index.search(ACCOUNT, 'mp3')) == ['/other.mp3']
+    assert index.stats()['entries'] == 1 and index.stats()['dead'] == 4
+
+
+def test_remove_compacts_when_many_dead(index):
+    index.upsert([_row(f'/d/file{i:04d}.txt') for i in range(1500)])
+    index.remove([f'/d/file{i:04d}.txt' for i in range(1200)])
+    assert index.stats()['entries'] == 300 and index.stats()['dead'] == 0
+    assert len(index._names) == 300
+    assert _paths(index.search(ACCOUNT, 'file1499', fuzzy=False)) == ['/d/file1499.txt']
+    assert index.search(ACCOUNT, 'file0001', fuzzy=False) == []
+
+
+def test_few_removals_do_not_compact(index):
+    index.upsert([_row(f'/d/file{i}.txt') for i in range(20)])
+    index.remove([f'/d/file{i}.txt' for i in range(15)])
+    assert index.stats()['dead'] == 15
+    assert len(index._names) == 20
+
+
+def test_exact_then_prefix_then_substring(index):
+    index.upsert([_row('/x/my_photo.jpg'), _row('/x/photo_album.zip'), _row('/x/photo')])
+    assert _paths(index.search(ACCOUNT, 'photo')) == ['/x/photo', '/x/photo_album.zip', '/x/my_photo.jpg']
+
+
+def test_fuzzy_matches_after_exact_results(index):
+    index.upsert([_row('/x/recieve.doc'), _row('/x/receive_log.txt')])
+    assert _paths(index.search(ACCOUNT, 'receive')) == ['/x/receive_log.txt', '/x/recieve.doc']
+    assert _paths(index.search(ACCOUNT, 'receive', fuzzy=False)) == ['/x/receive_log.txt']
+
+
+def test_fuzzy_deletion_variant(index):
+    index.upsert([_row('/x/banana.txt')])
+    assert _paths(index.search(ACCOUNT, 'bananna')) == ['/x/banana.txt']
+
+
+def test_multi_term_under_and_path_terms(index):
+    index.upsert([_row('/work/项目计划.xlsx'), _row('/home/项目计划.docx'), _row('/work/计划.txt')])
+    assert _paths(index.search(ACCOUNT, '项目 计划')) == ['/work/项目计划.xlsx', '/home/项目计划.docx']
+    assert _paths(index.search(ACCOUNT, '计划', under='/home')) == ['/home/项目计划.docx']
+    assert _paths(index.search(ACCOUNT, '计划 work/')) == ['/work/计划.txt', '/work/项目计划.xlsx']
+
+
+def test_normalized_case_and_width(index):
+    index.upsert([_row('/x/ＲＥＡＤＭＥ.md')])
+    assert _paths(index.search(ACCOUNT, 'readme')) == ['/x/ＲＥＡＤＭＥ.md']
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+OpBatcher：多操作请求失败时只重发只读操作，写操作不重复执行；缓存只为成功的操作失效
+"""
+
+import json
+
+from core.api_client import APIClient
+from core.op_batcher import OpBatcher
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class FakeClient:
+    """只提供 OpBatcher 用到的 APIClient 成员；batch_reply 为多操作接口的响应（异常则抛出）"""
+
+    _op_paths = staticmethod(APIClient._op_paths)
+
+    def __init__(self, batch_reply):
+        self.user_jwt = 'jwt'
+        self.base_url = 'http://pan.test'
+        self.batch_reply = batch_reply
+        self.single_calls = []
+        self.invalidated = []
+        client = self
+
+        class _Refresher:
+            def ensure_fresh(self):
+                pass
+
+        class _Session:
+            def post(self, url, json=None, headers=None):
+                if isinstance(client.batch_reply, Exception):
+                    raise client.batch_reply
+                return client.batch_reply
+
+        self.token_refresher = _Refresher()
+        self.session = _Session()
+
+    def refresh_token(self, used_jwt=None):
+        return False
+
+    def call_api(self, operation, args=None):
+        self.single_calls.append(operation)
+        return {"status": "ok", "data": {"errno": 0}}
+
+    def _invalidate_for_op(self, operation, args):
+        self.invalidated.append(operation)
+
+
+OPS = [("delete", {"filelist": json.dumps(["/a"])}), ("list_files", {"dir": "/"}),
+       ("move", {"filelist": json.dumps([{"path": "/b", "dest": "/c"}])})]
+
+
+def test_timeout_fails_writes_and_retries_reads():
+    client = FakeClient(TimeoutError("read timed out"))
+    results = OpBatcher(client).call_many(OPS)
+
+    assert client.single_calls == ["list_files"]
+    assert results[0] == {"status": "error", "error": "read timed out"}
+    assert results[1] == {"status": "ok", "data": {"errno": 0}}
+    assert results[2]["status"] == "error"
+    assert client.invalidated == []
+
+
+def test_server_error_does_not_replay_writes():
+    client = FakeClient(FakeResponse(502))
+    batcher = OpBatcher(client)
+    results = batcher.call_many(OPS)
+
+    assert client.single_calls == ["list_files"]
+    assert results[0]["status"] == "error" and results[2]["status"] == "error"
+    assert batcher.supported is None
+
+
+def test_unsupported_endpoint_falls_back_to_single_requests():
+    client = FakeClient(FakeResponse(404))
+    batcher = OpBatcher(client)
+    results = batcher.call_many(OPS)
+
+    assert sorted(client.single_calls) == ["delete", "list_files", "move"]
+    assert all(r == {"status": "ok", "data": {"errno": 0}} for r in results)
+    assert batcher.supported is False
+
+
+def test_invalidates_only_succeeded_ops():
+    client = FakeClient(FakeResponse(200, {"results": [
+        {"status": "ok", "data": {"errno": 0}},
+        {"status": "ok", "data": {"list": []}},
+        {"status": "ok", "data": {"errno": -9}},
+    ]}))
+    results = OpBatcher(client).call_many(OPS)
+
+    assert client.single_calls == []
+    assert results[2] == {"status": "ok", "data": {"errno": -9}}
+    assert client.invalidated == ["delete", "list_files"]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+SegmentedDownloader / download_via_dlink：本地 HTTP 服务按 Range 返回 206，越界返回 416（bytes */总长）
+"""
+
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.api_client import APIClient
+from core.download_manifest import DownloadManifest
+from core.segmented_download import SegmentedDownloader, RangeNotSupported
+
+
+class RangeServer:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.ranges = []  # 收到的 Range 请求头（None 表示整文件请求）
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                data = fake.data
+                rng = self.headers.get('Range')
+                fake.ranges.append(rng)
+                if rng:
+                    m = re.match(r'bytes=(\d+)-(\d*)', rng)
+                    start = int(m.group(1))
+                    end = min(int(m.group(2)) if m.group(2) else len(data) - 1, len(data) - 1)
+                    if start >= len(data):
+                        self.send_response(416)
+                        self.send_header('Content-Range', f'bytes */{len(data)}')
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    body = data[start:end + 1]
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+                else:
+                    body = data
+                    self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/file"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def _serve(data: bytes) -> RangeServer:
+        server = RangeServer(data)
+        servers.append(server)
+        return server
+
+    yield _serve
+    for server in servers:
+        server.close()
+
+
+def test_segmented_download(serve, tmp_path):
+    data = os.urandom(300 * 1024)
+    server = serve(data)
+    save_path = str(tmp_path / 'out.bin')
+    SegmentedDownloader(server.url, save_path, connections=3, segment_size=64 * 1024).download()
+
+    with open(save_path, 'rb') as f:
+        assert f.read() == data
+    assert not os.path.exists(save_path + '.part')
+
+
+def test_zero_byte_probe_is_range_not_supported(serve, tmp_path):
+    server = serve(b'')
+    downloader = SegmentedDownloader(server.url, str(tmp_path / 'empty.bin'))
+    with pytest.raises(RangeNotSupported):
+        downloader.probe()
+    with pytest.raises(RangeNotSupported):
+        downloader.download()
+    assert not os.path.exists(str(tmp_path / 'empty.bin'))
+
+
+def test_zero_byte_file_falls_back_to_single_stream(serve, tmp_path):
+    server = serve(b'')
+    save_path = str(tmp_path / 'empty.bin')
+    APIClient().download_via_dlink(server.url, 'token', save_path, connections=4)
+
+    assert os.path.getsize(save_path) == 0
+    assert server.ranges == ['bytes=0-0', None]
+
+
+def test_zero_byte_file_with_manifest(serve, tmp_path):
+    server = serve(b'')
+    save_path = str(tmp_path / 'empty.bin')
+    manifest = DownloadManifest(save_path, fsid=1, size=0)
+    APIClient().download_via_dlink(server.url, 'token', save_path, connections=4, manifest=manifest)
+
+    assert os.path.getsize(save_path) == 0
+    assert not os.path.exists(manifest.part_path)
+    assert not os.path.exists(manifest.manifest_path)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+TaskTracker：查询进行中调用 close()，轮询线程恢复后不应再改动已被 close 结算的任务
+"""
+
+import threading
+
+from core.task_tracker import TaskTracker
+
+
+class BlockingClient:
+    """call_api_many 阻塞到 release 被置位，然后报告所有任务已成功"""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def call_api_many(self, operations):
+        self.entered.set()
+        self.release.wait(5)
+        return [{"status": "ok", "data": {"status": "success"}} for _ in operations]
+
+
+def test_close_during_poll(monkeypatch):
+    errors = []
+    monkeypatch.setattr(threading, 'excepthook', lambda args: errors.append(args.exc_value))
+    monkeypatch.setattr(TaskTracker, 'INITIAL_DELAY', 0.0)
+    client = BlockingClient()
+    tracker = TaskTracker(client)
+    future = tracker.track(taskid='t1')
+
+    assert client.entered.wait(5)
+    tracker.close()
+    client.release.set()
+    tracker._thread.join(5)
+
+    assert not tracker._thread.is_alive()
+    assert errors == []
+    assert future.result(0) == {"status": "unknown", "taskid": 't1', "fsid": None, "error": "已关闭"}
+    assert tracker.pending_count() == 0
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+下载队列对话框
+列出下载管理器中的未结束与失败任务，可对选中任务暂停 / 继续 / 取消 / 重试，
+并调整同时下载的任务数。对话框不持有状态，全部操作直接调用 DownloadManager。
+"""
+
+from typing import Dict, List
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
+                               QHeaderView, QAbstractItemView, QMenu, QSpinBox, QPushButton)
+from PySide6.QtCore import Qt, QTimer
+
+from core.download_queue import DownloadTask
+
+
+class DownloadQueueDialog(QDialog):
+    """下载队列（非模态，随下载管理器的信号实时更新）"""
+
+    STATE_TEXT = {
+        DownloadTask.STATE_QUEUED: "排队中",
+        DownloadTask.STATE_RUNNING: "下载中",
+        DownloadTask.STATE_PAUSED: "已暂停",
+        DownloadTask.STATE_FAILED: "失败",
+    }
+    COLUMNS = ["名称", "状态", "进度", "错误"]
+    MAX_CONCURRENT_LIMIT = 10
+
+    def __init__(self, download_manager, parent=None):
+        super().__init__(parent)
+        self.manager = download_manager
+        self._rows: Dict[str, int] = {}  # task_id -> 行号
+        self._reload_scheduled = False
+        self.setWindowTitle("下载队列")
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.resize(720, 420)
+        self.setup_ui()
+        self.reload()
+        self.manager.task_added.connect(self._on_task_changed)
+        self.manager.task_state_changed.connect(self._on_task_changed)
+        self.manager.task_progress.connect(self._on_task_progress)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.table.customContextMenuRequested.connect(self._show_context_menu)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for col in (1, 2):
+            header.setSectionResizeMode(col, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        bottom = QHBoxLayout()
+        bottom.addWidget(QLabel("同时下载："))
+        self.concurrent_spin = QSpinBox()
+        self.concurrent_spin.setRange(1, self.MAX_CONCURRENT_LIMIT)
+        self.concurrent_spin.setValue(self.manager.max_concurrent)
+        self.concurrent_spin.valueChanged.connect(self.manager.set_max_concurrent)
+        bottom.addWidget(self.concurrent_spin)
+        bottom.addStretch(1)
+        for text, slot in (("全部暂停", self.manager.pause_all), ("全部继续", self.manager.resume_all),
+                           ("全部取消", self.manager.cancel_all), ("关闭", self.close)):
+            btn = QPushButton(text)
+            btn.clicked.connect(slot)
+            bottom.addWidget(btn)
+        layout.addLayout(bottom)
+
+    # ---------- 表格 ----------
+    def _visible(self, task: DownloadTask) -> bool:
+        return task.state in self.STATE_TEXT
+
+    def reload(self):
+        self._reload_scheduled = False
+        tasks = [t for t in self.manager.tasks() if self._visible(t)]
+        self.table.setRowCount(len(tasks))
+        self._rows = {}
+        for row, task in enumerate(tasks):
+            self._rows[task.task_id] = row
+            self._fill_row(row, task)
+
+    def _fill_row(self, row: int, task: DownloadTask):
+        name_item = QTableWidgetItem(task.name)
+        name_item.setData(Qt.UserRole, task.task_id)
+        name_item.setToolTip(task.save_path)
+        self.table.setItem(row, 0, name_item)
+        self.table.setItem(row, 1, QTableWidgetItem(self.STATE_TEXT.get(task.state, task.state)))
+        self.table.setItem(row, 2, QTableWidgetItem(self._progress_text(task.downloaded, task.total)))
+        self.table.setItem(row, 3, QTableWidgetItem(task.error or ""))
+
+    @staticmethod
+    def _progress_text(downloaded: int, total: int) -> str:
+        if total > 0:
+            return f"{min(100.0, downloaded * 100.0 / total):.1f}%"
+        return f"{downloaded / 1024 / 1024:.1f} MB" if downloaded else ""
+
+    def _on_task_changed(self, task_id: str, state: str = ""):
+        task = self.manager.get_task(task_id)
+        visible = task is not None and self._visible(task)
+        if visible == (task_id in self._rows):
+            if visible:
+                self._fill_row(self._rows[task_id], task)
+            return
+        # 增删行时整表重建（合并到下一轮事件循环，全部取消等批量变化只重建一次）
+        if not self._reload_scheduled:
+            self._reload_scheduled = True
+            QTimer.singleShot(0, self.reload)
+
+    def _on_task_progress(self, task_id: str, percent: float, downloaded: int, total: int, speed: float):
+        row = self._rows.get(task_id)
+        if row is not None:
+            self.table.setItem(row, 2, QTableWidgetItem(self._progress_text(downloaded, total)))
+
+    # ---------- 操作 ----------
+    def _selected_ids(self) -> List[str]:
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        ids = []
+        for row in rows:
+            item = self.table.item(row, 0)
+            if item is not None:
+                ids.append(item.data(Qt.UserRole))
+        return ids
+
+    def _show_context_menu(self, position):
+        ids = self._selected_ids()
+        if not ids:
+            return
+        menu = QMenu(self)
+        act_pause = menu.addAction("暂停")
+        act_resume = menu.addAction("继续")
+        act_retry = menu.addAction("重试")
+        menu.addSeparator()
+        act_cancel = menu.addAction("取消")
+        action = menu.exec(self.table.viewport().mapToGlobal(position))
+        handlers = {act_pause: self.manager.pause, act_resume: self.manager.resume,
+                    act_retry: self.manager.retry, act_cancel: self.manager.cancel}
+        handler = handlers.get(action)
+        if handler is None:
+            return
+        for task_id in ids:
+            handler(task_id)
+
+    def closeEvent(self, event):
+        for signal, slot in ((self.manager.task_added, self._on_task_changed),
+                             (self.manager.task_state_changed, self._on_task_changed),
+                             (self.manager.task_progress, self._on_task_progress)):
+            try:
+                signal.disconnect(slot)
+            except Exception:
+                pass
+        super().closeEvent(event)
@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 """
 目录选择对话框
+目录树按需加载：展开某个目录时才列出它的子目录。本地元数据镜像中已有的列表立即显示
+（跨对话框复用），过期或没有时在后台异步拉取，不阻塞界面。
 """
 
+import posixpath
+import time
+from typing import Optional, Dict, List, Any
+
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                               QLineEdit, QPushButton, QTreeWidget, QTreeWidgetItem,
                               QMessageBox, QHeaderView, QAbstractItemView)
@@ -10,18 +16,28 @@ from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QFont, QIcon
 from core.api_client import APIClient
 from core.utils import get_icon_path
+from ui.threads.async_bridge import AsyncBridge
 
 
 class FolderSelectorDialog(QDialog):
     """目录选择对话框"""
     
     folder_selected = Signal(str)  # 选择目录信号
+
+    LIST_LIMIT = 1000
+    FRESH_SECONDS = 60.0  # 镜像中最近列出过的目录展开时不再访问服务端
     
     def __init__(self, parent=None, api_client=None, current_folder="/", title="选择目录"):
         super().__init__(parent)
         self.api_client = api_client or APIClient()
         self.current_folder = current_folder
-        self.folders = {}  # 缓存目录结构
+        self.folders: Dict[str, QTreeWidgetItem] = {}  # 目录路径 -> 树节点
+        self._listed = set()  # 已填充子目录的路径
+        self._pending: Dict[str, int] = {}  # 路径 -> 在途的异步调用编号
+        self._reveal: Optional[str] = None  # 等待子目录加载后继续展开的目标路径
+        self._closed = False
+        # 优先复用主窗口的异步桥，没有时自建
+        self.async_bridge = getattr(parent, 'async_bridge', None) or AsyncBridge(self.api_client, parent=self)
         
         self.setWindowTitle(title)
         self.setFixedSize(500, 400)
@@ -87,7 +103,7 @@ class FolderSelectorDialog(QDialog):
         button_layout.addStretch()
         
         self.refresh_btn = QPushButton("刷新")
-        self.refresh_btn.clicked.connect(self.load_folders)
+        self.refresh_btn.clicked.connect(lambda: self.load_folders(force=True))
         button_layout.addWidget(self.refresh_btn)
         
         self.cancel_btn = QPushButton("取消")
@@ -116,38 +132,26 @@ class FolderSelectorDialog(QDialog):
         # 连接信号
         self.tree.itemSelectionChanged.connect(self.on_selection_changed)
         self.tree.itemDoubleClicked.connect(self.accept_selection)
+        self.tree.itemExpanded.connect(self._on_item_expanded)
     
-    def load_folders(self):
-        """加载目录结构"""
+    def load_folders(self, force: bool = False):
+        """加载目录结构（force 为 True 时忽略本地镜像，重新向服务端列出）"""
         try:
+            self._cancel_pending()
             self.tree.clear()
+            self.folders.clear()
+            self._listed.clear()
             
             # 添加根目录
             root_item = QTreeWidgetItem(self.tree, ["/ (根目录)"])
             root_item.setData(0, Qt.UserRole, "/")
             root_item.setIcon(0, QIcon(get_icon_path('folder.png')))
-            root_item.setExpanded(True)
+            self.folders["/"] = root_item
             
-            # 加载用户态目录
+            # 加载用户态目录：展开根目录即触发列出子目录
             if self.api_client.is_logged_in():
-                # 更新路径标签显示加载状态
-                self.path_label.setText("正在加载目录...")
-                result = self.api_client.list_files("/", limit=1000)
-                
-                if isinstance(result, dict):
-                    data = result.get('data') or {}
-                    files = result.get('list') or result.get('files') or data.get('list') or data.get('files') or []
-                elif isinstance(result, list):
-                    files = result
-                else:
-                    files = []
-                
-                # 只显示目录
-                folders = [f for f in files if int(f.get('isdir') or 0) == 1]
-                self._build_tree(root_item, folders, "/")
-                
-                # 恢复路径标签显示
-                self.path_label.setText(f"当前路径: {self.current_folder}")
+                self._list_children("/", force=force)
+                root_item.setExpanded(True)
             
             # 展开到当前目录
             self._expand_to_path(self.current_folder)
@@ -155,51 +159,151 @@ class FolderSelectorDialog(QDialog):
         except Exception as e:
             QMessageBox.warning(self, "错误", f"加载目录失败: {e}")
     
-    def _build_tree(self, parent_item, folders, parent_path):
-        """递归构建目录树"""
-        try:
-            for folder in folders:
-                folder_name = folder.get('server_filename') or folder.get('file_name') or folder.get('name') or ''
-                folder_path = folder.get('path') or folder.get('server_path') or ''
-                
-                if not folder_path.startswith(parent_path):
-                    continue
-                
-                # 创建目录项
-                item = QTreeWidgetItem(parent_item, [folder_name])
-                item.setData(0, Qt.UserRole, folder_path)
-                item.setIcon(0, QIcon(get_icon_path('folder.png')))
-                
-                # 递归添加子目录
-                child_folders = [f for f in folders if f.get('path', '').startswith(folder_path + '/') and f.get('path', '') != folder_path]
-                if child_folders:
-                    self._build_tree(item, child_folders, folder_path)
-                    
-        except Exception as e:
-            print(f"[ERROR] 构建目录树失败: {e}")
+    @staticmethod
+    def _norm_path(path: str) -> str:
+        return posixpath.normpath('/' + (path or '/').strip('/'))
+    
+    def _on_item_expanded(self, item):
+        path = item.data(0, Qt.UserRole)
+        if path:
+            self._list_children(path)
+    
+    def _list_children(self, path: str, force: bool = False):
+        """填充目录的子目录：先用本地镜像，过期或没有时后台拉取"""
+        if not force and path in self._listed:
+            return
+        account = self.api_client.account_key()
+        if not force:
+            cached = self.api_client.cached_listing(path)
+            if cached is not None:
+                self._set_children(path, cached)
+                listed_at = self.api_client.metadata_store.listed_at(account, path)
+                if listed_at is not None and time.time() - listed_at < self.FRESH_SECONDS:
+                    return
+        if path in self._pending:
+            return
+        item = self.folders.get(path)
+        if item is not None and item.childCount() == 0:
+            self.path_label.setText("正在加载目录...")
+        self._pending[path] = self.async_bridge.submit(
+            self.async_bridge.client.list_files(path, limit=self.LIST_LIMIT, use_cache=not force),
+            on_success=lambda result, path=path: self._on_listed(path, result),
+            on_error=lambda error, path=path: self._on_list_failed(path, error))
+    
+    def _on_listed(self, path: str, result):
+        if self._closed:
+            return
+        self._pending.pop(path, None)
+        if isinstance(result, dict):
+            if result.get('status') not in (None, 'ok', 'success'):
+                self._on_list_failed(path, result.get('error') or '未知错误')
+                return
+            data = result.get('data') or {}
+            files = result.get('list') or result.get('files') or data.get('list') or data.get('files') or []
+        elif isinstance(result, list):
+            files = result
+        else:
+            files = []
+        self._set_children(path, files)
+        self.path_label.setText(f"当前路径: {self.path_input.text().strip() or self.current_folder}")
+        if self._reveal:
+            self._expand_to_path(self._reveal)
+    
+    def _on_list_failed(self, path: str, error: str):
+        if self._closed:
+            return
+        self._pending.pop(path, None)
+        print(f"[DEBUG] 列出目录失败 {path}: {error}")
+        self.path_label.setText(f"加载目录失败: {error}")
+        if self._reveal:
+            # 目标路径的上级无法列出：停在已展开的位置
+            self._reveal = None
+    
+    def _set_children(self, parent_path: str, entries: List[Dict[str, Any]]):
+        """用列表结果更新某个目录的子节点：保留已有节点（及其已展开的子树），增删差异部分"""
+        parent_item = self.folders.get(parent_path)
+        if parent_item is None:
+            return
+        self._listed.add(parent_path)
+        wanted: Dict[str, str] = {}
+        for f in entries or []:
+            # 只显示目录
+            if not isinstance(f, dict) or int(f.get('isdir') or 0) != 1:
+                continue
+            name = f.get('server_filename') or f.get('file_name') or f.get('name') or ''
+            path = f.get('path') or f.get('server_path') or posixpath.join(parent_path, name)
+            wanted[self._norm_path(path)] = name or posixpath.basename(path)
+        # 删除已不存在的子目录（连同其子树在路径字典中的记录）
+        for i in reversed(range(parent_item.childCount())):
+            child = parent_item.child(i)
+            path = child.data(0, Qt.UserRole)
+            if path in wanted:
+                del wanted[path]
+                continue
+            parent_item.removeChild(child)
+            prefix = path.rstrip('/') + '/'
+            for key in [k for k in self.folders if k == path or k.startswith(prefix)]:
+                del self.folders[key]
+                self._listed.discard(key)
+        new_items = []
+        for path, name in sorted(wanted.items(), key=lambda kv: kv[1].lower()):
+            item = QTreeWidgetItem([name])
+            item.setData(0, Qt.UserRole, path)
+            item.setIcon(0, QIcon(get_icon_path('folder.png')))
+            # 未列出前总显示展开箭头，展开时再加载
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            self.folders[path] = item
+            new_items.append(item)
+        if new_items:
+            parent_item.addChildren(new_items)
+        if parent_item.childCount() == 0:
+            parent_item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicator)
     
     def _expand_to_path(self, target_path):
-        """展开到指定路径"""
+        """展开到指定路径：逐级展开上级目录，子目录尚未加载时等加载完成后继续"""
         try:
             if not target_path or target_path == "/":
+                self._reveal = None
                 return
+            target_path = self._norm_path(target_path)
+            self._reveal = target_path
             
-            # 查找并展开路径
-            items = self.tree.findItems(target_path, Qt.MatchExactly | Qt.MatchRecursive, 1)
-            if items:
-                item = items[0]
-                # 展开父级
-                parent = item.parent()
-                while parent:
-                    parent.setExpanded(True)
-                    parent = parent.parent()
+            # 从根目录开始逐级展开
+            parts = target_path.strip('/').split('/')
+            for depth in range(1, len(parts) + 1):
+                path = '/' + '/'.join(parts[:depth])
+                item = self.folders.get(path)
+                if item is None:
+                    parent_path = posixpath.dirname(path)
+                    if parent_path in self._pending:
+                        return  # 等上级列出后继续
+                    # 上级已列出但没有该目录：路径不存在，停在此处
+                    self._reveal = None
+                    return
+                if depth < len(parts):
+                    item.setExpanded(True)
+                    continue
                 # 选中当前项
+                self._reveal = None
                 self.tree.setCurrentItem(item)
+                self.tree.scrollToItem(item)
                 self.path_input.setText(target_path)
                 
         except Exception as e:
             print(f"[ERROR] 展开路径失败: {e}")
     
+    def _cancel_pending(self):
+        for call_id in self._pending.values():
+            self.async_bridge.cancel(call_id)
+        self._pending.clear()
+        self._reveal = None
+    
+    def done(self, result):
+        # 关闭对话框时取消在途的目录请求，之后到达的结果直接丢弃
+        self._closed = True
+        self._cancel_pending()
+        super().done(result)
+    
     def on_selection_changed(self):
         """选择改变时的处理"""
         try:
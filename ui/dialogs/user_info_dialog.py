@@ -61,10 +61,10 @@ class UserInfoDialog(QDialog):
             avatar_url = self.user_info.get('avatar_url')
             if avatar_url:
                 try:
-                    import requests
+                    from core.transport import get_transport
                     # 禁用代理，添加User-Agent，允许重定向
                     headers = {"User-Agent": "PanClient/1.0.0"}
-                    resp = requests.get(
+                    resp = get_transport().get(
                         avatar_url, 
                         timeout=8,
                         headers=headers,
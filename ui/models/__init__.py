@@ -0,0 +1,3 @@
+from .file_table_model import FileTableModel
+
+__all__ = ['FileTableModel']
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文件列表表格模型
+用户态与公共态共用同一个模型实例：行数据按列存放（名称/大小/时间/标记等各自一个数组），
+单元格文本在 data() 中按需格式化，不再为每个单元格创建 QStandardItem。
+不保留服务端返回的原始条目，payload()/raw_rows() 需要时按列重建只含常用字段的字典。
+大目录分批暴露给视图（canFetchMore / fetchMore），已全部暴露后可继续向服务端请求下一页。
+"""
+
+import posixpath
+from array import array
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Iterable
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PySide6.QtGui import QColor, QBrush
+
+
+class FileTableModel(QAbstractTableModel):
+    """文件列表模型
+
+    - set_rows(mode, files, token, base_dir)：替换全部行（切换目录/模式时）
+    - append_rows(files, base_dir)：追加一页
+    - update_row(row, entry) / removeRow(row) / row_for_path(path)：就地修改
+    - payload(row)：行数据 {"mode", "fsid", "path", "raw", "token"}，也可通过第 0 列的 UserRole 取得；
+      raw 为按列重建的条目（名称/路径/fs_id/大小/时间/isdir，公共态另有 category）
+    - set_pager(has_more, load_more)：已全部暴露时，视图滚动到底由 fetchMore 请求下一页
+    """
+
+    FETCH_BATCH = 200  # 每次向视图暴露的行数
+
+    HEADERS = {
+        "user": ["文件名称", "大小", "类别", "修改时间", "打开", "下载", "分享", "删除"],
+        "public": ["文件名称", "大小", "类别", "创建时间", "阅读", "下载", "分享", "举报"],
+    }
+    # 动作列文字颜色：深灰 / 中蓝 / 浅橙 / 淡红
+    ACTION_COLORS = ["#333333", "#2E86AB", "#FF9F43", "#E74C3C"]
+    ACTION_FIRST_COLUMN = 4
+
+    def __init__(self, parent=None, format_size: Optional[Callable[[float], str]] = None,
+                 type_text: Optional[Callable[[str, Dict[str, Any]], str]] = None):
+        super().__init__(parent)
+        self.format_size = format_size or (lambda size: f"{size} B")
+        self.type_text = type_text or (lambda mode, raw: "")
+        self.mode = "user"
+        self.token = 0
+        self._action_brushes = [QBrush(QColor(c)) for c in self.ACTION_COLORS]
+        self._has_more: Optional[Callable[[], bool]] = None
+        self._load_more: Optional[Callable[[], None]] = None
+        self._more_requested = False
+        self._reset_columns()
+
+    def _reset_columns(self):
+        self._names: List[str] = []
+        self._paths: List[str] = []
+        self._fsids: List[Any] = []
+        self._categories: List[Any] = []  # 公共态分类（用户态类别由名称推断，恒为 None）
+        self._time_texts: List[Optional[str]] = []  # 时间字段不是数字时的原始文本，否则为 None
+        self._sizes = array('d')
+        self._times = array('d')  # NaN 表示时间字段不是数字，显示原始文本
+        self._isdir = bytearray()
+        self._exposed = 0
+
+    # ---------- 行数据 ----------
+    def _extract(self, f: Dict[str, Any], base_dir: str):
+        if self.mode == "public":
+            name = f.get('file_name') or f.get('server_filename') or f.get('name') or ''
+            size = f.get('file_size') or f.get('size') or 0
+            ts = f.get('create_time') or f.get('ctime') or 0
+            path = f.get('file_path') or f.get('path') or ''
+            category = f.get('category') or f.get('category_id') or f.get('type') or None
+        else:
+            name = f.get('server_filename') or f.get('file_name') or f.get('name') or ''
+            size = f.get('size') or f.get('file_size') or 0
+            ts = f.get('server_mtime') or f.get('mtime') or f.get('update_time') or f.get('ctime') or 0
+            category = None
+            # 路径：优先后端给出的path；否则用当前目录+文件名拼接
+            path = f.get('path') or f.get('server_path') or posixpath.join(base_dir or '/', str(name))
+        try:
+            size = float(size)
+        except (TypeError, ValueError):
+            size = 0.0
+        time_text = None
+        try:
+            ts = float(ts) if isinstance(ts, (int, float)) else float('nan')
+        except (TypeError, ValueError):
+            ts = float('nan')
+        if ts != ts:  # 非数字时间（如 "2024-01-01 12:00"）原样保留文本
+            time_text = str(f.get('create_time') or f.get('ctime') or f.get('server_mtime')
+                            or f.get('mtime') or f.get('update_time') or "-")
+        fs_id = f.get('fs_id') or f.get('fsid') or f.get('id')
+        return str(name), size, ts, 1 if int(f.get('isdir') or 0) == 1 else 0, path, fs_id, category, time_text
+
+    def _store(self, files: Iterable[Dict[str, Any]], base_dir: str) -> int:
+        count = 0
+        for f in files or []:
+            if not isinstance(f, dict):
+                continue
+            name, size, ts, isdir, path, fs_id, category, time_text = self._extract(f, base_dir)
+            self._names.append(name)
+            self._sizes.append(size)
+            self._times.append(ts)
+            self._isdir.append(isdir)
+            self._paths.append(path)
+            self._fsids.append(fs_id)
+            self._categories.append(category)
+            self._time_texts.append(time_text)
+            count += 1
+        return count
+
+    def set_rows(self, mode: str, files: List[Dict[str, Any]], token: int = 0, base_dir: str = '/'):
+        self.beginResetModel()
+        self.mode = mode if mode in self.HEADERS else "user"
+        self.token = token
+        self._reset_columns()
+        self._store(files, base_dir)
+        self._exposed = min(len(self._names), self.FETCH_BATCH)
+        self.endResetModel()
+
+    def append_rows(self, files: List[Dict[str, Any]], base_dir: str = '/'):
+        was_all_exposed = self._exposed >= len(self._names)
+        if not self._store(files, base_dir) or not was_all_exposed:
+            return
+        # 之前已全部可见（通常是滚动到底加载了下一页）：立即暴露一批新行
+        self._expose(self.FETCH_BATCH)
+
+    def update_row(self, row: int, entry: Dict[str, Any], base_dir: str = '/'):
+        if not (0 <= row < len(self._names)):
+            return
+        name, size, ts, isdir, path, fs_id, category, time_text = self._extract(entry, base_dir)
+        self._names[row], self._sizes[row], self._times[row] = name, size, ts
+        self._isdir[row], self._paths[row], self._fsids[row] = isdir, path, fs_id
+        self._categories[row], self._time_texts[row] = category, time_text
+        if row < self._exposed:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    def removeRows(self, row: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        if parent.isValid() or count <= 0 or row < 0 or row + count > len(self._names):
+            return False
+        visible_end = min(row + count, self._exposed)
+        if row < visible_end:
+            self.beginRemoveRows(QModelIndex(), row, visible_end - 1)
+        for column in (self._names, self._sizes, self._times, self._isdir, self._paths, self._fsids,
+                       self._categories, self._time_texts):
+            del column[row:row + count]
+        if row < visible_end:
+            self._exposed -= visible_end - row
+            self.endRemoveRows()
+        return True
+
+    def clear(self):
+        self.set_rows(self.mode, [], self.token)
+
+    def row_for_path(self, path: str) -> Optional[int]:
+        key = (path or '').rstrip('/') or '/'
+        for row, p in enumerate(self._paths):
+            if ((p or '').rstrip('/') or '/') == key:
+                return row
+        return None
+
+    def payload(self, row: int) -> Optional[Dict[str, Any]]:
+        if not (0 <= row < len(self._names)):
+            return None
+        return {
+            "mode": self.mode,
+            "fsid": self._fsids[row],
+            "path": self._paths[row],
+            "raw": self._raw(row),
+            "token": self.token,  # 当前模式版本号
+        }
+
+    def raw_rows(self) -> List[Dict[str, Any]]:
+        """全部行的条目（按列重建）"""
+        return [self._raw(row) for row in range(len(self._names))]
+
+    def _raw(self, row: int) -> Dict[str, Any]:
+        """按列重建条目，键名与服务端列表一致（用户态 server_filename/path/size/server_mtime，公共态 file_*）"""
+        size = self._sizes[row]
+        size = int(size) if size.is_integer() else size
+        ts = self._times[row]
+        ts = self._time_texts[row] if ts != ts else int(ts)
+        if self.mode == "public":
+            return {"file_name": self._names[row], "file_path": self._paths[row], "fs_id": self._fsids[row],
+                    "file_size": size, "create_time": ts, "isdir": self._isdir[row],
+                    "category": self._categories[row]}
+        return {"server_filename": self._names[row], "path": self._paths[row], "fs_id": self._fsids[row],
+                "size": size, "server_mtime": ts, "isdir": self._isdir[row]}
+
+    def total_rows(self) -> int:
+        """已载入的全部行数（包括尚未暴露给视图的）"""
+        return len(self._names)
+
+    # ---------- 分页 ----------
+    def set_pager(self, has_more: Optional[Callable[[], bool]], load_more: Optional[Callable[[], None]]):
+        self._has_more = has_more
+        self._load_more = load_more
+        self._more_requested = False
+
+    def _expose(self, count: int):
+        end = min(len(self._names), self._exposed + count)
+        if end <= self._exposed:
+            return
+        self.beginInsertRows(QModelIndex(), self._exposed, end - 1)
+        self._exposed = end
+        self.endInsertRows()
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        if parent.isValid():
+            return False
+        if self._exposed < len(self._names):
+            return True
+        if self._load_more is None or self._more_requested:
+            return False
+        try:
+            return bool(self._has_more and self._has_more())
+        except Exception:
+            return False
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()):
+        if parent.isValid():
+            return
+        if self._exposed < len(self._names):
+            self._expose(self.FETCH_BATCH)
+            return
+        if self.canFetchMore(parent):
+            # 视图在布局过程中调用 fetchMore，请求下一页放到事件循环中进行
+            self._more_requested = True
+            QTimer.singleShot(0, self._run_load_more)
+
+    def _run_load_more(self):
+        self._more_requested = False
+        if self._load_more is not None:
+            self._load_more()
+
+    # ---------- QAbstractTableModel ----------
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._exposed
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS[self.mode])
+
+    def headerData(self, section: int, orientation, role: int = Qt.DisplayRole):
+        if orientation != Qt.Horizontal:
+            return None
+        headers = self.HEADERS[self.mode]
+        if not (0 <= section < len(headers)):
+            return None
+        if role == Qt.DisplayRole:
+            return headers[section]
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignLeft | Qt.AlignVCenter) if section == 0 else int(Qt.AlignCenter)
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if not (0 <= row < self._exposed):
+            return None
+        if role == Qt.DisplayRole:
+            return self._display(row, col)
+        if role == Qt.UserRole:
+            return self.payload(row) if col == 0 else None
+        if role == Qt.TextAlignmentRole:
+            return None if col == 0 else int(Qt.AlignCenter)
+        if role == Qt.ForegroundRole and col >= self.ACTION_FIRST_COLUMN:
+            return self._action_brushes[col - self.ACTION_FIRST_COLUMN]
+        return None
+
+    def _display(self, row: int, col: int) -> Optional[str]:
+        if col == 0:
+            return self._names[row]
+        if col == 1:
+            if self.mode == "user" and self._isdir[row]:
+                return "-"
+            return self.format_size(self._sizes[row])
+        if col == 2:
+            try:
+                return self.type_text(self.mode, self._raw(row))
+            except Exception:
+                return ""
+        if col == 3:
+            ts = self._times[row]
+            if ts != ts:  # NaN
+                return self._time_texts[row]
+            try:
+                return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
+            except Exception:
+                return "-"
+        if col >= self.ACTION_FIRST_COLUMN:
+            return self.HEADERS[self.mode][col]
+        return None
+
+    def flags(self, index: QModelIndex):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
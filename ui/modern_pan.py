@@ -10,23 +10,26 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                               QGroupBox, QGridLayout, QAbstractItemView, QStyle,
                               QListWidget, QListWidgetItem, QListView, QFileIconProvider)
 from PySide6.QtCore import QFileInfo
-from PySide6.QtCore import Qt, QTimer, QThread, Signal, QSize, QPoint, QPropertyAnimation, Property, QRectF
+from PySide6.QtCore import Qt, QTimer, QSize, QPoint, QPropertyAnimation, Property, QRectF
 from PySide6.QtGui import (QStandardItemModel, QStandardItem, QIcon, QFont, 
                           QColor, QPainter, QPen, QPainterPath, QBrush, QPixmap,
                           QMovie)
 from core.utils import get_icon_path
 from core.api_client import APIClient
+from core.download_manifest import DownloadManifest
+from core.transport import get_transport, NO_PROXIES
+from core.listing_prefetcher import ListingPrefetcher
+from core.search_cache import SearchResultCache
 from ui.widgets.circular_progress_bar import CircularProgressBar
 from ui.widgets.material_line_edit import MaterialLineEdit
 from ui.widgets.material_button import MaterialButton
 from ui.dialogs import UserInfoDialog, DownloadLimitDialog, LoadingDialog
 from ui.dialogs.login_dialog import LoginDialog
+from ui.models import FileTableModel
 from PySide6.QtGui import QDesktopServices
 from PySide6.QtCore import QUrl
-from datetime import datetime
 from PySide6.QtWidgets import QStyledItemDelegate, QInputDialog
 from PySide6.QtGui import QPalette
-import requests
 from urllib.parse import urlencode
 
 class ShareDialog(QDialog):
@@ -204,133 +207,18 @@ class ActionCellDelegate(QStyledItemDelegate):
         painter.drawText(rect, Qt.AlignCenter, index.data())
         painter.restore()
 
-class ProxyDownloadWorker(QThread):
-    progress = Signal(float)
-    status = Signal(str)
-    finished = Signal(str)  # save_path
-    failed = Signal(str)
-
-    def __init__(self, base_url: str, ticket: str, save_path: str, tmp_path: str, size_expect: int = 0, app_jwt: str = None, resume_pos: int = 0, mode_token: int = None, parent=None):
-        super().__init__(parent)
-        self.base_url = base_url.rstrip('/')
-        self.ticket = ticket
-        self.save_path = save_path
-        self.tmp_path = tmp_path
-        self.size_expect = size_expect or 0
-        self.app_jwt = app_jwt
-        self.resume_pos = resume_pos or 0
-        self.mode_token = mode_token  # 模式版本号，用于验证
-        self._stopped = False
-
-    def stop(self):
-        self._stopped = True
-
-    def _do_request(self, ticket: str):
-        headers = {}
-        if self.resume_pos > 0:
-            headers['Range'] = f'bytes={self.resume_pos}-'
-        if self.app_jwt:
-            headers['Authorization'] = f"Bearer {self.app_jwt}"
-        req_kwargs = {
-            'headers': headers,
-            'stream': True,
-            'timeout': 60,
-            'allow_redirects': True,
-            'proxies': {"http": None, "https": None}
-        }
-        proxy_url = f"{self.base_url}/files/proxy_download?ticket={ticket}"
-        return requests.get(proxy_url, **req_kwargs)
-
-    def run(self):
-        try:
-            # 首次请求
-            r = self._do_request(self.ticket)
-            if r.status_code in (401, 403):
-                try:
-                    body = r.text[:500]
-                except Exception:
-                    body = ''
-                self.status.emit(f"票据无效，重试中...")
-                # 由UI侧在启动前确保ticket有效；这里进行一次重试需要新票据，交由UI侧传入
-                # 为保持线程内自洽，这里不自行刷新票据，直接失败返回，由UI层决定是否换票重启线程
-                r.close()
-                self.failed.emit(f"HTTP {r.status_code}: {body}")
-                return
-            r.raise_for_status()
-            total = int(r.headers.get('Content-Length') or self.size_expect or 0)
-            downloaded = self.resume_pos
-            mode = 'ab' if self.resume_pos > 0 else 'wb'
-            with open(self.tmp_path, mode) as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if self._stopped:
-                        return
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        if total > 0 and downloaded % (256*1024) == 0:
-                            pct = downloaded / total * 100
-                            self.progress.emit(pct)
-            os.replace(self.tmp_path, self.save_path)
-            self.finished.emit(self.save_path)
-        except Exception as e:
-            self.failed.emit(str(e))
-
-class DlinkDownloadWorker(QThread):
-    progress = Signal(float, int, int, float)  # percent, downloaded, total, speed_bps
-    status = Signal(str)
-    finished = Signal(str)
-    failed = Signal(str)
-
-    def __init__(self, api_client, dlink: str, access_token: str, save_path: str, resume_pos: int = 0, parent=None):
-        super().__init__(parent)
-        self.api_client = api_client
-        self.dlink = dlink
-        self.access_token = access_token
-        self.save_path = save_path
-        self.resume_pos = int(resume_pos or 0)
-        self._stopped = False
-
-    def stop(self):
-        self._stopped = True
-
-    def run(self):
-        try:
-            import time
-            last_time = time.time()
-            last_downloaded = self.resume_pos
-
-            def _cb(percent, downloaded, total):
-                nonlocal last_time, last_downloaded
-                if self._stopped:
-                    return
-                now = time.time()
-                elapsed = max(1e-3, now - last_time)
-                inc = max(0, int(downloaded) - int(last_downloaded))
-                speed = inc / elapsed
-                last_time = now
-                last_downloaded = int(downloaded)
-                self.progress.emit(float(percent or 0.0), int(downloaded), int(total), float(speed))
-
-            self.status.emit("下载中...")
-            self.api_client.download_via_dlink(
-                self.dlink,
-                self.access_token,
-                self.save_path,
-                range_start=self.resume_pos if self.resume_pos > 0 else None,
-                progress_callback=_cb,
-            )
-            if not self._stopped:
-                self.finished.emit(self.save_path)
-        except Exception as e:
-            if not self._stopped:
-                self.failed.emit(str(e))
-
 class FileManagerUI(QMainWindow):
     def __init__(self):
         super().__init__()
         
         # 初始化API客户端
         self.api_client = APIClient()
+
+        # 全局下载管理器（统一调度所有下载线程）
+        self._init_download_manager()
+
+        # 目录/搜索列表的后台加载与预取
+        self._init_listing_loader()
         
         # 初始化更新检测管理器
         self.init_update_manager()
@@ -344,10 +232,12 @@ class FileManagerUI(QMainWindow):
         self.public_search_mode = False
         self.public_search_keyword = ""
         self.public_ui_inited = False
-        self.public_downloading = False
         
         # 用户态表格初始化标志，避免重复连接信号
         self.user_ui_inited = False
+
+        # 文件列表模型（用户态/公共态共用）
+        self.file_model = FileTableModel(self, format_size=self.format_size, type_text=self._file_type_text)
         
         # 用户态搜索状态变量
         self.user_search_mode = False
@@ -356,6 +246,13 @@ class FileManagerUI(QMainWindow):
         self.user_search_page = 1
         self.user_search_page_size = 50
         self.user_search_has_more = True
+
+        # 边输入边搜索：输入停顿后再发起请求，结果按查询短暂缓存
+        self.search_cache = SearchResultCache()
+        self.search_debounce = QTimer(self)
+        self.search_debounce.setSingleShot(True)
+        self.search_debounce.setInterval(300)
+        self.search_debounce.timeout.connect(lambda: self.search_files(incremental=True))
         
         # 模式管理
         self.current_mode = "public"  # "public" 或 "user"
@@ -460,6 +357,14 @@ class FileManagerUI(QMainWindow):
             if old_mode != mode:  # 只有在真正切换时才递增版本号
                 self.mode_token += 1
             
+            # 取消上一模式在途的列表请求、预取与待触发的自动搜索
+            self.listing_loader.cancel("main")
+            self.listing_loader.cancel("reconcile")
+            self.listing_prefetcher.cancel()
+            self.search_debounce.stop()
+            self.is_loading = False
+            self.public_loading = False
+
             # 断开所有已知的信号连接
             try:
                 self.file_tree.clicked.disconnect()
@@ -557,11 +462,7 @@ class FileManagerUI(QMainWindow):
             if not model or row < 0 or row >= model.rowCount():
                 return None
             
-            name_item = model.item(row, 0)
-            if not name_item:
-                return None
-            
-            payload = name_item.data(Qt.UserRole)
+            payload = model.index(row, 0).data(Qt.UserRole)
             if not isinstance(payload, dict):
                 return None
             
@@ -637,6 +538,8 @@ class FileManagerUI(QMainWindow):
             print("[DEBUG] 用户已登录，默认进入公共资源页面")
             self.status_label.setText("已登录 - 公共资源")
             self.open_public_resources()
+            # 恢复上次未完成的下载
+            self.download_manager.restore()
         else:
             print("[DEBUG] 用户未登录，进入公共资源页面（演示模式）")
             self.status_label.setText("演示模式 - 点击用户信息进行登录")
@@ -663,6 +566,7 @@ class FileManagerUI(QMainWindow):
     def on_login_success(self, data):
         """登录成功处理：保持当前视图（默认公共态），仅更新状态栏"""
         print("[DEBUG] 登录成功，保持当前视图")
+        self.download_manager.restore()
         try:
             if self.in_public:
                 self.status_label.setText("已登录 - 公共资源")
@@ -721,62 +625,156 @@ class FileManagerUI(QMainWindow):
             return
 
         self.is_loading = True
-        try:
-            cur_path = self.current_folder or '/'
-            self.status_label.setText(f"用户态：正在加载 {cur_path}")
-        except Exception:
-            self.status_label.setText("用户态：正在加载文件...")
-        
-        # 调用API获取文件列表（兼容多种返回格式）
-        result = self.api_client.list_files(self.current_folder, self.page_size)
-        ok_flag = False
-        files = []
-        if isinstance(result, dict):
-            status_val = str(result.get("status", "")).lower()
-            ok_flag = (status_val in ("ok", "success")) or ("data" in result) or ("list" in result)
-            data = result.get("data") if isinstance(result.get("data"), dict) else result
-            files = (data or {}).get("list") or (data or {}).get("files") or (data or {}).get("items") or []
-        elif isinstance(result, list):
-            ok_flag = True
-            files = result
-
-        if ok_flag:
+        self.current_page = 1
+        self.has_more = False
+        cur_path = self.current_folder or '/'
+        self.status_label.setText(f"用户态：正在加载 {cur_path}")
+        # 上一个目录的预取与本地数据校正已经没有意义
+        self.listing_prefetcher.cancel()
+        self.listing_loader.cancel("reconcile")
+        self.listing_prefetcher.record_visit(cur_path)
+        # 后台建立本地文件名索引（已建立时忽略）
+        self.api_client.name_index.preload(self.api_client.account_key())
+
+        # 本地镜像中有该目录时先立即显示，再在后台拉取最新列表校正
+        cached = self.api_client.cached_listing(cur_path)
+        if cached is not None:
             try:
-                self.display_user_files(files, append=False)
-                try:
-                    cur_path = self.current_folder or '/'
-                    self.status_label.setText(f"用户态：{cur_path} 已加载 {len(files)} 项")
-                except Exception:
-                    self.status_label.setText(f"用户态：已加载 {len(files)} 项")
+                self.display_user_files(cached, append=False)
+                # 镜像中的条目可能多于一页，且顺序与服务端分页不同：校正完成前不加载下一页，
+                # 页码与是否还有更多以校正得到的第一页为准
+                self.has_more = False
+                self.status_label.setText(f"用户态：{cur_path} 已加载 {len(cached)} 项（正在同步...）")
+                self._reconcile_user_listing(cur_path, cached)
+                self.is_loading = False
+                return
             except Exception as e:
-                self.status_label.setText(f"显示失败: {e}")
-                QMessageBox.critical(self, "错误", f"显示失败: {e}")
-        else:
-            error_msg = (result or {}).get("error", "加载文件失败") if isinstance(result, dict) else "网络连接失败"
-            self.status_label.setText(f"加载失败: {error_msg}")
-            QMessageBox.critical(self, "错误", f"加载文件失败: {error_msg}")
-        
-        self.is_loading = False
+                print(f"[DEBUG] 本地镜像显示失败，改为在线加载: {e}")
+
+        # 后台拉取文件列表，结果分批显示；期间导航到别处时本次结果被丢弃
+        token = self.mode_token
+
+        def _on_result(result):
+            self.is_loading = False
+            if token != self.mode_token or (self.current_folder or '/') != cur_path:
+                return None
+            files = self._listing_files(result)
+            if files is None:
+                error_msg = (result or {}).get("error", "加载文件失败") if isinstance(result, dict) else "网络连接失败"
+                self.status_label.setText(f"加载失败: {error_msg}")
+                QMessageBox.critical(self, "错误", f"加载文件失败: {error_msg}")
+                return None
+            self.has_more = len(files) >= self.page_size
+            return files
+
+        def _on_rows(rows, first, last):
+            self.display_user_files(rows, append=not first)
+            if last:
+                self.status_label.setText(f"用户态：{cur_path} 已加载 {self.file_model.total_rows()} 项")
+                self.listing_prefetcher.prefetch_subdirs(self.file_model.raw_rows(), self.page_size)
+
+        def _on_error(error):
+            self.is_loading = False
+            if token == self.mode_token:
+                self.status_label.setText(f"加载失败: {error}")
+                QMessageBox.critical(self, "错误", f"加载文件失败: {error}")
+
+        self.listing_loader.load("main", self.async_bridge.client.list_files(cur_path, self.page_size),
+                                 on_result=_on_result, on_rows=_on_rows, on_error=_on_error)
+
+    @staticmethod
+    def _listing_files(result):
+        """从列表/搜索结果中取出文件列表（兼容多种返回格式）；失败返回 None"""
+        if isinstance(result, list):
+            return result
+        if not isinstance(result, dict):
+            return None
+        status_val = str(result.get("status", "")).lower()
+        if status_val not in ("ok", "success") and "data" not in result and "list" not in result:
+            return None
+        data = result.get("data") if isinstance(result.get("data"), dict) else result
+        return ((data or {}).get("list") or (data or {}).get("files") or (data or {}).get("items")
+                or result.get("files") or [])
+
+    @staticmethod
+    def _listing_signature(files) -> set:
+        sig = set()
+        for f in files or []:
+            if isinstance(f, dict):
+                sig.add((str(f.get('path') or f.get('server_filename') or f.get('name') or ''),
+                         str(f.get('size') or 0), str(f.get('server_mtime') or f.get('mtime') or 0),
+                         int(f.get('isdir') or 0)))
+        return sig
+
+    def _reconcile_user_listing(self, dir_path: str, shown: list):
+        """后台拉取目录最新列表；与已显示的本地数据不一致时重新显示"""
+        token = self.mode_token
+
+        def _on_result(result):
+            if (token != self.mode_token or self.current_mode != "user" or self.user_search_mode
+                    or (self.current_folder or '/') != dir_path):
+                return None
+            files = self._listing_files(result)
+            if files is None:
+                error_msg = (result or {}).get("error", "同步失败") if isinstance(result, dict) else "网络连接失败"
+                self.status_label.setText(f"用户态：{dir_path} 已显示本地数据（{error_msg}）")
+                _keep_shown()
+                return None
+            self.current_page = 1
+            self.has_more = len(files) >= self.page_size
+            if self._listing_signature(files) != self._listing_signature(shown):
+                self.display_user_files(files, append=False)
+            self.status_label.setText(f"用户态：{dir_path} 已加载 {len(files)} 项")
+            self.listing_prefetcher.prefetch_subdirs(files, self.page_size)
+            return None
+
+        def _keep_shown():
+            # 校正失败：仅当显示的本地数据恰好是一整页时才允许接着加载第 2 页，避免重复行
+            self.current_page = 1
+            self.has_more = len(shown) == self.page_size
+
+        def _on_error(error):
+            if token == self.mode_token and (self.current_folder or '/') == dir_path:
+                self.status_label.setText(f"用户态：{dir_path} 已显示本地数据（同步失败：{error}）")
+                _keep_shown()
+
+        # 独立通道：滚动加载下一页（"main" 通道）不会取消校正
+        self.listing_loader.load(
+            "reconcile", self.async_bridge.client.list_files(dir_path, self.page_size),
+            on_result=_on_result, on_error=_on_error)
+
+    def _file_type_text(self, mode: str, raw: dict) -> str:
+        """表格“类别”列：用户态按后缀推断，公共态按分类ID映射"""
+        if mode == "user":
+            return self._user_file_type_text(raw)
+        category = raw.get('category') or raw.get('category_id') or raw.get('type') or ''
+        return self.map_category_to_type(int(category)) if str(category).isdigit() else str(category)
+
+    def _ensure_file_model(self):
+        """把共享的文件列表模型挂到视图上（用户态/公共态共用）"""
+        if self.file_tree.model() is not self.file_model:
+            self.file_tree.setModel(self.file_model)
+        return self.file_model
+
+    def _set_file_column_widths(self):
+        try:
+            for col, width in enumerate((480, 100, 80, 150, 60, 60, 60, 60)):
+                self.file_tree.setColumnWidth(col, width)
+        except Exception:
+            pass
 
     def display_user_files(self, files, append: bool = False):
         """在主列表控件内显示用户态文件列表，表格布局与公共态一致，但操作列改为“打开/下载/分享/删除”。"""
-        from PySide6.QtGui import QStandardItem, QStandardItemModel
-        from PySide6.QtCore import Qt
-        from PySide6.QtGui import QColor, QBrush
         try:
-            if not append:
-                model = QStandardItemModel()
-                model.setHorizontalHeaderLabels(["文件名称", "大小", "类别", "修改时间", "打开", "下载", "分享", "删除"])
-                self.file_tree.setModel(model)
-                try:
-                    model.horizontalHeaderItem(0).setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                    for col in range(1, 8):
-                        it = model.horizontalHeaderItem(col)
-                        if it:
-                            it.setTextAlignment(Qt.AlignCenter)
-                except Exception:
-                    pass
-                # 用户态动作点击：安全断开公共态槽，再连接用户态槽
+            model = self._ensure_file_model()
+            base_dir = self.current_folder or '/'
+            if not append or model.mode != "user":
+                model.set_rows("user", files, self.mode_token, base_dir)
+                model.set_pager(self._can_load_more_rows, self._load_more_rows)
+            else:
+                model.append_rows(files, base_dir)
+            # 用户态动作点击：安全断开公共态槽，再连接用户态槽（只连接一次）
+            if not self.user_ui_inited:
                 try:
                     self.file_tree.clicked.disconnect(self.on_public_cell_clicked)
                 except Exception:
@@ -787,84 +785,8 @@ class FileManagerUI(QMainWindow):
                     pass
                 self.file_tree.clicked.connect(self.on_user_cell_clicked)
                 self.user_ui_inited = True
-            else:
-                model = self.file_tree.model()
-                if model is None:
-                    model = QStandardItemModel()
-                    model.setHorizontalHeaderLabels(["文件名称", "大小", "类别", "修改时间", "打开", "下载", "分享", "删除"])
-                    self.file_tree.setModel(model)
-                # 确保信号连接一次
-                if not self.user_ui_inited:
-                    try:
-                        self.file_tree.clicked.disconnect(self.on_public_cell_clicked)
-                    except Exception:
-                        pass
-                    try:
-                        self.file_tree.clicked.disconnect(self.on_user_cell_clicked)
-                    except Exception:
-                        pass
-                    self.file_tree.clicked.connect(self.on_user_cell_clicked)
-                    self.user_ui_inited = True
-            for f in files:
-                name = f.get('server_filename') or f.get('file_name') or f.get('name') or ''
-                size = f.get('size') or f.get('file_size') or 0
-                is_dir = int(f.get('isdir') or 0) == 1
-                # 类型：文件夹或由后缀推断
-                type_text = self._user_file_type_text(f)
-                mtime = f.get('server_mtime') or f.get('mtime') or f.get('update_time') or f.get('ctime') or 0
-                # 路径：优先后端给出的path；否则用当前目录+文件名拼接
-                path_val = f.get('path') or f.get('server_path') or ''
-                if not path_val:
-                    try:
-                        base = self.current_folder or '/'
-                        if not base.endswith('/'):
-                            base = base + '/'
-                        path_val = base + name
-                    except Exception:
-                        path_val = '/' + name
-                fs_id = f.get('fs_id') or f.get('fsid') or f.get('id')
-                try:
-                    if isinstance(mtime, (int, float)):
-                        mtime_str = datetime.fromtimestamp(float(mtime)).strftime('%Y-%m-%d %H:%M')
-                    else:
-                        mtime_str = str(mtime)
-                except Exception:
-                    mtime_str = "-"
-                name_item = QStandardItem(str(name))
-                # 统一的数据结构，包含模式标记和完整上下文
-                payload = {
-                    "mode": "user",
-                    "fsid": fs_id,
-                    "path": path_val,
-                    "raw": f,
-                    "token": self.mode_token  # 当前模式版本号
-                }
-                name_item.setData(payload, Qt.UserRole)
-                size_item = QStandardItem("-" if is_dir else self.format_size(float(size)))
-                cat_item = QStandardItem(type_text)
-                time_item = QStandardItem(mtime_str)
-                open_item = QStandardItem("打开")
-                download_item = QStandardItem("下载")
-                share_item = QStandardItem("分享")
-                delete_item = QStandardItem("删除")
-                for it in (size_item, cat_item, time_item, open_item, download_item, share_item, delete_item):
-                    it.setTextAlignment(Qt.AlignCenter)
-                open_item.setForeground(QBrush(QColor("#333333")))
-                download_item.setForeground(QBrush(QColor("#2E86AB")))
-                share_item.setForeground(QBrush(QColor("#FF9F43")))
-                delete_item.setForeground(QBrush(QColor("#E74C3C")))
-                model.appendRow([name_item, size_item, cat_item, time_item, open_item, download_item, share_item, delete_item])
-            try:
-                self.file_tree.setColumnWidth(0, 480)
-                self.file_tree.setColumnWidth(1, 100)
-                self.file_tree.setColumnWidth(2, 80)
-                self.file_tree.setColumnWidth(3, 150)
-                self.file_tree.setColumnWidth(4, 60)
-                self.file_tree.setColumnWidth(5, 60)
-                self.file_tree.setColumnWidth(6, 60)
-                self.file_tree.setColumnWidth(7, 60)
-            except Exception:
-                pass
+            if not append:
+                self._set_file_column_widths()
         except Exception as e:
             QMessageBox.warning(self, "我的网盘", f"显示失败：{e}")
 
@@ -926,8 +848,7 @@ class FileManagerUI(QMainWindow):
             row = index.row()
             col = index.column()
             model = self.file_tree.model()
-            name_item = model.item(row, 0)
-            payload = name_item.data(Qt.UserRole) if name_item else {}
+            payload = model.index(row, 0).data(Qt.UserRole) if model is not None else {}
             
             # 验证模式标记和版本号
             if not self._validate_payload_mode(payload, "user"):
@@ -984,22 +905,24 @@ class FileManagerUI(QMainWindow):
                 print(f"[DEBUG][USER][OPEN] fsid={fsid}, path={path_val}")
             except Exception:
                 pass
-            # 使用最新的直接下载方法
-            self._direct_download_to_path(fsid=fsid, path=path_val, save_path=tmp_path)
-            QDesktopServices.openUrl(QUrl.fromLocalFile(tmp_path))
+            # 使用最新的直接下载方法（插队优先），完成后再用系统程序打开
+            self._direct_download_to_path(
+                fsid=fsid, path=path_val, save_path=tmp_path, priority=10,
+                on_finished=lambda p: QDesktopServices.openUrl(QUrl.fromLocalFile(p)),
+            )
         except Exception as e:
             QMessageBox.warning(self, "打开", f"打开失败：{e}")
 
     def download_user_file(self, file_info: dict):
         """用户态：下载到本地目录（使用直接百度网盘API下载）。"""
         try:
-            if int(file_info.get('isdir') or 0) == 1:
-                QMessageBox.information(self, "下载", "文件夹下载请在右键菜单中使用打包下载（待实现）。")
-                return
             from PySide6.QtWidgets import QFileDialog
             save_dir = QFileDialog.getExistingDirectory(self, "选择保存目录")
             if not save_dir:
                 return
+            if int(file_info.get('isdir') or 0) == 1:
+                self._download_user_folder(file_info.get('path') or file_info.get('server_path'), save_dir)
+                return
             import os
             filename = file_info.get('server_filename') or file_info.get('file_name') or 'download.bin'
             save_path = os.path.join(save_dir, filename)
@@ -1015,6 +938,52 @@ class FileManagerUI(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "下载", f"下载失败：{e}")
 
+    def _download_user_folder(self, remote_dir: str, save_dir: str):
+        """用户态：递归下载文件夹。后台并发遍历目录树，发现的文件立即交给下载管理器传输"""
+        if not remote_dir:
+            QMessageBox.warning(self, "下载", "无法获取文件夹路径")
+            return
+        from ui.threads.folder_download_worker import FolderDownloadWorker
+        walker = FolderDownloadWorker(self.api_client, remote_dir, save_dir, parent=self)
+        if not hasattr(self, 'active_folder_walkers'):
+            self.active_folder_walkers = []
+        self.active_folder_walkers.append(walker)
+
+        def _cleanup():
+            try:
+                self.active_folder_walkers.remove(walker)
+            except ValueError:
+                pass
+            walker.deleteLater()
+
+        def _on_found(entries):
+            self.download_manager.enqueue_user_files(entries)
+            self.progress_bar.show()
+
+        def _flush_idle():
+            # 扫描结束时传输已全部完成，则补发本轮汇总
+            if self.download_manager.active_count() == 0 and self.download_manager.pending_count() == 0:
+                if getattr(self, '_download_idle_carry', (0, 0)) != (0, 0):
+                    self._on_download_queue_idle(0, 0)
+
+        def _on_finished(dirs_cnt, files_cnt):
+            _cleanup()
+            self.status_label.setText(f"文件夹扫描完成：{dirs_cnt} 个文件夹，{files_cnt} 个文件已加入下载队列")
+            _flush_idle()
+
+        def _on_failed(err):
+            _cleanup()
+            self.status_label.setText("文件夹扫描失败")
+            QMessageBox.warning(self, "下载", self._friendly_error(str(err), "文件夹下载"))
+            _flush_idle()
+
+        walker.files_found.connect(_on_found)
+        walker.progress.connect(self.status_label.setText)
+        walker.finished.connect(_on_finished)
+        walker.failed.connect(_on_failed)
+        self.status_label.setText(f"正在扫描文件夹：{remote_dir}")
+        walker.start()
+
     def _resolve_user_dlink(self, file_info: dict, expires_hint: int = 300) -> str:
         """多策略获取用户态直链，返回可下载URL或抛出包含详细信息的异常。"""
         try:
@@ -1068,11 +1037,14 @@ class FileManagerUI(QMainWindow):
         except Exception as e:
             raise
 
-    def _proxy_download_to_path(self, fsid=None, save_path: str = None, ttl: int = 300, path: str = None):
+    def _proxy_download_to_path(self, fsid=None, save_path: str = None, ttl: int = 300, path: str = None,
+                                meta: dict = None):
         """通过后端签票 + 代理下载到本地；统一处理403、31045与用户百度token缺失提示。
-        支持断点续传：若已存在同名文件，则从其大小处继续下载。
+        支持断点续传：数据写入 .part，依据断点清单从已完成位置继续下载。
+        meta 为文件条目（size/server_mtime/md5），缺省时从本地元数据库查找，
+        用于判断旧的 .part 是否仍对应远端同一版本文件。
         """
-        import requests
+        file_meta = self._download_meta(fsid, path, meta)
         # 先签票
         def sign_ticket() -> str:
             if not (fsid or path):
@@ -1104,17 +1076,12 @@ class FileManagerUI(QMainWindow):
             base = self.api_client.base_url.rstrip('/')
             url = f"{base}/files/proxy_download?ticket={ticket}"
             headers = {"Authorization": f"Bearer {self.api_client.user_jwt}"}
-            # 断点支持：若文件已部分存在，从已有大小续传
-            resume_from = 0
-            try:
-                import os
-                if os.path.exists(save_path):
-                    resume_from = os.path.getsize(save_path)
-            except Exception:
-                resume_from = 0
+            # 断点支持：依据清单中从0开始的连续完成字节续传
+            manifest = DownloadManifest.open_for(save_path, file_meta)
+            resume_from = manifest.contiguous_prefix() if os.path.exists(manifest.part_path) else 0
             if resume_from > 0:
                 headers['Range'] = f'bytes={resume_from}-'
-            r = requests.get(url, stream=True, timeout=60, headers=headers, proxies={"http": None, "https": None}, allow_redirects=True)
+            r = get_transport().get(url, stream=True, timeout=60, headers=headers, proxies=NO_PROXIES, allow_redirects=True)
             if r.status_code == 403:
                 # 尝试读取JSON体，检查errno 31045
                 errno = None
@@ -1137,12 +1104,23 @@ class FileManagerUI(QMainWindow):
                 except Exception:
                     msg = r.text[:200]
                 raise RuntimeError(f"HTTP {r.status_code}: {msg}")
-            mode = 'ab' if resume_from > 0 else 'wb'
-            with open(save_path, mode) as f:
+            # 服务端忽略 Range 返回 200 时从头写入
+            pos = resume_from if r.status_code == 206 else 0
+            if pos == 0:
+                manifest.reset_ranges()
+            with open(manifest.part_path, 'r+b' if pos > 0 else 'wb') as f:
+                f.seek(pos)
                 for chunk in r.iter_content(chunk_size=256*1024):
                     if chunk:
                         f.write(chunk)
+                        manifest.add_range(pos, pos + len(chunk) - 1)
+                        pos += len(chunk)
+                        f.flush()
+                        manifest.save(force=False)
+            manifest.size = manifest.size or pos
+            manifest.finalize()
         # 流程：签票→下载；若下载报403(31045)或401/403，尝试刷新JWT后重签一次
+        used_jwt = self.api_client.user_jwt
         try:
             t1 = sign_ticket()
             do_download(t1)
@@ -1150,110 +1128,160 @@ class FileManagerUI(QMainWindow):
             msg = str(e)
             if '403' in msg or '401' in msg:
                 # 刷新JWT后重试一次（后端应使用用户token兜底，无服务态）
-                if self.api_client.refresh_token():
+                if self.api_client.refresh_token(used_jwt):
                     t2 = sign_ticket()
                     do_download(t2)
                     return
             # 其余错误直接抛出
             raise
 
-    def _direct_download_to_path(self, fsid=None, save_path: str = None, path: str = None):
-        """直接使用百度网盘API下载文件到本地路径（通过 filemetas 获取 dlink 并按规范下载）。"""
-        import os as _os
-        try:
-            # 1. 获取用户百度token
-            baidu_token = self.api_client.get_user_baidu_token()
-            if not baidu_token or not baidu_token.get('access_token'):
-                raise RuntimeError('无法获取用户百度token，请重新授权')
-            access_token = baidu_token.get('access_token')
-
-            # 2. 获取 dlink（优先使用 fsid 调用 filemetas）
-            if not fsid and not path:
-                raise RuntimeError('缺少fsid/path')
-
-            dlink = None
-            if fsid:
-                # 确保fsid是数字类型
-                try:
-                    fsid_int = int(fsid) if isinstance(fsid, str) else fsid
-                    meta = self.api_client.get_file_metas_with_dlink([fsid_int], access_token)
-                    meta_list = (meta.get('list') if isinstance(meta, dict) else None) or \
-                                ((meta.get('data') or {}).get('list') if isinstance(meta, dict) else None)
-                    if isinstance(meta_list, list) and meta_list:
-                        dlink = meta_list[0].get('dlink')
-                    else:
-                        pass
-                except Exception as e:
-                    # 继续尝试其他方法
-                    pass
+    def _download_meta(self, fsid=None, path: str = None, meta: dict = None) -> dict:
+        """续传清单所需的文件标识：fs_id + size/mtime/md5，调用方未给出的部分从本地元数据库补齐"""
+        file_meta = dict(meta or {})
+        if fsid:
+            file_meta.setdefault('fs_id', fsid)
+        if not all(file_meta.get(k) for k in ('size', 'server_mtime', 'md5')):
+            try:
+                store = self.api_client.metadata_store
+                account = self.api_client.account_key()
+                known = (store.get_by_fsid(account, fsid) if fsid else None) or (store.get(account, path) if path else None)
+                for key, value in (known or {}).items():
+                    if value not in (None, '') and not file_meta.get(key):
+                        file_meta[key] = value
+            except Exception as e:
+                print(f"[DEBUG] 查询下载文件元信息失败: {e}")
+        return file_meta
 
-            if not dlink and path:
-                # 兜底：若只有路径，尝试后端已有能力获取直链
-                alt = self.api_client.user_download_link(path=path, expires_hint=300)
-                if isinstance(alt, dict):
-                    dlink = (alt.get('data') or {}).get('dlink') or alt.get('dlink')
-
-            if not dlink:
-                raise RuntimeError('无法获取dlink')
-
-            # 3. 断点续传位置
-            resume_from = None
-            if save_path and _os.path.exists(save_path):
-                size = _os.path.getsize(save_path)
-                if size > 0:
-                    resume_from = size
-
-            # 4. 异步直链下载（带进度/速率）
-            self.status_label.setText("下载中...")
-            self.progress_bar.value = 0
+    def _direct_download_to_path(self, fsid=None, save_path: str = None, path: str = None, on_finished=None, priority: int = 0):
+        """直接使用百度网盘API下载文件到本地路径（交由下载管理器排队，线程内通过 filemetas 获取 dlink）。
+        on_finished(save_path) 可选，在该任务完成后回调（如预览打开）。
+        """
+        if not fsid and not path:
+            raise RuntimeError('缺少fsid/path')
+        try:
+            task_id = self.download_manager.enqueue_user_file(fsid, save_path, path=path, priority=priority)
+            if on_finished:
+                self._download_callbacks[task_id] = on_finished
+            self.status_label.setText("已加入下载队列")
             self.progress_bar.show()
-
-            self.user_download_worker = DlinkDownloadWorker(
-                api_client=self.api_client,
-                dlink=dlink,
-                access_token=access_token,
-                save_path=save_path,
-                resume_pos=resume_from or 0,
-                parent=self,
-            )
-
-            def _fmt_speed(bps: float) -> str:
-                units = ["B/s", "KB/s", "MB/s", "GB/s"]
-                v = float(bps or 0.0)
-                idx = 0
-                while v >= 1024 and idx < len(units) - 1:
-                    v /= 1024.0
-                    idx += 1
-                return f"{v:.1f} {units[idx]}"
-
-            def _on_progress(percent, downloaded, total, speed):
-                self.progress_bar.value = int(percent)
-                if total > 0:
-                    self.status_label.setText(f"下载中... {percent:.1f}% 速度 {_fmt_speed(speed)}")
-                else:
-                    self.status_label.setText(f"下载中... 速度 {_fmt_speed(speed)}")
-
-            def _on_status(s):
-                self.status_label.setText(s)
-
-            def _on_finished(path_done):
-                self.progress_bar.hide()
-                self.status_label.setText("下载完成")
-                QMessageBox.information(self, "下载", f"已保存到：{path_done}")
-
-            def _on_failed(err):
-                self.progress_bar.hide()
-                self.status_label.setText("下载失败")
-                QMessageBox.warning(self, "下载", f"下载失败：{err}")
-
-            self.user_download_worker.progress.connect(_on_progress)
-            self.user_download_worker.status.connect(_on_status)
-            self.user_download_worker.finished.connect(_on_finished)
-            self.user_download_worker.failed.connect(_on_failed)
-            self.user_download_worker.start()
+            return task_id
         except Exception as e:
             raise RuntimeError(f"直接下载失败: {e}")
-    
+
+    # ---------- 下载管理器 ----------
+    def _init_download_manager(self):
+        """创建全局下载管理器并连接进度/完成信号"""
+        from ui.threads.download_manager import DownloadManager
+        self.download_manager = DownloadManager(self.api_client, parent=self)
+        self._download_callbacks = {}  # task_id -> on_finished(save_path)
+        self._download_last_path = None
+        self._download_last_error = None
+        self.download_manager.task_progress.connect(self._on_download_task_progress)
+        self.download_manager.task_finished.connect(self._on_download_task_finished)
+        self.download_manager.task_failed.connect(self._on_download_task_failed)
+        self.download_manager.queue_idle.connect(self._on_download_queue_idle)
+
+    def _init_listing_loader(self):
+        """创建异步客户端桥接、列表加载器与预取器，并定时计算前台繁忙状态"""
+        # 轻量网络请求走异步客户端：协程在共享事件循环线程上运行，结果回到主线程
+        from ui.threads.async_bridge import AsyncBridge
+        from ui.threads.listing_loader import ListingLoader
+        self.async_bridge = AsyncBridge(self.api_client, parent=self)
+        # 主列表的加载（目录/搜索/公共资源/翻页）：新请求取代旧请求
+        self.listing_loader = ListingLoader(self.async_bridge, parent=self)
+        # 预取：滚动接近底部时的下一页、当前目录中最可能打开的子目录
+        # 预取在计时器/事件循环线程中判断前台是否繁忙：繁忙状态由主线程定时计算后交给它，
+        # 避免在后台线程读取界面对象
+        self._foreground_busy = False
+        self.listing_prefetcher = ListingPrefetcher(self.async_bridge.client, is_busy=lambda: self._foreground_busy)
+        self.busy_probe_timer = QTimer(self)
+        self.busy_probe_timer.setInterval(300)
+        self.busy_probe_timer.timeout.connect(self._update_foreground_busy)
+        self.busy_probe_timer.start()
+
+    @staticmethod
+    def _fmt_speed(bps: float) -> str:
+        units = ["B/s", "KB/s", "MB/s", "GB/s"]
+        v = float(bps or 0.0)
+        idx = 0
+        while v >= 1024 and idx < len(units) - 1:
+            v /= 1024.0
+            idx += 1
+        return f"{v:.1f} {units[idx]}"
+
+    def show_download_queue(self):
+        """打开下载队列（已打开时切到前台）"""
+        from ui.dialogs.download_queue_dialog import DownloadQueueDialog
+        dialog = getattr(self, '_download_queue_dialog', None)
+        if dialog is None:
+            dialog = self._download_queue_dialog = DownloadQueueDialog(self.download_manager, self)
+            dialog.destroyed.connect(lambda *_: setattr(self, '_download_queue_dialog', None))
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+
+    def _download_queue_prefix(self) -> str:
+        active = self.download_manager.active_count()
+        pending = self.download_manager.pending_count()
+        if active + pending > 1:
+            return f"下载中（{active} 个进行中，{pending} 个排队）"
+        return "下载中..."
+
+    def _on_download_task_progress(self, task_id, percent, downloaded, total, speed):
+        task = self.download_manager.get_task(task_id)
+        name = task.name if task else ''
+        self.progress_bar.show()
+        self.progress_bar.value = int(percent)
+        if total > 0:
+            self.status_label.setText(f"{self._download_queue_prefix()} {name} {percent:.1f}% 速度 {self._fmt_speed(speed)}")
+        else:
+            self.status_label.setText(f"{self._download_queue_prefix()} {name} 速度 {self._fmt_speed(speed)}")
+
+    def _on_download_task_finished(self, task_id, save_path):
+        self._download_last_path = save_path
+        task = self.download_manager.get_task(task_id)
+        self.status_label.setText(f"下载完成：{task.name if task else save_path}")
+        callback = self._download_callbacks.pop(task_id, None)
+        if callback:
+            # 带回调的任务（如预览）由回调自行处理，不再弹出保存提示
+            self._download_last_path = None
+            try:
+                callback(save_path)
+            except Exception as e:
+                print(f"[DEBUG] 下载完成回调失败: {e}")
+
+    def _on_download_task_failed(self, task_id, err):
+        self._download_last_error = err
+        self._download_callbacks.pop(task_id, None)
+        task = self.download_manager.get_task(task_id)
+        print(f"[DEBUG] 下载失败: {task.name if task else task_id} - {err}")
+
+    def _on_download_queue_idle(self, done_cnt, failed_cnt):
+        """本轮队列全部结束后汇总提示一次，避免批量下载时逐个弹窗"""
+        carry_done, carry_failed = getattr(self, '_download_idle_carry', (0, 0))
+        done_cnt, failed_cnt = done_cnt + carry_done, failed_cnt + carry_failed
+        if getattr(self, 'active_folder_walkers', None):
+            # 文件夹仍在扫描，传输暂时跟上了扫描进度：累计到扫描结束后再汇总
+            self._download_idle_carry = (done_cnt, failed_cnt)
+            return
+        self._download_idle_carry = (0, 0)
+        self.progress_bar.hide()
+        last_path, last_error = self._download_last_path, self._download_last_error
+        self._download_last_path = self._download_last_error = None
+        if failed_cnt == 0:
+            self.status_label.setText("下载完成")
+            if done_cnt == 1 and last_path:
+                QMessageBox.information(self, "下载", f"已保存到：{last_path}")
+            elif done_cnt > 1:
+                QMessageBox.information(self, "下载", f"已完成 {done_cnt} 个文件的下载")
+            return
+        self.status_label.setText("下载失败" if done_cnt == 0 else "部分下载失败")
+        detail = self._friendly_error(str(last_error or ''), "下载")
+        if done_cnt == 0 and failed_cnt == 1:
+            QMessageBox.warning(self, "下载", detail)
+        else:
+            QMessageBox.warning(self, "下载", f"完成 {done_cnt} 个，失败 {failed_cnt} 个\n{detail}")
+
     def _get_baidu_download_url(self, fsid, access_token: str) -> str:
         """兼容函数：改为通过 filemetas 获取 dlink。"""
         meta = self.api_client.get_file_metas_with_dlink([str(fsid)], access_token)
@@ -1398,6 +1426,69 @@ class FileManagerUI(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "删除异常", str(e))
     
+    def run_bulk_file_op(self, op_name: str, items: list):
+        """用户态：多选的删除/移动/复制/重命名打包为批量请求（后台提交，整批确认一次）"""
+        try:
+            if getattr(self, 'bulk_op_worker', None) and self.bulk_op_worker.isRunning():
+                QMessageBox.warning(self, "批量操作", "已有批量操作在运行，请等待完成后再试")
+                return
+            if not items:
+                return
+            
+            from ui.threads.bulk_op_worker import BulkOperationWorker
+            self.bulk_op_worker = BulkOperationWorker(self.api_client, op_name, items)
+            self._bulk_op_result = None
+            self.bulk_op_worker.op_progress.connect(lambda _op, message: self.status_label.setText(message))
+            self.bulk_op_worker.op_result.connect(self._on_bulk_op_result)
+            self.bulk_op_worker.op_completed.connect(self._on_bulk_op_completed)
+            
+            # 删除/移动：源条目立即从列表中移除，完成后再与服务端同步
+            if op_name in ('delete', 'move'):
+                model = self.file_tree.model()
+                if isinstance(model, FileTableModel):
+                    paths = {item if isinstance(item, str) else item.get('path') for item in items}
+                    rows = [r for r in range(model.total_rows()) if (model.payload(r) or {}).get('path') in paths]
+                    for r in reversed(rows):
+                        model.removeRow(r)
+            
+            self.bulk_op_worker.start()
+            
+        except Exception as e:
+            QMessageBox.critical(self, "批量操作异常", str(e))
+    
+    def _on_bulk_op_result(self, op_name: str, result: dict):
+        """批量操作逐项结果"""
+        self._bulk_op_result = result
+        for item in result.get('failed') or []:
+            print(f"[DEBUG] 批量{op_name}失败: {item.get('path')} - {item.get('error')}")
+    
+    def _on_bulk_op_completed(self, op_name: str, success: bool, message: str):
+        """批量操作完成回调"""
+        print(f"[DEBUG] 批量操作完成: {op_name} - 成功: {success} - {message}")
+        if getattr(self, 'bulk_op_worker', None):
+            if self.bulk_op_worker.isRunning():
+                self.bulk_op_worker.wait(3000)
+            self.bulk_op_worker.deleteLater()
+            self.bulk_op_worker = None
+        
+        # 文件已变化：缓存的搜索结果作废，只同步当前目录的变化
+        self.search_cache.invalidate()
+        QTimer.singleShot(100, self._sync_user_folder)
+        
+        title = "批量操作"
+        failed = (self._bulk_op_result or {}).get('failed') or []
+        if failed:
+            import posixpath
+            details = "\n".join(f"{posixpath.basename(f.get('path') or '')}：{f.get('error')}" for f in failed[:5])
+            if len(failed) > 5:
+                details += f"\n……等 {len(failed)} 项"
+            message = f"{message}\n\n{details}"
+        if success:
+            QMessageBox.information(self, title, message)
+        else:
+            QMessageBox.warning(self, title, message)
+        self.status_label.setText(message.split("\n")[0])
+    
     def _on_delete_started(self, file_path: str):
         """删除开始回调"""
         print(f"[DEBUG] 开始删除: {file_path}")
@@ -1423,9 +1514,9 @@ class FileManagerUI(QMainWindow):
             self.delete_worker.deleteLater()
             delattr(self, 'delete_worker')
         
-        # 刷新文件列表
+        # 只同步当前目录的变化，不重新加载整个列表
         from PySide6.QtCore import QTimer
-        QTimer.singleShot(100, self.load_files)
+        QTimer.singleShot(100, self._sync_user_folder)
         
         # 显示结果消息
         if success:
@@ -1579,6 +1670,7 @@ class FileManagerUI(QMainWindow):
         
         self.search_input = MaterialLineEdit("请输入您要搜索的文件编号或名称...")
         self.search_input.returnPressed.connect(self.search_files)  # 添加回车键支持
+        self.search_input.textChanged.connect(lambda _: self.search_debounce.start())  # 输入停顿后自动搜索
         
         search_btn = MaterialButton("搜索", "search.png")
         search_btn.setFixedWidth(100)  # 设置搜索按钮的宽度为120像素
@@ -1850,6 +1942,9 @@ class FileManagerUI(QMainWindow):
         
         show_action = tray_menu.addAction("显示界面")
         show_action.triggered.connect(self.show)
+
+        queue_action = tray_menu.addAction("下载队列")
+        queue_action.triggered.connect(self.show_download_queue)
         
         tray_menu.addSeparator()
         
@@ -1916,6 +2011,12 @@ class FileManagerUI(QMainWindow):
         dialog = ExitConfirmDialog(self)
         if dialog.exec() == QDialog.Accepted:
             try:
+                # 停止下载线程并保存队列，下次启动继续
+                for walker in list(getattr(self, 'active_folder_walkers', []) or []):
+                    walker.stop()
+                self.download_manager.shutdown()
+                self.listing_prefetcher.close()
+                self.async_bridge.shutdown()
                 # 隐藏托盘图标并退出应用
                 self.tray_icon.hide()
                 QApplication.quit()
@@ -2034,12 +2135,16 @@ class FileManagerUI(QMainWindow):
                 self.status_label.setText("上传中...")
                 def _on_prog(text, done, total):
                     self.status_label.setText(f"{text} ({done}/{total})")
+                def _on_bytes(sent, total):
+                    if total:
+                        self.progress_bar.value = int(sent * 100 / total)
                 def _on_finished(okc, failc, skipc):
                     self.progress_bar.hide()
                     QMessageBox.information(self, "上传", f"成功 {okc} 个，失败 {failc} 个，已存在跳过 {skipc} 个")
                     if okc and not self.in_public:
                         self.load_files()
                 worker.progress.connect(_on_prog)
+                worker.bytes_progress.connect(_on_bytes)
                 def _finish_and_cleanup(okc, failc, skipc):
                     try:
                         _on_finished(okc, failc, skipc)
@@ -2129,12 +2234,16 @@ class FileManagerUI(QMainWindow):
                 self.status_label.setText("上传中...")
                 def _on_prog(text, done, total):
                     self.status_label.setText(f"{text} ({done}/{total})")
+                def _on_bytes(sent, total):
+                    if total:
+                        self.progress_bar.value = int(sent * 100 / total)
                 def _on_finished(okc, failc, skipc):
                     self.progress_bar.hide()
                     QMessageBox.information(self, "上传", f"成功 {okc} 个，失败 {failc} 个，已存在跳过 {skipc} 个")
                     if okc and not self.in_public:
                         self.load_files()
                 worker.progress.connect(_on_prog)
+                worker.bytes_progress.connect(_on_bytes)
                 def _finish_and_cleanup2(okc, failc, skipc):
                     try:
                         _on_finished(okc, failc, skipc)
@@ -2170,9 +2279,14 @@ class FileManagerUI(QMainWindow):
         self.refresh_public_stats()
 
     def refresh_public_stats(self):
-        """拉取文件数据库统计并显示到状态栏"""
+        """拉取文件数据库统计并显示到状态栏（异步请求，不阻塞界面）"""
+        self.async_bridge.submit(self.async_bridge.client.files_stats(), on_success=self._show_public_stats)
+
+    def _show_public_stats(self, stats):
         try:
-            stats = self.api_client.files_stats() or {}
+            stats = stats or {}
+            if not self.in_public:
+                return
             total = stats.get('total_files') or stats.get('total_count') or stats.get('total') or ''
             total_size = stats.get('total_size') or ''
             # 类别统计取前两项
@@ -2204,27 +2318,31 @@ class FileManagerUI(QMainWindow):
             pass
 
     def load_public_resources(self, keyword: str = None, load_more: bool = False):
-        """加载公共资源文件列表（滚动加载）"""
+        """加载公共资源文件列表（滚动加载，后台请求）"""
         if self.public_loading:
             return
         self.public_loading = True
-        try:
-            # 处理搜索模式与页码
-            if keyword is not None:
-                self.public_search_mode = True
-                self.public_search_keyword = keyword
-            page = self.public_page if load_more else 1
-            files = []
-            result = None
-            if self.public_search_mode and self.public_search_keyword:
-                # 使用 /files/list + file_path 以支持分页（保持远端仓库逻辑）
-                result = self.api_client.files_list(
-                    page=page,
-                    page_size=self.public_page_size,
-                    file_path=self.public_search_keyword
-                )
-            else:
-                result = self.api_client.files_list(page=page, page_size=self.public_page_size)
+        # 处理搜索模式与页码
+        if keyword is not None:
+            self.public_search_mode = True
+            self.public_search_keyword = keyword
+        page = self.public_page if load_more else 1
+        searching = bool(self.public_search_mode and self.public_search_keyword)
+        keyword_text = self.public_search_keyword
+        token = self.mode_token
+        if searching:
+            # 使用 /files/list + file_path 以支持分页（保持远端仓库逻辑）
+            coro = self.async_bridge.client.files_list(
+                page=page, page_size=self.public_page_size, file_path=self.public_search_keyword, cached=True)
+        else:
+            coro = self.async_bridge.client.files_list(page=page, page_size=self.public_page_size, cached=True)
+        total = ''
+
+        def _on_result(result):
+            nonlocal total
+            self.public_loading = False
+            if token != self.mode_token or self.current_mode != "public":
+                return None
             if isinstance(result, dict):
                 files = result.get('files') or (result.get('data') or {}).get('files') or (result.get('data') or {}).get('items') or []
                 has_next = result.get('has_next')
@@ -2235,14 +2353,22 @@ class FileManagerUI(QMainWindow):
             else:
                 files = result or []
                 self.public_has_more = len(files) >= self.public_page_size
-                total = ''
-            # 显示
-            self.display_public_files(files, append=load_more)
             # 翻页
             if self.public_has_more:
                 self.public_page = page + 1
+            if searching:
+                if page == 1:
+                    self.search_cache.put(("public",), keyword_text, files, complete=not self.public_has_more)
+                else:
+                    self.search_cache.extend(("public",), keyword_text, files, complete=not self.public_has_more)
+            return files
+
+        def _on_rows(rows, first, last):
+            self.display_public_files(rows, append=load_more or not first)
+            if not last:
+                return
             # 状态栏
-            if self.public_search_mode and self.public_search_keyword:
+            if searching:
                 total_text = f"共 {total} 条" if total != '' else ""
                 page_text = f"当前第 {page} 页"
                 if total_text:
@@ -2251,117 +2377,33 @@ class FileManagerUI(QMainWindow):
                     self.status_label.setText(f"公共资源-搜索 '{self.public_search_keyword}'：{page_text}")
             else:
                 self.refresh_public_stats()
-        except Exception as e:
-            self.status_label.setText(f"公共资源加载失败：{e}")
-        finally:
+
+        def _on_error(error):
             self.public_loading = False
+            if token == self.mode_token:
+                self.status_label.setText(f"公共资源加载失败：{error}")
+
+        self.listing_loader.load("main", coro, on_result=_on_result, on_rows=_on_rows, on_error=_on_error)
 
     def display_public_files(self, files, append: bool = False):
         """在主列表控件内显示公共资源列表，支持追加"""
-        from PySide6.QtGui import QStandardItem, QStandardItemModel
-        from PySide6.QtCore import Qt
-        from PySide6.QtWidgets import QHeaderView
-        from PySide6.QtGui import QColor, QBrush
         try:
-            if not append:
-                model = QStandardItemModel()
-                model.setHorizontalHeaderLabels(["文件名称", "大小", "类别", "创建时间", "阅读", "下载", "分享", "举报"])
-                self.file_tree.setModel(model)
-                # 表头对齐
-                try:
-                    from PySide6.QtCore import Qt
-                    model.horizontalHeaderItem(0).setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                    for col in range(1, 8):
-                        item = model.horizontalHeaderItem(col)
-                        if item:
-                            item.setTextAlignment(Qt.AlignCenter)
-                except Exception:
-                    pass
-                # 初始化一次交互（避免重复连接导致需点两次）
-                if not self.public_ui_inited:
-                    self.file_tree.clicked.connect(self.on_public_cell_clicked)
-                    self.file_tree.setMouseTracking(True)
-                    self.file_tree.viewport().installEventFilter(self)
-                    self.file_tree.setItemDelegateForColumn(4, ActionCellDelegate(self.file_tree, text_color="#333333"))
-                    self.file_tree.setItemDelegateForColumn(5, ActionCellDelegate(self.file_tree, text_color="#2E86AB"))
-                    self.file_tree.setItemDelegateForColumn(6, ActionCellDelegate(self.file_tree, text_color="#FF9F43"))
-                    self.file_tree.setItemDelegateForColumn(7, ActionCellDelegate(self.file_tree, text_color="#E74C3C"))
-                    self.public_ui_inited = True
+            model = self._ensure_file_model()
+            if not append or model.mode != "public":
+                model.set_rows("public", files, self.mode_token)
+                model.set_pager(self._can_load_more_rows, self._load_more_rows)
             else:
-                model = self.file_tree.model()
-                if model is None:
-                    model = QStandardItemModel()
-                    model.setHorizontalHeaderLabels(["文件名称", "大小", "类别", "创建时间", "阅读", "下载", "分享", "举报"])
-                    self.file_tree.setModel(model)
-                    try:
-                        from PySide6.QtCore import Qt
-                        model.horizontalHeaderItem(0).setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                        for col in range(1, 8):
-                            item = model.horizontalHeaderItem(col)
-                            if item:
-                                item.setTextAlignment(Qt.AlignCenter)
-                    except Exception:
-                        pass
-                    if not self.public_ui_inited:
-                        self.file_tree.setMouseTracking(True)
-                        self.file_tree.viewport().installEventFilter(self)
-                        self.file_tree.setItemDelegateForColumn(4, ActionCellDelegate(self.file_tree, text_color="#333333"))
-                        self.file_tree.setItemDelegateForColumn(5, ActionCellDelegate(self.file_tree, text_color="#2E86AB"))
-                        self.file_tree.setItemDelegateForColumn(6, ActionCellDelegate(self.file_tree, text_color="#FF9F43"))
-                        self.file_tree.setItemDelegateForColumn(7, ActionCellDelegate(self.file_tree, text_color="#E74C3C"))
-                        self.file_tree.clicked.connect(self.on_public_cell_clicked)
-                        self.public_ui_inited = True
-            for f in files:
-                name = f.get('file_name') or f.get('server_filename') or f.get('name') or ''
-                size = f.get('file_size') or f.get('size') or 0
-                category = f.get('category') or f.get('category_id') or f.get('type') or ''
-                ctime = f.get('create_time') or f.get('ctime') or 0
-                fs_id = f.get('fs_id') or f.get('fsid') or f.get('id')  # 需要fs_id用于分享
-                try:
-                    if isinstance(ctime, (int, float)):
-                        ctime_str = datetime.fromtimestamp(float(ctime)).strftime('%Y-%m-%d %H:%M')
-                    else:
-                        ctime_str = str(ctime)
-                except Exception:
-                    ctime_str = "-"
-                name_item = QStandardItem(str(name))
-                # 统一的数据结构，包含模式标记和完整上下文
-                payload = {
-                    "mode": "public",
-                    "fsid": fs_id,
-                    "path": f.get('file_path') or f.get('path') or '',
-                    "raw": f,
-                    "token": self.mode_token  # 当前模式版本号
-                }
-                name_item.setData(payload, Qt.UserRole)
-                size_item = QStandardItem(self.format_size(float(size)))
-                cat_item = QStandardItem(self.map_category_to_type(int(category)) if str(category).isdigit() else str(category))
-                ctime_item = QStandardItem(ctime_str)
-                read_item = QStandardItem("阅读")
-                download_item = QStandardItem("下载")
-                share_item = QStandardItem("分享")
-                report_item = QStandardItem("举报")
-                # 对齐：除文件名称外其它列居中
-                for it in (size_item, cat_item, ctime_item, read_item, download_item, share_item, report_item):
-                    it.setTextAlignment(Qt.AlignCenter)
-                # 设置列文字颜色
-                read_item.setForeground(QBrush(QColor("#333333")))     # 深灰
-                download_item.setForeground(QBrush(QColor("#2E86AB"))) # 中蓝
-                share_item.setForeground(QBrush(QColor("#FF9F43")))    # 浅橙
-                report_item.setForeground(QBrush(QColor("#E74C3C")))   # 淡红
-                model.appendRow([name_item, size_item, cat_item, ctime_item, read_item, download_item, share_item, report_item])
-            # 固定列宽
-            try:
-                self.file_tree.setColumnWidth(0, 480)
-                self.file_tree.setColumnWidth(1, 100)
-                self.file_tree.setColumnWidth(2, 80)
-                self.file_tree.setColumnWidth(3, 150)
-                self.file_tree.setColumnWidth(4, 60)
-                self.file_tree.setColumnWidth(5, 60)
-                self.file_tree.setColumnWidth(6, 60)
-                self.file_tree.setColumnWidth(7, 60)
-            except Exception:
-                pass
+                model.append_rows(files)
+            # 初始化一次交互（避免重复连接导致需点两次）
+            if not self.public_ui_inited:
+                self.file_tree.clicked.connect(self.on_public_cell_clicked)
+                self.file_tree.setMouseTracking(True)
+                self.file_tree.viewport().installEventFilter(self)
+                for col, color in enumerate(model.ACTION_COLORS, start=model.ACTION_FIRST_COLUMN):
+                    self.file_tree.setItemDelegateForColumn(col, ActionCellDelegate(self.file_tree, text_color=color))
+                self.public_ui_inited = True
+            if not append:
+                self._set_file_column_widths()
         except Exception as e:
             QMessageBox.warning(self, "公共资源", f"显示失败：{e}")
 
@@ -2393,8 +2435,7 @@ class FileManagerUI(QMainWindow):
             row = index.row()
             col = index.column()
             model = self.file_tree.model()
-            name_item = model.item(row, 0)
-            payload = name_item.data(Qt.UserRole) if name_item else {}
+            payload = model.index(row, 0).data(Qt.UserRole) if model is not None else {}
             
             # 验证模式标记和版本号
             if not self._validate_payload_mode(payload, "public"):
@@ -2422,101 +2463,31 @@ class FileManagerUI(QMainWindow):
                     if not items:
                         raise RuntimeError('未获取到直链元信息')
                     return items[0]
-                def _get_ticket():
-                    # 优先 fsid，失败或空票据时，若存在 path 则回退用 path 再试一次
-                    def _extract_ticket(resp_dict):
-                        data1 = resp_dict.get('ticket')
-                        data2 = (resp_dict.get('data') or {}).get('ticket')
-                        data3 = ((resp_dict.get('data') or {}).get('data') or {}).get('ticket')
-                        return data1 or data2 or data3
-                    # 尝试 fsid
-                    t = self.api_client.public_download_ticket(fsid=fs_id, ttl=300) if fs_id else None
-                    if isinstance(t, dict):
-                        try:
-                            print(f"[DEBUG][READ] sign fsid status={t.get('status')} raw={t}")
-                        except Exception:
-                            pass
-                    if isinstance(t, dict) and str(t.get('status')).lower() == 'ok':
-                        tk = _extract_ticket(t)
-                        if tk:
-                            try:
-                                print(f"[DEBUG][READ] ticket(from fsid)={tk[:32]}...")
-                            except Exception:
-                                pass
-                            return tk
-                    # 回退 path
-                    p = payload.get('file_path') or payload.get('path')
-                    if p:
-                        t2 = self.api_client.public_download_ticket(path=p, ttl=300)
-                        if isinstance(t2, dict):
-                            try:
-                                print(f"[DEBUG][READ] sign path status={t2.get('status')} raw={t2}")
-                            except Exception:
-                                pass
-                        if isinstance(t2, dict) and str(t2.get('status')).lower() == 'ok':
-                            tk2 = _extract_ticket(t2)
-                            if tk2:
-                                try:
-                                    print(f"[DEBUG][READ] ticket(from path)={tk2[:32]}...  path={p}")
-                                except Exception:
-                                    pass
-                                return tk2
-                        err2 = (t2.get('data') or {}).get('errmsg') or t2.get('error') if isinstance(t2, dict) else None
-                        raise RuntimeError(err2 or '票据获取失败')
-                    err = (t.get('data') or {}).get('errmsg') or t.get('error') if isinstance(t, dict) else None
-                    raise RuntimeError(err or '票据获取失败')
+                def _open_local(path):
+                    self.status_label.setText("阅读：打开中...")
+                    try:
+                        QDesktopServices.openUrl(QUrl.fromLocalFile(path))
+                        self.status_label.setText("阅读：已打开")
+                    except Exception as e:
+                        self.status_label.setText(f"阅读失败：{e}")
+                        QMessageBox.warning(self, "阅读", f"打开失败：{e}")
                 try:
                     self.status_label.setText("阅读：准备中...")
                     meta = _get_meta()
                     real_name = meta.get('filename') or meta.get('server_filename') or (payload.get('file_name') or 'preview.bin')
-                    # 保存到临时目录
-                    tmp_dir = tempfile.gettempdir()
-                    base = self.api_client.base_url.rstrip('/')
-                    save_path = os.path.join(tmp_dir, real_name)
-                    tmp_path = save_path + '.part'
-                    size_expect = meta.get('size')
-                    ticket = _get_ticket()
-                    try:
-                        print(f"[DEBUG][READ] final ticket={ticket[:48]}...  jwt_present={bool(app_jwt)}")
-                    except Exception:
-                        pass
-                    app_jwt = getattr(self.api_client, 'user_jwt', None)
-                    # 启动下载线程
+                    # 保存到临时目录；阅读任务插队优先，下载完成后用系统默认程序打开
+                    save_path = os.path.join(tempfile.gettempdir(), real_name)
+                    task_id = self.download_manager.enqueue_public_file(
+                        fs_id,
+                        save_path,
+                        path=payload.get('file_path') or payload.get('path'),
+                        name=real_name,
+                        meta=meta,
+                        priority=10,
+                    )
+                    self._download_callbacks[task_id] = _open_local
                     self.progress_bar.show()
                     self.status_label.setText("阅读：下载中...")
-                    self.download_worker = ProxyDownloadWorker(
-                        base_url=base,
-                        ticket=ticket,
-                        save_path=save_path,
-                        tmp_path=tmp_path,
-                        size_expect=size_expect,
-                        app_jwt=app_jwt,
-                        resume_pos=0,
-                        mode_token=self.mode_token,
-                        parent=self
-                    )
-                    def _on_finished(path):
-                        self.progress_bar.hide()
-                        self.status_label.setText("阅读：打开中...")
-                        try:
-                            QDesktopServices.openUrl(QUrl.fromLocalFile(path))
-                            self.status_label.setText("阅读：已打开")
-                        except Exception as e:
-                            self.status_label.setText(f"阅读失败：{e}")
-                            QMessageBox.warning(self, "阅读", f"打开失败：{e}")
-                    def _on_failed(err):
-                        self.progress_bar.hide()
-                        # 限额友好提示
-                        msg = str(err)
-                        if '429' in msg or 'daily_quota_exceeded' in msg:
-                            self.status_label.setText("阅读失败：今日额度已用尽")
-                            QMessageBox.information(self, "阅读", "今日总额度已用尽，请明日再试或升级会员。")
-                        else:
-                            self.status_label.setText("阅读失败")
-                            QMessageBox.warning(self, "阅读", f"下载失败：{err}")
-                    self.download_worker.finished.connect(_on_finished)
-                    self.download_worker.failed.connect(lambda e: _on_failed(e))
-                    self.download_worker.start()
                 except Exception as e:
                     self.progress_bar.hide()
                     msg = self._friendly_error(str(e), "阅读")
@@ -2533,9 +2504,6 @@ class FileManagerUI(QMainWindow):
                 if not fs_id and not (payload.get('file_path') or payload.get('path')):
                     QMessageBox.warning(self, "下载", "无法获取fs_id")
                     return
-                if self.public_downloading:
-                    QMessageBox.information(self, "下载", "当前已有下载进行中，请稍候…")
-                    return
                 save_dir = QFileDialog.getExistingDirectory(self, "选择保存目录")
                 if not save_dir:
                     return
@@ -2548,117 +2516,21 @@ class FileManagerUI(QMainWindow):
                     if not items:
                         raise RuntimeError('未获取到直链元信息')
                     return items[0]
-                def _get_ticket():
-                    # 优先 fsid，失败或空票据时，若存在 path 则回退用 path 再试一次
-                    def _extract_ticket(resp_dict):
-                        data1 = resp_dict.get('ticket')
-                        data2 = (resp_dict.get('data') or {}).get('ticket')
-                        data3 = ((resp_dict.get('data') or {}).get('data') or {}).get('ticket')
-                        return data1 or data2 or data3
-                    t = self.api_client.public_download_ticket(fsid=fs_id, ttl=300) if fs_id else None
-                    if isinstance(t, dict):
-                        try:
-                            print(f"[DEBUG][DL] sign fsid status={t.get('status')} raw={t}")
-                        except Exception:
-                            pass
-                    if isinstance(t, dict) and str(t.get('status')).lower() == 'ok':
-                        tk = _extract_ticket(t)
-                        if tk:
-                            return tk
-                    p = payload.get('file_path') or payload.get('path')
-                    if p:
-                        t2 = self.api_client.public_download_ticket(path=p, ttl=300)
-                        if isinstance(t2, dict):
-                            try:
-                                print(f"[DEBUG][DL] sign path status={t2.get('status')} raw={t2}")
-                            except Exception:
-                                pass
-                        if isinstance(t2, dict) and str(t2.get('status')).lower() == 'ok':
-                            tk2 = _extract_ticket(t2)
-                            if tk2:
-                                return tk2
-                        err2 = (t2.get('data') or {}).get('errmsg') or t2.get('error') if isinstance(t2, dict) else None
-                        raise RuntimeError(err2 or '票据获取失败')
-                    err = (t.get('data') or {}).get('errmsg') or t.get('error') if isinstance(t, dict) else None
-                    raise RuntimeError(err or '票据获取失败')
                 try:
-                    self.public_downloading = True
                     meta = _get_meta()
                     real_name = meta.get('filename') or meta.get('server_filename') or (payload.get('file_name') or 'download.bin')
-                    size_expect = meta.get('size')
-                    ticket = _get_ticket()
-                    base = self.api_client.base_url.rstrip('/')
                     save_path = os.path.join(save_dir, real_name)
-                    tmp_path = save_path + '.part'
-                    resume_pos = os.path.getsize(tmp_path) if os.path.exists(tmp_path) else 0
-
-                    # 启动下载线程
-                    self.status_label.setText("下载中...")
-                    self.progress_bar.show()
-                    app_jwt = getattr(self.api_client, 'user_jwt', None)
-                    self.download_worker = ProxyDownloadWorker(
-                        base_url=base,
-                        ticket=ticket,
-                        save_path=save_path,
-                        tmp_path=tmp_path,
-                        size_expect=size_expect,
-                        app_jwt=app_jwt,
-                        resume_pos=resume_pos,
-                        mode_token=self.mode_token,
-                        parent=self
+                    # 交由下载管理器排队：线程内签票（失败时回退 path、401/403 自动换票），按清单断点续传
+                    self.download_manager.enqueue_public_file(
+                        fs_id,
+                        save_path,
+                        path=payload.get('file_path') or payload.get('path'),
+                        name=real_name,
+                        meta=meta,
                     )
-                    def _on_progress(p):
-                        self.status_label.setText(f"下载中... {p:.1f}%")
-                    def _on_status(s):
-                        self.status_label.setText(s)
-                    def _on_finished(path):
-                        self.progress_bar.hide()
-                        self.public_downloading = False
-                        self.status_label.setText("下载完成")
-                        QMessageBox.information(self, "下载", f"已保存到: {path}")
-                    def _on_failed(err):
-                        # 如果是401/403由线程上报，这里尝试换票一次并重启线程
-                        msg = str(err)
-                        if any(x in msg for x in ('HTTP 401', 'HTTP 403')):
-                            try:
-                                new_ticket = _get_ticket()
-                                self.download_worker = ProxyDownloadWorker(
-                                    base_url=base,
-                                    ticket=new_ticket,
-                                    save_path=save_path,
-                                    tmp_path=tmp_path,
-                                    size_expect=size_expect,
-                                    app_jwt=app_jwt,
-                                    resume_pos=os.path.getsize(tmp_path) if os.path.exists(tmp_path) else resume_pos,
-                                    mode_token=self.mode_token,
-                                    parent=self
-                                )
-                                self.download_worker.progress.connect(_on_progress)
-                                self.download_worker.status.connect(_on_status)
-                                self.download_worker.finished.connect(_on_finished)
-                                self.download_worker.failed.connect(lambda e: _on_failed(e))
-                                self.download_worker.start()
-                                return
-                            except Exception:
-                                pass
-                        self.progress_bar.hide()
-                        self.public_downloading = False
-                        # 限额友好提示
-                        if '429' in msg or 'daily_quota_exceeded' in msg:
-                            self.status_label.setText("下载失败：今日额度已用尽")
-                            QMessageBox.information(self, "下载", "今日总额度已用尽，请明日再试或升级会员。")
-                        else:
-                            self.status_label.setText("下载失败")
-                            QMessageBox.warning(self, "下载", f"下载失败：{err}")
-
-                    self.download_worker.progress.connect(_on_progress)
-                    self.download_worker.status.connect(_on_status)
-                    self.download_worker.finished.connect(_on_finished)
-                    self.download_worker.failed.connect(lambda e: _on_failed(e))
-                    self.download_worker.start()
+                    self.status_label.setText("已加入下载队列")
+                    self.progress_bar.show()
                 except Exception as e:
-                    self.progress_bar.hide()
-                    self.public_downloading = False
                     msg = self._friendly_error(str(e), "下载")
                     self.status_label.setText("下载失败")
                     QMessageBox.information(self, "下载", msg)
@@ -2747,32 +2619,65 @@ class FileManagerUI(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "操作", f"失败：{e}")
     
-    def search_files(self):
-        """搜索文件"""
+    def _search_scope(self):
+        """搜索结果缓存的范围：公共资源，或用户态的（账号, 搜索目录）"""
+        if self.current_mode == "public":
+            return ("public",)
+        return ("user", self.api_client.account_key(), self.user_search_dir)
+
+    def search_files(self, checked: bool = False, incremental: bool = False):
+        """搜索文件
+
+        incremental 为 True 表示输入停顿后自动触发的搜索：不弹出登录/错误对话框，
+        查询与当前结果相同时不重复请求；命中结果缓存时不访问服务端。
+        """
+        self.search_debounce.stop()
         search_text = self.search_input.text().strip()
-        print(f"[DEBUG] search_files mode={self.current_mode} in_public={self.in_public}")
+        print(f"[DEBUG] search_files mode={self.current_mode} in_public={self.in_public} incremental={incremental}")
         if not search_text:
             # 清空搜索框时重置搜索状态
-            if self.user_search_mode:
+            if self.current_mode == "public" and self.public_search_mode:
+                self.public_search_mode = False
+                self.public_search_keyword = ""
+                self.public_page = 1
+                self.public_has_more = True
+                self.public_loading = False
+                self.load_public_resources(load_more=False)
+            elif self.user_search_mode:
                 self.user_search_mode = False
                 self.load_files()  # 重新加载文件列表
             return
         
         if self.current_mode == "public":
+            if incremental and self.public_search_mode and self.public_search_keyword == search_text:
+                return
             # 公共资源搜索：清空并分页加载
-            self.status_label.setText("公共资源：搜索中...")
             self.public_page = 1
             self.public_has_more = True
             self.public_loading = False
             self.public_search_mode = True
             self.public_search_keyword = search_text
+            cached = self.search_cache.lookup(self._search_scope(), search_text)
+            if cached is not None:
+                # 缓存命中：取消在途的旧查询，直接显示
+                self.listing_loader.cancel("main")
+                files, complete = cached
+                self.public_has_more = not complete
+                self.public_page = len(files) // self.public_page_size + 1
+                self.display_public_files(files, append=False)
+                total_text = f"共 {len(files)} 条" if complete else f"已加载 {len(files)} 条"
+                self.status_label.setText(f"公共资源-搜索 '{search_text}'：{total_text}")
+                return
+            self.status_label.setText("公共资源：搜索中...")
             self.display_public_files([], append=False)
             self.load_public_resources(keyword=search_text, load_more=False)
-            self.search_input.setText("")
             return
         
         # 用户态搜索
         if not self.api_client.is_logged_in():
+            if incremental:
+                self.status_label.setText("搜索文件需要先登录")
+                return
             reply = QMessageBox.question(
                 self, 
                 "需要登录", 
@@ -2783,53 +2688,89 @@ class FileManagerUI(QMainWindow):
             if reply == QMessageBox.Yes:
                 self.show_my_info()
             return
+
+        search_dir = self.user_search_dir if self.user_search_mode else (self.current_folder or "/")
+        if (incremental and self.user_search_mode and self.user_search_keyword == search_text
+                and self.user_search_dir == search_dir):
+            return
         
         # 初始化用户态搜索状态
         self.user_search_mode = True
         self.user_search_keyword = search_text
-        self.user_search_dir = self.current_folder or "/"
+        self.user_search_dir = search_dir
         self.user_search_page = 1
         self.user_search_has_more = True
+        token = self.mode_token
+        scope = self._search_scope()
+
+        cached = self.search_cache.lookup(scope, search_text)
+        if cached is not None:
+            # 缓存命中（同一查询，或由更短查询的完整结果过滤得到）：取消在途的旧查询
+            self.listing_loader.cancel("main")
+            self.is_loading = False
+            files, complete = cached
+            self.user_search_has_more = not complete
+            self.user_search_page = max(1, len(files) // self.user_search_page_size)
+            self.display_user_files(files, append=False)
+            self.status_label.setText(f"找到 {len(files)} 个结果")
+            return
         
         self.is_loading = True
         self.status_label.setText("正在搜索...")
-        
-        # 调用搜索API
-        result = self.api_client.search_filename(
-            key=search_text, 
-            dir_path=self.user_search_dir, 
-            page=self.user_search_page, 
-            num=self.user_search_page_size, 
-            recursion=True
-        )
-        
-        # 调试信息：打印响应结构
-        if result:
-            print(f"[DEBUG] search_files response status: {result.get('status')}")
-            print(f"[DEBUG] search_files response data keys: {list(result.get('data', {}).keys()) if result.get('data') else 'None'}")
-        
-        # 兼容多种status格式
-        status = result.get("status", "").lower() if result else ""
-        if result and status in ["ok", "success"]:
-            data = result.get("data", {})
+
+        # 本地索引已建立时先显示本地匹配结果，服务端结果返回后替换
+        name_index = self.api_client.name_index
+        if name_index.is_loaded(self.api_client.account_key()):
+            try:
+                local = self.api_client.local_search(search_text, limit=self.user_search_page_size,
+                                                     under=self.user_search_dir)
+                self.display_user_files(local, append=False)
+                self.status_label.setText(f"本地匹配 {len(local)} 项，正在搜索服务端...")
+            except Exception as e:
+                print(f"[DEBUG] 本地搜索失败: {e}")
+        else:
+            name_index.preload(self.api_client.account_key())
+
+        def _on_result(result):
+            self.is_loading = False
+            if token != self.mode_token or not self.user_search_mode or self.user_search_keyword != search_text:
+                return None
+            # 兼容多种status格式
+            status = str(result.get("status", "")).lower() if isinstance(result, dict) else ""
+            if status not in ("ok", "success"):
+                error_msg = result.get("error", "搜索失败") if isinstance(result, dict) else "网络连接失败"
+                self.status_label.setText(f"搜索失败: {error_msg}")
+                if not incremental:
+                    QMessageBox.critical(self, "错误", f"搜索失败: {error_msg}")
+                return None
+            data = result.get("data") if isinstance(result.get("data"), dict) else {}
             # 放宽结果解析，支持多种字段名
-            files = data.get("list") or data.get("files") or result.get("files") or []
+            files = self._listing_files(result) or []
             print(f"[DEBUG] search_files found {len(files)} files")
-            self.display_user_files(files, append=False)
-            
             # 计算是否有更多结果，兼容多种has_next格式
             has_next = bool(data.get("has_next")) if "has_next" in data else len(files) >= self.user_search_page_size
             if not has_next and len(files) < self.user_search_page_size:
                 self.user_search_has_more = False
-            
+            self.search_cache.put(scope, search_text, files, complete=not self.user_search_has_more)
             self.status_label.setText(f"找到 {len(files)} 个结果（第 {self.user_search_page} 页）")
-        else:
-            error_msg = result.get("error", "搜索失败") if result else "网络连接失败"
-            self.status_label.setText(f"搜索失败: {error_msg}")
-            QMessageBox.critical(self, "错误", f"搜索失败: {error_msg}")
-        
-        self.is_loading = False
-        self.search_input.setText("")
+            return files
+
+        def _on_error(error):
+            self.is_loading = False
+            if token == self.mode_token:
+                self.status_label.setText(f"搜索失败: {error}")
+                if not incremental:
+                    QMessageBox.critical(self, "错误", f"搜索失败: {error}")
+
+        # 调用搜索API（取代同一通道上未完成的上一次查询）
+        self.listing_loader.load(
+            "main",
+            self.async_bridge.client.search_filename(
+                key=search_text, dir_path=self.user_search_dir, page=self.user_search_page,
+                num=self.user_search_page_size, recursion=True),
+            on_result=_on_result,
+            on_rows=lambda rows, first, last: self.display_user_files(rows, append=not first),
+            on_error=_on_error)
     
     def show_my_info(self):
         """显示用户信息对话框"""
@@ -2930,25 +2871,33 @@ class FileManagerUI(QMainWindow):
                 fs_id = row_data['fsid']
 
                 # 文件/文件夹上的完整菜单
+                selected_rows = self._selected_user_rows()
+                selected_count = len(selected_rows)
                 act_open = menu.addAction("打开")
+                act_download = menu.addAction(f"下载选中的 {selected_count} 项" if selected_count > 1 else "下载")
                 act_refresh = menu.addAction("刷新")
                 menu.addSeparator()
                 act_share = menu.addAction("分享")
                 menu.addSeparator()
                 act_new_folder = menu.addAction("新建文件夹")
                 act_rename = menu.addAction("重命名")
-                act_move = menu.addAction("移动到...")
-                act_copy = menu.addAction("复制到...")
-                act_delete = menu.addAction("删除")
+                act_move = menu.addAction(f"移动选中的 {selected_count} 项到..." if selected_count > 1 else "移动到...")
+                act_copy = menu.addAction(f"复制选中的 {selected_count} 项到..." if selected_count > 1 else "复制到...")
+                act_delete = menu.addAction(f"删除选中的 {selected_count} 项" if selected_count > 1 else "删除")
                 menu.addSeparator()
                 act_upload_local = menu.addAction("上传本地文件...")
                 act_upload_text = menu.addAction("上传文本...")
                 act_upload_url = menu.addAction("通过URL上传...")
+                menu.addSeparator()
+                act_download_queue = menu.addAction("下载队列...")
 
                 global_pos = self.file_tree.viewport().mapToGlobal(position)
                 action = menu.exec(global_pos)
                 if action is None:
                     return
+                if action == act_download_queue:
+                    self.show_download_queue()
+                    return
 
                 if action == act_open:
                     # 复用现有的打开/预览逻辑
@@ -2963,6 +2912,12 @@ class FileManagerUI(QMainWindow):
                         # 文件：预览
                         self.open_file_preview(file_raw)
                     return
+                if action == act_download:
+                    if selected_count > 1:
+                        self.download_selected_files()
+                    else:
+                        self.download_user_file(row_data['file'])
+                    return
                 if action == act_refresh:
                     self.refresh_user_files()
                     return
@@ -3013,6 +2968,11 @@ class FileManagerUI(QMainWindow):
                             if target_path == self.current_folder:
                                 QMessageBox.warning(self, "移动", "不能选择当前目录作为目标")
                                 return
+                            if selected_count > 1:
+                                # 多选：打包为一个批量请求
+                                self.run_bulk_file_op('move', [{"path": r['path'], "dest": target_path, "fs_id": r['fsid']}
+                                                               for r in selected_rows if r['path']])
+                                return
                             resp = self.api_client.move_file(row_data['path'], target_path)
                             self._show_result_msg(resp, "移动")
                             # 延迟刷新，避免异步操作未完成
@@ -3042,12 +3002,22 @@ class FileManagerUI(QMainWindow):
                             if target_path == self.current_folder:
                                 QMessageBox.warning(self, "复制", "不能选择当前目录作为目标")
                                 return
+                            if selected_count > 1:
+                                self.run_bulk_file_op('copy', [{"path": r['path'], "dest": target_path, "fs_id": r['fsid']}
+                                                               for r in selected_rows if r['path']])
+                                return
                             resp = self.api_client.copy_file(row_data['path'], target_path)
                             self._show_result_msg(resp, "复制")
                             # 延迟刷新，避免异步操作未完成
                             QTimer.singleShot(800, self.refresh_user_files)
                     return
                 if action == act_delete:
+                    if selected_count > 1:
+                        if QMessageBox.question(self, "删除", f"确定要删除选中的 {selected_count} 项吗？",
+                                                QMessageBox.Yes | QMessageBox.No, QMessageBox.No) == QMessageBox.Yes:
+                            self.run_bulk_file_op('delete', [{"path": r['path'], "fs_id": r['fsid']}
+                                                             for r in selected_rows if r['path']])
+                        return
                     file_raw = row_data['file']
                     self.delete_user_item(file_raw, row)
                     return
@@ -3130,11 +3100,16 @@ class FileManagerUI(QMainWindow):
                 act_upload_local = menu.addAction("上传本地文件...")
                 act_upload_text = menu.addAction("上传文本...")
                 act_upload_url = menu.addAction("通过URL上传...")
+                menu.addSeparator()
+                act_download_queue = menu.addAction("下载队列...")
 
                 global_pos = self.file_tree.viewport().mapToGlobal(position)
                 action = menu.exec(global_pos)
                 if action is None:
                     return
+                if action == act_download_queue:
+                    self.show_download_queue()
+                    return
 
                 if action == act_refresh:
                     self.refresh_user_files()
@@ -3461,14 +3436,20 @@ class FileManagerUI(QMainWindow):
 
     def refresh_user_files(self):
         """刷新用户态当前目录文件列表。"""
-        # 重置用户态搜索状态
+        was_search = self.user_search_mode
+        # 重置用户态搜索状态；文件可能已变化，缓存的搜索结果作废
         self.user_search_mode = False
+        self.search_cache.invalidate()
         
         try:
             if not self.api_client.is_logged_in():
                 QMessageBox.information(self, "刷新", "请先登录")
                 return
-            result = self.api_client.list_files(self.current_folder or '/', limit=1000)
+            if not was_search and self.current_mode == "user" and self.file_tree.model() is not None:
+                # 正在显示该目录：重新列出后只把变化应用到表格
+                self._sync_user_folder(force=True)
+                return
+            result = self.api_client.list_files(self.current_folder or '/', limit=1000, use_cache=False)
             files = []
             if isinstance(result, dict):
                 data = result.get('data') or {}
@@ -3481,91 +3462,187 @@ class FileManagerUI(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "刷新", f"失败：{e}")
     
+    def _sync_user_folder(self, force: bool = False):
+        """后台同步当前目录，变化以事件形式应用到表格（不重建整个列表）"""
+        dir_path = self.current_folder or '/'
+        worker = getattr(self, 'remote_sync_worker', None)
+        if worker is not None and worker.isRunning():
+            # 上一次同步尚未结束：结束后再同步一次
+            self.api_client.remote_sync.mark_dirty([dir_path])
+            self._sync_pending = True
+            return
+        self._sync_pending = False
+        from ui.threads.remote_sync_worker import RemoteSyncWorker
+        token = self.mode_token
+        worker = RemoteSyncWorker(self.api_client, [dir_path], force=force, parent=self)
+        worker.dir_changed.connect(
+            lambda d, events: self._apply_user_listing_changes(d, events) if token == self.mode_token else None)
+
+        def _on_finished(_checked, changed):
+            if token == self.mode_token and (self.current_folder or '/') == dir_path and not self.user_search_mode:
+                self.status_label.setText("已刷新" if changed else "已是最新")
+            if getattr(self, '_sync_pending', False):
+                QTimer.singleShot(0, self._sync_user_folder)
+
+        worker.sync_finished.connect(_on_finished)
+        worker.sync_failed.connect(lambda err: self.status_label.setText(f"同步失败: {err}"))
+        worker.finished.connect(worker.deleteLater)
+        self.remote_sync_worker = worker
+        self.status_label.setText("正在同步...")
+        worker.start()
+
+    def _apply_user_listing_changes(self, dir_path: str, events: list):
+        """把目录变化事件（added/removed/modified）应用到当前用户态表格"""
+        if (self.current_mode != "user" or self.user_search_mode
+                or (self.current_folder or '/').rstrip('/') != dir_path.rstrip('/')):
+            return
+        model = self.file_tree.model()
+        if model is not self.file_model or model.mode != "user":
+            return
+        removed = [model.row_for_path(e['path']) for e in events if e['type'] == 'removed']
+        for row in sorted((r for r in removed if r is not None), reverse=True):
+            model.removeRow(row)
+        added = []
+        for e in events:
+            if e['type'] == 'removed':
+                continue
+            row = model.row_for_path(e['path'])
+            if row is None:
+                added.append(e['entry'])
+            else:
+                model.update_row(row, e['entry'], dir_path)
+        if added:
+            model.append_rows(added, dir_path)
+
+    def _can_load_more_rows(self) -> bool:
+        """当前列表是否还有下一页（供表格模型 canFetchMore 使用）"""
+        if self.current_mode == "public":
+            return self.public_has_more and not self.public_loading
+        if self.user_search_mode:
+            return self.user_search_has_more and not self.is_loading
+        # 本地数据校正完成前页码未定，不加载下一页
+        return self.has_more and not self.is_loading and not self.listing_loader.is_busy("reconcile")
+
+    def _load_more_rows(self):
+        """加载当前列表的下一页（用户目录/用户搜索/公共资源）"""
+        if not self._can_load_more_rows():
+            return
+        if self.current_mode == "public":
+            self.load_public_resources(load_more=True)
+        elif self.user_search_mode:
+            self.load_more_user_search()
+        else:
+            self.load_more_user_files()
+
+    def _update_foreground_busy(self):
+        """（主线程）记录前台是否有列表加载或传输，预取此时暂停，不与之争抢带宽"""
+        try:
+            busy = (self.listing_loader.is_busy("main") or self.listing_loader.is_busy("reconcile")
+                    or self.download_manager.active_count() > 0
+                    or bool(getattr(self, 'active_upload_workers', None)))
+        except Exception:
+            busy = False
+        self._foreground_busy = bool(busy)
+
+    def _prefetch_next_page(self):
+        """预取当前列表的下一页（结果进入响应缓存，真正翻页时直接命中）"""
+        model = self.file_tree.model()
+        if model is self.file_model and model.total_rows() - model.rowCount() > model.FETCH_BATCH:
+            # 已载入的行还没显示完，离服务端的下一页还远
+            return
+        if self.current_mode == "public":
+            if self.public_has_more and not self.public_loading:
+                keyword = self.public_search_keyword if self.public_search_mode else None
+                self.listing_prefetcher.prefetch_public_page(self.public_page, self.public_page_size, keyword)
+        elif not self.user_search_mode and self.has_more and not self.is_loading:
+            self.listing_prefetcher.prefetch_page(self.current_folder or '/', self.page_size, self.current_page + 1)
+
     def check_scroll_position(self, value):
         """检查滚动位置，到底时加载更多"""
         scrollbar = self.file_tree.verticalScrollBar()
-        
-        # 用户态搜索模式：到底自动加载下一页
-        if self.user_search_mode and self.current_mode == "user":
-            if value == scrollbar.maximum() and not self.is_loading and self.user_search_has_more:
-                self.load_more_user_search()
+        # 距底部不到两屏时预取下一页
+        if scrollbar.maximum() > 0 and value >= scrollbar.maximum() - 2 * scrollbar.pageStep():
+            self._prefetch_next_page()
+        if value != scrollbar.maximum():
             return
-        
-        # 公共资源模式：到底自动加载下一页
-        if self.current_mode == "public":
-            if value == scrollbar.maximum() and not self.public_loading and self.public_has_more:
-                self.load_public_resources(load_more=True)
+        # 共享的文件列表模型由视图通过 canFetchMore/fetchMore 分批显示并请求下一页
+        if self.file_tree.model() is not self.file_model and self._can_load_more_rows():
+            self._load_more_rows()
             return
-        
-        # 用户态目录列表滚动处理
-        if self.current_mode == "user":
-            if value == scrollbar.maximum() and not self.is_loading and self.has_more:
-                self.load_more_user_files()
-            elif value == scrollbar.maximum() and not self.has_more:
-                # 当滚动到底部但没有更多数据时显示提示
-                self.status_label.setText("已加载全部文件")
+        if self.current_mode == "user" and not self.user_search_mode and not self.has_more:
+            # 当滚动到底部但没有更多数据时显示提示
+            self.status_label.setText("已加载全部文件")
     
     def load_more_user_files(self):
-        """加载更多用户态文件"""
+        """加载更多用户态文件（后台请求，结果追加到列表）"""
         if not self.api_client.is_logged_in():
             return
-            
+
         self.is_loading = True
         self.status_label.setText("正在加载更多文件...")
         self.current_page += 1
-        
-        try:
-            result = self.api_client.list_files(
-                dir_path=self.current_folder or "/", 
-                limit=self.page_size, 
-                page=self.current_page
-            )
-            
-            if result and result.get("status") == "ok":
-                data = result.get("data", {})
-                files = data.get("list") or data.get("files") or []
-                
-                # 如果返回的文件数小于页大小，说明没有更多数据了
-                if len(files) < self.page_size:
-                    self.has_more = False
-                    self.status_label.setText("已加载全部文件")
-                
-                # 添加新的文件到列表
-                if files:
-                    self.display_user_files(files, append=True)
-                    if self.has_more:
-                        self.status_label.setText(f"已加载第 {self.current_page} 页")
-                else:
-                    self.has_more = False
-                    self.status_label.setText("已加载全部文件")
-            else:
-                error_msg = result.get("error", "加载失败") if result else "网络连接失败"
+        page = self.current_page
+        dir_path = self.current_folder or "/"
+        token = self.mode_token
+
+        def _on_result(result):
+            self.is_loading = False
+            if token != self.mode_token or (self.current_folder or "/") != dir_path:
+                return None
+            files = self._listing_files(result)
+            if files is None:
+                error_msg = result.get("error", "加载失败") if isinstance(result, dict) else "网络连接失败"
                 self.status_label.setText(f"加载更多失败: {error_msg}")
                 # 回退页码
                 self.current_page -= 1
-                
-        except Exception as e:
-            self.status_label.setText(f"加载更多失败: {str(e)}")
-            # 回退页码
-            self.current_page -= 1
-        finally:
+                return None
+            # 如果返回的文件数小于页大小，说明没有更多数据了
+            self.has_more = len(files) >= self.page_size
+            if not files:
+                self.status_label.setText("已加载全部文件")
+            return files
+
+        def _on_rows(rows, first, last):
+            self.display_user_files(rows, append=True)
+            if last:
+                self.status_label.setText(f"已加载第 {page} 页" if self.has_more else "已加载全部文件")
+
+        def _on_error(error):
             self.is_loading = False
+            if token == self.mode_token:
+                self.status_label.setText(f"加载更多失败: {error}")
+                # 回退页码
+                self.current_page -= 1
+
+        self.listing_loader.load("main", self.async_bridge.client.list_files(dir_path, self.page_size, page),
+                                 on_result=_on_result, on_rows=_on_rows, on_error=_on_error)
+
+    def _selected_user_rows(self) -> list:
+        """用户态表格中选中的行数据（按行去重、保持顺序）"""
+        rows = []
+        sel = self.file_tree.selectionModel()
+        if sel is None:
+            return rows
+        seen = set()
+        for index in sel.selectedIndexes():
+            row = index.row()
+            if row in seen:
+                continue
+            seen.add(row)
+            row_data = self.get_user_row_payload(row)
+            if row_data:
+                rows.append(row_data)
+        return rows
 
     def download_selected_files(self):
-        """批量下载选择的文件"""
+        """批量下载选择的文件：dlink 由下载管理器按每批 100 个 fsid 解析，并发下载"""
         if not self.is_vip:
             QMessageBox.warning(self, "提示", "批量下载功能仅对VIP用户开放")
             return
 
-        # 检查是否有正在进行的下载任务
-        if (self.download_worker and self.download_worker.isRunning()) or \
-           (hasattr(self, 'batch_download_worker') and self.batch_download_worker and self.batch_download_worker.isRunning()):
-            QMessageBox.warning(self, "提示", "有正在进行的下载任务，请等待当前下载完成。")
-            return
-
         # 获取所有选中的项目
-        selected_indexes = self.file_tree.selectionModel().selectedRows()
-        if not selected_indexes:
+        selected_rows = self._selected_user_rows()
+        if not selected_rows:
             QMessageBox.warning(self, "提示", "请先选择要下载的文件")
             return
 
@@ -3581,28 +3658,35 @@ class FileManagerUI(QMainWindow):
             return
 
         try:
-            # 创建下载队列
+            # 创建下载队列；文件夹交给目录遍历线程，边扫描边下载
             download_queue = []
-            for index in selected_indexes:
-                file_info = self.model.item(index.row(), 0).data(Qt.UserRole)
-                if file_info:
-                    fs_id = file_info.get('fs_id')
-                    file_name = file_info.get('server_filename')
-                    if fs_id:
-                        save_path = os.path.join(save_dir, file_name)
-                        download_queue.append((fs_id, save_path, file_name))
-
-            if not download_queue:
+            folders = []
+            for row_data in selected_rows:
+                file_info = row_data['file'] or {}
+                if int(file_info.get('isdir') or 0) == 1:
+                    folders.append(row_data['path'] or file_info.get('path'))
+                    continue
+                fs_id = row_data['fsid'] or file_info.get('fs_id')
+                file_name = file_info.get('server_filename') or file_info.get('file_name') or 'download.bin'
+                if fs_id:
+                    download_queue.append({
+                        'fsid': fs_id,
+                        'save_path': os.path.join(save_dir, file_name),
+                        'path': row_data['path'] or file_info.get('path'),
+                        'name': file_name,
+                        'size': file_info.get('size') or 0,
+                    })
+
+            if not download_queue and not folders:
+                QMessageBox.information(self, "提示", "选中的项目中没有可下载的文件")
                 return
 
-            # 显示进度条
-            self.progress_bar.show()
-            self.status_label.setText(f"准备下载 {len(download_queue)} 个文件...")
-
-            # 创建批量下载线程
-            # 暂时禁用批量下载功能（access_token已废弃）
-            QMessageBox.information(self, "提示", "批量下载功能暂时不可用")
-            return
+            if download_queue:
+                self.download_manager.enqueue_user_files(download_queue)
+                self.progress_bar.show()
+                self.status_label.setText(f"已加入下载队列：{len(download_queue)} 个文件")
+            for remote_dir in folders:
+                self._download_user_folder(remote_dir, save_dir)
 
         except Exception as e:
             self.status_label.setText(f"批量下载失败: {str(e)}")
@@ -3660,9 +3744,8 @@ class FileManagerUI(QMainWindow):
             if row is not None:
                 try:
                     model = self.file_tree.model()
-                    name_item = model.item(row, 0)
-                    if name_item:
-                        display_text = name_item.text()
+                    if model is not None:
+                        display_text = model.index(row, 0).data()
                         if display_text and display_text.strip():
                             return display_text.strip()
                 except Exception:
@@ -3674,9 +3757,8 @@ class FileManagerUI(QMainWindow):
                 if current_index.isValid():
                     current_row = current_index.row()
                     model = self.file_tree.model()
-                    name_item = model.item(current_row, 0)
-                    if name_item:
-                        display_text = name_item.text()
+                    if model is not None:
+                        display_text = model.index(current_row, 0).data()
                         if display_text and display_text.strip():
                             return display_text.strip()
             except Exception:
@@ -3901,55 +3983,49 @@ class FileManagerUI(QMainWindow):
         pass
 
     def load_more_user_search(self):
-        """加载更多用户态搜索结果"""
+        """加载更多用户态搜索结果（后台请求，结果追加到列表）"""
         if not self.user_search_mode or not self.user_search_has_more:
             return
-            
+
         self.is_loading = True
         self.status_label.setText("正在加载更多搜索结果...")
         self.user_search_page += 1
-        
-        try:
-            # 调用搜索API
-            result = self.api_client.search_filename(
-                key=self.user_search_keyword, 
-                dir_path=self.user_search_dir, 
-                page=self.user_search_page, 
-                num=self.user_search_page_size, 
-                recursion=True
-            )
-            
+        token = self.mode_token
+        scope, keyword = self._search_scope(), self.user_search_keyword
+
+        def _on_result(result):
+            self.is_loading = False
+            if token != self.mode_token or not self.user_search_mode:
+                return None
             # 兼容多种status格式
-            status = result.get("status", "").lower() if result else ""
-            if result and status in ["ok", "success"]:
-                data = result.get("data", {})
-                # 放宽结果解析，支持多种字段名
-                files = data.get("list") or data.get("files") or result.get("files") or []
-                
-                # 如果返回的文件数小于页大小，说明没有更多数据了
-                if len(files) < self.user_search_page_size:
-                    self.user_search_has_more = False
-                    self.status_label.setText("已加载全部搜索结果")
-                else:
-                    self.status_label.setText(f"找到 {len(files)} 个结果（第 {self.user_search_page} 页）")
-                
-                # 添加新的文件到列表
-                if files:
-                    self.display_user_files(files, append=True)
-                else:
-                    self.user_search_has_more = False
-                    self.status_label.setText("已加载全部搜索结果")
-            else:
-                error_msg = result.get("error", "搜索失败") if result else "网络连接失败"
+            status = str(result.get("status", "")).lower() if isinstance(result, dict) else ""
+            if status not in ("ok", "success"):
+                error_msg = result.get("error", "搜索失败") if isinstance(result, dict) else "网络连接失败"
                 self.status_label.setText(f"加载更多失败: {error_msg}")
                 # 回退页码
                 self.user_search_page -= 1
-                
-        except Exception as e:
-            self.status_label.setText(f"加载更多失败: {str(e)}")
-            # 回退页码
-            self.user_search_page -= 1
-        finally:
-            self.is_loading = False
+                return None
+            files = self._listing_files(result) or []
+            # 如果返回的文件数小于页大小，说明没有更多数据了
+            if len(files) < self.user_search_page_size:
+                self.user_search_has_more = False
+                self.status_label.setText("已加载全部搜索结果")
+            else:
+                self.status_label.setText(f"找到 {len(files)} 个结果（第 {self.user_search_page} 页）")
+            self.search_cache.extend(scope, keyword, files, complete=not self.user_search_has_more)
+            return files
 
+        def _on_error(error):
+            self.is_loading = False
+            if token == self.mode_token:
+                self.status_label.setText(f"加载更多失败: {error}")
+                # 回退页码
+                self.user_search_page -= 1
 
+        self.listing_loader.load(
+            "main",
+            self.async_bridge.client.search_filename(
+                key=self.user_search_keyword, dir_path=self.user_search_dir, page=self.user_search_page,
+                num=self.user_search_page_size, recursion=True),
+            on_result=_on_result, on_rows=lambda rows, first, last: self.display_user_files(rows, append=True),
+            on_error=_on_error)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+异步客户端与 Qt 的桥接
+协程在后台事件循环线程上运行，完成后通过信号把结果送回主线程执行回调，
+界面代码无需为每个网络操作单独创建 QThread。
+"""
+
+import itertools
+from typing import Optional, Callable, Dict, Any, Coroutine, Tuple
+
+from PySide6.QtCore import QObject, Signal
+
+from core.async_client import AsyncAPIClient
+
+
+class AsyncBridge(QObject):
+    """提交协程并在主线程接收结果
+
+    bridge = AsyncBridge(api_client)
+    bridge.submit(bridge.client.list_files('/'), on_success=..., on_error=...)
+    """
+
+    succeeded = Signal(int, object)  # call_id, result
+    failed = Signal(int, str)  # call_id, error
+
+    def __init__(self, api_client, client: Optional[AsyncAPIClient] = None, parent=None):
+        super().__init__(parent)
+        self.client = client or AsyncAPIClient(api_client)
+        self._ids = itertools.count(1)
+        self._callbacks: Dict[int, Tuple[Optional[Callable], Optional[Callable]]] = {}
+        self._futures: Dict[int, Any] = {}
+        self.succeeded.connect(self._dispatch_success)
+        self.failed.connect(self._dispatch_error)
+
+    def submit(self, coro: Coroutine, on_success: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[str], None]] = None) -> int:
+        """提交协程，返回调用编号；回调在主线程执行"""
+        call_id = next(self._ids)
+        self._callbacks[call_id] = (on_success, on_error)
+        future = self.client.run(coro)
+        self._futures[call_id] = future
+
+        def _done(fut, call_id=call_id):
+            # 在事件循环线程中执行：只发信号，回调由主线程处理
+            if fut.cancelled():
+                self.failed.emit(call_id, '已取消')
+                return
+            exc = fut.exception()
+            if exc is not None:
+                self.failed.emit(call_id, str(exc))
+            else:
+                self.succeeded.emit(call_id, fut.result())
+
+        future.add_done_callback(_done)
+        return call_id
+
+    def cancel(self, call_id: int):
+        future = self._futures.get(call_id)
+        if future is not None:
+            future.cancel()
+
+    def pending_count(self) -> int:
+        return len(self._futures)
+
+    def _dispatch_success(self, call_id: int, result: Any):
+        self._futures.pop(call_id, None)
+        on_success, _ = self._callbacks.pop(call_id, (None, None))
+        if on_success:
+            try:
+                on_success(result)
+            except Exception as e:
+                print(f"[DEBUG] 异步回调失败: {e}")
+
+    def _dispatch_error(self, call_id: int, error: str):
+        self._futures.pop(call_id, None)
+        _, on_error = self._callbacks.pop(call_id, (None, None))
+        if on_error:
+            try:
+                on_error(error)
+            except Exception as e:
+                print(f"[DEBUG] 异步回调失败: {e}")
+        else:
+            print(f"[DEBUG] 异步调用失败: {error}")
+
+    def shutdown(self):
+        for future in list(self._futures.values()):
+            future.cancel()
+        self._futures.clear()
+        self._callbacks.clear()
+        self.client.close()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量文件操作工作线程
+多选的删除/移动/复制/重命名通过 APIClient.file_op_many 打包提交，
+提交后整批交给任务跟踪器确认（所有请求的任务在同一个轮询中查询）。
+"""
+
+import posixpath
+from typing import Any, List, Optional, Tuple
+
+from PySide6.QtCore import QThread, Signal
+
+
+class BulkOperationWorker(QThread):
+    """批量文件操作线程"""
+
+    # 信号定义
+    op_started = Signal(str, int)  # 操作名，条目数
+    op_progress = Signal(str, str)  # 操作名，状态消息
+    op_result = Signal(str, dict)  # 操作名，汇总结果（file_op_many 的返回值 + "unverified"）
+    op_completed = Signal(str, bool, str)  # 操作名，是否成功，消息
+
+    OP_TITLES = {'delete': "删除", 'move': "移动", 'copy': "复制", 'rename': "重命名"}
+
+    def __init__(self, api_client, op_name: str, items: List[Any], parent=None):
+        super().__init__(parent)
+        self.api_client = api_client
+        self.op_name = op_name
+        self.items = list(items or [])
+        self._should_stop = False
+
+    def stop(self):
+        self._should_stop = True
+        self.quit()
+        self.wait(3000)
+
+    def run(self):
+        title = self.OP_TITLES.get(self.op_name, self.op_name)
+        self.op_started.emit(self.op_name, len(self.items))
+        try:
+            self.op_progress.emit(self.op_name, f"正在提交{title} {len(self.items)} 项...")
+            result = self.api_client.file_op_many(self.op_name, self.items)
+            succeeded = result.get('succeeded') or []
+            failed = result.get('failed') or []
+            if not succeeded:
+                result['unverified'] = []
+                self.op_result.emit(self.op_name, result)
+                self.op_completed.emit(self.op_name, False, f"{title}失败: {result.get('error') or '未知错误'}")
+                return
+
+            self.op_progress.emit(self.op_name, f"已提交 {len(succeeded)} 项，正在确认结果...")
+            unverified, task_failed = self._verify(result)
+            if task_failed:
+                # 服务端任务执行失败的条目从成功列表移到失败列表
+                gone = {f['path'] for f in task_failed}
+                succeeded = result['succeeded'] = [p for p in succeeded if p not in gone]
+                failed = result['failed'] = failed + task_failed
+            result['unverified'] = unverified
+
+            self.op_result.emit(self.op_name, result)
+            parts = [f"成功 {len(succeeded) - len(unverified)} 项"]
+            if unverified:
+                parts.append(f"{len(unverified)} 项已提交（后台处理可能稍有延迟）")
+            if failed:
+                parts.append(f"失败 {len(failed)} 项")
+            self.op_completed.emit(self.op_name, not failed, f"{title}：" + "，".join(parts))
+        except Exception as e:
+            self.op_completed.emit(self.op_name, False, f"{title}异常: {str(e)}")
+
+    def _verify(self, result: dict) -> Tuple[List[str], List[dict]]:
+        """整批确认：每个请求的 taskid 交给任务跟踪器（没有 taskid 时按条目的 fs_id 确认），
+        所有任务共用一个轮询；返回 (未确认的路径, 任务失败的条目)"""
+        tracker = self.api_client.task_tracker
+        fsids = {}
+        for item in self.items:
+            if isinstance(item, dict) and item.get('path') and (item.get('fs_id') or item.get('fsid')):
+                fsids[item['path']] = item.get('fs_id') or item.get('fsid')
+        by_path = {item['path']: item for item in self.items if isinstance(item, dict) and item.get('path')}
+
+        def _track_items(paths):
+            return [(tracker.track(fsid=fsids.get(p), **self._expect(p, by_path.get(p))), [p]) for p in paths]
+
+        tracked = []  # (future, 路径列表)
+        for task in result.get('tasks') or []:
+            paths = task.get('paths') or []
+            if not paths:
+                continue
+            if task.get('taskid'):
+                tracked.append((tracker.track(taskid=task['taskid']), paths))
+            else:
+                tracked.extend(_track_items(paths))
+
+        unverified, failed = [], []
+        while tracked:
+            tracker.wait([f for f, _ in tracked], should_stop=lambda: self._should_stop)
+            retry = []
+            for future, paths in tracked:
+                outcome = future.result() if future.done() else {"status": "unknown"}
+                if outcome['status'] == 'success':
+                    continue
+                if outcome['status'] == 'failed':
+                    failed.extend({"path": p, "error": outcome.get('error') or "任务执行失败"} for p in paths)
+                elif outcome.get('taskid') and tracker.task_query_supported is False:
+                    # 服务端不支持任务查询：改为按条目的 fs_id 确认
+                    retry.extend(paths)
+                else:
+                    unverified.extend(paths)
+            tracked = _track_items(retry) if retry and not self._should_stop else []
+        return unverified, failed
+
+    def _expect(self, path: str, item: Optional[dict]) -> dict:
+        """按 fs_id 确认时的期望：删除为不再存在，移动/重命名为路径变为目标路径（复制无法按 fs_id 确认）"""
+        if self.op_name == 'delete':
+            return {"gone": True}
+        if self.op_name == 'rename' and item:
+            return {"expect_path": posixpath.join(posixpath.dirname(path.rstrip('/')) or '/', item.get('newname') or '')}
+        if self.op_name == 'move' and item:
+            name = item.get('newname') or posixpath.basename(path.rstrip('/'))
+            return {"expect_path": posixpath.join(item.get('dest') or '/', name)}
+        return {}
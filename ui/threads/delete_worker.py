@@ -5,7 +5,6 @@
 删除操作异步工作线程
 """
 
-import time
 from PySide6.QtCore import QThread, Signal
 from typing import Dict, Any, Optional
 
@@ -38,47 +37,18 @@ class DeleteWorker(QThread):
             if isinstance(ret, dict) and (ret.get('status') in ('ok', 'success')):
                 self.delete_progress.emit(self.file_path, "删除成功，正在确认...")
                 
-                # 异步轮询确认删除（最多约10秒）
-                start_ts = time.time()
-                disappeared = False
+                # 跟踪异步删除任务（有 taskid 查任务状态，否则按 fs_id 查文件是否仍存在）
+                tracker = self.api_client.task_tracker
+                future = tracker.track(taskid=tracker.taskid_of(ret), fsid=self.fs_id, gone=True)
+                finished = tracker.wait(
+                    [future], should_stop=lambda: self._should_stop,
+                    on_tick=lambda elapsed: self.delete_progress.emit(self.file_path, f"等待删除完成... ({elapsed}s)"))
+                outcome = future.result() if finished else {"status": "unknown"}
                 
-                while time.time() - start_ts < 10 and not self._should_stop:
-                    try:
-                        # 检查模式是否已切换
-                        if hasattr(self.api_client, 'mode_token') and self.mode_token != self.api_client.mode_token:
-                            self.delete_progress.emit(self.file_path, "模式已切换，停止轮询")
-                            break
-                        
-                        # 获取当前文件列表
-                        lst = self.api_client.list_files("/", limit=200)  # 从根目录搜索
-                        items = []
-                        if isinstance(lst, dict):
-                            data = lst.get('data') or lst
-                            items = data.get('list') or data.get('files') or data.get('items') or []
-                        elif isinstance(lst, list):
-                            items = lst
-                        
-                        # 检查文件是否还存在
-                        present = False
-                        for it in items:
-                            cur = str(it.get('fs_id') or it.get('fsid') or '')
-                            if cur and cur == str(self.fs_id):
-                                present = True
-                                break
-                        
-                        if not present:
-                            disappeared = True
-                            break
-                        
-                        self.delete_progress.emit(self.file_path, f"等待删除完成... ({int(time.time() - start_ts)}s)")
-                        time.sleep(0.4)
-                        
-                    except Exception as e:
-                        self.delete_progress.emit(self.file_path, f"轮询出错: {str(e)}")
-                        break
-                
-                if disappeared:
+                if outcome['status'] == 'success':
                     self.delete_completed.emit(self.file_path, True, "删除成功")
+                elif outcome['status'] == 'failed':
+                    self.delete_completed.emit(self.file_path, False, f"删除失败: {outcome.get('error')}")
                 else:
                     self.delete_completed.emit(self.file_path, True, "已提交删除（后台处理可能稍有延迟）")
             else:
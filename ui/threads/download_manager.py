@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+下载管理器：统一调度所有下载线程
+- 持久化队列（程序重启后恢复未完成任务）
+- 全局并发上限与任务优先级
+- 暂停 / 继续 / 取消
+- 失败按指数退避自动重试
+"""
+
+import heapq
+import itertools
+from typing import Optional, Dict, Any, List
+
+from PySide6.QtCore import QObject, Signal, QTimer
+
+from core.dlink_resolver import DlinkResolver
+from core.download_manifest import DownloadManifest
+from core.download_queue import DownloadTask, DownloadQueueStore
+from core.transport import get_transport
+from ui.threads.download_workers import ProxyDownloadWorker, DlinkDownloadWorker
+
+
+class DownloadManager(QObject):
+    """下载管理器
+
+    UI 只负责入队与展示，线程的创建、并发控制、重试均由管理器负责。
+    """
+
+    task_added = Signal(str)  # task_id
+    task_progress = Signal(str, float, int, int, float)  # task_id, percent, downloaded, total, speed_bps
+    task_state_changed = Signal(str, str)  # task_id, state
+    task_finished = Signal(str, str)  # task_id, save_path
+    task_failed = Signal(str, str)  # task_id, error
+    queue_idle = Signal(int, int)  # 本轮完成数, 本轮失败数
+
+    DEFAULT_MAX_CONCURRENT = 3
+    MAX_RETRIES = 3
+    RETRY_BASE_DELAY = 2.0  # 秒，第 n 次重试等待 BASE * 2^(n-1)
+    RETRY_MAX_DELAY = 60.0
+    REAP_INTERVAL_MS = 500
+    PERSIST_DELAY_MS = 1000  # 队列落盘防抖，文件夹下载一次入队上万个任务时避免反复写文件
+    # 重试无意义的错误（配额、授权、参数问题）
+    NO_RETRY_MARKERS = ('daily_quota_exceeded', 'http 429', 'baidu_token', '百度token', '缺少fsid', 'not_logged_in')
+
+    def __init__(self, api_client, max_concurrent: Optional[int] = None, store: Optional[DownloadQueueStore] = None, parent=None):
+        super().__init__(parent)
+        self.api_client = api_client
+        self.max_concurrent = max(1, int(max_concurrent or self.DEFAULT_MAX_CONCURRENT))
+        self.store = store or DownloadQueueStore()
+        self.resolver = DlinkResolver(api_client)  # 用户态 dlink 按批解析，所有下载线程共享
+        self._ensure_pool_size()
+
+        self._tasks: Dict[str, DownloadTask] = {}
+        self._by_path: Dict[str, str] = {}  # save_path -> 未结束任务的 task_id
+        self._heap: List[tuple] = []  # (-priority, seq, task_id)
+        self._seq = itertools.count()
+        self._workers: Dict[str, Any] = {}  # task_id -> 运行中的线程
+        self._retiring: List[tuple] = []  # (task_id, worker, save_path) 已请求停止、等待线程退出
+        self._waiting_retry = set()  # 正在退避等待重试的 task_id
+        self._discard_on_exit: Dict[str, str] = {}  # task_id -> save_path，已取消且线程尚未退出
+        self._start_on_exit = set()  # 排队中但同一保存路径的旧线程尚未退出的 task_id
+        self._restored = False
+        self._round_done = 0
+        self._round_failed = 0
+
+        self._reaper = QTimer(self)
+        self._reaper.setInterval(self.REAP_INTERVAL_MS)
+        self._reaper.timeout.connect(self._reap)
+
+        self._persist_timer = QTimer(self)
+        self._persist_timer.setSingleShot(True)
+        self._persist_timer.setInterval(self.PERSIST_DELAY_MS)
+        self._persist_timer.timeout.connect(self._persist_now)
+
+    # ---------- 查询 ----------
+    def get_task(self, task_id: str) -> Optional[DownloadTask]:
+        return self._tasks.get(task_id)
+
+    def tasks(self) -> List[DownloadTask]:
+        return list(self._tasks.values())
+
+    def active_count(self) -> int:
+        return len(self._workers)
+
+    def pending_count(self) -> int:
+        """排队中（含退避等待）的任务数"""
+        return sum(1 for t in self._tasks.values() if t.state == DownloadTask.STATE_QUEUED)
+
+    # ---------- 入队 ----------
+    def enqueue(self, kind: str, save_path: str, fsid=None, path: Optional[str] = None, name: Optional[str] = None,
+                size: int = 0, meta: Optional[Dict[str, Any]] = None, priority: int = 0) -> str:
+        """添加下载任务；同一保存路径已有未结束任务时直接返回已有任务（避免两个线程写同一个 .part）"""
+        task_id = self._add(kind, save_path, fsid=fsid, path=path, name=name, size=size, meta=meta, priority=priority)
+        self._persist()
+        self._schedule()
+        return task_id
+
+    def _add(self, kind: str, save_path: str, **kwargs) -> str:
+        # 先合并上次未完成的队列，避免持久化时覆盖
+        self.restore()
+        existing = self._tasks.get(self._by_path.get(save_path))
+        if existing is not None and existing.is_pending:
+            if existing.state == DownloadTask.STATE_PAUSED:
+                self.resume(existing.task_id)
+            return existing.task_id
+        task = DownloadTask(kind, save_path, **kwargs)
+        self._tasks[task.task_id] = task
+        self._by_path[save_path] = task.task_id
+        if kind == DownloadTask.KIND_DLINK and task.fsid:
+            self.resolver.prefetch([task.fsid])
+        self._push(task)
+        self.task_added.emit(task.task_id)
+        return task.task_id
+
+    def enqueue_user_file(self, fsid, save_path: str, path: Optional[str] = None, name: Optional[str] = None,
+                          size: int = 0, priority: int = 0) -> str:
+        """用户态文件：线程内通过 filemetas 解析 dlink 后直链下载"""
+        return self.enqueue(DownloadTask.KIND_DLINK, save_path, fsid=fsid, path=path, name=name, size=size, priority=priority)
+
+    def enqueue_user_files(self, entries: List[Dict[str, Any]], priority: int = 0) -> List[str]:
+        """批量添加用户态文件，entries 为 {'fsid','save_path','path','name','size'}；
+        所有 fsid 先登记到解析器，首个任务开始时按每批 100 个一次性解析 dlink
+        """
+        self.resolver.prefetch([e.get('fsid') for e in entries if e.get('fsid')])
+        ids = []
+        for e in entries:
+            ids.append(self._add(
+                DownloadTask.KIND_DLINK,
+                e['save_path'],
+                fsid=e.get('fsid'),
+                path=e.get('path'),
+                name=e.get('name'),
+                size=e.get('size') or 0,
+                priority=priority,
+            ))
+        self._persist()
+        self._schedule()
+        return ids
+
+    def enqueue_public_file(self, fsid, save_path: str, path: Optional[str] = None, name: Optional[str] = None,
+                            meta: Optional[Dict[str, Any]] = None, priority: int = 0) -> str:
+        """公共资源：线程内签票后经后端代理下载"""
+        size = (meta or {}).get('size') or 0
+        return self.enqueue(DownloadTask.KIND_PROXY, save_path, fsid=fsid, path=path, name=name, size=size, meta=meta, priority=priority)
+
+    # ---------- 控制 ----------
+    def pause(self, task_id: str):
+        task = self._tasks.get(task_id)
+        if not task or not task.is_pending or task.state == DownloadTask.STATE_PAUSED:
+            return
+        self._stop_worker(task_id)
+        self._waiting_retry.discard(task_id)
+        self._start_on_exit.discard(task_id)
+        self._set_state(task, DownloadTask.STATE_PAUSED)
+        self._schedule()
+
+    def resume(self, task_id: str):
+        task = self._tasks.get(task_id)
+        if not task or task.state != DownloadTask.STATE_PAUSED:
+            return
+        self._set_state(task, DownloadTask.STATE_QUEUED)
+        self._push(task)
+        self._schedule()
+
+    def cancel(self, task_id: str):
+        """取消任务并清理已下载的 .part 数据"""
+        task = self._tasks.get(task_id)
+        if not task or not task.is_pending:
+            return
+        if task_id in self._workers or self._path_retiring(task.save_path):
+            self._discard_on_exit[task_id] = task.save_path
+            self._stop_worker(task_id)
+        else:
+            DownloadManifest(task.save_path).discard_data()
+        self._waiting_retry.discard(task_id)
+        self._start_on_exit.discard(task_id)
+        self._set_state(task, DownloadTask.STATE_CANCELED)
+        self._schedule()
+
+    def retry(self, task_id: str):
+        """手动重试失败的任务（重置重试计数）"""
+        task = self._tasks.get(task_id)
+        if not task or task.state != DownloadTask.STATE_FAILED:
+            return
+        task.attempts = 0
+        task.error = None
+        self._by_path[task.save_path] = task_id
+        self._set_state(task, DownloadTask.STATE_QUEUED)
+        self._push(task)
+        self._schedule()
+
+    def pause_all(self):
+        for task_id in [t.task_id for t in self._tasks.values() if t.is_pending]:
+            self.pause(task_id)
+
+    def resume_all(self):
+        for task_id in [t.task_id for t in self._tasks.values() if t.state == DownloadTask.STATE_PAUSED]:
+            self.resume(task_id)
+
+    def cancel_all(self):
+        for task_id in [t.task_id for t in self._tasks.values() if t.is_pending]:
+            self.cancel(task_id)
+
+    def set_max_concurrent(self, n: int):
+        self.max_concurrent = max(1, int(n or 1))
+        self._ensure_pool_size()
+        self._schedule()
+
+    def _ensure_pool_size(self):
+        # 同一下载主机上的长连接数 = 并发任务数 × 每个任务的分段连接数，另留余量给列表/元信息请求
+        connections = int(getattr(self.api_client, 'download_connections', 1) or 1)
+        get_transport().ensure_pool_size(self.max_concurrent * connections + 4)
+
+    def restore(self):
+        """恢复上次未完成的任务（仅执行一次）；运行中的任务重新排队，暂停的保持暂停"""
+        if self._restored:
+            return
+        self._restored = True
+        for task in self.store.load():
+            if task.task_id in self._tasks or not task.is_pending:
+                continue
+            if task.state == DownloadTask.STATE_RUNNING:
+                task.state = DownloadTask.STATE_QUEUED
+            self._tasks[task.task_id] = task
+            self._by_path[task.save_path] = task.task_id
+            if task.state == DownloadTask.STATE_QUEUED:
+                self._push(task)
+            if task.kind == DownloadTask.KIND_DLINK and task.fsid:
+                self.resolver.prefetch([task.fsid])
+            self.task_added.emit(task.task_id)
+        if self._tasks:
+            print(f"[DEBUG] 恢复下载队列: {len(self._tasks)} 个任务")
+        self._schedule()
+
+    def shutdown(self):
+        """退出前停止所有线程，运行中的任务保存为排队状态以便下次恢复"""
+        for task_id in list(self._workers.keys()):
+            task = self._tasks.get(task_id)
+            self._stop_worker(task_id)
+            if task:
+                task.state = DownloadTask.STATE_QUEUED
+        self._persist_now()
+        for _, worker, _ in self._retiring:
+            try:
+                worker.wait(2000)
+            except Exception:
+                pass
+
+    # ---------- 调度 ----------
+    def _push(self, task: DownloadTask):
+        heapq.heappush(self._heap, (-task.priority, next(self._seq), task.task_id))
+
+    def _schedule(self):
+        while len(self._workers) < self.max_concurrent and self._heap:
+            _, _, task_id = heapq.heappop(self._heap)
+            task = self._tasks.get(task_id)
+            if not task or task.state != DownloadTask.STATE_QUEUED or task_id in self._workers:
+                continue
+            if task_id in self._waiting_retry:
+                # 暂停/继续留下的旧堆条目：退避结束前不启动，由 _retry_due 重新入堆
+                continue
+            if self._path_retiring(task.save_path):
+                # 暂停后立即继续：旧线程仍在写同一个 .part，等它退出后由 _reap 重新入堆
+                self._start_on_exit.add(task_id)
+                continue
+            self._start(task)
+        if not self._workers and not self._heap and not self._waiting_retry and not self._start_on_exit:
+            if self._round_done or self._round_failed:
+                done, failed = self._round_done, self._round_failed
+                self._round_done = self._round_failed = 0
+                self.queue_idle.emit(done, failed)
+
+    def _start(self, task: DownloadTask):
+        try:
+            worker = self._create_worker(task)
+        except Exception as e:
+            self._handle_failure(task, str(e))
+            return
+        self._workers[task.task_id] = worker
+        task.attempts += 1
+        self._set_state(task, DownloadTask.STATE_RUNNING)
+        worker.start()
+
+    def _create_worker(self, task: DownloadTask):
+        task_id = task.task_id
+        if task.kind == DownloadTask.KIND_DLINK:
+            worker = DlinkDownloadWorker(
+                api_client=self.api_client,
+                dlink=None,
+                access_token=None,
+                save_path=task.save_path,
+                fsid=task.fsid,
+                path=task.path,
+                resolver=self.resolver,
+                parent=self,
+            )
+            worker.progress.connect(lambda pct, done, total, speed, tid=task_id: self._on_progress(tid, pct, done, total, speed))
+        elif task.kind == DownloadTask.KIND_PROXY:
+            manifest = DownloadManifest.open_for(task.save_path, task.meta or {'fs_id': task.fsid})
+            worker = ProxyDownloadWorker(
+                base_url=self.api_client.base_url,
+                ticket=None,
+                save_path=task.save_path,
+                tmp_path=manifest.part_path,
+                size_expect=task.size,
+                app_jwt=getattr(self.api_client, 'user_jwt', None),
+                manifest=manifest,
+                ticket_provider=lambda t=task: self._sign_public_ticket(t),
+                parent=self,
+            )
+            worker.progress.connect(lambda pct, tid=task_id: self._on_progress(tid, pct, -1, -1, 0.0))
+        else:
+            raise RuntimeError(f"未知下载类型: {task.kind}")
+        worker.finished.connect(lambda path, tid=task_id: self._on_finished(tid, path))
+        worker.failed.connect(lambda err, tid=task_id: self._on_failed(tid, err))
+        return worker
+
+    def _sign_public_ticket(self, task: DownloadTask) -> str:
+        """公共资源签票：优先 fsid，失败或空票据时回退 path（在下载线程中调用）"""
+        def _extract_ticket(resp_dict):
+            data1 = resp_dict.get('ticket')
+            data2 = (resp_dict.get('data') or {}).get('ticket')
+            data3 = ((resp_dict.get('data') or {}).get('data') or {}).get('ticket')
+            return data1 or data2 or data3
+
+        t = self.api_client.public_download_ticket(fsid=task.fsid, ttl=300) if task.fsid else None
+        if isinstance(t, dict) and str(t.get('status')).lower() == 'ok':
+            tk = _extract_ticket(t)
+            if tk:
+                return tk
+        if task.path:
+            t = self.api_client.public_download_ticket(path=task.path, ttl=300)
+            if isinstance(t, dict) and str(t.get('status')).lower() == 'ok':
+                tk = _extract_ticket(t)
+                if tk:
+                    return tk
+        err = ((t.get('data') or {}).get('errmsg') or t.get('error')) if isinstance(t, dict) else None
+        raise RuntimeError(err or '票据获取失败')
+
+    # ---------- 线程回调 ----------
+    def _on_progress(self, task_id: str, percent: float, downloaded: int, total: int, speed: float):
+        task = self._tasks.get(task_id)
+        if not task or task_id not in self._workers:
+            return
+        if total < 0:
+            # 代理下载只上报百分比，按预期大小折算
+            total = task.total
+            downloaded = int(total * percent / 100) if total else 0
+        task.downloaded = int(downloaded)
+        task.total = int(total or task.total)
+        self.task_progress.emit(task_id, float(percent or 0.0), task.downloaded, task.total, float(speed or 0.0))
+
+    def _on_finished(self, task_id: str, save_path: str):
+        worker = self._workers.pop(task_id, None)
+        self._retire(task_id, worker)
+        task = self._tasks.get(task_id)
+        if not task or task.state != DownloadTask.STATE_RUNNING:
+            self._schedule()
+            return
+        task.error = None
+        task.downloaded = task.total or task.downloaded
+        self._round_done += 1
+        self._set_state(task, DownloadTask.STATE_DONE)
+        self.task_finished.emit(task_id, save_path)
+        self._schedule()
+
+    def _on_failed(self, task_id: str, err: str):
+        worker = self._workers.pop(task_id, None)
+        self._retire(task_id, worker)
+        task = self._tasks.get(task_id)
+        if not task or task.state != DownloadTask.STATE_RUNNING:
+            self._schedule()
+            return
+        self._handle_failure(task, err)
+        self._schedule()
+
+    def _handle_failure(self, task: DownloadTask, err: str):
+        task.error = str(err)
+        text = task.error.lower()
+        retryable = not any(m in text for m in self.NO_RETRY_MARKERS)
+        if retryable and task.attempts < self.MAX_RETRIES:
+            delay = min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * (2 ** max(0, task.attempts - 1)))
+            print(f"[DEBUG] 下载失败，{delay:.0f}s 后第 {task.attempts + 1} 次尝试: {task.name} - {err}")
+            self._set_state(task, DownloadTask.STATE_QUEUED)
+            self._waiting_retry.add(task.task_id)
+            QTimer.singleShot(int(delay * 1000), lambda tid=task.task_id: self._retry_due(tid))
+            return
+        self._round_failed += 1
+        self._set_state(task, DownloadTask.STATE_FAILED)
+        self.task_failed.emit(task.task_id, task.error)
+
+    def _retry_due(self, task_id: str):
+        if task_id not in self._waiting_retry:
+            return
+        self._waiting_retry.discard(task_id)
+        task = self._tasks.get(task_id)
+        if task and task.state == DownloadTask.STATE_QUEUED:
+            self._push(task)
+        self._schedule()
+
+    # ---------- 线程回收 ----------
+    def _stop_worker(self, task_id: str):
+        worker = self._workers.pop(task_id, None)
+        if worker is None:
+            return
+        try:
+            worker.stop()
+        except Exception:
+            pass
+        self._retire(task_id, worker)
+
+    def _retire(self, task_id: str, worker):
+        if worker is None:
+            return
+        task = self._tasks.get(task_id)
+        self._retiring.append((task_id, worker, task.save_path if task else None))
+        if not self._reaper.isActive():
+            self._reaper.start()
+
+    def _reap(self):
+        """释放已退出的线程；已取消任务在线程退出后再清理 .part，避免线程退出前重新写入清单"""
+        alive = []
+        for task_id, worker, save_path in self._retiring:
+            if worker.isRunning():
+                alive.append((task_id, worker, save_path))
+                continue
+            worker.deleteLater()
+        self._retiring = alive
+        if not alive:
+            self._reaper.stop()
+        for task_id, save_path in list(self._discard_on_exit.items()):
+            if not self._path_retiring(save_path):
+                self._discard_on_exit.pop(task_id, None)
+                DownloadManifest(save_path).discard_data()
+        # 旧线程已退出的排队任务重新入堆
+        ready = [tid for tid in self._start_on_exit
+                 if tid not in self._tasks or not self._path_retiring(self._tasks[tid].save_path)]
+        for task_id in ready:
+            self._start_on_exit.discard(task_id)
+            task = self._tasks.get(task_id)
+            if task and task.state == DownloadTask.STATE_QUEUED:
+                self._push(task)
+        if ready:
+            self._schedule()
+
+    def _path_retiring(self, save_path: str) -> bool:
+        """是否有写同一保存路径的线程已请求停止但尚未退出"""
+        return any(path == save_path and worker.isRunning() for _, worker, path in self._retiring)
+
+    # ---------- 状态与持久化 ----------
+    def _set_state(self, task: DownloadTask, state: str):
+        task.state = state
+        self.task_state_changed.emit(task.task_id, state)
+        self._persist()
+        if not task.is_pending and self._by_path.get(task.save_path) == task.task_id:
+            self._by_path.pop(task.save_path, None)
+        if not task.is_pending and state != DownloadTask.STATE_FAILED:
+            # 已结束的任务不再保留在内存中，批量下载上百个文件时避免无限增长
+            QTimer.singleShot(0, lambda tid=task.task_id: self._forget(tid))
+
+    def _forget(self, task_id: str):
+        task = self._tasks.get(task_id)
+        if task and not task.is_pending and task.state != DownloadTask.STATE_FAILED and task_id not in self._workers:
+            self._tasks.pop(task_id, None)
+
+    def _persist(self):
+        if not self._persist_timer.isActive():
+            self._persist_timer.start()
+
+    def _persist_now(self):
+        self._persist_timer.stop()
+        self.store.save(list(self._tasks.values()))
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+下载线程：公共态票据代理下载与用户态 dlink 直链下载
+"""
+
+import os
+import threading
+import time
+
+from PySide6.QtCore import QThread, Signal
+
+from core.download_manifest import DownloadManifest
+from core.transport import get_transport
+
+# 分段下载时进度回调来自多个工作线程；多个下载线程并发时串行化信号发射
+_EMIT_LOCK = threading.Lock()
+# 进度信号最小发射间隔（秒），避免批量下载时刷屏UI事件循环
+PROGRESS_EMIT_INTERVAL = 0.2
+
+
+class ProxyDownloadWorker(QThread):
+    progress = Signal(float)
+    status = Signal(str)
+    finished = Signal(str)  # save_path
+    failed = Signal(str)
+
+    def __init__(self, base_url: str, ticket: str, save_path: str, tmp_path: str, size_expect: int = 0, app_jwt: str = None, resume_pos: int = 0, mode_token: int = None,
+                 manifest=None, ticket_provider=None, parent=None):
+        super().__init__(parent)
+        self.base_url = base_url.rstrip('/')
+        self.ticket = ticket
+        self.save_path = save_path
+        self.tmp_path = tmp_path
+        self.size_expect = size_expect or 0
+        self.app_jwt = app_jwt
+        self.resume_pos = resume_pos or 0
+        self.mode_token = mode_token  # 模式版本号，用于验证
+        self.ticket_provider = ticket_provider  # 可选：线程内签票/换票的回调，返回新票据
+        self.manifest = manifest  # DownloadManifest，提供时以清单记录的连续前缀作为续传位置
+        if manifest is not None:
+            self.tmp_path = manifest.part_path
+            self.resume_pos = manifest.contiguous_prefix() if os.path.exists(manifest.part_path) else 0
+            self.size_expect = self.size_expect or manifest.size
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def _do_request(self, ticket: str):
+        headers = {}
+        if self.resume_pos > 0:
+            headers['Range'] = f'bytes={self.resume_pos}-'
+        if self.app_jwt:
+            headers['Authorization'] = f"Bearer {self.app_jwt}"
+        req_kwargs = {
+            'headers': headers,
+            'stream': True,
+            'timeout': 60,
+            'allow_redirects': True,
+            'proxies': {"http": None, "https": None}
+        }
+        proxy_url = f"{self.base_url}/files/proxy_download?ticket={ticket}"
+        return get_transport().get(proxy_url, **req_kwargs)
+
+    def run(self):
+        try:
+            if not self.ticket and self.ticket_provider:
+                self.status.emit("签票中...")
+                self.ticket = self.ticket_provider()
+            # 首次请求
+            r = self._do_request(self.ticket)
+            if r.status_code in (401, 403) and self.ticket_provider:
+                # 提供了换票回调时在线程内换票重试一次
+                r.close()
+                self.status.emit("票据无效，重试中...")
+                self.ticket = self.ticket_provider()
+                r = self._do_request(self.ticket)
+            if r.status_code in (401, 403):
+                try:
+                    body = r.text[:500]
+                except Exception:
+                    body = ''
+                self.status.emit(f"票据无效，重试中...")
+                # 由UI侧在启动前确保ticket有效；这里进行一次重试需要新票据，交由UI侧传入
+                # 为保持线程内自洽，这里不自行刷新票据，直接失败返回，由UI层决定是否换票重启线程
+                r.close()
+                self.failed.emit(f"HTTP {r.status_code}: {body}")
+                return
+            r.raise_for_status()
+            # 服务端忽略 Range 返回 200 时从头写入，避免把整文件追加到旧数据之后
+            resumed = self.resume_pos > 0 and r.status_code == 206
+            total = int(r.headers.get('Content-Length') or self.size_expect or 0)
+            downloaded = self.resume_pos if resumed else 0
+            if self.manifest is not None:
+                if not resumed:
+                    self.manifest.reset_ranges()
+                if self.size_expect:
+                    total = int(self.size_expect)
+                if not self.manifest.size and total:
+                    self.manifest.size = total
+                mode = 'r+b' if resumed else 'wb'
+            else:
+                mode = 'ab' if resumed else 'wb'
+            with open(self.tmp_path, mode) as f:
+                if mode == 'r+b':
+                    f.seek(downloaded)
+                for chunk in r.iter_content(chunk_size=8192):
+                    if self._stopped:
+                        if self.manifest is not None:
+                            self.manifest.save()
+                        return
+                    if chunk:
+                        f.write(chunk)
+                        if self.manifest is not None:
+                            self.manifest.add_range(downloaded, downloaded + len(chunk) - 1)
+                        downloaded += len(chunk)
+                        if self.manifest is not None and downloaded % (256*1024) == 0:
+                            f.flush()
+                            self.manifest.save(force=False)
+                        if total > 0 and downloaded % (256*1024) == 0:
+                            pct = downloaded / total * 100
+                            self.progress.emit(pct)
+            if self.manifest is not None:
+                if self.manifest.size and downloaded < self.manifest.size:
+                    self.manifest.save()
+                    raise RuntimeError(f"下载未完成: {downloaded}/{self.manifest.size}")
+                self.manifest.finalize()
+            else:
+                os.replace(self.tmp_path, self.save_path)
+            self.finished.emit(self.save_path)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class DlinkDownloadWorker(QThread):
+    progress = Signal(float, int, int, float)  # percent, downloaded, total, speed_bps
+    status = Signal(str)
+    finished = Signal(str)
+    failed = Signal(str)
+
+    def __init__(self, api_client, dlink: str, access_token: str, save_path: str, resume_pos: int = 0, connections: int = None,
+                 manifest=None, fsid=None, path: str = None, resolver=None, parent=None):
+        super().__init__(parent)
+        self.api_client = api_client
+        self.dlink = dlink
+        self.access_token = access_token
+        self.save_path = save_path
+        self.fsid = fsid  # 未提供 dlink 时在线程内通过 fsid/path 解析
+        self.path = path
+        self.resolver = resolver  # 可选：DlinkResolver，批量解析并缓存 dlink
+        self.manifest = manifest  # DownloadManifest，提供时续传位置以清单为准
+        self.resume_pos = manifest.completed_bytes() if manifest is not None else int(resume_pos or 0)
+        self.connections = connections  # None 表示使用 api_client.download_connections
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def _resolve_dlink(self):
+        """通过 filemetas 获取 dlink 与元信息（优先 fsid，兜底 path），并打开断点清单"""
+        if self.resolver is not None and self.fsid:
+            try:
+                file_meta = self.resolver.resolve(self.fsid)
+                self.dlink = file_meta.get('dlink')
+                self.access_token = self.access_token or self.resolver.access_token()
+                if self.manifest is None:
+                    self.manifest = DownloadManifest.open_for(self.save_path, file_meta)
+                    self.resume_pos = self.manifest.completed_bytes()
+                return
+            except Exception as e:
+                print(f"[DEBUG] 批量解析dlink失败，回退单独解析: {e}")
+                self.dlink = None
+        if not self.access_token:
+            baidu_token = self.api_client.get_user_baidu_token()
+            if not baidu_token or not baidu_token.get('access_token'):
+                raise RuntimeError('无法获取用户百度token，请重新授权')
+            self.access_token = baidu_token.get('access_token')
+
+        if not self.fsid and not self.path:
+            raise RuntimeError('缺少fsid/path')
+
+        file_meta = {'fs_id': self.fsid} if self.fsid else {}
+        if self.fsid:
+            try:
+                fsid_int = int(self.fsid) if isinstance(self.fsid, str) else self.fsid
+                meta = self.api_client.get_file_metas_with_dlink([fsid_int], self.access_token)
+                meta_list = (meta.get('list') if isinstance(meta, dict) else None) or \
+                            ((meta.get('data') or {}).get('list') if isinstance(meta, dict) else None)
+                if isinstance(meta_list, list) and meta_list:
+                    self.dlink = meta_list[0].get('dlink')
+                    file_meta = meta_list[0]
+            except Exception as e:
+                print(f"[DEBUG] filemetas 获取dlink失败: {e}")
+
+        if not self.dlink and self.path:
+            # 兜底：若只有路径，尝试后端已有能力获取直链
+            alt = self.api_client.user_download_link(path=self.path, expires_hint=300)
+            if isinstance(alt, dict):
+                self.dlink = (alt.get('data') or {}).get('dlink') or alt.get('dlink')
+
+        if not self.dlink:
+            raise RuntimeError('无法获取dlink')
+
+        if self.manifest is None:
+            # 远端 fsid/size/mtime/md5 变化时丢弃旧的 .part
+            self.manifest = DownloadManifest.open_for(self.save_path, file_meta)
+            self.resume_pos = self.manifest.completed_bytes()
+
+    def run(self):
+        try:
+            if not self.dlink:
+                self.status.emit("获取下载链接...")
+                self._resolve_dlink()
+                if self._stopped:
+                    return
+            last_time = time.time()
+            last_downloaded = self.resume_pos
+
+            def _cb(percent, downloaded, total):
+                nonlocal last_time, last_downloaded
+                if self._stopped:
+                    return
+                with _EMIT_LOCK:
+                    now = time.time()
+                    elapsed = now - last_time
+                    if elapsed < PROGRESS_EMIT_INTERVAL and downloaded < total:
+                        return
+                    elapsed = max(1e-3, elapsed)
+                    inc = max(0, int(downloaded) - int(last_downloaded))
+                    speed = inc / elapsed
+                    last_time = now
+                    last_downloaded = int(downloaded)
+                    self.progress.emit(float(percent or 0.0), int(downloaded), int(total), float(speed))
+
+            self.status.emit("下载中...")
+            self.api_client.download_via_dlink(
+                self.dlink,
+                self.access_token,
+                self.save_path,
+                range_start=self.resume_pos if self.resume_pos > 0 else None,
+                progress_callback=_cb,
+                connections=self.connections,
+                should_stop=lambda: self._stopped,
+                manifest=self.manifest,
+            )
+            if not self._stopped:
+                self.finished.emit(self.save_path)
+        except Exception as e:
+            if self.resolver is not None and self.fsid:
+                # dlink 可能已过期（31360）或被风控，下次重试重新解析
+                self.resolver.invalidate(self.fsid)
+            if not self._stopped:
+                self.failed.emit(str(e))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+文件夹下载：并发遍历远端目录树
+边遍历边通过 files_found 信号交出文件条目，由下载管理器立即开始传输，
+无需等待完整列表；本地同步创建对应的目录结构（包括空目录）。
+待列出的目录按深度优先处理，并按待处理队列的长度限制同时进行的列表请求（每个请求最多带回一页子目录），
+宽目录树也不会让队列无限增长。
+"""
+
+import os
+import posixpath
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any
+
+from PySide6.QtCore import QThread, Signal
+
+
+class FolderDownloadWorker(QThread):
+    files_found = Signal(list)  # [{'fsid','save_path','path','name','size'}, ...]
+    progress = Signal(str)
+    finished = Signal(int, int)  # dirs_cnt, files_cnt
+    failed = Signal(str)
+
+    LIST_CONCURRENCY = 4  # 同时进行的 list_files 请求数
+    PAGE_SIZE = 1000
+    MAX_PENDING = 10000  # 待列出的目录/分页上限；接近上限时只保留一个列表请求，先消化已发现的子目录
+
+    def __init__(self, api_client, remote_dir: str, local_root: str, parent=None):
+        super().__init__(parent)
+        self.api_client = api_client
+        self.remote_dir = (remote_dir or '/').rstrip('/') or '/'
+        # 本地镜像根目录：<保存目录>/<远端文件夹名>
+        self.local_root = os.path.join(local_root, posixpath.basename(self.remote_dir) or 'download')
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def _local_dir(self, remote_dir: str) -> str:
+        rel = posixpath.relpath(remote_dir, self.remote_dir)
+        if rel == '.':
+            return self.local_root
+        return os.path.join(self.local_root, *rel.split('/'))
+
+    def _list_page(self, remote_dir: str, page: int) -> List[Dict[str, Any]]:
+        result = self.api_client.list_files(remote_dir, self.PAGE_SIZE, page)
+        if isinstance(result, list):
+            return result
+        if not isinstance(result, dict):
+            raise RuntimeError(f"列出目录失败: {remote_dir}")
+        status_val = str(result.get("status", "")).lower()
+        if status_val == "error":
+            raise RuntimeError(result.get("error") or result.get("message") or f"列出目录失败: {remote_dir}")
+        data = result.get("data") if isinstance(result.get("data"), dict) else result
+        return (data or {}).get("list") or (data or {}).get("files") or (data or {}).get("items") or []
+
+    def run(self):
+        dirs_cnt = 0
+        files_cnt = 0
+        try:
+            os.makedirs(self.local_root, exist_ok=True)
+            todo = deque([(self.remote_dir, 1)])
+            with ThreadPoolExecutor(max_workers=self.LIST_CONCURRENCY, thread_name_prefix="walk") as pool:
+                running = {}
+                while (todo or running) and not self._stopped:
+                    while todo and len(running) < self.LIST_CONCURRENCY:
+                        # 背压：进行中的请求各自最多再加入一页子目录，预计超出上限时不再发起新请求
+                        if running and len(todo) + self.PAGE_SIZE * (len(running) + 1) > self.MAX_PENDING:
+                            break
+                        # 后进先出：深度优先，已发现的子目录尽快列完，队列保持较短
+                        remote_dir, page = todo.pop()
+                        running[pool.submit(self._list_page, remote_dir, page)] = (remote_dir, page)
+                    done, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        remote_dir, page = running.pop(fut)
+                        items = fut.result()
+                        if page == 1:
+                            dirs_cnt += 1
+                        if len(items) >= self.PAGE_SIZE:
+                            todo.append((remote_dir, page + 1))
+                        local_dir = self._local_dir(remote_dir)
+                        batch = []
+                        for item in items:
+                            name = item.get('server_filename') or item.get('file_name') or posixpath.basename(item.get('path') or '')
+                            if not name:
+                                continue
+                            child_path = item.get('path') or posixpath.join(remote_dir, name)
+                            if int(item.get('isdir') or 0) == 1:
+                                os.makedirs(os.path.join(local_dir, name), exist_ok=True)
+                                todo.append((child_path, 1))
+                                continue
+                            batch.append({
+                                'fsid': item.get('fs_id') or item.get('fsid'),
+                                'save_path': os.path.join(local_dir, name),
+                                'path': child_path,
+                                'name': name,
+                                'size': item.get('size') or 0,
+                            })
+                        if batch and not self._stopped:
+                            files_cnt += len(batch)
+                            self.files_found.emit(batch)
+                        self.progress.emit(f"正在扫描文件夹：已发现 {dirs_cnt} 个文件夹，{files_cnt} 个文件")
+                if self._stopped:
+                    for fut in running:
+                        fut.cancel()
+                    return
+            self.finished.emit(dirs_cnt, files_cnt)
+        except Exception as e:
+            if not self._stopped:
+                self.failed.emit(str(e))
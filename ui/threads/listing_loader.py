@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+列表加载服务
+目录列表、搜索、公共资源等列表请求在异步客户端的后台事件循环上执行，不阻塞界面；
+每个通道（如主列表）只保留最新一次请求：导航时旧请求被取消，已在途的旧结果到达后直接丢弃；
+结果较多时按批次在事件循环空闲时交给视图，首批可以先显示出来。
+"""
+
+import itertools
+from typing import Optional, Callable, Dict, Any, Coroutine, List
+
+from PySide6.QtCore import QObject, QTimer
+
+
+class ListingLoader(QObject):
+    """列表加载服务（在主线程使用）
+
+    loader.load("main", client.list_files(path, 1000),
+                on_result=..., on_rows=..., on_error=...)
+
+    - on_result(result)：原始结果，返回要显示的行列表（返回 None 表示不逐批显示）
+    - on_rows(rows, first, last)：逐批显示，first 为第一批，last 为最后一批
+    - on_error(error)：请求失败（被取消的请求不回调）
+    """
+
+    CHUNK = 200  # 每批交给视图的行数
+
+    def __init__(self, bridge, parent=None):
+        super().__init__(parent)
+        self.bridge = bridge
+        self._generations = itertools.count(1)
+        # 通道 -> (代号, 异步调用编号)
+        self._active: Dict[str, tuple] = {}
+
+    def generation(self, channel: str) -> int:
+        return self._active.get(channel, (0, None))[0]
+
+    def is_busy(self, channel: str) -> bool:
+        return self._active.get(channel, (0, None))[1] is not None
+
+    def load(self, channel: str, coro: Coroutine,
+             on_result: Optional[Callable[[Any], Optional[List[Any]]]] = None,
+             on_rows: Optional[Callable[[List[Any], bool, bool], None]] = None,
+             on_error: Optional[Callable[[str], None]] = None) -> int:
+        """发起请求并取代该通道上未完成的请求，返回本次请求的代号"""
+        self.cancel(channel)
+        gen = next(self._generations)
+        self._active[channel] = (gen, None)
+        done = []
+
+        def _success(result):
+            if self.generation(channel) != gen:
+                return
+            done.append(True)
+            self._finish(channel, gen)
+            rows = on_result(result) if on_result else None
+            if on_rows is not None and rows is not None:
+                self._deliver(channel, gen, list(rows), 0, on_rows)
+
+        def _error(error):
+            if self.generation(channel) != gen:
+                return
+            done.append(True)
+            self._finish(channel, gen)
+            if on_error:
+                on_error(error)
+
+        call_id = self.bridge.submit(coro, on_success=_success, on_error=_error)
+        if self.generation(channel) == gen and not done:
+            self._active[channel] = (gen, call_id)
+        return gen
+
+    def _finish(self, channel: str, gen: int):
+        self._active[channel] = (gen, None)
+
+    def _deliver(self, channel: str, gen: int, rows: List[Any], start: int,
+                 on_rows: Callable[[List[Any], bool, bool], None]):
+        # 期间发起了新请求（导航）时剩余批次不再投递
+        if self.generation(channel) != gen:
+            return
+        end = start + self.CHUNK
+        try:
+            on_rows(rows[start:end], start == 0, end >= len(rows))
+        except Exception as e:
+            print(f"[DEBUG] 列表显示失败: {e}")
+            return
+        if end < len(rows):
+            QTimer.singleShot(0, lambda: self._deliver(channel, gen, rows, end, on_rows))
+
+    def cancel(self, channel: str):
+        """取消通道上的请求；已到达但尚未显示完的结果也不再投递"""
+        gen, call_id = self._active.pop(channel, (0, None))
+        if call_id is not None:
+            self.bridge.cancel(call_id)
+
+    def cancel_all(self):
+        for channel in list(self._active):
+            self.cancel(channel)
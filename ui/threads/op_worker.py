@@ -1,7 +1,4 @@
 from PySide6.QtCore import QThread, Signal
-from PySide6.QtWidgets import QApplication
-import time
-import posixpath
 
 
 class OperationWorker(QThread):
@@ -47,13 +44,13 @@ class OperationWorker(QThread):
                 self.op_completed.emit(self.op_name, False, f"提交失败: {err}")
                 return
 
-            # 轮询验证是否落地
+            # 确认任务是否完成
             self.op_progress.emit(self.op_name, "已提交，正在确认结果...")
             try:
                 print(f"[DEBUG][OP] dispatch result: {ret}")
             except Exception:
                 pass
-            success, msg = self._poll_verify()
+            success, msg = self._await_task(ret)
             self.op_completed.emit(self.op_name, success, msg)
         except Exception as e:
             self.op_completed.emit(self.op_name, False, f"异常: {str(e)}")
@@ -73,57 +70,28 @@ class OperationWorker(QThread):
             return self.api_client.copy_file(self.args['source_path'], self.args['target_dir'])
         return {'status': 'error', 'error': f'unsupported_op:{self.op_name}'}
 
-    def _poll_verify(self, timeout_sec: float = 15.0, interval_sec: float = 0.5):
+    def _await_task(self, ret):
         """
-        基于列表结果做简易验证：在 verify['current_dir'] 拉列表，判断 verify['expect_path'] 是否出现。
+        确认异步任务完成：有 taskid 时查询任务状态，否则按 verify['fsid'] 查文件元信息
+        （移动/重命名确认路径变为 verify['expect_path']），不再反复列目录。
         """
-        current_dir = self.verify.get('current_dir') or '/'
-        expect_path = self.verify.get('expect_path') or ''
-
-        if not expect_path:
+        if self.op_name == 'mkdir':
+            # 新建目录是同步操作，提交成功即落地
+            return True, "操作成功"
+
+        tracker = self.api_client.task_tracker
+        fsid = self.verify.get('fsid')
+        expect_path = self.verify.get('expect_path') if self.op_name in ('move', 'rename') else None
+        future = tracker.track(taskid=tracker.taskid_of(ret), fsid=fsid, expect_path=expect_path)
+        if not tracker.wait([future], should_stop=lambda: self._should_stop):
             return False, "已提交（后台处理可能稍有延迟）"
-
-        t0 = time.time()
-        while time.time() - t0 < timeout_sec and not self._should_stop:
-            try:
-                lst = self.api_client.list_files(current_dir, limit=500)
-                try:
-                    print(f"[DEBUG][OP] verify list dir={current_dir} resp_head={(str(lst)[:200] if lst is not None else 'None')}")
-                except Exception:
-                    pass
-                items = []
-                if isinstance(lst, dict):
-                    data = lst.get('data') or lst
-                    items = data.get('list') or data.get('files') or data.get('items') or []
-                elif isinstance(lst, list):
-                    items = lst
-
-                found = False
-                expect_name = posixpath.basename(expect_path.rstrip('/'))
-                for it in items:
-                    cur_path = str(it.get('path') or '')
-                    cur_name = str(it.get('server_filename') or it.get('filename') or it.get('name') or '')
-                    if cur_path == expect_path or cur_name == expect_name:
-                        found = True
-                        break
-
-                if found:
-                    try:
-                        print(f"[DEBUG][OP] verify success expect={expect_path}")
-                    except Exception:
-                        pass
-                    return True, "操作成功"
-                QApplication.processEvents()
-                time.sleep(interval_sec)
-            except Exception as e:
-                try:
-                    print(f"[DEBUG][OP] verify exception: {e}")
-                except Exception:
-                    pass
-                # 标记为未落地，提示已提交（异常），避免误判为成功
-                return False, "已提交(确认异常, 请稍后刷新查看)"
-                return True, f"已提交（确认异常：{e}）"
-
+        outcome = future.result()
+        try:
+            print(f"[DEBUG][OP] task outcome: {outcome}")
+        except Exception:
+            pass
+        if outcome['status'] == 'success':
+            return True, "操作成功"
+        if outcome['status'] == 'failed':
+            return False, f"操作失败: {outcome.get('error')}"
         return False, "已提交（后台处理可能稍有延迟）"
-
-
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+远端目录树增量同步工作线程
+"""
+
+from typing import Optional, List
+
+from PySide6.QtCore import QThread, Signal
+
+
+class RemoteSyncWorker(QThread):
+    """在后台检查并同步目录，逐个目录发出变化事件"""
+
+    # 信号定义
+    dir_changed = Signal(str, list)  # 目录路径，事件列表 [{"type", "path", "entry"}]
+    sync_finished = Signal(int, int)  # 检查的目录数，发生变化的目录数
+    sync_failed = Signal(str)
+
+    def __init__(self, api_client, dirs: Optional[List[str]] = None, force: bool = False, parent=None):
+        super().__init__(parent)
+        self.api_client = api_client
+        self.dirs = list(dirs) if dirs is not None else None
+        self.force = force
+        self._should_stop = False
+
+    def stop(self):
+        self._should_stop = True
+
+    def run(self):
+        try:
+            changes = self.api_client.remote_sync.refresh(
+                self.dirs, force=self.force,
+                on_events=lambda d, events: self.dir_changed.emit(d, events),
+                should_stop=lambda: self._should_stop)
+            checked = len(self.dirs) if self.dirs is not None else -1
+            self.sync_finished.emit(checked, len(changes))
+        except Exception as e:
+            self.sync_failed.emit(str(e))
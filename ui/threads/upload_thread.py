@@ -1,40 +1,140 @@
 #!/usr/bin/env python3
 """
 批量上传线程（避免阻塞UI）
+流水线：哈希线程池先行计算MD5 → 按批并发查重 → 多个上传并行进行
+查重请求在独立的线程池中发出，协调循环不等待查重结果，期间继续接收哈希结果、回收上传
+大文件在哈希线程池中先做指纹预检（大小 + 前256KB MD5）：未命中本地秒传索引时不计算整文件MD5，
+不查重直接上传；分片上传的文件由 precreate 完成秒传判断，照常计算分块MD5
 """
 
 from PySide6.QtCore import QThread, Signal
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import os
-import hashlib
+import threading
+import time
+
+from core.chunked_upload import ChunkedUploader
+from core.hash_cache import get_hash_cache
+from core.rapid_upload import fingerprint, get_rapid_index
 
 
 class UploadWorker(QThread):
     progress = Signal(str, int, int)  # status_text, done, total
     finished = Signal(int, int, int)  # success_cnt, failed_cnt, skipped_cnt
+    bytes_progress = Signal(object, object)  # sent_bytes, total_bytes（全部文件合计）
+
+    DEDUP_BATCH_SIZE = 20  # 一批查重的最大文件数
+    DEDUP_WINDOW = 0.2  # 秒：哈希结果在该时间内没有新完成则立即提交当前批次
+    DEDUP_WORKERS = 2  # 同时进行的查重批次数
+    PROGRESS_EMIT_INTERVAL = 0.2  # 秒：字节进度信号的最小间隔
+    CHUNKED_THRESHOLD = 64 * 1024 * 1024  # 用户态超过该大小的文件改用分片断点续传
+    RAPID_MIN_SIZE = 8 * 1024 * 1024  # 超过该大小先做秒传指纹预检，未命中的文件不计算整文件MD5
 
-    def __init__(self, api_client, file_paths: List[str], is_public: bool, user_dir: Optional[str] = None):
+    def __init__(self, api_client, file_paths: List[str], is_public: bool, user_dir: Optional[str] = None,
+                 max_concurrent: int = 3, hash_workers: int = 2, chunked_threshold: Optional[int] = None):
         super().__init__()
         self.api_client = api_client
         self.file_paths = file_paths or []
         self.is_public = bool(is_public)
         self.user_dir = user_dir or "/"
+        self.max_concurrent = max(1, int(max_concurrent or 1))  # 同时进行的上传数
+        self.hash_workers = max(1, int(hash_workers or 1))  # 并行计算MD5的线程数
+        # 0 表示禁用分片上传
+        self.chunked_threshold = self.CHUNKED_THRESHOLD if chunked_threshold is None else int(chunked_threshold)
         self._stopped = False
+        self._bytes_lock = threading.Lock()
+        self._bytes_sent: Dict[str, int] = {}  # path -> 已发送/已计入字节
+        self._bytes_total = 0
+        self._last_bytes_emit = 0.0
 
     def stop(self):
         self._stopped = True
 
     def _compute_md5(self, path: str) -> Optional[str]:
+        """在哈希线程池中执行；返回 None 表示不查重直接上传（指纹未命中或计算失败）"""
+        if self._use_chunked(path):
+            # 分片上传需要各分块MD5：一次读取同时算出，写入缓存供上传时使用
+            hashed = get_hash_cache().file_block_md5s(path, ChunkedUploader.BLOCK_SIZE, lambda: self._stopped)
+            return hashed[0] if hashed else None
+        if self._rapid_miss(path):
+            return None
+        # 文件签名未变化时直接返回缓存的MD5，重试同一批文件无需重新读取
+        return get_hash_cache().file_md5(path, lambda: self._stopped)
+
+    def _rapid_miss(self, path: str) -> bool:
+        """大文件的指纹不在本地秒传索引中（服务端大概率没有该内容，整文件MD5不值得计算）"""
+        if self._file_size(path) < self.RAPID_MIN_SIZE or get_hash_cache().get(path, 'md5'):
+            return False
+        fp = fingerprint(path)
+        return fp is not None and not get_rapid_index().candidates(*fp)
+
+    def _remember_remote(self, path: str, md5_hex: Optional[str] = None):
+        """记录服务端已有该内容，供以后秒传预检（直接上传的文件由上传流在发送时算出MD5并写入缓存）"""
+        md5_hex = md5_hex or get_hash_cache().get(path, 'md5')
+        fp = fingerprint(path) if md5_hex else None
+        if fp:
+            get_rapid_index().remember(fp[0], fp[1], md5_hex)
+
+    def _use_chunked(self, path: str) -> bool:
+        return (not self.is_public and self.chunked_threshold > 0
+                and self._file_size(path) >= self.chunked_threshold)
+
+    def _file_size(self, path: str) -> int:
         try:
-            md5 = hashlib.md5()
-            with open(path, 'rb') as f:
-                for chunk in iter(lambda: f.read(1024 * 1024), b''):
-                    if self._stopped:
-                        return None
-                    md5.update(chunk)
-            return md5.hexdigest()
+            return os.path.getsize(path)
         except Exception:
-            return None
+            return 0
+
+    def _report_bytes(self, path: str, sent: int, force: bool = False):
+        # 多个上传线程并发回调：合计后节流发出
+        with self._bytes_lock:
+            self._bytes_sent[path] = sent
+            now = time.monotonic()
+            if not force and now - self._last_bytes_emit < self.PROGRESS_EMIT_INTERVAL:
+                return
+            self._last_bytes_emit = now
+            total_sent = sum(self._bytes_sent.values())
+            self.bytes_progress.emit(min(total_sent, self._bytes_total), self._bytes_total)
+
+    def _upload_one(self, p: str, md5_hex: Optional[str]) -> bool:
+        base_name = os.path.basename(p)
+        size = self._file_size(p)
+
+        def _on_sent(sent, body_total):
+            # 请求体含表单头尾，按文件大小截断
+            self._report_bytes(p, min(sent, size))
+
+        if self.is_public:
+            resp = self.api_client.public_upload_multipart(dir_path="/用户上传", local_path=p, filename=base_name,
+                                                           md5=md5_hex, progress_callback=_on_sent)
+        else:
+            # 用户态上传：使用user_upload_local
+            # 确保目录路径以/开头
+            user_dir = self.user_dir
+            if not user_dir.startswith('/'):
+                user_dir = '/' + user_dir
+            remote_path = (user_dir.rstrip('/') + '/' + base_name) if user_dir != '/' else '/' + base_name
+            if self._use_chunked(p):
+                resp = self.api_client.user_upload_chunked(p, remote_path, progress_callback=_on_sent,
+                                                           should_stop=lambda: self._stopped)
+            else:
+                resp = self.api_client.user_upload_local_file(p, remote_path, md5=md5_hex, progress_callback=_on_sent,
+                                                              auto_md5=False)
+            # 调试输出
+            print(f"[DEBUG] 批量上传响应: {resp}")
+
+        # 检查成功状态，包括duplicate
+        ok = isinstance(resp, dict) and (resp.get('status') == 'ok' or resp.get('status') == 'duplicate')
+        try:
+            inner = (resp or {}).get('data') if isinstance(resp, dict) else None
+            if inner and isinstance(inner, dict) and str(inner.get('status') or 'ok').lower() == 'error':
+                ok = False
+        except Exception:
+            pass
+        if ok:
+            self._remember_remote(p, md5_hex)
+        return ok
 
     def run(self):
         total = len(self.file_paths)
@@ -43,56 +143,105 @@ class UploadWorker(QThread):
         failed_cnt = 0
         skipped_cnt = 0
 
-        for p in self.file_paths:
-            if self._stopped:
-                break
-            done += 1
-            base_name = os.path.basename(p)
-            self.progress.emit(f"准备上传 {base_name}", done - 1, total)
-            if not os.path.exists(p):
-                failed_cnt += 1
-                self.progress.emit(f"跳过（不存在）{base_name}", done, total)
-                continue
-
-            # 前置查重
-            md5_hex = self._compute_md5(p)
-            if md5_hex:
-                du = self.api_client.files_dedup_md5(md5_hex, 5)
+        hash_pool = ThreadPoolExecutor(max_workers=self.hash_workers, thread_name_prefix="upload-hash")
+        upload_pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="upload")
+        dedup_pool = ThreadPoolExecutor(max_workers=self.DEDUP_WORKERS, thread_name_prefix="upload-dedup")
+        hash_futs: Dict[Any, str] = {}
+        upload_futs: Dict[Any, str] = {}
+        dedup_futs: Dict[Any, List[Tuple[str, Optional[str]]]] = {}
+        dedup_batch: List[Tuple[str, Optional[str]]] = []
+
+        def _flush_dedup():
+            # 一批哈希结果交给查重线程池，结果由 _collect_dedup 处理
+            batch = dedup_batch[:self.DEDUP_BATCH_SIZE]
+            del dedup_batch[:self.DEDUP_BATCH_SIZE]
+            md5s = [m for _, m in batch if m]
+            dedup_futs[dedup_pool.submit(self.api_client.files_dedup_md5_batch, md5s, 5, self.max_concurrent)] = batch
+
+        def _collect_dedup(fut):
+            # 已存在的跳过，其余提交到上传线程池
+            nonlocal done, skipped_cnt
+            batch = dedup_futs.pop(fut)
+            try:
+                results = fut.result() or {}
+            except Exception as e:
+                print(f"[DEBUG] 批量查重失败: {e}")
+                results = {}
+            for p, md5_hex in batch:
+                base_name = os.path.basename(p)
+                du = results.get(md5_hex) if md5_hex else None
                 if isinstance(du, dict) and du.get('exists') is True:
+                    self._remember_remote(p, md5_hex)
+                    self._report_bytes(p, self._file_size(p), force=True)
                     skipped_cnt += 1
+                    done += 1
                     self.progress.emit(f"已存在，跳过 {base_name}", done, total)
                     continue
+                if isinstance(du, dict) and du.get('exists') is False:
+                    # 索引记录的内容已不在服务端
+                    get_rapid_index().forget(md5_hex)
+                self.progress.emit(f"上传中 {base_name}", done, total)
+                upload_futs[upload_pool.submit(self._upload_one, p, md5_hex)] = p
 
-            # 上传
-            if self.is_public:
-                resp = self.api_client.public_upload_multipart(dir_path="/用户上传", local_path=p, filename=base_name, md5=md5_hex)
-            else:
-                # 用户态上传：使用user_upload_local
-                # 确保目录路径以/开头
-                user_dir = self.user_dir
-                if not user_dir.startswith('/'):
-                    user_dir = '/' + user_dir
-                remote_path = (user_dir.rstrip('/') + '/' + base_name) if user_dir != '/' else '/' + base_name
-                resp = self.api_client.user_upload_local_file(p, remote_path, md5=md5_hex)
-                # 调试输出
-                print(f"[DEBUG] 批量上传响应: {resp}")
-
-            # 检查成功状态，包括duplicate
-            ok = isinstance(resp, dict) and (resp.get('status') == 'ok' or resp.get('status') == 'duplicate')
-            try:
-                inner = (resp or {}).get('data') if isinstance(resp, dict) else None
-                if inner and isinstance(inner, dict) and str(inner.get('status') or 'ok').lower() == 'error':
+        def _collect_uploads(futs):
+            nonlocal done, success_cnt, failed_cnt
+            for fut in futs:
+                p = upload_futs.pop(fut)
+                base_name = os.path.basename(p)
+                done += 1
+                try:
+                    ok = fut.result()
+                except Exception as e:
+                    print(f"[DEBUG] 上传异常 {base_name}: {e}")
                     ok = False
-            except Exception:
-                pass
+                self._report_bytes(p, self._file_size(p), force=True)
+                if ok:
+                    success_cnt += 1
+                    self.progress.emit(f"上传成功 {base_name}", done, total)
+                else:
+                    failed_cnt += 1
+                    self.progress.emit(f"上传失败 {base_name}", done, total)
 
-            if ok:
-                success_cnt += 1
-                self.progress.emit(f"上传成功 {base_name}", done, total)
-            else:
-                failed_cnt += 1
-                self.progress.emit(f"上传失败 {base_name}", done, total)
-
-        self.finished.emit(success_cnt, failed_cnt, skipped_cnt)
+        try:
+            existing = []
+            for p in self.file_paths:
+                if not os.path.exists(p):
+                    failed_cnt += 1
+                    done += 1
+                    self.progress.emit(f"跳过（不存在）{os.path.basename(p)}", done, total)
+                    continue
+                self._bytes_total += self._file_size(p)
+                existing.append(p)
+            for p in existing:
+                hash_futs[hash_pool.submit(self._compute_md5, p)] = p
 
+            # 哈希与上传重叠：哈希结果陆续进入查重批次，上传完成也在同一循环里回收
+            pending = set(hash_futs.keys())
+            while (pending or dedup_batch or dedup_futs or upload_futs) and not self._stopped:
+                waiting = pending | set(dedup_futs.keys()) | set(upload_futs.keys())
+                finished_futs, _ = wait(waiting, timeout=self.DEDUP_WINDOW, return_when=FIRST_COMPLETED)
+                new_hashes = [f for f in finished_futs if f in pending]
+                for fut in new_hashes:
+                    pending.discard(fut)
+                    p = hash_futs.pop(fut)
+                    md5_hex = fut.result()
+                    if md5_hex:
+                        dedup_batch.append((p, md5_hex))
+                    else:
+                        # 没有MD5无法查重：直接上传
+                        self.progress.emit(f"上传中 {os.path.basename(p)}", done, total)
+                        upload_futs[upload_pool.submit(self._upload_one, p, None)] = p
+                _collect_uploads([f for f in finished_futs if f in upload_futs])
+                for fut in [f for f in finished_futs if f in dedup_futs]:
+                    _collect_dedup(fut)
+                while dedup_batch and (len(dedup_batch) >= self.DEDUP_BATCH_SIZE or not new_hashes or not pending):
+                    _flush_dedup()
+        finally:
+            if self._stopped:
+                for fut in list(hash_futs.keys()) + list(dedup_futs.keys()) + list(upload_futs.keys()):
+                    fut.cancel()
+            hash_pool.shutdown(wait=True)
+            dedup_pool.shutdown(wait=True)
+            upload_pool.shutdown(wait=True)
 
+        self.finished.emit(success_cnt, failed_cnt, skipped_cnt)
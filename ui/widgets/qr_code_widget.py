@@ -8,7 +8,7 @@ from io import BytesIO
 from PySide6.QtWidgets import QLabel
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QPixmap
-import requests
+from core.transport import get_transport
 
 
 class QRCodeWidget(QLabel):
@@ -45,7 +45,7 @@ class QRCodeWidget(QLabel):
                 try:
                     # 显式禁用系统代理，添加UA，允许重定向
                     headers = {"User-Agent": "PanClient/1.0 (+https://example.local)"}
-                    resp = requests.get(
+                    resp = get_transport().get(
                         qr_url,
                         timeout=10,
                         allow_redirects=True,